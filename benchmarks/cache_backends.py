@@ -0,0 +1,134 @@
+"""
+Benchmark of the cache backends in src/models/cache
+
+Writes --entries url status payloads (like cache_utils does for /v2/check-url) with each
+backend, then reads a random sample back, and reports write and read latency and the
+disk space allocated for the entries.
+
+usage (from the top of the tree):
+    python -m benchmarks.cache_backends [--entries 1000000] [--reads 10000] [--dir /mnt/scratch]
+
+Use a --dir on the same kind of filesystem as the production json/ directory;
+1M entries need a few GB with the flat backend.
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+from src.models.cache import CacheBackend
+from src.models.cache.flat_cache_backend import FlatCacheBackend
+from src.models.cache.sharded_cache_backend import ShardedCacheBackend, zstandard
+from src.models.cache.sqlite_cache_backend import SqliteCacheBackend
+
+NAMESPACE = "status"
+
+
+def make_payload(number: int, references: int):
+    url = f"https://www.example{number % 997}.org/articles/{number}/index.html"
+    return {
+        "url": url,
+        "status_code": 200,
+        "status_code_method": "IABOT",
+        "status_code_error_details": "",
+        "tld": "org",
+        "fld": f"example{number % 997}.org",
+        "netloc": f"www.example{number % 997}.org",
+        "archive_status": {"is_archived": bool(number % 3), "archived_url": "", "last_checked": 1700000000},
+        "iabot_results": {url: {"archived": bool(number % 3), "live_state": "ALIVE", "hasarchive": False}},
+        # article like payloads
+        "references": [
+            {
+                "id": f"{number:08x}{index:08x}",
+                "name": f"cite web {index}",
+                "template_names": ["cite web"],
+                "urls": [f"https://www.example{index}.org/news/{number}/{index}"],
+                "wikitext": f"<ref>{{{{cite web |url=https://www.example{index}.org/news/{number}/{index}"
+                f" |title=Some news article {index} |access-date=2023-01-01}}}}</ref>",
+            }
+            for index in range(references)
+        ],
+    }
+
+
+def disk_usage(path: str):
+    """(bytes allocated on disk, bytes of content)"""
+    allocated = content = 0
+    for directory, _, filenames in os.walk(path):
+        for filename in filenames:
+            stat = os.stat(os.path.join(directory, filename))
+            allocated += stat.st_blocks * 512
+            content += stat.st_size
+    return allocated, content
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return statistics.median(latencies) * 1e6, p99 * 1e6
+
+
+def run(backend: CacheBackend, entries: int, reads: int, references: int):
+    os.makedirs(backend.namespace_path(NAMESPACE), exist_ok=True)
+    write_latencies = []
+    start = time.perf_counter()
+    for number in range(entries):
+        payload = make_payload(number, references)
+        before = time.perf_counter()
+        backend.set(NAMESPACE, f"IABOT-{number:016x}", payload)
+        write_latencies.append(time.perf_counter() - before)
+    write_seconds = time.perf_counter() - start
+
+    sample = random.Random(42).sample(range(entries), min(reads, entries))
+    read_latencies = []
+    for number in sample:
+        before = time.perf_counter()
+        payload = backend.get(NAMESPACE, f"IABOT-{number:016x}")
+        read_latencies.append(time.perf_counter() - before)
+        if payload is None:
+            raise SystemExit(f"{backend.name}: entry {number} not found")
+
+    return write_seconds, percentiles(write_latencies), percentiles(read_latencies), disk_usage(backend.root)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=10000)
+    parser.add_argument("--reads", type=int, default=10000)
+    parser.add_argument("--references", type=int, default=0, help="references per payload, 50 approximates an article")
+    parser.add_argument("--dir", help="directory for the temporary caches (default: system temp)")
+    args = parser.parse_args()
+
+    backends = [
+        ("flat", lambda root: FlatCacheBackend(root)),
+        ("sharded none", lambda root: ShardedCacheBackend(root, compression="none")),
+        ("sharded gzip", lambda root: ShardedCacheBackend(root, compression="gzip")),
+    ]
+    if zstandard is not None:
+        backends.append(("sharded zstd", lambda root: ShardedCacheBackend(root, compression="zstd")))
+    backends.append(("sqlite", lambda root: SqliteCacheBackend(root)))
+
+    print(f"entries: {args.entries}, reads: {min(args.reads, args.entries)}, references per entry: {args.references}")
+    print(
+        f"{'backend':>14} {'write s':>9} {'write p50/p99 us':>18} {'read p50/p99 us':>18}"
+        f" {'disk MB':>9} {'content MB':>10} {'B/entry':>8}"
+    )
+    for name, make_backend in backends:
+        root = tempfile.mkdtemp(prefix="iari-cache-bench-", dir=args.dir) + "/"
+        try:
+            seconds, (write_p50, write_p99), (read_p50, read_p99), (usage, content) = run(
+                make_backend(root), args.entries, args.reads, args.references
+            )
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+        print(
+            f"{name:>14} {seconds:9.1f} {write_p50:8.0f}/{write_p99:<9.0f} "
+            f"{read_p50:8.0f}/{read_p99:<9.0f} {usage / 1024**2:9.1f} {content / 1024**2:10.1f} {usage / args.entries:8.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark of serving a cached /article result
+
+Compares, for an article payload with --references references,
+* before: json.load of the flat cache file and a json.dumps of the response
+* dumps: json.load and helpers.json_encoding.dumps (orjson when installed)
+* encoded: the stored bytes as they are (CacheBackend.get_encoded), plain and gzipped
+
+usage (from the top of the tree):
+    python -m benchmarks.cache_hits [--references 2000] [--runs 20]
+"""
+import argparse
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import timeit
+
+from src.helpers.json_encoding import dumps, orjson
+from src.models.cache.flat_cache_backend import FlatCacheBackend
+from src.models.cache.sharded_cache_backend import ShardedCacheBackend
+
+NAMESPACE = "articles"
+KEY = "1234567890"
+
+
+def make_payload(references: int):
+    return {
+        "iari_version": "4.0.0",
+        "iari_id": KEY,
+        "page_title": "Easter_Island",
+        "served_from_cache": True,
+        "urls": [f"https://www.example{number % 97}.org/{number}" for number in range(references)],
+        "references": [
+            {
+                "id": f"ref-{number}",
+                "template_names": ["cite web"],
+                "templates": [
+                    {
+                        "name": "cite web",
+                        "parameters": {
+                            "url": f"https://www.example{number % 97}.org/{number}",
+                            "title": f"Title number {number} of the Rapa Nui",
+                            "access-date": "2023-05-01",
+                        },
+                    }
+                ],
+                "urls": [f"https://www.example{number % 97}.org/{number}"],
+                "wikitext": "<ref>{{cite web |url=https://www.example.org/ |title=Rapa Nui}}</ref>",
+            }
+            for number in range(references)
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--references", type=int, default=2000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp() + "/"
+    try:
+        os.makedirs(root + NAMESPACE)
+        payload = make_payload(args.references)
+        flat = FlatCacheBackend(root)
+        flat.set(NAMESPACE, KEY, payload)
+        sharded = ShardedCacheBackend(root, compression="gzip")
+        sharded.set(NAMESPACE, KEY, payload)
+        body, _ = flat.get_encoded(NAMESPACE, KEY)
+        print(f"{args.references} references, {len(body) / 1024:.0f} KiB, orjson {'installed' if orjson else 'missing'}")
+
+        paths = [
+            ("before", lambda: json.dumps(flat.get(NAMESPACE, KEY)).encode()),
+            ("dumps", lambda: dumps(flat.get(NAMESPACE, KEY))),
+            ("encoded", lambda: flat.get_encoded(NAMESPACE, KEY)),
+            ("encoded gzip", lambda: sharded.get_encoded(NAMESPACE, KEY)),
+            ("encoded gunzip", lambda: gzip.decompress(sharded.get_encoded(NAMESPACE, KEY)[0])),
+        ]
+        for name, path in paths:
+            seconds = min(timeit.repeat(path, number=1, repeat=args.runs))
+            print(f"{name:>15}: {seconds * 1e3:8.2f} ms per hit")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark of the compact wire format (format=compact, src/helpers/compact.py)
+
+Reports, for an /extract_refs payload made from the wikitext in test_data and for the
+references of an /article payload made from the Parsoid excerpt in test_data
+(its footnotes repeated --scale times), the size of the json and compact responses,
+plain and gzipped, and the time to encode and to parse them.
+
+usage (from the top of the tree):
+    python -m benchmarks.compact_format [--scale 200] [--runs 5]
+"""
+import argparse
+import gzip
+import json
+import logging
+import timeit
+from typing import Any, Dict
+
+from benchmarks.html_references import scale_html
+from iarilib.html_document import WikiHtmlDocument
+from src.helpers.compact import compact, expand
+from src.models.v2.analyzers.wiki_analyzer import extract_references_from_page
+from test_data.test_content import (  # type: ignore
+    easter_island_head_excerpt,
+    easter_island_parsoid_html_excerpt,
+    easter_island_tail_excerpt,
+    electrical_breakdown_full_article,
+    test_full_article,
+)
+
+
+def extract_refs_payload():
+    wikitext = "\n".join(
+        [easter_island_head_excerpt, easter_island_tail_excerpt, electrical_breakdown_full_article, test_full_article]
+    )
+    article = {"page_id": "1", "rev_id": 1, "rev_timestamp": "2024-01-01T00:00:00Z", "wikitext": wikitext}
+    return extract_references_from_page("Easter_Island", article=article)
+
+
+def article_payload(scale: int):
+    document = WikiHtmlDocument(scale_html(easter_island_parsoid_html_excerpt, scale), markup=False)
+    references = document.footnote_references()
+    url_dict: Dict[str, Dict[str, Any]] = {}
+    for ref in references:
+        for url in ref["template_urls"]:
+            url_dict.setdefault(url, {"count": 0, "refs": []})
+            url_dict[url]["count"] += 1
+            url_dict[url]["refs"].append(ref["ref_id"])
+    return {"references": references, "urls": list(url_dict), "url_dict": url_dict}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.disable(logging.DEBUG)
+    for name, payload in [("extract_refs", extract_refs_payload()), ("article", article_payload(args.scale))]:
+        plain = json.dumps(payload).encode()
+        compacted = json.dumps(compact(payload)).encode()
+        if expand(json.loads(compacted)) != payload:
+            raise SystemExit(f"{name}: the expanded compact payload differs")
+        print(f"{name}: {len(payload['references'])} references")
+        print(f"  json:    {len(plain) / 1024:8.1f} KiB, gzipped {len(gzip.compress(plain)) / 1024:8.1f} KiB")
+        print(f"  compact: {len(compacted) / 1024:8.1f} KiB, gzipped {len(gzip.compress(compacted)) / 1024:8.1f} KiB")
+        for label, function in [
+            ("encode json", lambda payload=payload: json.dumps(payload)),
+            ("encode compact", lambda payload=payload: json.dumps(compact(payload))),
+            ("parse json", lambda plain=plain: json.loads(plain)),
+            ("parse compact", lambda compacted=compacted: json.loads(compacted)),
+            ("parse and expand compact", lambda compacted=compacted: expand(json.loads(compacted))),
+        ]:
+            seconds = min(timeit.repeat(function, number=1, repeat=args.runs))
+            print(f"  {label:>24}: {seconds * 1e3:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+The frozen article corpus of the benchmark suite (see benchmarks/suite.py)
+
+Three articles of stored wikitext and Parsoid html, built deterministically from
+test_data/test_content.py so every checkout benchmarks the same input:
+
+    small   the head of Easter Island with its Parsoid excerpt
+    medium  Electrical breakdown and Easter Island, the footnotes of the excerpt repeated 20 times
+    huge    --huge-copies copies of the medium wikitext, each with its own urls and section
+            headings (so nothing is deduplicated), the footnotes repeated 500 times
+
+Changing how an article is built changes its content, so CORPUS_VERSION is bumped
+with it and results of different corpus versions are not compared.
+
+A corpus can be written to a directory, to freeze it or to benchmark other articles:
+
+    python -m benchmarks.corpus --output corpus/
+
+writes <name>.wikitext and <name>.html per article and a corpus.json manifest with
+the version and the sha256 of each file, which read_corpus() checks.
+"""
+import argparse
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from typing import Dict, List
+
+from benchmarks.html_references import scale_html
+from test_data.test_content import (  # type: ignore
+    easter_island_head_excerpt,
+    easter_island_parsoid_html_excerpt,
+    easter_island_short_tail_excerpt,
+    easter_island_tail_excerpt,
+    electrical_breakdown_full_article,
+)
+
+CORPUS_VERSION = 1
+MANIFEST = "corpus.json"
+HUGE_COPIES = 20
+
+
+@dataclass
+class CorpusArticle:
+    name: str
+    title: str
+    wikitext: str
+    html: str
+
+    @property
+    def sha256(self) -> str:
+        digest = hashlib.sha256(self.wikitext.encode())
+        digest.update(self.html.encode())
+        return digest.hexdigest()
+
+
+@dataclass
+class Corpus:
+    version: int
+    articles: List[CorpusArticle]
+
+    @property
+    def fingerprint(self) -> str:
+        """identifies the content of the corpus, results are only compared for the same one"""
+        digest = hashlib.sha256(str(self.version).encode())
+        for article in self.articles:
+            digest.update(f"{article.name}:{article.sha256}".encode())
+        return digest.hexdigest()[:16]
+
+    def get(self, names: List[str]) -> List[CorpusArticle]:
+        if not names:
+            return self.articles
+        unknown = set(names) - {article.name for article in self.articles}
+        if unknown:
+            raise ValueError(f"not in the corpus: {', '.join(sorted(unknown))}")
+        return [article for article in self.articles if article.name in names]
+
+
+def huge_wikitext(copies: int) -> str:
+    medium = medium_wikitext()
+    parts = []
+    for number in range(copies):
+        part = medium.replace("://", f"://c{number}.")
+        part = part.replace("\n== ", f"\n== Part {number} ")
+        parts.append(part)
+    return "\n".join(parts)
+
+
+def medium_wikitext() -> str:
+    return "\n".join([electrical_breakdown_full_article, easter_island_head_excerpt, easter_island_tail_excerpt])
+
+
+def build_corpus(huge_copies: int = HUGE_COPIES) -> Corpus:
+    return Corpus(
+        version=CORPUS_VERSION,
+        articles=[
+            CorpusArticle(
+                name="small",
+                title="Easter_Island",
+                wikitext="\n".join([easter_island_head_excerpt, easter_island_short_tail_excerpt]),
+                html=easter_island_parsoid_html_excerpt,
+            ),
+            CorpusArticle(
+                name="medium",
+                title="Electrical_breakdown",
+                wikitext=medium_wikitext(),
+                html=scale_html(easter_island_parsoid_html_excerpt, 20),
+            ),
+            CorpusArticle(
+                name="huge",
+                title="Electrical_breakdown",
+                wikitext=huge_wikitext(huge_copies),
+                html=scale_html(easter_island_parsoid_html_excerpt, 500),
+            ),
+        ],
+    )
+
+
+def write_corpus(corpus: Corpus, directory: str) -> None:
+    os.makedirs(directory, exist_ok=True)
+    manifest: Dict = {"version": corpus.version, "articles": {}}
+    for article in corpus.articles:
+        files = {}
+        for extension, content in [("wikitext", article.wikitext), ("html", article.html)]:
+            filename = f"{article.name}.{extension}"
+            with open(os.path.join(directory, filename), "w", encoding="utf-8", newline="") as file:
+                file.write(content)
+            files[extension] = hashlib.sha256(content.encode()).hexdigest()
+        manifest["articles"][article.name] = {"title": article.title, "sha256": files}
+    with open(os.path.join(directory, MANIFEST), "w") as file:
+        json.dump(manifest, file, indent=2)
+
+
+def read_corpus(directory: str) -> Corpus:
+    """
+    the corpus in directory: the articles of its corpus.json,
+    or every <name>.wikitext (with <name>.html if any) when there is no manifest
+    """
+    manifest_path = os.path.join(directory, MANIFEST)
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as file:
+            manifest = json.load(file)
+    else:
+        names = sorted(name[: -len(".wikitext")] for name in os.listdir(directory) if name.endswith(".wikitext"))
+        manifest = {"version": 0, "articles": {name: {"title": name} for name in names}}
+
+    articles = []
+    for name, entry in manifest["articles"].items():
+        contents = {}
+        for extension in ["wikitext", "html"]:
+            path = os.path.join(directory, f"{name}.{extension}")
+            contents[extension] = ""
+            if os.path.exists(path):
+                with open(path, encoding="utf-8", newline="") as file:
+                    contents[extension] = file.read()
+            expected = entry.get("sha256", {}).get(extension)
+            if expected and hashlib.sha256(contents[extension].encode()).hexdigest() != expected:
+                raise ValueError(f"{path} does not match the sha256 in {MANIFEST}")
+        articles.append(CorpusArticle(name=name, title=entry["title"], **contents))
+    return Corpus(version=manifest["version"], articles=articles)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", required=True, help="directory to write the corpus to")
+    parser.add_argument("--huge-copies", type=int, default=HUGE_COPIES)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.huge_copies)
+    write_corpus(corpus, args.output)
+    for article in corpus.articles:
+        print(f"{article.name}: {len(article.wikitext) / 1024:8.1f} KiB wikitext, {len(article.html) / 1024:8.1f} KiB html")
+    print(f"corpus version {corpus.version}, fingerprint {corpus.fingerprint}")
+
+
+if __name__ == "__main__":
+    main()
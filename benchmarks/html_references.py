@@ -0,0 +1,68 @@
+"""
+Benchmark of html reference extraction for /v2/article
+
+Compares the old three-parse path (footnote refs, section refs and cite refs
+each parsing the html on their own, see benchmarks/legacy_html_references.py)
+with a single shared WikiHtmlDocument, and checks that both give the same output.
+
+usage (from the top of the tree):
+    python -m benchmarks.html_references [--html-file page.html] [--scale 200] [--runs 5]
+
+Without --html-file the Parsoid excerpt in test_data is used, with its footnotes
+repeated --scale times to approximate a large enwiki article.
+"""
+import argparse
+import re
+import timeit
+
+from benchmarks import legacy_html_references
+from iarilib.html_document import WikiHtmlDocument
+from test_data.test_content import easter_island_parsoid_html_excerpt
+
+
+def scale_html(html: str, scale: int) -> str:
+    """repeat the <li>s of the references list scale times"""
+    match = re.search(r'(<ol class="mw-references references"[^>]*>)(.*?)(</ol>)', html, re.DOTALL)
+    if not match or scale <= 1:
+        return html
+    return html[: match.start(2)] + match.group(2) * scale + html[match.end(2):]
+
+
+def three_parse_path(html: str):
+    footnote_refs = legacy_html_references.footnote_references(html)
+    section_refs = legacy_html_references.section_references(html, len(footnote_refs))
+    cite_refs = legacy_html_references.extract_cite_refs(html)
+    return footnote_refs + section_refs, cite_refs
+
+
+def single_parse_path(html: str):
+    document = WikiHtmlDocument(html)
+    footnote_refs = document.footnote_references()
+    section_refs = document.section_references(len(footnote_refs))
+    return footnote_refs + section_refs, document.cite_refs()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--html-file", help="Parsoid html of an article")
+    parser.add_argument("--scale", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.html_file:
+        with open(args.html_file) as file:
+            html = file.read()
+    else:
+        html = scale_html(easter_island_parsoid_html_excerpt, args.scale)
+
+    if three_parse_path(html) != single_parse_path(html):
+        raise SystemExit("output of the two paths differs")
+
+    print(f"html size: {len(html)} bytes, references: {len(single_parse_path(html)[0])}")
+    for name, path in [("three parses", three_parse_path), ("single parse", single_parse_path)]:
+        best = min(timeit.repeat(lambda p=path: p(html), number=1, repeat=args.runs))
+        print(f"{name:>14}: {best * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark of incremental re-analysis of articles (WikipediaReferenceExtractorV2 incremental=True)
+
+Replays the revision history of a page from oldest to newest, extracting the references
+of every revision with a full extraction and with an incremental one that reuses the
+sections and references of the revisions before it. Checks that both give the same
+references and reports the extraction times.
+
+usage (from the top of the tree):
+    python -m benchmarks.incremental_analysis [--title Easter_Island] [--lang en] [--revisions 50]
+    python -m benchmarks.incremental_analysis --dir revisions/
+
+With --dir, the revisions are read from the *.wikitext files in that directory, in name order.
+"""
+import argparse
+import os
+import statistics
+import time
+from typing import Dict, List
+
+import config
+from src.helpers.http_client import get_session
+from src.models.v2.job.article_job_v2 import ArticleJobV2
+from src.models.v2.wikimedia.wikipedia.reference.analysis_cache_v2 import (
+    get_analysis_cache,
+)
+from src.models.v2.wikimedia.wikipedia.reference.extractor_v2 import (
+    WikipediaReferenceExtractorV2,
+)
+
+
+def fetch_revisions(lang: str, title: str, count: int) -> List[str]:
+    """wikitext of the last count revisions of title, oldest first"""
+    revisions: List[str] = []
+    params: Dict[str, str] = {
+        "action": "query",
+        "format": "json",
+        "formatversion": "2",
+        "prop": "revisions",
+        "titles": title,
+        "rvprop": "ids|content",
+        "rvslots": "main",
+        "rvlimit": str(min(count, 50)),
+    }
+    while len(revisions) < count:
+        response = get_session().get(f"https://{lang}.wikipedia.org/w/api.php", params=params, timeout=60)
+        response.raise_for_status()
+        data = response.json()
+        page = data["query"]["pages"][0]
+        revisions.extend(
+            revision["slots"]["main"]["content"] for revision in page.get("revisions", [])
+        )
+        if "continue" not in data:
+            break
+        params.update(data["continue"])
+    return list(reversed(revisions[:count]))
+
+
+def read_revisions(directory: str) -> List[str]:
+    revisions = []
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith(".wikitext"):
+            with open(os.path.join(directory, filename)) as file:
+                revisions.append(file.read())
+    return revisions
+
+
+def extract(job: ArticleJobV2, wikitext: str, incremental: bool):
+    start = time.perf_counter()
+    extractor = WikipediaReferenceExtractorV2(wikitext=wikitext, job=job, incremental=incremental)
+    extractor.extract_all_references()
+    return time.perf_counter() - start, extractor
+
+
+def summary(extractor):
+    return [
+        (reference.section, reference.reference_id, reference.is_general_reference, reference.raw_urls)
+        for reference in extractor.references
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--title", default="Easter_Island")
+    parser.add_argument("--lang", default="en")
+    parser.add_argument("--revisions", type=int, default=50)
+    parser.add_argument("--dir", help="directory with *.wikitext revisions")
+    parser.add_argument("--memo", action="store_true", help="also use the reference extraction memo")
+    args = parser.parse_args()
+    if not args.memo:
+        config.reference_memo_size = 0
+
+    if args.dir:
+        revisions = read_revisions(args.dir)
+    else:
+        revisions = fetch_revisions(args.lang, args.title, args.revisions)
+    if not revisions:
+        raise SystemExit("no revisions found")
+
+    job = ArticleJobV2(url=f"https://{args.lang}.wikipedia.org/wiki/{args.title}")
+    job.__extract_url__()
+    get_analysis_cache().clear()
+
+    full_times, incremental_times, reused, sections = [], [], 0, 0
+    for number, wikitext in enumerate(revisions):
+        full_time, full = extract(job, wikitext, incremental=False)
+        incremental_time, incremental = extract(job, wikitext, incremental=True)
+        if summary(full) != summary(incremental):
+            raise SystemExit(f"revision {number}: incremental extraction differs from the full extraction")
+        full_times.append(full_time)
+        # the first revision fills the cache
+        if number:
+            incremental_times.append(incremental_time)
+            reused += incremental.reused_sections
+            sections += len(incremental.sections)
+
+    print(f"{len(revisions)} revisions, {len(full.references)} references in the last one")
+    print(f"full extraction:        median {statistics.median(full_times) * 1000:8.1f} ms")
+    if incremental_times:
+        print(f"incremental extraction: median {statistics.median(incremental_times) * 1000:8.1f} ms")
+        print(f"reused sections:        {reused} of {sections}")
+
+
+if __name__ == "__main__":
+    main()
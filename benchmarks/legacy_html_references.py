@@ -0,0 +1,199 @@
+"""
+The html reference extraction of /v2/article as it was before WikiHtmlDocument
+
+A copy of WikipediaArticleV2.__extract_footnote_references__, __extract_section_references__
+(with their template helpers) and iarilib.parse_utils.extract_cite_refs, each parsing
+the html on its own, so benchmarks.html_references can time the old path and check that
+WikiHtmlDocument still gives the same output. Not used by IARI itself.
+"""
+import json
+import re
+from typing import Any, Dict, List, Optional
+from urllib.parse import unquote
+
+from bs4 import BeautifulSoup
+
+REGEX_EXTRACT_REF_NAME = r"#cite_note-(.*?)-\d+$"
+
+
+def parse_template(template_data) -> Optional[Dict[str, Any]]:
+    ref_dict = json.loads(template_data.strip("'"))
+    parts = ref_dict.get("parts")
+    template = None
+    if parts and len(parts) > 0:
+        my_template = parts[0].get("template")
+        if my_template:
+            template = {}
+            if "target" in my_template and "wt" in my_template["target"]:
+                template["name"] = my_template["target"]["wt"].strip()
+            my_params = my_template["params"]
+            if my_params:
+                template["parameters"] = {key: my_params[key]["wt"] for key in my_params}
+    return template
+
+
+def parse_span_template(span_data) -> List[str]:
+    return [unquote(elem.replace("+", " ")) for elem in span_data.split("&")]
+
+
+def cite_urls(cite) -> List[str]:
+    urls = []
+    for a in cite.find_all("a"):
+        href = a.get("href")
+        if re.match(r"^https?://", href) is not None:
+            urls.append(href)
+    return urls
+
+
+def templates_of(element) -> List[Dict[str, Any]]:
+    templates = []
+    for link_ref in element.find_all("link"):
+        template_data = link_ref.get("data-mw")
+        if template_data:
+            template = parse_template(template_data)
+            if template:
+                templates.append(template)
+    return templates
+
+
+def template_urls_of(templates) -> List[str]:
+    return [
+        template["parameters"]["url"]
+        for template in templates
+        if "parameters" in template and "url" in template["parameters"]
+    ]
+
+
+def footnote_references(html: str, ref_counter: int = 0) -> List[Dict[str, Any]]:
+    soup = BeautifulSoup(html, "html.parser")
+    references_wrapper = soup.find("div", class_="mw-references-wrap")
+    refs: List[Dict[str, Any]] = []
+    if not references_wrapper:
+        return refs
+    references_list = references_wrapper.find("ol", class_="references")
+    for ref in references_list.find_all("li"):  # type: ignore[union-attr]
+        ref_counter += 1
+        page_refs = [
+            {"href": link.get("href"), "id": link.get("id")}
+            for link in ref.find_all("a")
+            if link.find("span", class_="mw-linkback-text")
+        ]
+        templates: List[Dict[str, Any]] = []
+        span_templates = []
+        cite_html = None
+        span_html = None
+        urls: List[str] = []
+        template_urls: List[str] = []
+        ref_info: Dict[str, Any] = {"about_link": ref.get("about"), "ref_name": "", "cite_id": "", "cite_class": ""}
+        match = re.search(REGEX_EXTRACT_REF_NAME, ref_info["about_link"])
+        if match:
+            ref_info["ref_name"] = match.group(1)
+
+        span_ref = ref.find("span", class_="mw-reference-text")
+        if span_ref:
+            templates = templates_of(span_ref)
+            template_urls = template_urls_of(templates)
+            cite = span_ref.find("cite")
+            if cite:
+                cite_html = cite.prettify()
+                urls = cite_urls(cite)
+                ref_info["cite_id"] = cite.get("id")
+                ref_info["cite_class"] = cite.get("class")
+            for span in span_ref.find_all("span", class_="Z3988"):
+                span_data = span.get("title")
+                if span_data:
+                    span_templates.append(parse_span_template(span_data))
+            if not cite_html:
+                # as before: the last Z3988 span when there is one, else the reference text
+                span_html = (span if span_ref.find_all("span", class_="Z3988") else span_ref).prettify()
+
+        refs.append(
+            {
+                "wiki_ref_id": ref.get("id"),
+                "ref_id": ref_counter,
+                "source_section": "References",
+                "cite_def_link": ref.get("about"),
+                "cite_ref_links": page_refs,
+                "template_names": [template["name"] for template in templates if "name" in template],
+                "templates": templates,
+                "urls": urls,
+                "template_urls": template_urls,
+                "span_templates": span_templates,
+                "cite_html": cite_html,
+                "span_html": span_html,
+                "ref_info": ref_info,
+            }
+        )
+    return refs
+
+
+def section_references(html: str, ref_counter: int = 0) -> List[Dict[str, Any]]:
+    soup = BeautifulSoup(html, "html.parser")
+    refs: List[Dict[str, Any]] = []
+    for section in soup.find_all("section"):
+        for section_id in ["Bibliography", "Further_reading"]:
+            if not section.find("h2", id=section_id):
+                continue
+            ref_list = section.find("ul")
+            if not ref_list:
+                continue
+            for ref in ref_list.find_all("li"):
+                ref_counter += 1
+                templates = templates_of(ref)
+                cite = ref.find("cite")
+                refs.append(
+                    {
+                        "wiki_ref_id": ref.get("id"),
+                        "ref_id": ref_counter,
+                        "source_section": section_id,
+                        "cite_ref_link": "",
+                        "cite_def_links": [],
+                        "template_names": [template["name"] for template in templates if "name" in template],
+                        "templates": templates,
+                        "urls": cite_urls(cite) if cite else [],
+                        "template_urls": template_urls_of(templates),
+                        "span_templates": [],
+                        "cite_html": cite.prettify() if cite else "",
+                    }
+                )
+    return refs
+
+
+def extract_cite_refs(html: str) -> List[Dict[str, Any]]:
+    soup = BeautifulSoup(html, "html.parser")
+    ref_wrapper = soup.find("div", class_="mw-references-wrap")
+    refs: List[Dict[str, Any]] = []
+    if not ref_wrapper:
+        return refs
+    for ref in ref_wrapper.find("ol", class_="references").find_all("li"):  # type: ignore[union-attr]
+        cite_html = None
+        span_html = None
+        urls: List[str] = []
+        page_refs = [
+            {"href": link.get("href"), "id": link.get("id")}
+            for link in ref.find_all("a")
+            if link.find("span", class_="mw-linkback-text")
+        ]
+        span_link = ref.find("span", class_="mw-reference-text")
+        raw_data = None
+        if span_link:
+            link_data = span_link.find("link")
+            if link_data:
+                raw_data = link_data.get("data-mw")
+            cite = span_link.find("cite")
+            if cite:
+                cite_html = cite.prettify()
+                urls = cite_urls(cite)
+        if not cite_html:
+            span_html = span_link.prettify() if span_link else ""
+        refs.append(
+            {
+                "id": ref.get("id"),
+                "raw_data": raw_data,
+                "page_refs": page_refs,
+                "cite_html": cite_html,
+                "span_html": span_html,
+                "urls": urls,
+            }
+        )
+    return refs
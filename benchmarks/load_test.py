@@ -0,0 +1,74 @@
+"""
+Load test of a running IARI, e.g. one replaying recorded upstream calls
+
+Record the upstream calls of the requests to load test once, then replay them
+(http_mode in config.py, see src/helpers/http_replay.py), so the load test never
+reaches MediaWiki, ORES, IABot, ...:
+
+    # config.py: http_mode = "record"
+    gunicorn -w 4 "src:app"  &  python -m benchmarks.load_test --requests 1 --path ...
+    # config.py: http_mode = "replay", http_replay_latency = {"default": "recorded"}
+    gunicorn -w 4 "src:app"  &  python -m benchmarks.load_test --concurrency 64 --path ...
+
+usage (from the top of the tree):
+    python -m benchmarks.load_test [--url http://localhost:5000] [--concurrency 32] [--requests 1000]
+        --path "/v2/extract_refs?page_title=Easter_Island&domain=en.wikipedia.org&refresh=true" [--path ...]
+
+The paths are requested round robin. Reports the throughput, the latency percentiles
+and the number of responses per status.
+"""
+import argparse
+import statistics
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+import requests
+
+
+def fetch(session: requests.Session, url: str, timeout: float) -> Tuple[int, float]:
+    start = time.perf_counter()
+    try:
+        status = session.get(url, timeout=timeout).status_code
+    except requests.RequestException:
+        status = 0
+    return status, time.perf_counter() - start
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--path", action="append", required=True)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=300)
+    args = parser.parse_args()
+
+    urls = [args.url.rstrip("/") + args.path[number % len(args.path)] for number in range(args.requests)]
+    session = requests.Session()
+    session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=args.concurrency))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as executor:
+        results = list(executor.map(lambda url: fetch(session, url, args.timeout), urls))
+    seconds = time.perf_counter() - start
+
+    latencies = [latency for _, latency in results]
+    print(f"{len(results)} requests in {seconds:.1f} s, {len(results) / seconds:.1f} requests/s")
+    print(
+        f"latency: median {statistics.median(latencies) * 1e3:.0f} ms, "
+        f"p90 {percentile(latencies, 0.9) * 1e3:.0f} ms, p99 {percentile(latencies, 0.99) * 1e3:.0f} ms, "
+        f"max {max(latencies) * 1e3:.0f} ms"
+    )
+    for status, count in sorted(Counter(status for status, _ in results).items()):
+        print(f"  {status or 'connection error'}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark of the reference extraction memo (src/models/v2/wikimedia/wikipedia/reference/extraction_memo_v2.py)
+
+Extracts the references of a batch of articles, as a batch run over many articles
+would, first without and then with the memo, and reports the time per reference.
+The articles are the ones in test_data, each repeated --copies times with a few
+article specific references added, so most citations recur across the batch like
+popular sources do on Wikipedia.
+
+usage (from the top of the tree):
+    python -m benchmarks.reference_memo [--copies 20] [--dir articles/]
+
+With --dir, the articles are read from the *.wikitext files in that directory instead.
+"""
+import argparse
+import os
+import time
+from typing import List
+
+import config
+from src.models.v2.job.article_job_v2 import ArticleJobV2
+from src.models.v2.wikimedia.wikipedia.reference.extraction_memo_v2 import (
+    get_reference_memo,
+)
+from src.models.v2.wikimedia.wikipedia.reference.extractor_v2 import (
+    WikipediaReferenceExtractorV2,
+)
+from test_data.test_content import (  # type: ignore
+    easter_island_head_excerpt,
+    electrical_breakdown_full_article,
+    old_norse_sources,
+    test_full_article,
+)
+
+
+def make_articles(copies: int) -> List[str]:
+    articles = []
+    for number in range(copies):
+        for article in [
+            easter_island_head_excerpt,
+            electrical_breakdown_full_article,
+            old_norse_sources,
+            test_full_article,
+        ]:
+            articles.append(
+                article + f"\n<ref>{{{{cite web |url=https://example.org/{number} |title=Article {number}}}}}</ref>"
+            )
+    return articles
+
+
+def read_articles(directory: str) -> List[str]:
+    articles = []
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith(".wikitext"):
+            with open(os.path.join(directory, filename)) as file:
+                articles.append(file.read())
+    return articles
+
+
+def run(job: ArticleJobV2, articles: List[str]):
+    """(seconds, number of references)"""
+    references = 0
+    start = time.perf_counter()
+    for wikitext in articles:
+        extractor = WikipediaReferenceExtractorV2(wikitext=wikitext, job=job)
+        extractor.extract_all_references()
+        references += extractor.number_of_references
+    return time.perf_counter() - start, references
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--copies", type=int, default=20)
+    parser.add_argument("--dir", help="directory with *.wikitext articles")
+    args = parser.parse_args()
+
+    articles = read_articles(args.dir) if args.dir else make_articles(args.copies)
+    job = ArticleJobV2(url="https://en.wikipedia.org/wiki/Easter_Island")
+    job.__extract_url__()
+
+    config.reference_memo_size = 0
+    seconds, references = run(job, articles)
+    print(f"{len(articles)} articles, {references} references")
+    print(f"without memo: {seconds / references * 1000:7.3f} ms per reference")
+
+    config.reference_memo_size = 100000
+    seconds, references = run(job, articles)
+    memo = get_reference_memo()
+    print(f"with memo:    {seconds / references * 1000:7.3f} ms per reference ({memo.hits} hits, {memo.misses} misses)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+"""
+Offline benchmark suite of the three reference extraction pipelines
+
+    legacy        WikipediaArticle + WikipediaAnalyzer (/statistics/article)
+    v2            WikipediaArticleV2 + WikipediaReferenceExtractorV2 (/v2/article)
+    extract_refs  WikiAnalyzerV2.get_page_data (/v2/extract_refs)
+
+over the frozen corpus of benchmarks/corpus.py. Nothing is fetched: the wikitext and
+html of the corpus are handed to each pipeline and any network connection fails the run.
+
+The time of each run is split into stages by wrapping the functions that do the work
+(see STAGES), each stage counting its own time without that of the stages it calls:
+
+    parse          wikitext and html parsing
+    sections       splitting the wikitext into sections
+    references     finding the references (and their claims) in sections and html
+    templates      normalizing template names and parameters
+    urls           url parsing and analysis
+    serialization  encoding the result as the endpoint does (src/helpers/json_encoding.py)
+    other          the rest of the run
+
+Each pipeline and article is run --runs times in a fresh process, with the reference
+memo and incremental analysis disabled so every run does the full work. The minimum
+and median of each stage are reported, with the peak RSS of the process.
+
+usage (from the top of the tree):
+    python -m benchmarks.suite [--runs 5] [--pipeline v2] [--article small]
+        [--corpus-dir corpus/] [--output results.json] [--compare baseline.json] [--threshold 1.2]
+
+--output writes the results as json; --compare reports the stages, totals and peak RSS
+that are more than --threshold times those of an earlier results file and exits with 1
+if there are any, so a run can gate a change:
+
+    git stash && python -m benchmarks.suite --output baseline.json && git stash pop
+    python -m benchmarks.suite --compare baseline.json
+"""
+import argparse
+import functools
+import importlib
+import json
+import logging
+import multiprocessing
+import platform
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import warnings
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.corpus import Corpus, CorpusArticle, build_corpus, read_corpus
+
+RESULTS_VERSION = 1
+PIPELINES = ["legacy", "v2", "extract_refs"]
+STAGE_NAMES = ["parse", "sections", "references", "templates", "urls", "serialization", "other"]
+
+# pipeline: [(stage, module, attribute path), ...], the functions timed as the stage
+STAGES: Dict[str, List[Tuple[str, str, str]]] = {
+    "legacy": [
+        ("parse", "src.models.wikimedia.wikipedia.reference.extractor", "WikipediaReferenceExtractor.__parse_wikitext__"),
+        ("parse", "src.models.wikimedia.wikipedia.reference.extractor", "WikipediaReferenceExtractor.__parse_html_source__"),
+        ("sections", "src.models.wikimedia.wikipedia.reference.extractor", "WikipediaReferenceExtractor.__extract_sections__"),
+        ("references", "src.models.mediawiki.section", "MediawikiSection.extract"),
+        ("templates", "src.models.wikimedia.wikipedia.reference.template.template", "WikipediaTemplate.extract_and_prepare_parameter_and_flds"),
+        ("urls", "src.models.wikimedia.wikipedia.url", "WikipediaUrl.__parse_extract_and_validate__"),
+        ("serialization", "src.helpers.json_encoding", "dumps"),
+    ],
+    "v2": [
+        ("parse", "src.models.v2.wikimedia.wikipedia.reference.extractor_v2", "WikipediaReferenceExtractorV2.__parse_wikitext__"),
+        ("parse", "src.models.v2.wikimedia.wikipedia.article_v2", "WikipediaArticleV2.__parse_html__"),
+        ("sections", "src.models.v2.wikimedia.wikipedia.reference.extractor_v2", "WikipediaReferenceExtractorV2.__extract_sections__"),
+        ("references", "src.models.v2.wikimedia.wikipedia.section_v2", "WikipediaSectionV2.extract"),
+        ("references", "src.models.v2.wikimedia.wikipedia.article_v2", "WikipediaArticleV2.__extract_footnote_references__"),
+        ("references", "src.models.v2.wikimedia.wikipedia.article_v2", "WikipediaArticleV2.__extract_section_references__"),
+        ("templates", "src.models.v2.wikimedia.wikipedia.reference.template", "WikipediaTemplateV2.extract_and_prepare_parameter_and_flds"),
+        ("urls", "src.models.v2.wikimedia.wikipedia.url_v2", "WikipediaUrlV2.__parse_extract_and_validate__"),
+        ("urls", "src.models.v2.wikimedia.wikipedia.article_v2", "WikipediaArticleV2.__extract_urls_from_references__"),
+        ("serialization", "src.helpers.json_encoding", "dumps"),
+    ],
+    "extract_refs": [
+        ("parse", "mwparserfromhell", "parse"),
+        ("sections", "src.models.v2.analyzers.wiki_analyzer", "mw_extract_sections"),
+        ("references", "src.models.v2.analyzers.wiki_analyzer", "get_refs_from_section"),
+        ("references", "src.models.v2.analyzers.wiki_analyzer", "get_claim"),
+        ("references", "src.models.v2.analyzers.wiki_analyzer", "extract_cite_refs"),
+        ("templates", "src.models.v2.analyzers.wiki_analyzer", "get_templates_from_ref"),
+        ("urls", "src.models.v2.analyzers.wiki_analyzer", "extract_urls_from_text"),
+        ("serialization", "src.helpers.json_encoding", "dumps"),
+    ],
+}
+
+
+class StageTimer:
+    """the exclusive time and number of calls of each stage"""
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        # the time spent in stages called by the running ones, innermost last
+        self.nested: List[float] = []
+
+    def reset(self):
+        self.seconds = {}
+        self.calls = {}
+        self.nested = []
+
+    def wrap(self, stage: str, function: Callable) -> Callable:
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            self.nested.append(0.0)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                nested = self.nested.pop()
+                self.seconds[stage] = self.seconds.get(stage, 0.0) + elapsed - nested
+                self.calls[stage] = self.calls.get(stage, 0) + 1
+                if self.nested:
+                    self.nested[-1] += elapsed
+
+        return timed
+
+    def install(self, pipeline: str) -> None:
+        for stage, module_name, path in STAGES[pipeline]:
+            owner: Any = importlib.import_module(module_name)
+            *owners, attribute = path.split(".")
+            for name in owners:
+                owner = getattr(owner, name)
+            function = owner.__dict__[attribute] if isinstance(owner, type) else getattr(owner, attribute)
+            setattr(owner, attribute, self.wrap(stage, function))
+
+
+def refuse_connections(*args, **kwargs):
+    raise ConnectionError("the benchmark suite runs offline, the pipeline tried to connect")
+
+
+def run_legacy(article: CorpusArticle) -> Dict[str, Any]:
+    from src.models.api.job.article_job import ArticleJob
+    from src.models.wikimedia.wikipedia.analyzer import WikipediaAnalyzer
+    from src.models.wikimedia.wikipedia.article import WikipediaArticle
+
+    job = ArticleJob(
+        title=article.title,
+        page_id=1,
+        revision=1,
+        sections="bibliography|further reading|works cited|sources|external links",
+    )
+    wikipedia_article = WikipediaArticle(
+        job=job,
+        wikitext=article.wikitext,
+        html_markup=article.html,
+        md5hash=None,
+        revision_isodate=datetime(2024, 1, 1),
+        revision_timestamp=1704067200,
+        page_id=1,
+    )
+    # the ORES scores are fetched, the rest of the pipeline is timed
+    wikipedia_article.ores_details = {}
+    WikipediaArticle.__get_ores_scores__ = lambda self: None  # type: ignore
+    analyzer = WikipediaAnalyzer(job=job, article=wikipedia_article)
+    wikipedia_article.fetch_and_extract_and_parse()
+    return analyzer.get_statistics()
+
+
+def run_v2(article: CorpusArticle) -> Dict[str, Any]:
+    from src.models.v2.job.article_job_v2 import ArticleJobV2
+    from src.models.v2.wikimedia.wikipedia.analyzer_v2 import WikipediaAnalyzerV2
+    from src.models.v2.wikimedia.wikipedia.article_v2 import WikipediaArticleV2
+
+    job = ArticleJobV2(title=article.title, page_id=1, revision=1)
+    wikipedia_article = WikipediaArticleV2(
+        job=job,
+        wikitext=article.wikitext,
+        html_markup=article.html,
+        ores_details={},
+        revision_isodate=datetime(2024, 1, 1),
+        revision_timestamp=1704067200,
+        page_id=1,
+    )
+    return WikipediaAnalyzerV2(job=job, article=wikipedia_article).get_article_data()
+
+
+def run_extract_refs(article: CorpusArticle) -> Dict[str, Any]:
+    from src.models.v2.analyzers.wiki_analyzer import WikiAnalyzerV2
+
+    page_spec = {"page_title": article.title, "domain": "en.wikipedia.org", "as_of": None, "hydrate": False}
+    revision = {"page_id": "1", "rev_id": 1, "rev_timestamp": "2024-01-01T00:00:00Z", "wikitext": article.wikitext}
+    return WikiAnalyzerV2.get_page_data(page_spec, article=revision)
+
+
+RUNNERS = {"legacy": run_legacy, "v2": run_v2, "extract_refs": run_extract_refs}
+
+
+def peak_rss_mib() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def benchmark(pipeline: str, article: CorpusArticle, runs: int) -> Dict[str, Any]:
+    """the timings of pipeline on article, run in a process of its own (see run_in_process)"""
+    import config
+    import src.models.v2.analyzers.wiki_analyzer as wiki_analyzer
+    from src.helpers import json_encoding
+
+    logging.disable(logging.CRITICAL)
+    warnings.simplefilter("ignore")
+    socket.socket.connect = refuse_connections  # type: ignore
+    socket.getaddrinfo = refuse_connections  # type: ignore
+    # optional settings, not in every config.py
+    setattr(config, "reference_memo_size", 0)  # noqa: B010
+    setattr(config, "incremental_analysis", False)  # noqa: B010
+    # the html of extract_refs comes from the corpus too
+    wiki_analyzer.fetch_page_html = lambda *args, **kwargs: article.html
+
+    timer = StageTimer()
+    timer.install(pipeline)
+    rss_before = peak_rss_mib()
+
+    samples: List[Dict[str, float]] = []
+    calls: Dict[str, int] = {}
+    data: Dict[str, Any] = {}
+    for _ in range(runs):
+        timer.reset()
+        start = time.perf_counter()
+        data = RUNNERS[pipeline](article)
+        json_encoding.dumps(data)
+        total = time.perf_counter() - start
+        sample = {stage: timer.seconds.get(stage, 0.0) for stage in STAGE_NAMES[:-1]}
+        sample["other"] = max(total - sum(sample.values()), 0.0)
+        sample["total"] = total
+        samples.append(sample)
+        calls = dict(timer.calls)
+
+    return {
+        "pipeline": pipeline,
+        "article": article.name,
+        "references": data.get("reference_count", len(data.get("references", []))),
+        "urls": len(data.get("urls", [])),
+        "stages": {
+            stage: {
+                "min_ms": min(sample[stage] for sample in samples) * 1e3,
+                "median_ms": statistics.median(sample[stage] for sample in samples) * 1e3,
+                "calls": calls.get(stage, 0),
+            }
+            for stage in STAGE_NAMES + ["total"]
+        },
+        "rss_before_mib": rss_before,
+        "peak_rss_mib": peak_rss_mib(),
+    }
+
+
+def run_in_process(pipeline: str, article: CorpusArticle, runs: int) -> Dict[str, Any]:
+    """benchmark() in a fresh process, so its peak RSS and module state are its own"""
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1) as pool:
+        return pool.apply(benchmark, (pipeline, article, runs))
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """the regressions of results against baseline: measures more than threshold times larger"""
+    if results["corpus"] != baseline["corpus"]:
+        print(f"warning: the baseline was run on corpus {baseline['corpus']}, this run on {results['corpus']}")
+    baseline_runs = {(run["pipeline"], run["article"]): run for run in baseline["runs"]}
+    regressions = []
+    for run in results["runs"]:
+        base = baseline_runs.get((run["pipeline"], run["article"]))
+        if not base:
+            continue
+        measures = [(f"{stage} min_ms", run["stages"][stage]["min_ms"], base["stages"][stage]["min_ms"])
+                    for stage in STAGE_NAMES + ["total"]]
+        measures.append(("peak_rss_mib", run["peak_rss_mib"], base["peak_rss_mib"]))
+        for measure, value, base_value in measures:
+            # ignore stages too short to be measured reliably
+            if measure.endswith("min_ms") and base_value < 1.0:
+                continue
+            if value > base_value * threshold:
+                regressions.append(
+                    f"{run['pipeline']}/{run['article']} {measure}: {base_value:.1f} -> {value:.1f} "
+                    f"({value / base_value:.2f}x)"
+                )
+    return regressions
+
+
+def print_run(run: Dict[str, Any]) -> None:
+    stages = run["stages"]
+    print(
+        f"{run['pipeline']:>12} {run['article']:>8}: {stages['total']['min_ms']:9.1f} ms "
+        f"(median {stages['total']['median_ms']:9.1f}), {run['references']} references, "
+        f"peak RSS {run['peak_rss_mib']:.0f} MiB"
+    )
+    for stage in STAGE_NAMES:
+        if stages[stage]["min_ms"] or stages[stage]["calls"]:
+            print(f"{'':>23}{stage:>13}: {stages[stage]['min_ms']:9.1f} ms, {stages[stage]['calls']} calls")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--pipeline", action="append", choices=PIPELINES, help="default: all")
+    parser.add_argument("--article", action="append", help="default: all articles of the corpus")
+    parser.add_argument("--corpus-dir", help="read the corpus from this directory (see benchmarks/corpus.py)")
+    parser.add_argument("--output", help="write the results to this json file")
+    parser.add_argument("--compare", help="compare with the results in this json file")
+    parser.add_argument("--threshold", type=float, default=1.2)
+    args = parser.parse_args()
+
+    corpus: Corpus = read_corpus(args.corpus_dir) if args.corpus_dir else build_corpus()
+    articles = corpus.get(args.article or [])
+    print(f"corpus version {corpus.version}, fingerprint {corpus.fingerprint}")
+
+    results: Dict[str, Any] = {
+        "version": RESULTS_VERSION,
+        "corpus": {"version": corpus.version, "fingerprint": corpus.fingerprint},
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "started": datetime.now(timezone.utc).isoformat(),
+        "runs_per_article": args.runs,
+        "runs": [],
+    }
+    for pipeline in args.pipeline or PIPELINES:
+        for article in articles:
+            run = run_in_process(pipeline, article, args.runs)
+            results["runs"].append(run)
+            print_run(run)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        for regression in regressions:
+            print(f"regression: {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Microbenchmark of template parameter normalization (WikipediaTemplateV2.extract_and_prepare_parameter_and_flds)
+
+Compares, over the cite templates in test_data:
+* before: comments removed with the regex from every value and the keys fixed in three
+  passes (__fix_class_key__, __fix_aliases__, __fix_dash__)
+* after: the regex only for values with a comment and the keys renamed in one pass
+  with normalize_parameter_name
+
+usage (from the top of the tree):
+    python -m benchmarks.template_parameters [--runs 5]
+
+Debug logging is disabled, as in production.
+"""
+import argparse
+import logging
+import re
+import timeit
+from typing import List
+from unittest.mock import patch
+
+import mwparserfromhell  # type: ignore
+
+from src.models.v2.wikimedia.wikipedia.reference.template import WikipediaTemplateV2
+from test_data.test_content import (  # type: ignore
+    easter_island_head_excerpt,
+    easter_island_tail_excerpt,
+    electrical_breakdown_full_article,
+    old_norse_sources,
+    test_full_article,
+)
+
+
+def remove_comments_with_regex(text: str) -> str:
+    string = ""
+    for match in re.findall(re.compile(r"(.*)<!--.*-->(.*)|(.*)"), text):
+        for part in match:
+            string += str(part)
+    return string.strip()
+
+
+def fix_key_names_step_by_step(self):
+    self.__fix_class_key__()
+    self.__fix_aliases__()
+    self.__fix_dash__()
+
+
+def normalize(raw_templates: List) -> None:
+    for raw_template in raw_templates:
+        WikipediaTemplateV2(raw_template=raw_template).extract_and_prepare_parameter_and_flds()
+
+
+def before(raw_templates: List) -> None:
+    with patch.object(
+        WikipediaTemplateV2, "__remove_comments__", staticmethod(remove_comments_with_regex)
+    ), patch.object(WikipediaTemplateV2, "__fix_key_names_in_template_parameters__", fix_key_names_step_by_step):
+        normalize(raw_templates)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.disable(logging.DEBUG)
+    wikitext = "\n".join(
+        [
+            easter_island_head_excerpt,
+            easter_island_tail_excerpt,
+            electrical_breakdown_full_article,
+            old_norse_sources,
+            test_full_article,
+        ]
+    )
+    raw_templates = [
+        template
+        for template in mwparserfromhell.parse(wikitext).filter_templates(recursive=True)
+        if template.name.strip().lower().startswith("cite")
+    ]
+    parameters = sum(len(template.params) for template in raw_templates)
+    print(f"{len(raw_templates)} cite templates, {parameters} parameters")
+    for name, path in [("before", before), ("after", normalize)]:
+        seconds = min(timeit.repeat(lambda path=path: path(raw_templates), number=1, repeat=args.runs))
+        print(f"{name}: {seconds / len(raw_templates) * 1e6:8.1f} µs per template")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark of url analysis (WikipediaUrlV2) over the urls of a reference heavy article
+
+Compares, per url:
+* before: a validated WikipediaUrlV2 with an uncached first level domain lookup,
+  with the template urls rebuilt on each of the three accesses a reference makes
+* after: WikipediaUrlV2.from_url with first level domains memoized per netloc
+  and template urls computed once
+
+usage (from the top of the tree):
+    python -m benchmarks.url_analysis [--wikitext-file article.wikitext] [--runs 5]
+
+Without --wikitext-file the articles in test_data are used.
+Debug logging is disabled, as in production.
+"""
+import argparse
+import logging
+import timeit
+from typing import List
+from unittest.mock import patch
+
+import mwparserfromhell  # type: ignore
+
+from src.models.v2.wikimedia.wikipedia import url_v2
+from src.models.v2.wikimedia.wikipedia.reference.template import (
+    URL_PARAMETERS,
+    WikipediaTemplateV2,
+)
+from src.models.v2.wikimedia.wikipedia.url_v2 import (
+    WikipediaUrlV2,
+    resolve_first_level_domain,
+)
+from test_data.test_content import (  # type: ignore
+    easter_island_head_excerpt,
+    easter_island_tail_excerpt,
+    electrical_breakdown_full_article,
+    old_norse_sources,
+)
+
+# __extract_template_urls__, __extract_reference_urls__ and the api output
+ACCESSES = 3
+
+
+def get_templates(wikitext: str) -> List[WikipediaTemplateV2]:
+    templates = []
+    for raw_template in mwparserfromhell.parse(wikitext).ifilter_templates(recursive=True):
+        template = WikipediaTemplateV2(raw_template=raw_template)
+        template.extract_and_prepare_parameter_and_flds()
+        templates.append(template)
+    return templates
+
+
+def before(templates: List[WikipediaTemplateV2]):
+    with patch.object(url_v2, "resolve_first_level_domain", resolve_first_level_domain.__wrapped__):
+        for template in templates:
+            for _ in range(ACCESSES):
+                for parameter in URL_PARAMETERS:
+                    if template.parameters.get(parameter):
+                        url = WikipediaUrlV2(url=template.parameters[parameter])
+                        url.extract()
+
+
+def after(templates: List[WikipediaTemplateV2]):
+    for template in templates:
+        template.__dict__.pop("urls", None)
+        for _ in range(ACCESSES):
+            _ = template.urls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--wikitext-file", help="wikitext of an article")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.wikitext_file:
+        with open(args.wikitext_file) as file:
+            wikitext = file.read()
+    else:
+        wikitext = "\n".join(
+            [
+                easter_island_head_excerpt,
+                easter_island_tail_excerpt,
+                electrical_breakdown_full_article,
+                old_norse_sources,
+            ]
+        )
+    logging.disable(logging.DEBUG)
+    templates = get_templates(wikitext)
+    urls = sum(len(template.urls) for template in templates)
+    if not urls:
+        raise SystemExit("no template urls found")
+
+    print(f"{len(templates)} templates, {urls} urls")
+    for name, path in [("before", before), ("after", after)]:
+        seconds = min(timeit.repeat(lambda path=path: path(templates), number=1, repeat=args.runs))
+        print(f"{name}: {seconds / urls * 1e6:8.1f} µs per url")
+
+
+if __name__ == "__main__":
+    main()
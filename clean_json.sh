@@ -3,4 +3,5 @@ rm json/references/*.json
 rm json/dois/*.json
 rm json/urls/*.json
 rm json/xhtmls/*.json
-rm json/pdfs/*.json
\ No newline at end of file
+rm json/pdfs/*.json
+rm json/locks/*.result.json
@@ -1,5 +1,6 @@
 import logging
 import re
+from typing import Any, Dict, List
 
 # Settings:
 
@@ -17,3 +18,84 @@ loglevel = logging.DEBUG
 # loglevel = logging.INFO
 
 user_agent = "IARI, see https://github.com/internetarchive/iari"
+
+# Cache storage, see src/models/cache
+# "flat": one pretty printed json file per entry in json/<type>/ (default)
+# "sharded": compressed json in hashed subdirectories, written atomically,
+#   with per type TTLs and disk budgets
+# "sqlite": one SQLite database in WAL mode, indexed on iari_id, page_id, revision,
+#   url hash and fetch time
+# Convert an existing cache with migrate_cache.py
+cache_backend = "flat"
+cache_compression = "gzip"  # sharded: "zstd" (needs the zstandard package), "gzip" or "none"
+cache_sqlite_path = ""  # sqlite: defaults to <iari_cache_dir>cache.sqlite3
+cache_ttl_seconds = {  # max age per cache type, types not listed never expire
+    "status": 7 * 24 * 3600,
+    "probes": 30 * 24 * 3600,
+}
+cache_max_bytes = {  # disk budget per cache type, types not listed are not evicted
+    "articlesV2": 20 * 1024**3,
+    "referencesV2": 20 * 1024**3,
+}
+
+# seconds a worker waits for another worker doing the same analysis before doing it itself,
+# see src/helpers/single_flight.py
+single_flight_timeout = 120
+
+# url checking budgets per upstream and per checked host (livewebcheck),
+# see src/helpers/url_status_engine.py for the defaults
+# url_check_budgets = {
+#     "livewebcheck": {"concurrency": 16, "qps": 20},
+#     "host": {"concurrency": 2, "qps": 4},
+# }
+
+# reuse the references of unchanged sections when analyzing a new revision of an article,
+# see src/models/v2/wikimedia/wikipedia/reference/analysis_cache_v2.py
+incremental_analysis = True
+analysis_cache_max_sections = 2000  # per worker
+analysis_cache_max_references = 50000  # per worker
+
+# memoize reference extraction by wikitext hash, see
+# src/models/v2/wikimedia/wikipedia/reference/extraction_memo_v2.py
+reference_memo_size = 100000  # payloads per worker, 0 disables the memo
+# also store the payloads in the cache backend, shared by all workers
+# (create <iari_cache_dir>reference_extractions/ for the flat and sharded backends)
+reference_memo_persistent = False
+
+# first level domains memoized per netloc and worker, see src/models/v2/wikimedia/wikipedia/url_v2.py
+fld_cache_size = 100000
+
+# batches of pages (/fetchrefs with several pages, /extract_refs with pages=) are parsed in a
+# pool of processes per worker, see src/helpers/page_pool.py
+page_pool_size = 0  # 0: the number of CPUs, at most 8
+page_pool_start_method = "forkserver"
+batch_time_budget = 120  # seconds per batch, pages not done by then get an error
+
+# record/replay of upstream http calls (MediaWiki, ORES, IABot, ...), see src/helpers/http_replay.py
+# "live": call the upstreams, "record": also store their responses in http_fixtures_dir,
+# "replay": answer from http_fixtures_dir only, to load test and benchmark offline
+http_mode = "live"
+http_fixtures_dir = "fixtures/http/"
+# replay: seconds added per call, per host or "default"; "recorded" replays the recorded latency
+http_replay_latency = {"default": 0.0}
+# replay: fraction of calls per host (or "default") that fail with status (0: a connection error)
+http_replay_errors: Dict[str, Dict[str, Any]] = {}  # e.g. {"ores.wikimedia.org": {"rate": 0.05, "status": 503}}
+# query parameters that change between runs, matched loosely when no call matches exactly
+http_replay_ignored_params = ["rvstart"]
+
+# per process metrics of /v2/metrics (and Server-Timing headers), see src/helpers/metrics.py
+# the metrics are only written when the directory exists (create <iari_cache_dir>metrics/)
+metrics_dir = ""  # defaults to <iari_cache_dir>metrics/, shared by the workers of a host
+metrics_flush_seconds = 1.0
+
+# token of the admin only parameters and endpoints (profile=1, /v2/profiles),
+# sent in the X-IARI-Admin-Token header; empty disables them
+admin_token = ""
+# profile=1 on any v2 endpoint stores a profile of the request, see src/helpers/profiling.py
+profile_interval = 0.005  # seconds between stack samples
+profile_max_files = 100  # the oldest profiles are removed beyond this
+
+# words whose period does not end the sentence of a claim (get_claim in
+# src/models/v2/analyzers/wiki_analyzer.py), e.g. ["Mr", "Mrs", "Dr", "St"];
+# empty keeps the claims as they have always been found
+claim_abbreviations: List[str] = []
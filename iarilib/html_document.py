@@ -0,0 +1,347 @@
+# html_document.py
+"""
+Parse-once model of the Parsoid html of a wiki article.
+
+The html is parsed a single time and walked a single time; the walk records the
+elements we extract references from (the first div.mw-references-wrap and any
+<section> holding a Bibliography or Further_reading h2). Footnote references,
+section references and cite-ref backlinks are then all produced from that one tree,
+and the expensive per-<li> work (backlinks, <cite> prettify, urls) is shared between
+the footnote references and the cite refs.
+"""
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+from bs4 import BeautifulSoup, Tag
+
+logger = logging.getLogger(__name__)
+
+# h2 ids of the sections whose <ul> list items we treat as references
+REFERENCE_SECTION_IDS = ["Bibliography", "Further_reading"]
+
+regex_extract_ref_name = r"#cite_note-(.*?)-\d+$"
+regex_http_url = re.compile(r"^https?://")
+
+
+def parse_template_data(template_data) -> Optional[Dict[str, Any]]:
+    """
+    1. remove outer quotes, if any
+    2. parse into "small tree"
+    3. peruse tree and make "big tree"
+    """
+    json_string_to_parse = template_data.strip('\'')  # remove beginning and ending quotes
+    ref_dict = json.loads(json_string_to_parse)
+
+    parts = ref_dict.get("parts")
+    template = None
+    if parts and len(parts) > 0:
+        part = parts[0]  # just get first part for now (don't know if there are ever more)
+        my_template = part.get("template")
+        if my_template:
+            template = {}
+
+            if "target" in my_template and "wt" in my_template["target"]:
+                template["name"] = my_template["target"]["wt"].strip()
+
+            my_params = my_template["params"]
+            if my_params:
+                params = {}
+                for key in my_params:
+                    params[key] = my_params[key]["wt"]
+                template["parameters"] = params
+
+    return template
+
+
+def parse_span_template_data(span_data) -> List[str]:
+    """
+    split the COinS data of a span.Z3988[title] attribute into its unquoted elements, e.g.:
+
+    title="ctx_ver=Z39.88-2004
+    &amp;rft_val_fmt=info%3Aofi%2Ffmt%3Akev%3Amtx%3Ajournal
+    &amp;rft.genre=unknown&amp;rft.jtitle=National+Statistics+Institute
+    ..."
+    """
+    span_template = []
+    for elem in span_data.split("&"):
+        # replace "+" with space
+        val = elem.replace("+", " ")
+        span_template.append(unquote(val))
+
+    return span_template
+
+
+def extract_cite_urls(cite) -> List[str]:
+    """extract http(s) urls from <a> tags inside a <cite> element"""
+    urls = []
+    for a in cite.find_all('a'):
+        href = a.get('href')
+        if href and regex_http_url.match(href) is not None:
+            urls.append(href)
+    return urls
+
+
+def extract_templates(element) -> List[Dict[str, Any]]:
+    """templates from the data-mw attribute of <link> elements inside element"""
+    templates = []
+    for link_ref in element.find_all("link"):
+        # typeof="mw:Extension/templatestyles mw:Transclusion"
+        template_data = link_ref.get("data-mw")
+        if template_data:
+            template = parse_template_data(template_data)
+            if template:
+                templates.append(template)
+    return templates
+
+
+def extract_template_urls(templates) -> List[str]:
+    template_urls = []
+    for template in templates:
+        if "parameters" in template:
+            if "url" in template["parameters"]:
+                template_urls.append(template["parameters"]["url"])
+    return template_urls
+
+
+def extract_template_names(templates) -> List[str]:
+    return [template["name"] for template in templates if "name" in template]
+
+
+class WikiHtmlDocument:
+    """
+    Parses the html once and yields
+    - footnote references (the <li>s of the first div.mw-references-wrap)
+    - section references (Bibliography and Further_reading <section>s)
+    - cite refs (backlinks from each footnote to its place(s) in the article)
+
+    With markup=False the prettified html (cite_html, span_html) is not rendered
+    and returned as None, for patrons that did not ask for it.
+    """
+
+    def __init__(self, html: str, features: str = "html.parser", markup: bool = True):
+        # "html.parser" keeps prettify output identical to what we have always returned
+        self.soup = BeautifulSoup(html or "", features)
+        self.markup = markup
+
+        self.references_wrapper: Optional[Tag] = None
+        self.reference_sections: List[Tuple[Tag, str]] = []  # (section, section_id) in document order
+
+        self.__footnote_items: Optional[List[Dict[str, Any]]] = None
+
+        self.__walk__()
+
+    def __walk__(self):
+        """
+        single walk over the tree, recording the elements we extract references from
+
+        A <section> counts as a reference section when it contains an h2 with one of
+        REFERENCE_SECTION_IDS anywhere below it, so every ancestor section of such an h2 is recorded.
+        """
+        sections: List[Tag] = []
+        section_ids: Dict[int, List[str]] = {}
+
+        for element in self.soup.descendants:
+            if not isinstance(element, Tag):
+                continue
+
+            if element.name == "section":
+                sections.append(element)
+
+            elif element.name == "div":
+                if self.references_wrapper is None and "mw-references-wrap" in (element.get("class") or []):
+                    self.references_wrapper = element
+
+            elif element.name == "h2":
+                h2_id = element.get("id")
+                if h2_id in REFERENCE_SECTION_IDS:
+                    for parent in element.parents:
+                        if parent.name == "section":
+                            ids = section_ids.setdefault(id(parent), [])
+                            if h2_id not in ids:
+                                ids.append(h2_id)
+
+        for section in sections:
+            ids = section_ids.get(id(section), [])
+            for section_id in REFERENCE_SECTION_IDS:
+                if section_id in ids:
+                    self.reference_sections.append((section, section_id))
+
+    @property
+    def footnote_items(self) -> List[Dict[str, Any]]:
+        """
+        per-<li> data shared by footnote_references and cite_refs, computed once
+        """
+        if self.__footnote_items is None:
+            self.__footnote_items = []
+            if self.references_wrapper:
+                references_list = self.references_wrapper.find("ol", class_="references")
+                if references_list:
+                    for ref in references_list.find_all("li"):
+                        self.__footnote_items.append(self.__footnote_item__(ref, self.markup))
+        return self.__footnote_items
+
+    @staticmethod
+    def __footnote_item__(ref: Tag, markup: bool = True) -> Dict[str, Any]:
+        # collect cite refs back to article location
+        page_refs = []
+        for link in ref.find_all("a"):
+            # span.mw-linkback-text children should have a citeref link
+            if link.find("span", class_="mw-linkback-text"):
+                page_refs.append(
+                    {
+                        "href": link.get("href"),
+                        "id": link.get("id"),
+                    }
+                )
+
+        span_ref = ref.find("span", class_="mw-reference-text")
+        cite = span_ref.find("cite") if span_ref else None
+
+        return {
+            "ref": ref,
+            "page_refs": page_refs,
+            "span_ref": span_ref,
+            "cite": cite,
+            "cite_html": cite.prettify() if cite and markup else None,  # marked up html
+            "urls": extract_cite_urls(cite) if cite else [],
+        }
+
+    def cite_refs(self) -> List[Dict[str, Any]]:
+        """cite ref data for each footnote, as returned by iarilib.parse_utils.extract_cite_refs"""
+        refs = []
+        for item in self.footnote_items:
+            span_link = item["span_ref"]
+            raw_data = None
+            if span_link:
+                link_data = span_link.find("link")
+                if link_data:
+                    raw_data = link_data.get("data-mw")
+
+            span_html = None
+            if self.markup and not item["cite_html"]:
+                span_html = span_link.prettify() if span_link else ''
+
+            refs.append(
+                {
+                    "id": item["ref"].get("id"),
+                    "raw_data": raw_data,
+                    "page_refs": item["page_refs"],
+                    "cite_html": item["cite_html"],
+                    "span_html": span_html,
+                    "urls": list(item["urls"]),
+                }
+            )
+        return refs
+
+    def footnote_references(self, ref_counter: int = 0) -> List[Dict[str, Any]]:
+        """
+        references from the references list; ref_id numbering continues from ref_counter
+        """
+        refs = []
+        for item in self.footnote_items:
+            ref_counter += 1
+            ref = item["ref"]
+            span_ref = item["span_ref"]
+            cite = item["cite"]
+
+            templates = []
+            span_templates = []
+            template_urls = []
+            ref_info = {
+                "about_link": ref.get("about"),
+                "ref_name": "",
+                "cite_id": "",
+                "cite_class": "",
+            }
+
+            match = re.search(regex_extract_ref_name, ref_info["about_link"] or "")
+            if match:
+                ref_info["ref_name"] = match.group(1)
+
+            # the span whose html is returned when no <cite> is found
+            span_html_source = span_ref
+
+            if span_ref:
+                # span_ref contains citation markup and possible template data
+                # fetch "template" data from link[data-mw] attribute
+                templates = extract_templates(span_ref)
+                template_urls = extract_template_urls(templates)
+
+                if cite:
+                    ref_info["cite_id"] = cite.get("id")
+                    ref_info["cite_class"] = cite.get("class")
+
+                # fetch other "template" data from span.Z3988[title] attribute
+                for span_z3988 in span_ref.find_all("span", class_="Z3988"):
+                    span_data = span_z3988.get("title")
+                    if span_data:
+                        span_template = parse_span_template_data(span_data)
+                        if span_template:
+                            span_templates.append(span_template)
+                    # we have always returned the html of the last span.Z3988 here
+                    span_html_source = span_z3988
+
+            span_html = None
+            if self.markup and not item["cite_html"]:
+                span_html = span_html_source.prettify() if span_html_source else None
+
+            refs.append(
+                {
+                    "wiki_ref_id": ref.get("id"),
+                    "ref_id": ref_counter,
+                    "source_section": "References",  # which section these refs are from
+                    "cite_def_link": ref.get("about"),
+                    "cite_ref_links": item["page_refs"],
+                    "template_names": extract_template_names(templates),
+                    "templates": templates,
+                    "urls": list(item["urls"]),
+                    "template_urls": template_urls,
+                    "span_templates": span_templates,
+                    "cite_html": item["cite_html"],
+                    "span_html": span_html,
+                    "ref_info": ref_info,
+                }
+            )
+        return refs
+
+    def section_references(self, ref_counter: int = 0) -> List[Dict[str, Any]]:
+        """
+        references from the list items of the Bibliography and Further_reading sections;
+        ref_id numbering continues from ref_counter
+        """
+        refs = []
+        for section, section_id in self.reference_sections:
+            ref_list = section.find("ul")
+            if not ref_list:
+                continue
+            for ref in ref_list.find_all("li"):
+                # at this point, <link>, <cite>, and <span> sub elements are present
+                ref_counter += 1
+                templates = extract_templates(ref)
+
+                cite_html: Optional[str] = ""
+                urls = []
+                cite = ref.find("cite")
+                if cite:
+                    cite_html = cite.prettify() if self.markup else None
+                    urls = extract_cite_urls(cite)
+
+                refs.append(
+                    {
+                        "wiki_ref_id": ref.get("id"),  # TODO this should come from cite
+                        "ref_id": ref_counter,
+                        "source_section": section_id,  # which section these refs are from
+                        "cite_ref_link": "",
+                        "cite_def_links": [],
+                        "template_names": extract_template_names(templates),
+                        "templates": templates,
+                        "urls": urls,
+                        "template_urls": extract_template_urls(templates),
+                        "span_templates": [],
+                        "cite_html": cite_html,
+                    }
+                )
+        return refs
@@ -0,0 +1,185 @@
+"""
+Maintenance of the json cache, see src/models/cache and cache_backend in config_sample.py
+
+    python migrate_cache.py migrate --to sharded|sqlite [--from flat] [--delete-source] [type ...]
+    python migrate_cache.py evict [--backend sharded|sqlite] [type ...]
+    python migrate_cache.py export [--backend ...] [--output cache.ndjson] [type ...]
+    python migrate_cache.py import [--backend ...] [--input cache.ndjson]
+
+migrate copies the entries of one backend into another, e.g. an existing flat cache
+into the sharded layout or the SQLite database. Set cache_backend in config.py afterwards.
+evict applies the TTLs and disk budgets of config.py.
+export writes one json object per line: {"namespace", "key", "fetched_at", "payload"};
+import reads such a file, e.g. to move a cache between hosts or backends.
+
+Without types all types of the backend are processed (evict: those with a TTL or disk budget).
+Fetch times are kept, so TTLs keep counting from the original write.
+migrate and import flag entries of older caches as served from the cache, as they are sent
+as stored (see src/helpers/json_encoding.py).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from itertools import islice
+from typing import Any, Dict, List, Tuple
+
+import config
+from src.models.cache import CacheBackend
+from src.models.cache.flat_cache_backend import FlatCacheBackend
+from src.models.cache.sharded_cache_backend import ShardedCacheBackend
+from src.models.cache.sqlite_cache_backend import SqliteCacheBackend
+
+BATCH_SIZE = 1000
+
+
+def make_backend(name: str, root: str, compression: str = "") -> CacheBackend:
+    ttl_seconds = getattr(config, "cache_ttl_seconds", {})
+    max_bytes = getattr(config, "cache_max_bytes", {})
+    if name == FlatCacheBackend.name:
+        return FlatCacheBackend(root)
+    if name == ShardedCacheBackend.name:
+        return ShardedCacheBackend(
+            root,
+            compression=compression or getattr(config, "cache_compression", "gzip"),
+            ttl_seconds=ttl_seconds,
+            max_bytes=max_bytes,
+        )
+    if name == SqliteCacheBackend.name:
+        return SqliteCacheBackend(
+            root,
+            path=getattr(config, "cache_sqlite_path", ""),
+            ttl_seconds=ttl_seconds,
+            max_bytes=max_bytes,
+        )
+    raise ValueError(f"Unknown cache backend \"{name}\"")
+
+
+def batches(iterable, size: int = BATCH_SIZE):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def flag_served_from_cache(entries: List[Tuple[str, Any, float]]) -> List[Tuple[str, Any, float]]:
+    """the entries with the "served_from_cache": false of articles cached before hits were stored flagged"""
+    return [
+        (key, {**payload, "served_from_cache": True}, fetched_at)
+        if isinstance(payload, dict) and payload.get("served_from_cache") is False
+        else (key, payload, fetched_at)
+        for key, payload, fetched_at in entries
+    ]
+
+
+def migrate(source: CacheBackend, target: CacheBackend, namespaces: List[str], delete_source: bool = False) -> int:
+    migrated = 0
+    for namespace in namespaces or source.namespaces():
+        start = time.perf_counter()
+        count = 0
+        for batch in batches(source.iter_entries(namespace)):
+            target.restore_many(namespace, flag_served_from_cache(batch))
+            if delete_source:
+                for key, _, _ in batch:
+                    source.delete(namespace, key)
+            count += len(batch)
+        migrated += count
+        print(f"{namespace}: migrated {count} entries in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return migrated
+
+
+def evict(backend: CacheBackend, namespaces: List[str]) -> int:
+    removed = 0
+    configured = set(getattr(backend, "ttl_seconds", {})) | set(backend.max_bytes)
+    for namespace in namespaces or sorted(configured):
+        try:
+            count = backend.evict(namespace)
+        except NotImplementedError:
+            raise SystemExit(f"the {backend.name} backend does not support eviction") from None
+        removed += count
+        print(f"{namespace}: evicted {count} entries, {backend.disk_usage(namespace)} bytes left", file=sys.stderr)
+    return removed
+
+
+def export(backend: CacheBackend, namespaces: List[str], output) -> int:
+    exported = 0
+    for namespace in namespaces or backend.namespaces():
+        for key, payload, fetched_at in backend.iter_entries(namespace):
+            entry = {"namespace": namespace, "key": key, "fetched_at": fetched_at, "payload": payload}
+            output.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+            exported += 1
+    return exported
+
+
+def import_(backend: CacheBackend, input_) -> int:
+    imported = 0
+    for batch in batches(json.loads(line) for line in input_ if line.strip()):
+        by_namespace: Dict[str, List[Tuple[str, Any, float]]] = {}
+        for entry in batch:
+            by_namespace.setdefault(entry["namespace"], []).append(
+                (entry["key"], entry["payload"], entry.get("fetched_at") or time.time())
+            )
+        for namespace, entries in by_namespace.items():
+            if not backend.namespace_exists(namespace):
+                os.makedirs(backend.namespace_path(namespace), exist_ok=True)
+            backend.restore_many(namespace, flag_served_from_cache(entries))
+        imported += len(batch)
+    return imported
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["migrate", "evict", "export", "import"])
+    parser.add_argument("types", nargs="*", help="cache types (directories), e.g. articlesV2 status")
+    parser.add_argument("--root", default=config.iari_cache_dir)
+    backends = [FlatCacheBackend.name, ShardedCacheBackend.name, SqliteCacheBackend.name]
+    parser.add_argument(
+        "--backend",
+        default=getattr(config, "cache_backend", FlatCacheBackend.name),
+        choices=backends,
+        help="backend for evict, export and import (default: cache_backend in config.py)",
+    )
+    parser.add_argument("--from", dest="source", default=FlatCacheBackend.name, choices=backends)
+    parser.add_argument("--to", dest="target", choices=backends)
+    parser.add_argument("--compression", default="", choices=["", "zstd", "gzip", "none"])
+    parser.add_argument("--delete-source", action="store_true", help="migrate: remove entries once copied")
+    parser.add_argument("--output", help="export: file to write (default stdout)")
+    parser.add_argument("--input", help="import: file to read (default stdin)")
+    args = parser.parse_args(arguments)
+
+    if not os.path.isdir(args.root):
+        print(f"cache root {args.root} does not exist", file=sys.stderr)
+        return 1
+
+    if args.command == "migrate":
+        if not args.target or args.target == args.source:
+            parser.error("migrate needs a --to backend other than --from")
+        source = make_backend(args.source, args.root, args.compression)
+        target = make_backend(args.target, args.root, args.compression)
+        migrate(source, target, args.types, args.delete_source)
+        return 0
+
+    backend = make_backend(args.backend, args.root, args.compression)
+    if args.command == "evict":
+        evict(backend, args.types)
+    elif args.command == "export":
+        output = open(args.output, "w") if args.output else sys.stdout
+        try:
+            count = export(backend, args.types, output)
+        finally:
+            if args.output:
+                output.close()
+        print(f"exported {count} entries", file=sys.stderr)
+    else:
+        input_ = open(args.input) if args.input else sys.stdin
+        try:
+            count = import_(backend, input_)
+        finally:
+            if args.input:
+                input_.close()
+        print(f"imported {count} entries", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,6 +10,7 @@ def create_json_folders():
         "pdfs",
         "probes",
         "references",
+        "revisions",
         "urls",
         "xhtmls"
     ]
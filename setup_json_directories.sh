@@ -7,3 +7,5 @@ mkdir json/xhtmls/
 mkdir json/pdfs/
 mkdir json/articlesV2/
 mkdir json/referencesV2/
+mkdir json/revisions/
+mkdir json/metrics/
@@ -20,6 +20,9 @@ from flask_restful import Api, Resource  # type: ignore
 
 # from flask_cors import CORS
 import config
+from src.helpers.http_replay import install_http_replay
+from src.helpers.json_encoding import output_json
+from src.helpers.metrics import install_metrics
 from src.models.exceptions import MissingInformationError, WikipediaApiFetchError
 
 # # new stuff aug 2025
@@ -51,6 +54,8 @@ from src.views.v2.article_view_v2 import ArticleV2
 from src.views.v2.get_book_reference_v2 import GetBookReferenceV2
 from src.views.v2.get_url_info_v2 import GetUrlInfoV2
 from src.views.v2.version_v2 import VersionV2
+from src.views.v2.metrics_v2 import MetricsV2
+from src.views.v2.profiles_v2 import ProfilesV2, ProfileV2
 
 # legacy endpoints...
 from src.views.check_doi import CheckDoi
@@ -68,6 +73,9 @@ from src.views.statistics.xhtml import Xhtml
 logging.basicConfig(level=config.loglevel)
 logger = logging.getLogger(__name__)
 
+# record or replay upstream http calls (http_mode in config.py), see src/helpers/http_replay.py
+install_http_replay()
+
 app = Flask(__name__)
 
 
@@ -82,12 +90,17 @@ def add_cors_headers(response):
 # Register CORS function as an after_request handler
 app.after_request(add_cors_headers)
 
+# Server-Timing headers and the metrics of /v2/metrics, see src/helpers/metrics.py
+install_metrics(app)
+
 # let's see if we can distinguish which server we are on
 server_name = os.getenv('FLASK_SERVER_NAME', 'Unknown Server')
 
 # We use a prefix here to enable us to stabilize the api over time
 # and bump the version when making breaking changes
 api = Api(app, prefix="/v2")  # NB TODO This pseudo-versioning of v2 should be addressed, i.e. removed
+# orjson backed json responses, see src/helpers/json_encoding.py
+api.representations["application/json"] = output_json
 
 
 @app.errorhandler(404)
@@ -133,6 +146,13 @@ def favicon():
 # gets IARI version
 api.add_resource(VersionV2, "/version")
 
+# stage timings, upstream latencies, cache hits and requests in flight of all workers
+api.add_resource(MetricsV2, "/metrics")
+
+# request profiles of profile=1 (admins only, see src/helpers/profiling.py)
+api.add_resource(ProfilesV2, "/profiles")
+api.add_resource(ProfileV2, "/profiles/<string:name>")
+
 # article refs extraction
 api.add_resource(ExtractRefsV2, "/extract_refs")    # based on James' extraction code * this is preferred
 api.add_resource(ExtractGrokV2, "/extract_grok")    # extracts refs from grokipedia article
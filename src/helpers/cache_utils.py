@@ -1,12 +1,10 @@
 import hashlib
-import os
 from typing import Any
 
 import config
-import json
-from os.path import exists
 
-from datetime import datetime
+from src.helpers.metrics import count_cache, span
+from src.models.cache import CacheBackend, get_cache_backend
 from src.models.exceptions import UnknownValueError
 
 from enum import Enum
@@ -15,6 +13,7 @@ from enum import Enum
 class CacheType(Enum):
     probes = "probes"
     status = "status"
+    revisions = "revisions"
 
 
 def get_cache_hash(string: str):
@@ -22,23 +21,34 @@ def get_cache_hash(string: str):
     return hashlib.md5(string.encode()).hexdigest()[:16]
 
 
-def get_cache_file_path(url, cache_type: CacheType, variety):
-    json_path = f"{config.iari_cache_dir}{cache_type.value}"
+def get_cache_key(url, variety):
+    # prefix: uppercase of variety
+    prefix = variety.upper()
+    url_hash = get_cache_hash(url.upper())
+    return f"{prefix}-{url_hash}"
+
 
-    # error if type not found as a subdir
-    if not os.path.isdir(json_path):
+def check_cache_type(cache_type: CacheType) -> CacheBackend:
+    """
+    return the cache backend, raise UnknownValueError if cache_type is not set up as a subdir
+    """
+    backend = get_cache_backend()
+    if not backend.namespace_exists(cache_type.value):
+        json_path = f"{config.iari_cache_dir}{cache_type.value}"
         raise UnknownValueError(f"Unsupported cache type \"{cache_type.value}\" (json path \"{json_path}\" does not exist).")
+    return backend
 
-    url_hash = get_cache_hash(url.upper())
 
-    # prefix: uppercase of variety
-    prefix = variety.upper()
+def get_cache_file_path(url, cache_type: CacheType, variety):
+    """path of the entry in the flat cache layout (config.cache_backend = "flat")"""
+    check_cache_type(cache_type)
+    json_path = f"{config.iari_cache_dir}{cache_type.value}"
 
     # calc filename
-    return f"{json_path}/{prefix}-{url_hash}.json"
+    return f"{json_path}/{get_cache_key(url, variety)}.json"
 
 
-def get_cache(url, cache_type: CacheType, variety):
+def get_cache(url, cache_type: CacheType, variety, count: bool = True):
     """
     return JSON of cached value found or None if not found
 
@@ -46,51 +56,47 @@ def get_cache(url, cache_type: CacheType, variety):
     variety is the prefix
     url gets transformed into an md5 hash
         (or something else in the future if deemed necessary)
+    count=False leaves the lookup out of the cache hit/miss counters of /v2/metrics
 
     """
 
-    cache_file_path = get_cache_file_path(url, cache_type, variety)
-
-    # return None if file does not yet exist
-    if not exists(cache_file_path):
-        return None
+    backend = check_cache_type(cache_type)
 
-    # return payload; assume saved in json format
-    with open(file=cache_file_path) as file:
-        payload = json.load(file)
-        return payload
+    # None if not cached (or expired)
+    with span("cache"):
+        payload = backend.get(cache_type.value, get_cache_key(url, variety))
+    if count:
+        count_cache(cache_type.value, hit=payload is not None)
+    return payload
 
 
 def set_cache(url: str, cache_type: CacheType, variety: str, payload: Any):
     """
-    sets payload as cached value
+    sets payload as cached value, overwriting any existing value
 
-    TODO: check error behavior when json cache path does not exist
+    the backend writes atomically, so concurrent workers can not collide
     """
 
-    cache_file_path = get_cache_file_path(url, cache_type, variety)
+    backend = check_cache_type(cache_type)
+    cache_key = get_cache_key(url, variety)
 
     from src import app
-    app.logger.debug(f"cache id for url {url} is {cache_file_path}")
+    app.logger.debug(f"cache id for url {url} is {cache_type.value}/{cache_key}")
 
-    # overwrite if already exists
-    if exists(cache_file_path):
-        with open(file=cache_file_path, mode="w") as file:
-            # https://stackoverflow.com/questions/12309269/how-do-i-write-json-data-to-a-file
-            json.dump(payload, file, ensure_ascii=False, indent=4)
+    backend.set(cache_type.value, cache_key, payload)
 
-    # else create cache (mode "x" = create and write)
-    else:
-        with open(file=cache_file_path, mode="x") as file:
-            # https://stackoverflow.com/questions/12309269/how-do-i-write-json-data-to-a-file
-            json.dump(payload, file, ensure_ascii=False, indent=4)
 
-
-def is_cached(url, cache_type: CacheType, variety):
+def is_cached(url, cache_type: CacheType, variety, count: bool = True):
     """
+    whether a value is cached
+
+    only a miss is counted (count=True), a hit is counted by the get_cache() that follows it
     """
-    cache_file_path = get_cache_file_path(url, cache_type, variety)
-    return exists(cache_file_path)
+    backend = check_cache_type(cache_type)
+    cached = backend.exists(cache_type.value, get_cache_key(url, variety))
+    if count and not cached:
+        count_cache(cache_type.value, hit=False)
+    return cached
 
 
 if __name__ == "__main__":
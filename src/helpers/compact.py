@@ -0,0 +1,218 @@
+# compact.py
+"""
+Compact wire format for reference lists (format=compact)
+
+The urls, template names, section names and template parameter keys of a page repeat
+across references, urls and url_dict. In the compact format each distinct string is sent
+once, in a string table, and referred to by its index:
+
+    {
+        ...the other fields as they are...,
+        "compact": {
+            "version": 1,
+            "strings": ["https://example.com/a", "cite web", "url", "History", ...],
+            "templates": {"names": [1, ...], "parameters": [[2, 0, ...], ...]},
+            "fields": {"urls": "S", "references": "r", "url_dict": "k"}
+        },
+        "urls": [0, ...],
+        "references": {"count": 3, "columns": {"section": ["s", [3, 3, 3]], ...}, "absent": {...}},
+        "url_dict": {"keys": [0, ...], "rows": {"count": ..., "columns": ...}},
+    }
+
+fields tells how each of COMPACT_FIELDS is encoded:
+    "S" a list of strings: their indices
+    "r" a list of dicts (records): one [type, values] column per key, values in record order;
+        "absent" lists the records without the key (their value is null)
+    "k" a dict of dicts: the indices of its keys and its values as records
+
+and the type of each column of a record list:
+    "s" a string (or null): its index
+    "S" a list of strings: their indices
+    "t" a list of templates ({"name": ..., "parameters": {...}}): indices into the template
+        table, whose names are string indices and parameters flat [key, value, ...] string indices
+    "v" anything else, as it is
+
+expand() restores the original data, so does expand_compact() in user_scripts/iari-compact.js.
+"""
+from typing import Any, Dict, List, Optional, Tuple, TypeGuard
+
+COMPACT_FORMAT = "compact"
+COMPACT_VERSION = 1
+
+# the top level fields that are encoded, when their value has a shape we encode
+COMPACT_FIELDS = ["urls", "section_names", "references", "cite_refs", "url_dict"]
+
+STRING = "s"
+STRINGS = "S"
+TEMPLATES = "t"
+VERBATIM = "v"
+RECORDS = "r"
+KEYED_RECORDS = "k"
+
+
+class CompactEncoder:
+    """the string and template tables shared by the fields of one response"""
+
+    def __init__(self):
+        self.strings: List[str] = []
+        self.string_index: Dict[str, int] = {}
+        self.template_names: List[Optional[int]] = []
+        self.template_parameters: List[Optional[List[Optional[int]]]] = []
+        self.template_index: Dict[Tuple, int] = {}
+
+    def string(self, value: Optional[str]) -> Optional[int]:
+        if value is None:
+            return None
+        index = self.string_index.get(value)
+        if index is None:
+            index = self.string_index[value] = len(self.strings)
+            self.strings.append(value)
+        return index
+
+    def template(self, template: Dict[str, Any]) -> int:
+        name = self.string(template.get("name"))
+        parameters: Optional[List[Optional[int]]] = None
+        if "parameters" in template:
+            parameters = []
+            for key, value in template["parameters"].items():
+                parameters.append(self.string(key))
+                parameters.append(self.string(value))
+        key = (name, tuple(parameters) if parameters is not None else None)
+        index = self.template_index.get(key)
+        if index is None:
+            index = self.template_index[key] = len(self.template_names)
+            self.template_names.append(name)
+            self.template_parameters.append(parameters)
+        return index
+
+    def records(self, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        keys: Dict[str, None] = {}
+        for record in records:
+            keys.update(dict.fromkeys(record))
+
+        columns = {}
+        absent = {}
+        for key in keys:
+            values = [record.get(key) for record in records]
+            present = [record[key] for record in records if key in record]
+            column_type = column_type_of(present)
+            if column_type == STRING:
+                values = [self.string(value) for value in values]
+            elif column_type == STRINGS:
+                values = [[self.string(item) for item in value] if value is not None else None for value in values]
+            elif column_type == TEMPLATES:
+                values = [[self.template(item) for item in value] if value is not None else None for value in values]
+            columns[key] = [column_type, values]
+            if len(present) < len(records):
+                absent[key] = [row for row, record in enumerate(records) if key not in record]
+
+        encoded: Dict[str, Any] = {"count": len(records), "columns": columns}
+        if absent:
+            encoded["absent"] = absent
+        return encoded
+
+    def table(self, fields: Dict[str, str]) -> Dict[str, Any]:
+        return {
+            "version": COMPACT_VERSION,
+            "strings": self.strings,
+            "templates": {"names": self.template_names, "parameters": self.template_parameters},
+            "fields": fields,
+        }
+
+
+def is_string_list(value: Any) -> TypeGuard[List[str]]:
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+
+def is_template(value: Any) -> bool:
+    return (
+        isinstance(value, dict)
+        and set(value) <= {"name", "parameters"}
+        and isinstance(value.get("name", ""), str)
+        and isinstance(value.get("parameters", {}), dict)
+        and all(isinstance(key, str) and isinstance(item, str) for key, item in value.get("parameters", {}).items())
+    )
+
+
+def column_type_of(values: List[Any]) -> str:
+    """the column type of the present values of a key"""
+    if any(isinstance(value, str) for value in values) and all(
+        value is None or isinstance(value, str) for value in values
+    ):
+        return STRING
+    if values and all(is_string_list(value) for value in values):
+        return STRINGS
+    if values and all(isinstance(value, list) and all(is_template(item) for item in value) for value in values):
+        return TEMPLATES
+    return VERBATIM
+
+
+def compact(data: Dict[str, Any]) -> Dict[str, Any]:
+    """data with the COMPACT_FIELDS it has encoded with a shared string table, see above"""
+    encoder = CompactEncoder()
+    fields: Dict[str, str] = {}
+    result = dict(data)
+    for name in COMPACT_FIELDS:
+        value = data.get(name)
+        if is_string_list(value):
+            result[name] = [encoder.string(item) for item in value]
+            fields[name] = STRINGS
+        elif isinstance(value, list) and all(isinstance(item, dict) for item in value):
+            result[name] = encoder.records(value)
+            fields[name] = RECORDS
+        elif isinstance(value, dict) and all(isinstance(item, dict) for item in value.values()):
+            result[name] = {
+                "keys": [encoder.string(key) for key in value],
+                "rows": encoder.records(list(value.values())),
+            }
+            fields[name] = KEYED_RECORDS
+    result["compact"] = encoder.table(fields)
+    return result
+
+
+def expand(data: Dict[str, Any]) -> Dict[str, Any]:
+    """the data compact() was given"""
+    table = data["compact"]
+    strings = table["strings"]
+    names = table["templates"]["names"]
+    parameters = table["templates"]["parameters"]
+
+    def string(index: Optional[int]) -> Optional[str]:
+        return strings[index] if index is not None else None
+
+    def template(index: int) -> Dict[str, Any]:
+        expanded: Dict[str, Any] = {}
+        if names[index] is not None:
+            expanded["name"] = strings[names[index]]
+        if parameters[index] is not None:
+            flat = parameters[index]
+            expanded["parameters"] = {strings[flat[i]]: strings[flat[i + 1]] for i in range(0, len(flat), 2)}
+        return expanded
+
+    def records(encoded: Dict[str, Any]) -> List[Dict[str, Any]]:
+        expanded: List[Dict[str, Any]] = [{} for _ in range(encoded["count"])]
+        absent = encoded.get("absent", {})
+        for key, (column_type, values) in encoded["columns"].items():
+            skipped = set(absent.get(key, []))
+            for row, value in enumerate(values):
+                if row in skipped:
+                    continue
+                if column_type == STRING:
+                    value = string(value)
+                elif column_type == STRINGS:
+                    value = [strings[item] for item in value] if value is not None else None
+                elif column_type == TEMPLATES:
+                    value = [template(item) for item in value] if value is not None else None
+                expanded[row][key] = value
+        return expanded
+
+    result = {key: value for key, value in data.items() if key != "compact"}
+    for name, field_type in table["fields"].items():
+        value = data[name]
+        if field_type == STRINGS:
+            result[name] = [strings[item] for item in value]
+        elif field_type == RECORDS:
+            result[name] = records(value)
+        elif field_type == KEYED_RECORDS:
+            result[name] = dict(zip([strings[key] for key in value["keys"]], records(value["rows"])))
+    return result
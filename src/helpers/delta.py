@@ -0,0 +1,130 @@
+# delta.py
+"""
+Delta responses between two revisions of a page (the since_revision= parameter)
+
+A patron holding the analysis of an earlier revision of the page gets the analysis of
+the requested revision with its reference lists (DELTA_FIELDS) replaced by what changed:
+
+    {
+        ...the other fields (counts, urls, url_dict, ...) as they are...,
+        "delta": {
+            "since_revision": 1234,
+            "references": {
+                "from_base": [0, 1, null, 3, ...],
+                "added": [{...}, ...],
+                "removed": [2, ...],
+                "changed": [{"index": 3, "set": {"claim": "..."}, "unset": []}, ...]
+            }
+        }
+    }
+
+from_base has an entry per reference of the requested revision, in order: the index of
+the same reference in the base analysis, or null for the next of "added". "changed" holds
+the fields that differ, by index in the requested revision; "removed" the base indices
+that are gone. apply_delta() rebuilds the full analysis from the base one.
+
+References are matched by their content (see record_key), without the fields that
+depend on their position in the page (ids, backlinks) or their context (section, claim),
+so a reference that moved is matched and only those fields are sent.
+"""
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+# the reference lists sent as deltas
+DELTA_FIELDS = ["references", "cite_refs"]
+
+# not part of the identity of a reference, they change when other references are added or moved
+KEY_EXCLUDED_FIELDS = {
+    "id",
+    "ref_id",
+    "wiki_ref_id",
+    "page_refs",
+    "cite_ref_link",
+    "cite_ref_links",
+    "cite_def_link",
+    "cite_def_links",
+    "ref_info",
+    "section",
+    "source_section",
+    "claim",
+    "claim_array",
+    "hydrate",
+}
+
+
+def record_key(record: Dict[str, Any]) -> str:
+    """the identity of a reference across revisions, a hash of its content"""
+    content = {key: value for key, value in record.items() if key not in KEY_EXCLUDED_FIELDS}
+    return hashlib.sha1(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def keyed_indices(records: List[Dict[str, Any]]) -> Dict[str, int]:
+    """{key: index}, identical references (e.g. reused named refs) are told apart by occurrence"""
+    indices: Dict[str, int] = {}
+    occurrences: Dict[str, int] = {}
+    for index, record in enumerate(records):
+        key = record_key(record)
+        occurrence = occurrences.get(key, 0)
+        occurrences[key] = occurrence + 1
+        indices[f"{key}-{occurrence}"] = index
+    return indices
+
+
+def diff_records(base: List[Dict[str, Any]], current: List[Dict[str, Any]]) -> Dict[str, Any]:
+    base_indices = keyed_indices(base)
+    from_base: List[Optional[int]] = []
+    added = []
+    changed = []
+    for key, index in keyed_indices(current).items():
+        record = current[index]
+        base_index = base_indices.pop(key, None)
+        from_base.append(base_index)
+        if base_index is None:
+            added.append(record)
+            continue
+        base_record = base[base_index]
+        set_fields = {field: value for field, value in record.items() if base_record.get(field, ...) != value}
+        unset_fields = [field for field in base_record if field not in record]
+        if set_fields or unset_fields:
+            changed.append({"index": index, "set": set_fields, "unset": unset_fields})
+    return {
+        "from_base": from_base,
+        "added": added,
+        "removed": sorted(base_indices.values()),
+        "changed": changed,
+    }
+
+
+def apply_record_diff(base: List[Dict[str, Any]], diff: Dict[str, Any]) -> List[Dict[str, Any]]:
+    added = iter(diff["added"])
+    records = [dict(base[index]) if index is not None else next(added) for index in diff["from_base"]]
+    for change in diff["changed"]:
+        record = records[change["index"]]
+        record.update(change["set"])
+        for field in change["unset"]:
+            record.pop(field, None)
+    return records
+
+
+def make_delta(base: Dict[str, Any], current: Dict[str, Any], since_revision: int) -> Dict[str, Any]:
+    """current with its DELTA_FIELDS replaced by their differences with those of base"""
+    result = dict(current)
+    delta: Dict[str, Any] = {"since_revision": since_revision}
+    for field in DELTA_FIELDS:
+        if isinstance(current.get(field), list) and isinstance(base.get(field), list):
+            delta[field] = diff_records(base[field], result.pop(field))
+    result["delta"] = delta
+    return result
+
+
+def apply_delta(base: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
+    """the full analysis a delta response (data) was made from, given the base analysis"""
+    if "delta" not in data:
+        # the base analysis was not cached, data is the full analysis
+        return data
+    result = {key: value for key, value in data.items() if key != "delta"}
+    for field in DELTA_FIELDS:
+        if field in data["delta"]:
+            result[field] = apply_record_diff(base[field], data["delta"][field])
+    return result
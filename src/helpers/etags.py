@@ -0,0 +1,67 @@
+# etags.py
+"""
+ETags and conditional GET (If-None-Match) for analyses of a revision
+
+The analysis of a revision never changes for a given IARI version, so the etag of a
+response is derived from the iari_id (<lang>.<domain>.<page_id>.<revision>), the IARI
+version and what else shapes the representation (fields=, format=, ...), e.g.
+
+    "4.2.0-en.wikipedia.org.12345.67890-3f2a9c1e04b7"
+
+A request whose If-None-Match holds the etag gets an empty 304 as soon as the
+revision is known, before any cache file is read or anything is analyzed.
+A cache hit sent gzipped as stored gets the etag with a "-gzip" suffix,
+both are matched.
+"""
+import hashlib
+import json
+from typing import Any, Optional, Tuple, Union
+
+from flask import Response, request
+
+from src.helpers.get_version import get_poetry_version
+
+GZIP_SUFFIX = "-gzip"
+
+
+def make_etag(iari_id: str, **variants: Any) -> str:
+    """the (unquoted) etag of iari_id, variants that are not None are hashed into it"""
+    etag = f"{get_poetry_version('pyproject.toml')}-{iari_id}"
+    variants = {name: value for name, value in variants.items() if value is not None}
+    if variants:
+        digest = hashlib.sha1(json.dumps(variants, sort_keys=True, default=str).encode()).hexdigest()
+        etag += f"-{digest[:12]}"
+    return etag
+
+
+def etag_matches(etag: Optional[str]) -> bool:
+    """whether the If-None-Match of the request holds etag (weak comparison, as for GET)"""
+    if not etag:
+        return False
+    return request.if_none_match.contains_weak(etag) or request.if_none_match.contains_weak(etag + GZIP_SUFFIX)
+
+
+def not_modified(etag: Optional[str]) -> Optional[Response]:
+    """an empty 304 Not Modified if the If-None-Match of the request holds etag, else None"""
+    if etag is None or not etag_matches(etag):
+        return None
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+
+def with_etag(
+    result: Union[Response, Tuple[Any, int]], etag: Optional[str]
+) -> Union[Response, Tuple[Any, int], Tuple[Any, int, dict]]:
+    """adds the etag to a successful view result, a Response or a (data, status) tuple"""
+    if not etag:
+        return result
+    if isinstance(result, Response):
+        if result.status_code == 200:
+            gzipped = result.headers.get("Content-Encoding") == "gzip"
+            result.set_etag(etag + GZIP_SUFFIX if gzipped else etag)
+        return result
+    data, status = result
+    if status != 200:
+        return result
+    return data, status, {"ETag": f'"{etag}"'}
@@ -0,0 +1,72 @@
+# fieldsets.py
+"""
+Sparse fieldsets (the fields= parameter of /extract_refs and /article)
+
+fields is a comma separated list of the response fields the patron wants,
+with dotted names for the fields of each item of a list, e.g.:
+
+    fields=urls,references.template_names
+
+returns the urls and, for each reference, only its template_names.
+A field named without sub fields (e.g. "references") is returned whole.
+
+Besides pruning the response, the analysis uses wants_field to skip the work
+behind fields that were not asked for (e.g. fetching html for cite_refs).
+A fieldset of None means all fields.
+"""
+from typing import Any, Dict, List, Optional, Union
+
+Fieldset = Optional[Dict[str, Any]]
+
+
+def parse_fields(fields: Union[str, List[str], None]) -> Fieldset:
+    """
+    "urls,references.template_names" -> {"urls": {}, "references": {"template_names": {}}}
+    an empty value gives None: all fields
+    """
+    if not fields:
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    fieldset: Dict[str, Any] = {}
+    for field in fields:
+        node = fieldset
+        for name in field.strip().split("."):
+            if name:
+                node = node.setdefault(name, {})
+    return fieldset or None
+
+
+def get_sub_fieldset(fieldset: Fieldset, name: str) -> Fieldset:
+    """the fieldset for the items of field name, None if they are wanted whole"""
+    if fieldset is None:
+        return None
+    return fieldset.get(name) or None
+
+
+def wants_field(fieldset: Fieldset, path: str) -> bool:
+    """whether the field at the dotted path is (part of) what was asked for"""
+    node = fieldset
+    for name in path.split("."):
+        # no fieldset, or a field asked for without sub fields: everything below it
+        if not node:
+            return True
+        if name not in node:
+            return False
+        node = node[name]
+    return True
+
+
+def wants_any(fieldset: Fieldset, *paths: str) -> bool:
+    return any(wants_field(fieldset, path) for path in paths)
+
+
+def prune_fields(data: Any, fieldset: Fieldset) -> Any:
+    """data with only the fields of fieldset, lists are pruned item by item"""
+    if not fieldset:
+        return data
+    if isinstance(data, list):
+        return [prune_fields(item, fieldset) for item in data]
+    if isinstance(data, dict):
+        return {key: prune_fields(value, fieldset[key]) for key, value in data.items() if key in fieldset}
+    return data
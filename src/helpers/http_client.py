@@ -0,0 +1,46 @@
+# http_client.py
+"""
+Shared, pooled http client for upstream calls (MediaWiki, ORES, etc.)
+
+One requests.Session per process keeps connections to upstream hosts alive
+between calls and across requests handled by the same gunicorn worker.
+The session is created lazily, and anew after a fork, so workers never share
+sockets with their parent.
+"""
+import os
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import config
+
+# connections kept alive per upstream host; enough for the concurrent fetches of one article
+POOL_MAXSIZE = 16
+
+__session: Optional[requests.Session] = None
+__session_pid: Optional[int] = None
+__session_lock = threading.Lock()
+
+
+def create_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_MAXSIZE, pool_maxsize=POOL_MAXSIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"User-Agent": config.user_agent})
+    return session
+
+
+def get_session() -> requests.Session:
+    """returns the pooled session of this process"""
+    global __session, __session_pid
+
+    pid = os.getpid()
+    if __session is None or __session_pid != pid:
+        with __session_lock:
+            if __session is None or __session_pid != pid:
+                __session = create_session()
+                __session_pid = pid
+    return __session
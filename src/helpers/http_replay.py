@@ -0,0 +1,383 @@
+# http_replay.py
+"""
+Record/replay of upstream http calls (http_mode in config.py)
+
+IARI calls many upstreams: MediaWiki, ORES, IABot, OpenAlex, Wikidata, fatcat, ...
+To load test or benchmark it without them, every http call made with requests (module
+functions and sessions alike, they all go through HTTPAdapter.send) or aiohttp
+(ClientSession._request) can be recorded and replayed:
+
+* "live" (default): calls go to the upstreams, nothing is installed
+* "record": calls go to the upstreams and their responses are stored in http_fixtures_dir
+* "replay": calls are answered from http_fixtures_dir, an upstream is never called;
+  a call without a recorded response fails like an unreachable host would
+
+The fixture store is content addressed:
+
+    <http_fixtures_dir>/bodies/<sha256[:2]>/<sha256>        response bodies, stored once
+    <http_fixtures_dir>/requests/<key[:2]>/<key>.json       status, headers, body sha256,
+                                                            recorded latency of a request
+
+where key is the sha256 of the method, the url (query parameters sorted) and the body
+of the request. Each response is also stored under the key of the request without
+the http_replay_ignored_params (e.g. the rvstart=<now> of the latest revision), which
+replay falls back on when no request matches exactly.
+
+Replay adds http_replay_latency to each call (seconds, per host or "default", or
+"recorded" for the latency of the recorded call) and fails a fraction of them per
+http_replay_errors, e.g. {"ores.wikimedia.org": {"rate": 0.05, "status": 503}}
+(status 0: a connection error), so the error paths are load tested too.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+import urllib.parse
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+import config
+from src.models.cache import write_atomically
+
+try:
+    import aiohttp
+    from multidict import CIMultiDict, CIMultiDictProxy
+    from yarl import URL
+except ImportError:  # pragma: no cover - optional dependency
+    aiohttp = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+LIVE = "live"
+RECORD = "record"
+REPLAY = "replay"
+
+# not replayed: they describe the recorded transfer, not the stored body
+TRANSFER_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"}
+
+
+# the functions replaced by install_http_replay()
+live_send = HTTPAdapter.send
+live_request: Optional[Callable[..., Awaitable[Any]]] = aiohttp.ClientSession._request if aiohttp else None
+
+
+class FixtureNotFound(requests.ConnectionError):
+    """replay: no response was recorded for the request"""
+
+
+def canonical_url(url: str, ignored_params: Optional[List[str]] = None) -> str:
+    """url with a lowercase scheme and host and sorted query parameters, without ignored_params"""
+    parts = urllib.parse.urlsplit(url)
+    query = [
+        (name, value)
+        for name, value in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+        if not ignored_params or name not in ignored_params
+    ]
+    return urllib.parse.urlunsplit(
+        (parts.scheme.lower(), parts.netloc.lower(), parts.path, urllib.parse.urlencode(sorted(query)), "")
+    )
+
+
+def request_key(method: str, url: str, body: bytes = b"", ignored_params: Optional[List[str]] = None) -> str:
+    digest = hashlib.sha256(f"{method.upper()} {canonical_url(url, ignored_params)}\n".encode())
+    digest.update(body)
+    return digest.hexdigest()
+
+
+def body_bytes(body: Any) -> bytes:
+    """the bytes of a request body, as far as they can be known before sending it"""
+    if body is None:
+        return b""
+    if isinstance(body, bytes):
+        return body
+    if isinstance(body, str):
+        return body.encode()
+    if isinstance(body, dict):
+        return urllib.parse.urlencode(sorted(body.items())).encode()
+    # streamed bodies (generators, files) are not part of the key
+    return b""
+
+
+class FixtureStore:
+    """the recorded responses in directory, see above"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def __path__(self, kind: str, name: str, extension: str = "") -> str:
+        return os.path.join(self.directory, kind, name[:2], name + extension)
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], bytes]]:
+        try:
+            with open(self.__path__("requests", key, ".json")) as file:
+                fixture = json.load(file)
+            with open(self.__path__("bodies", fixture["body"]), "rb") as file:
+                return fixture, file.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, keys: List[str], fixture: Dict[str, Any], body: bytes) -> None:
+        fixture = {**fixture, "body": hashlib.sha256(body).hexdigest()}
+        body_path = self.__path__("bodies", fixture["body"])
+        if not os.path.exists(body_path):
+            os.makedirs(os.path.dirname(body_path), exist_ok=True)
+            write_atomically(body_path, body)
+        data = json.dumps(fixture, indent=2).encode()
+        for key in keys:
+            path = self.__path__("requests", key, ".json")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_atomically(path, data)
+
+
+class HttpReplay:
+    """records or replays the calls of this process, see install_http_replay()"""
+
+    def __init__(
+        self,
+        mode: str,
+        directory: str,
+        latency: Any = None,
+        errors: Optional[Dict[str, Dict[str, Any]]] = None,
+        ignored_params: Optional[List[str]] = None,
+    ):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"http_mode {mode!r} is not one of {LIVE}, {RECORD}, {REPLAY}")
+        self.mode = mode
+        self.store = FixtureStore(directory)
+        self.latency = latency if latency is not None else {}
+        self.errors = errors or {}
+        self.ignored_params = ignored_params or []
+        self.counts: Dict[str, int] = {"recorded": 0, "replayed": 0, "missing": 0, "injected_errors": 0}
+        self.lock = threading.Lock()
+
+    def count(self, name: str) -> None:
+        with self.lock:
+            self.counts[name] += 1
+
+    def keys(self, method: str, url: str, body: bytes) -> List[str]:
+        """the exact key of a request, then the one without the ignored parameters"""
+        keys = [request_key(method, url, body)]
+        if self.ignored_params:
+            loose_key = request_key(method, url, body, self.ignored_params)
+            if loose_key != keys[0]:
+                keys.append(loose_key)
+        return keys
+
+    def record(self, method: str, url: str, body: bytes, status: int, reason: str, headers, content: bytes, elapsed: float):
+        fixture = {
+            "method": method.upper(),
+            "url": url,
+            "status": status,
+            "reason": reason,
+            "headers": {name: value for name, value in headers.items() if name.lower() not in TRANSFER_HEADERS},
+            "elapsed": elapsed,
+        }
+        self.store.put(self.keys(method, url, body), fixture, content)
+        self.count("recorded")
+
+    def lookup(self, method: str, url: str, body: bytes) -> Tuple[Dict[str, Any], bytes]:
+        """the recorded response of a request, raises FixtureNotFound if there is none"""
+        for key in self.keys(method, url, body):
+            found = self.store.get(key)
+            if found:
+                self.count("replayed")
+                return found
+        self.count("missing")
+        logger.warning(f"http replay: no recorded response for {method.upper()} {url}")
+        raise FixtureNotFound(f"http replay: no recorded response for {method.upper()} {url}")
+
+    def __host_setting__(self, setting: Any, url: str, default: Any) -> Any:
+        if not isinstance(setting, dict):
+            return setting
+        host = urllib.parse.urlsplit(url).hostname or ""
+        return setting.get(host, setting.get("default", default))
+
+    def delay(self, url: str, fixture: Dict[str, Any]) -> float:
+        """the seconds to wait before answering a call"""
+        latency = self.__host_setting__(self.latency, url, 0.0)
+        if latency == "recorded":
+            return float(fixture.get("elapsed", 0.0))
+        return float(latency or 0.0)
+
+    def injected_error(self, url: str) -> Optional[int]:
+        """the status to fail a call with (0: a connection error), None to answer it"""
+        error = self.__host_setting__(self.errors, url, None)
+        if not error or random.random() >= error.get("rate", 0.0):
+            return None
+        self.count("injected_errors")
+        return int(error.get("status", 0))
+
+    # requests
+
+    def send(self, adapter: HTTPAdapter, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        method = request.method or "GET"
+        url = request.url or ""
+        body = body_bytes(request.body)
+
+        if self.mode == RECORD:
+            start = time.perf_counter()
+            response = live_send(adapter, request, **kwargs)
+            content = response.content
+            self.record(method, url, body, response.status_code, response.reason or "", response.headers, content,
+                        time.perf_counter() - start)
+            return response
+
+        fixture, content = self.lookup(method, url, body)
+        time.sleep(self.delay(url, fixture))
+        status = self.injected_error(url)
+        if status == 0:
+            raise requests.ConnectionError(f"http replay: injected connection error for {url}", request=request)
+        response = requests.Response()
+        response.status_code = status or fixture["status"]
+        response.reason = "Injected error" if status else fixture.get("reason", "")
+        response.headers = CaseInsensitiveDict({} if status else fixture["headers"])
+        response._content = b"" if status else content
+        response._content_consumed = True
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.url = url
+        response.request = request
+        response.connection = adapter
+        response.elapsed = timedelta(seconds=fixture.get("elapsed", 0.0))
+        return response
+
+    # aiohttp
+
+    async def request(self, session, method: str, str_or_url, **kwargs):
+        url = URL(str_or_url)
+        if kwargs.get("params"):
+            url = url.extend_query(kwargs["params"])
+        body = body_bytes(json.dumps(kwargs["json"]) if kwargs.get("json") is not None else kwargs.get("data"))
+
+        if self.mode == RECORD:
+            if live_request is None:
+                raise RuntimeError("aiohttp is not installed")
+            start = time.perf_counter()
+            response = await live_request(session, method, str_or_url, **kwargs)
+            content = await response.read()
+            self.record(method, str(url), body, response.status, response.reason or "", response.headers, content,
+                        time.perf_counter() - start)
+            return response
+
+        try:
+            fixture, content = self.lookup(method, str(url), body)
+        except FixtureNotFound as e:
+            raise aiohttp.ClientConnectionError(str(e)) from e
+        await asyncio.sleep(self.delay(str(url), fixture))
+        status = self.injected_error(str(url))
+        if status == 0:
+            raise aiohttp.ClientConnectionError(f"http replay: injected connection error for {url}")
+        if status:
+            return ReplayedClientResponse(method, url, status, "Injected error", {}, b"")
+        return ReplayedClientResponse(method, url, fixture["status"], fixture.get("reason", ""), fixture["headers"], content)
+
+
+class ReplayedClientResponse:
+    """what IARI uses of an aiohttp.ClientResponse, answered from a fixture"""
+
+    def __init__(self, method: str, url, status: int, reason: str, headers: Dict[str, str], content: bytes):
+        self.method = method
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = CIMultiDictProxy(CIMultiDict(headers))
+        self.content_type = self.headers.get("Content-Type", "application/octet-stream").split(";")[0]
+        self.__content = content
+
+    @property
+    def ok(self) -> bool:
+        return self.status < 400
+
+    @property
+    def request_info(self):
+        return aiohttp.RequestInfo(self.url, self.method, CIMultiDictProxy(CIMultiDict()), self.url)
+
+    async def read(self) -> bytes:
+        return self.__content
+
+    async def text(self, encoding: Optional[str] = None, errors: str = "strict") -> str:
+        return self.__content.decode(encoding or "utf-8", errors)
+
+    async def json(self, *, encoding: Optional[str] = None, loads=json.loads, content_type: Optional[str] = "application/json"):
+        if content_type and content_type not in self.content_type:
+            raise aiohttp.ContentTypeError(
+                self.request_info, (), status=self.status, message=f"unexpected mimetype: {self.content_type}"
+            )
+        return loads(await self.text(encoding))
+
+    def raise_for_status(self) -> None:
+        if not self.ok:
+            raise aiohttp.ClientResponseError(self.request_info, (), status=self.status, message=self.reason)
+
+    def release(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    async def wait_for_close(self) -> None:
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+__replay: Optional[HttpReplay] = None
+
+
+def __replay_send__(adapter, request, **kwargs):
+    return __replay.send(adapter, request, **kwargs)
+
+
+async def __replay_request__(session, method, str_or_url, **kwargs):
+    return await __replay.request(session, method, str_or_url, **kwargs)
+
+
+def install_http_replay(mode: str = "", directory: str = "") -> Optional[HttpReplay]:
+    """
+    records or replays the http calls of this process, per http_mode in config.py
+    (or mode and directory if given). does nothing in live mode
+    """
+    global __replay
+
+    mode = mode or getattr(config, "http_mode", LIVE)
+    if mode == LIVE:
+        uninstall_http_replay()
+        return None
+    __replay = HttpReplay(
+        mode,
+        directory or getattr(config, "http_fixtures_dir", "fixtures/http/"),
+        latency=getattr(config, "http_replay_latency", None),
+        errors=getattr(config, "http_replay_errors", None),
+        ignored_params=getattr(config, "http_replay_ignored_params", None),
+    )
+    HTTPAdapter.send = __replay_send__  # type: ignore[method-assign,assignment]
+    if aiohttp:
+        aiohttp.ClientSession._request = __replay_request__  # type: ignore[method-assign,assignment]
+    logger.warning(f"http calls are {mode}ed ({__replay.store.directory})")
+    return __replay
+
+
+def uninstall_http_replay() -> None:
+    """back to live http calls"""
+    global __replay
+
+    __replay = None
+    HTTPAdapter.send = live_send  # type: ignore[method-assign]
+    if aiohttp:
+        aiohttp.ClientSession._request = live_request  # type: ignore[method-assign,assignment]
+
+
+def get_http_replay() -> Optional[HttpReplay]:
+    """the installed record/replay of this process, None when live"""
+    return __replay
@@ -0,0 +1,86 @@
+# json_encoding.py
+"""
+Fast json encoding of responses and pre-encoded cache hits
+
+* dumps() encodes with orjson when it is installed (several times faster than
+  the json module on large article payloads) and falls back to json otherwise
+  or for what orjson does not support (e.g. integers beyond 64 bits)
+* output_json is registered on the Api as the application/json representation
+* encoded_response() sends a cache hit as the bytes stored by the cache backend
+  (see CacheBackend.get_encoded), gzipped ones as they are if the client accepts
+  gzip, so a hit is never parsed and serialized again. The hit is flagged with
+  the SERVED_FROM_CACHE_HEADER header.
+
+Gzipped hits are sent without looking into them: the entries of older caches, stored
+with "served_from_cache": false, are flagged by migrate_cache.py when it copies them
+into a compressing backend.
+"""
+import gzip
+import json
+from typing import Any, Dict, Optional
+
+from flask import Response, current_app, request
+
+from src.helpers.metrics import span
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore[assignment]
+
+SERVED_FROM_CACHE_HEADER = "X-IARI-Served-From-Cache"
+
+# how the (flat) entries written before cached payloads were stored with "served_from_cache": true
+# flag it, first occurrence only: the top level key comes before the references
+LEGACY_CACHE_FLAGS = [
+    (b'"served_from_cache": false', b'"served_from_cache": true'),
+    (b'"served_from_cache":false', b'"served_from_cache":true'),
+]
+
+
+def dumps(payload: Any, indent: bool = False) -> bytes:
+    """payload as utf-8 json"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        try:
+            return orjson.dumps(payload, default=str, option=option)
+        except TypeError:
+            pass
+    return json.dumps(
+        payload,
+        ensure_ascii=False,
+        default=str,
+        indent=2 if indent else None,
+        separators=None if indent else (",", ":"),
+    ).encode("utf-8")
+
+
+def output_json(data: Any, code: int, headers: Optional[Dict[str, str]] = None) -> Response:
+    """flask-restful representation for application/json, pretty printed in debug mode like the default"""
+    with span("encode"):
+        body = dumps(data, indent=current_app.debug) + b"\n"
+    response = Response(body, status=code, mimetype="application/json")
+    response.headers.extend(headers or {})
+    return response
+
+
+def encoded_response(body: bytes, content_encoding: Optional[str] = None, status: int = 200) -> Response:
+    """
+    a cache hit as stored: body is json, gzipped if content_encoding is "gzip"
+    """
+    if content_encoding == "gzip":
+        if "gzip" in request.accept_encodings:
+            response = Response(body, status=status, mimetype="application/json")
+            response.headers["Content-Encoding"] = "gzip"
+            response.headers["Vary"] = "Accept-Encoding"
+            response.headers[SERVED_FROM_CACHE_HEADER] = "true"
+            return response
+        body = gzip.decompress(body)
+
+    for legacy, flag in LEGACY_CACHE_FLAGS:
+        if legacy in body:
+            body = body.replace(legacy, flag, 1)
+            break
+    response = Response(body, status=status, mimetype="application/json")
+    response.headers[SERVED_FROM_CACHE_HEADER] = "true"
+    return response
@@ -0,0 +1,391 @@
+# metrics.py
+"""
+Per request stage timing (Server-Timing) and the process metrics of /v2/metrics
+
+Code times its stages with spans:
+
+    with span("parse"):
+        sections = mw_extract_sections(wikitext)
+
+Within a request the durations of its spans are summed per name (and description)
+and sent in a Server-Timing header, with the total time of the request:
+
+    Server-Timing: fetch;dur=412.3, parse;dur=38.1, refs;dur=95.0,
+        upstream;dur=405.7;desc="en.wikipedia.org", total;dur=561.2
+
+Every process also aggregates, whether it serves requests or not (page pool workers):
+
+* latency histograms per stage (span name), per upstream host and per endpoint
+* cache hits and misses per cache namespace (FileIo subfolder or CacheType)
+* the number of requests in flight per endpoint
+
+Upstream calls are timed where all of them pass: requests.Session.send and, for the url
+status engine, an aiohttp trace config (see aiohttp_trace_config). Only the hosts IARI calls
+are labelled by name (UPSTREAM_HOSTS and the wikis), the urls patrons have fetched (xhtml and
+pdf handlers) are all labelled "other", so the metrics don't grow with every host ever fetched.
+
+Each process writes its metrics to <metrics_dir>/<host>-<pid>.json (json/metrics/ by
+default, create it to enable the metrics), atomically, from a background thread every
+metrics_flush_seconds. /v2/metrics merges the files of all processes, so the gunicorn
+workers of a host (or of hosts sharing metrics_dir) are aggregated without any shared
+memory. The counts of processes that have exited are kept (folded into archived.json),
+their requests in flight are not.
+"""
+import atexit
+import fcntl
+import json
+import logging
+import os
+import re
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+import config
+from src.models.cache import write_atomically
+
+logger = logging.getLogger(__name__)
+
+# histogram bucket upper bounds, in seconds
+BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float("inf")]
+
+HISTOGRAM_FAMILIES = ["stages", "upstreams", "endpoints"]
+ARCHIVE = "archived.json"
+HOSTNAME = socket.gethostname()
+
+# the upstreams labelled by host, besides the wikis of WIKI_HOST
+UPSTREAM_HOSTS = {
+    "iabot-api.archive.org",
+    "iabot.wmcloud.org",
+    "web.archive.org",
+    "scholar.archive.org",
+    "ores.wikimedia.org",
+    "www.wikidata.org",
+    "commons.wikimedia.org",
+    "veri-fyi.toolforge.org",
+    "wikipediacitations.scatter.red",
+    "api.fatcat.wiki",
+}
+WIKI_HOST = re.compile(r"^[a-z]{2,3}(-[a-z]+)*\.wikipedia\.org$")
+OTHER_UPSTREAM = "other"
+
+
+def new_histogram() -> Dict[str, Any]:
+    return {"count": 0, "sum": 0.0, "buckets": [0] * len(BUCKETS)}
+
+
+def observe_histogram(histogram: Dict[str, Any], seconds: float) -> None:
+    histogram["count"] += 1
+    histogram["sum"] += seconds
+    for index, bound in enumerate(BUCKETS):
+        if seconds <= bound:
+            histogram["buckets"][index] += 1
+            break
+
+
+def empty_metrics() -> Dict[str, Any]:
+    return {
+        **{family: {} for family in HISTOGRAM_FAMILIES},
+        "cache": {},
+        "in_flight": {},
+    }
+
+
+def merge_metrics(total: Dict[str, Any], metrics: Dict[str, Any], in_flight: bool = True) -> Dict[str, Any]:
+    """adds metrics (as written by a process) to total"""
+    for family in HISTOGRAM_FAMILIES:
+        for label, histogram in metrics.get(family, {}).items():
+            merged = total[family].setdefault(label, new_histogram())
+            merged["count"] += histogram["count"]
+            merged["sum"] += histogram["sum"]
+            merged["buckets"] = [a + b for a, b in zip(merged["buckets"], histogram["buckets"])]
+    for namespace, counts in metrics.get("cache", {}).items():
+        merged = total["cache"].setdefault(namespace, {"hits": 0, "misses": 0})
+        merged["hits"] += counts.get("hits", 0)
+        merged["misses"] += counts.get("misses", 0)
+    if in_flight:
+        for endpoint, count in metrics.get("in_flight", {}).items():
+            total["in_flight"][endpoint] = total["in_flight"].get(endpoint, 0) + count
+    return total
+
+
+class Metrics:
+    """the metrics of this process"""
+
+    def __init__(self, directory: str, flush_seconds: float = 1.0):
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self.data = empty_metrics()
+        self.lock = threading.Lock()
+        self.changed = False
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, f"{HOSTNAME}-{os.getpid()}.json")
+
+    def observe(self, family: str, label: str, seconds: float) -> None:
+        with self.lock:
+            observe_histogram(self.data[family].setdefault(label, new_histogram()), seconds)
+            self.changed = True
+
+    def count_cache(self, namespace: str, hit: bool) -> None:
+        with self.lock:
+            counts = self.data["cache"].setdefault(namespace, {"hits": 0, "misses": 0})
+            counts["hits" if hit else "misses"] += 1
+            self.changed = True
+
+    def add_in_flight(self, endpoint: str, delta: int) -> None:
+        with self.lock:
+            self.data["in_flight"][endpoint] = self.data["in_flight"].get(endpoint, 0) + delta
+            self.changed = True
+
+    def flush(self) -> None:
+        """writes the metrics of this process if they changed and the metrics directory exists"""
+        with self.lock:
+            if not self.changed or not os.path.isdir(self.directory):
+                return
+            data = json.dumps(self.data).encode()
+            self.changed = False
+        write_atomically(self.path, data)
+
+    def start_flushing(self) -> None:
+        """flushes every flush_seconds in a daemon thread, and at exit"""
+        def flush_periodically():
+            while True:
+                time.sleep(self.flush_seconds)
+                try:
+                    self.flush()
+                except OSError as e:
+                    logger.warning(f"metrics: could not write {self.path}: {e}")
+
+        threading.Thread(target=flush_periodically, name="metrics-flush", daemon=True).start()
+        atexit.register(self.flush)
+
+
+__metrics: Optional[Metrics] = None
+__metrics_pid: Optional[int] = None
+__metrics_lock = threading.Lock()
+
+
+def get_metrics_dir() -> str:
+    return getattr(config, "metrics_dir", "") or f"{config.iari_cache_dir}metrics/"
+
+
+def get_metrics() -> Metrics:
+    """the metrics of this process, anew after a fork so children do not report their parent's"""
+    global __metrics, __metrics_pid
+
+    pid = os.getpid()
+    if __metrics is None or __metrics_pid != pid:
+        with __metrics_lock:
+            if __metrics is None or __metrics_pid != pid:
+                __metrics = Metrics(get_metrics_dir(), getattr(config, "metrics_flush_seconds", 1.0))
+                __metrics.start_flushing()
+                __metrics_pid = pid
+    return __metrics
+
+
+def request_timings() -> Optional[Dict[tuple, float]]:
+    """the span durations of the current request, None outside of a request"""
+    from flask import g, has_request_context
+
+    if not has_request_context():
+        return None
+    timings: Dict[tuple, float] = g.setdefault("server_timing", {})
+    return timings
+
+
+@contextmanager
+def span(name: str, desc: Optional[str] = None, family: str = "stages") -> Iterator[None]:
+    """times the block as stage name (and adds it to the Server-Timing of the request)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - start, desc, family)
+
+
+def record_span(name: str, seconds: float, desc: Optional[str] = None, family: str = "stages") -> None:
+    timings = request_timings()
+    if timings is not None:
+        timings[(name, desc)] = timings.get((name, desc), 0.0) + seconds
+    get_metrics().observe(family, desc if family == "upstreams" and desc else name, seconds)
+
+
+def upstream_label(url: str) -> str:
+    """the host of url if it is a known upstream, else OTHER_UPSTREAM"""
+    host = urlsplit(str(url)).hostname or ""
+    if host in UPSTREAM_HOSTS or WIKI_HOST.match(host):
+        return host
+    return OTHER_UPSTREAM
+
+
+def record_upstream(url: str, seconds: float) -> None:
+    record_span("upstream", seconds, desc=upstream_label(url), family="upstreams")
+
+
+def count_cache(namespace: str, hit: bool) -> None:
+    get_metrics().count_cache(namespace, hit)
+
+
+def server_timing(timings: Dict[tuple, float], total: Optional[float] = None) -> str:
+    """the Server-Timing header value of the span durations (in seconds)"""
+    entries = []
+    for (name, desc), seconds in timings.items():
+        entry = f"{name};dur={seconds * 1e3:.1f}"
+        if desc:
+            entry += f';desc="{desc}"'
+        entries.append(entry)
+    if total is not None:
+        entries.append(f"total;dur={total * 1e3:.1f}")
+    return ", ".join(entries)
+
+
+def process_is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def collect_metrics(directory: Optional[str] = None) -> Dict[str, Any]:
+    """
+    the merged metrics of all processes writing to directory.
+    the files of exited processes of this host are folded into the archive,
+    under a lock so concurrent collections do not count them twice
+    """
+    get_metrics().flush()
+    directory = directory or get_metrics_dir()
+    total = empty_metrics()
+    processes = 0
+    if not os.path.isdir(directory):
+        return {**total, "processes": processes}
+
+    with open(os.path.join(directory, ".lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        archive = read_metrics_file(os.path.join(directory, ARCHIVE)) or empty_metrics()
+        exited: List[str] = []
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith(".json") or filename == ARCHIVE:
+                continue
+            host, _, pid = filename[: -len(".json")].rpartition("-")
+            metrics = read_metrics_file(os.path.join(directory, filename))
+            if metrics is None:
+                continue
+            if host == HOSTNAME and pid.isdigit() and not process_is_alive(int(pid)):
+                merge_metrics(archive, metrics, in_flight=False)
+                exited.append(filename)
+            else:
+                merge_metrics(total, metrics)
+                processes += 1
+        if exited:
+            write_atomically(os.path.join(directory, ARCHIVE), json.dumps(archive).encode())
+            for filename in exited:
+                os.unlink(os.path.join(directory, filename))
+        merge_metrics(total, archive, in_flight=False)
+    return {**total, "processes": processes}
+
+
+def read_metrics_file(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path) as file:
+            data: Dict[str, Any] = json.load(file)
+            return data
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def prometheus_text(metrics: Dict[str, Any]) -> str:
+    """metrics in the Prometheus text exposition format"""
+    lines = []
+    for family, metric, label in [
+        ("stages", "iari_stage_seconds", "stage"),
+        ("upstreams", "iari_upstream_seconds", "host"),
+        ("endpoints", "iari_request_seconds", "endpoint"),
+    ]:
+        lines.append(f"# TYPE {metric} histogram")
+        for name, histogram in sorted(metrics[family].items()):
+            cumulative = 0
+            for bound, count in zip(BUCKETS, histogram["buckets"]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{metric}_bucket{{{label}="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'{metric}_sum{{{label}="{name}"}} {histogram["sum"]}')
+            lines.append(f'{metric}_count{{{label}="{name}"}} {histogram["count"]}')
+    lines.append("# TYPE iari_cache_lookups_total counter")
+    for namespace, counts in sorted(metrics["cache"].items()):
+        lines.append(f'iari_cache_lookups_total{{namespace="{namespace}",result="hit"}} {counts["hits"]}')
+        lines.append(f'iari_cache_lookups_total{{namespace="{namespace}",result="miss"}} {counts["misses"]}')
+    lines.append("# TYPE iari_requests_in_flight gauge")
+    for endpoint, count in sorted(metrics["in_flight"].items()):
+        lines.append(f'iari_requests_in_flight{{endpoint="{endpoint}"}} {count}')
+    lines.append("# TYPE iari_processes gauge")
+    lines.append(f"iari_processes {metrics['processes']}")
+    return "\n".join(lines) + "\n"
+
+
+def aiohttp_trace_config():
+    """an aiohttp.TraceConfig timing the calls of a session as upstreams"""
+    import aiohttp
+
+    async def on_request_start(session, context, params):
+        context.start = time.perf_counter()
+
+    async def on_request_end(session, context, params):
+        record_upstream(params.url, time.perf_counter() - context.start)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_request_exception.append(on_request_end)
+    return trace_config
+
+
+# the function timed by install_metrics()
+live_session_send = requests.Session.send
+
+
+def __timed_send__(session, request, **kwargs):
+    start = time.perf_counter()
+    try:
+        return live_session_send(session, request, **kwargs)
+    finally:
+        record_upstream(request.url, time.perf_counter() - start)
+
+
+def install_metrics(app) -> None:
+    """times the requests of app and the upstream calls made with requests"""
+    from flask import g, request
+
+    requests.Session.send = __timed_send__  # type: ignore
+
+    def endpoint() -> str:
+        return request.url_rule.rule if request.url_rule else "unmatched"
+
+    @app.before_request
+    def start_request():
+        g.metrics_start = time.perf_counter()
+        g.metrics_endpoint = endpoint()
+        get_metrics().add_in_flight(g.metrics_endpoint, 1)
+
+    @app.after_request
+    def add_server_timing(response):
+        if "metrics_start" in g:
+            total = time.perf_counter() - g.metrics_start
+            response.headers["Server-Timing"] = server_timing(request_timings() or {}, total)
+        return response
+
+    @app.teardown_request
+    def finish_request(exception=None):
+        if "metrics_start" in g:
+            metrics = get_metrics()
+            metrics.observe("endpoints", g.metrics_endpoint, time.perf_counter() - g.metrics_start)
+            metrics.add_in_flight(g.metrics_endpoint, -1)
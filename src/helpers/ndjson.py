@@ -0,0 +1,52 @@
+# ndjson.py
+"""
+Streaming responses in newline delimited json (format=ndjson)
+
+Instead of building the whole result in memory and serializing it at once,
+an endpoint yields records that are written to the client one json object
+per line as they are produced:
+
+* the first record is the header, with "record": "header" and the fields
+  known before the items (ids, section names, ...)
+* then one record per item, e.g. {"record": "reference", ...} or {"record": "page", ...}
+* optionally a footer with what is only known at the end (counts, execution time)
+
+The header is produced before the response starts, so errors up to then get
+the usual error response and status. Later errors end the stream with
+{"record": "error", "errors": [...]}.
+"""
+from typing import Any, Dict, Iterable, Iterator
+
+from flask import Response, stream_with_context
+
+from src.helpers.iari_utils import iari_errors
+from src.helpers.json_encoding import dumps
+
+NDJSON_FORMAT = "ndjson"
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+
+def ndjson_response(records: Iterable[Dict[str, Any]], status: int = 200) -> Response:
+    """
+    a streaming response with one line per record.
+    exceptions raised before the first record propagate to the caller
+    """
+    records = iter(records)
+    header = next(records)
+    return Response(
+        stream_with_context(ndjson_lines(header, records)),
+        status=status,
+        mimetype=NDJSON_MIMETYPE,
+    )
+
+
+def ndjson_lines(header: Dict[str, Any], records: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+    from src import app
+
+    yield dumps(header) + b"\n"
+    try:
+        for record in records:
+            yield dumps(record) + b"\n"
+    except Exception as e:
+        app.logger.error(f"ndjson_lines: stream ended by {type(e).__name__}: {e}")
+        yield dumps({"record": "error", **iari_errors(e)}) + b"\n"
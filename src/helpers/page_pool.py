@@ -0,0 +1,165 @@
+# page_pool.py
+"""
+Process pool for batches of pages
+
+Parsing a page (mwparserfromhell, BeautifulSoup) is CPU bound, so the pages of a
+batch request (/fetchrefs with several pages, /extract_refs with pages=) are
+spread over a bounded pool of processes instead of being handled one after the
+other in the request thread.
+
+* the pool is created on first use in each gunicorn worker, with
+  page_pool_size processes (config.py, default: the number of CPUs, at most 8)
+* processes are started with the "forkserver" method, so they don't inherit the
+  threads (e.g. of the url status engine) of the worker
+* a batch gets a time budget (batch_time_budget in config.py); pages that are
+  not done by then get an error, the others keep their results. Pages still
+  running then would keep their processes busy for later batches, so the pool
+  is recycled: its processes are terminated, unless other batches of the worker
+  are running on it (then it is only shut down, and exits once they are done,
+  their queued pages included)
+* results come back in input order, all at once (run_batch) or one by one
+  as they are done (iter_batch)
+
+The function run for each page must be defined at module level, so it can be
+pickled, and must return json serializable data.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import config
+
+DEFAULT_TIME_BUDGET = 120
+MAX_DEFAULT_SIZE = 8
+
+__pool: Optional[ProcessPoolExecutor] = None
+__pool_pid: Optional[int] = None
+__pool_lock = threading.Lock()
+# batches in progress in this process
+__running_batches = 0
+
+
+def get_pool_size() -> int:
+    return int(getattr(config, "page_pool_size", 0) or min(os.cpu_count() or 1, MAX_DEFAULT_SIZE))
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """the pool of this process, created anew after a fork"""
+    global __pool, __pool_pid
+    pid = os.getpid()
+    if __pool is None or __pool_pid != pid:
+        with __pool_lock:
+            if __pool is None or __pool_pid != pid:
+                context = multiprocessing.get_context(getattr(config, "page_pool_start_method", "forkserver"))
+                __pool = ProcessPoolExecutor(max_workers=get_pool_size(), mp_context=context)
+                __pool_pid = pid
+    return __pool
+
+
+def shutdown_pool() -> None:
+    global __pool
+    with __pool_lock:
+        if __pool is not None and __pool_pid == os.getpid():
+            __pool.shutdown(wait=False, cancel_futures=True)
+        __pool = None
+
+
+def recycle_pool() -> None:
+    """
+    replaces the pool after a batch left pages running past its budget,
+    terminating its processes if no other batch is running on them
+    """
+    global __pool
+    with __pool_lock:
+        pool = __pool if __pool_pid == os.getpid() else None
+        __pool = None
+        terminate = __running_batches <= 1
+    if pool is None:
+        return
+    # ProcessPoolExecutor has no public way to stop a running call
+    processes = list((pool._processes or {}).values()) if terminate else []
+    # the queued pages of other batches are within their own budget
+    pool.shutdown(wait=False, cancel_futures=terminate)
+    for process in processes:
+        process.terminate()
+
+
+def count_batch(started: bool) -> None:
+    global __running_batches
+    with __pool_lock:
+        __running_batches += 1 if started else -1
+
+
+def run_batch(
+    function: Callable[..., Any],
+    arguments: List[Tuple],
+    time_budget: Optional[float] = None,
+) -> List[Tuple[Any, Optional[Dict[str, str]]]]:
+    """
+    runs function(*args) for every args in arguments in the pool and returns
+    [(result, None) or (None, error), ...] in the order of arguments,
+    where error is like {"error": "TimeoutError", "details": "..."}
+    """
+    return list(iter_batch(function, arguments, time_budget))
+
+
+def iter_batch(
+    function: Callable[..., Any],
+    arguments: List[Tuple],
+    time_budget: Optional[float] = None,
+) -> Iterator[Tuple[Any, Optional[Dict[str, str]]]]:
+    """
+    like run_batch, but yields each (result, error) as soon as it and
+    the ones before it are done, e.g. for streaming responses
+    """
+    from src import app
+
+    if time_budget is None:
+        time_budget = getattr(config, "batch_time_budget", DEFAULT_TIME_BUDGET)
+    if not arguments:
+        return
+
+    start = time.monotonic()
+    try:
+        futures: List[Future] = [get_pool().submit(function, *args) for args in arguments]
+    except BrokenProcessPool:
+        # a process of the pool died in an earlier batch
+        shutdown_pool()
+        futures = [get_pool().submit(function, *args) for args in arguments]
+
+    over_budget = 0
+    count_batch(started=True)
+    try:
+        for future in futures:
+            remaining = time_budget - (time.monotonic() - start)
+            if remaining > 0:
+                wait([future], timeout=remaining)
+            if not future.done():
+                # pages that have not started are dropped, running ones are stopped below
+                future.cancel()
+                over_budget += 1
+                yield None, {"error": "TimeoutError", "details": f"batch time budget of {time_budget}s exceeded"}
+                continue
+            try:
+                yield future.result(), None
+            except BrokenProcessPool as e:
+                shutdown_pool()
+                yield None, {"error": type(e).__name__, "details": str(e)}
+            except Exception as e:
+                yield None, {"error": type(e).__name__, "details": str(e)}
+    finally:
+        # the consumer stopped early, e.g. a closed stream
+        for future in futures:
+            future.cancel()
+        if over_budget and not all(future.done() for future in futures):
+            recycle_pool()
+        count_batch(started=False)
+
+    app.logger.info(
+        f"run_batch: {len(arguments)} pages in {time.monotonic() - start:.2f}s "
+        f"with {get_pool_size()} processes, {over_budget} over budget"
+    )
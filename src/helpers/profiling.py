@@ -0,0 +1,236 @@
+# profiling.py
+"""
+Profiles of single requests, on demand
+
+Any endpoint deriving from StatisticsViewV2 can be run under a profiler by an admin,
+to see why one article is slow in production without reproducing it locally:
+
+    curl -H "X-IARI-Admin-Token: ..." ".../v2/article?url=...&refresh=true&profile=1"
+
+profile=1 (or profile=sample) samples the stack of the request thread every
+profile_interval seconds and stores the samples as collapsed stacks, one
+"frame;frame;frame count" line per stack, the input of flamegraph.pl, speedscope
+and the like. profile=cprofile runs the request under cProfile instead (deterministic,
+slower) and stores its stats (snakeviz, pstats).
+
+The profiles are stored in <iari_cache_dir>profiles/ (at most profile_max_files of them,
+the oldest are removed), each with a <name>.json of what was profiled. The response
+links to its profile in a Link header:
+
+    Link: </v2/profiles/20261018T120000-article-1234-a1b2c3.collapsed>; rel="profile"
+
+/v2/profiles lists the profiles, /v2/profiles/<name> returns one; both need the admin token too.
+
+Only the request thread is profiled, not the page pool processes or the url status
+engine thread it waits for, and a streamed response (format=ndjson) only up to its
+first record. Without profile= a request is not touched (see StatisticsViewV2.dispatch_request).
+"""
+import cProfile
+import hmac
+import json
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+import config
+
+PROFILE_SUBFOLDER = "profiles/"
+ADMIN_TOKEN_HEADER = "X-IARI-Admin-Token"
+# profile= values
+PROFILE_MODES = {"1": "sample", "true": "sample", "sample": "sample", "cprofile": "cprofile"}
+EXTENSIONS = {"sample": ".collapsed", "cprofile": ".prof"}
+# seconds between samples
+DEFAULT_INTERVAL = 0.005
+DEFAULT_MAX_FILES = 100
+# profile names, nothing else is served from the profiles directory
+NAME_PATTERN = re.compile(r"^[\w.-]+\.(collapsed|prof)$")
+TOP_OF_TREE = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def get_profile_directory() -> str:
+    directory = f"{config.iari_cache_dir}{PROFILE_SUBFOLDER}"
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def is_admin(token: Optional[str]) -> bool:
+    """whether token is the admin_token of config.py (never, when no admin_token is set)"""
+    admin_token = getattr(config, "admin_token", "")
+    if not admin_token or not token:
+        return False
+    return hmac.compare_digest(token.encode(), admin_token.encode())
+
+
+def check_admin() -> None:
+    """aborts with 403 unless the request carries the admin token"""
+    from flask import request
+    from flask_restful import abort  # type: ignore
+
+    if not is_admin(request.headers.get(ADMIN_TOKEN_HEADER)):
+        abort(403, error=f"an admin token ({ADMIN_TOKEN_HEADER} header) is needed")
+
+
+def get_profile_mode(value: str) -> Optional[str]:
+    """the profiler of profile=value, None for no profiling (profile=0)"""
+    from flask_restful import abort  # type: ignore
+
+    value = value.lower()
+    if value in ["", "0", "false"]:
+        return None
+    if value not in PROFILE_MODES:
+        abort(400, error=f"profile must be one of {', '.join(PROFILE_MODES)} or 0")
+    return PROFILE_MODES[value]
+
+
+class StackSampler:
+    """samples the stack of a thread every interval seconds, from a thread of its own"""
+
+    def __init__(self, thread_id: int, interval: float = DEFAULT_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.labels: Dict[Any, str] = {}
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.__run__, name="profile-sampler", daemon=True)
+
+    def __enter__(self) -> "StackSampler":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stopped.set()
+        self.thread.join()
+
+    def __run__(self) -> None:
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def label(self, code) -> str:
+        """function (file:line) of code, without the separators of the collapsed format"""
+        label = self.labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            if filename.startswith(TOP_OF_TREE):
+                filename = os.path.relpath(filename, TOP_OF_TREE)
+            label = f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":").replace(" ", "_")
+            self.labels[code] = label
+        return label
+
+    def sample(self) -> None:
+        frame = sys._current_frames().get(self.thread_id)
+        stack = []
+        while frame is not None:
+            stack.append(self.label(frame.f_code))
+            frame = frame.f_back
+        if stack:
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def new_profile_name(path: str, mode: str) -> str:
+    endpoint = re.sub(r"[^\w-]+", "_", path.strip("/").split("/", 1)[-1]) or "root"
+    return f"{time.strftime('%Y%m%dT%H%M%S')}-{endpoint}-{os.getpid()}-{secrets.token_hex(3)}{EXTENSIONS[mode]}"
+
+
+def profile_request(dispatch: Callable[[], Any], mode: str) -> Any:
+    """
+    returns dispatch() run under the profiler of mode,
+    storing the profile and linking to it from the response
+    """
+    from flask import after_this_request, request
+    from src import app
+
+    name = new_profile_name(request.path, mode)
+    profiler = cProfile.Profile() if mode == "cprofile" else None
+    sampler = StackSampler(threading.get_ident(), getattr(config, "profile_interval", DEFAULT_INTERVAL))
+    start = time.perf_counter()
+    status = "error"
+    try:
+        if profiler is not None:
+            try:
+                result = profiler.runcall(dispatch)
+            finally:
+                profiler.create_stats()
+        else:
+            with sampler:
+                result = dispatch()
+        status = "ok"
+        return result
+    finally:
+        seconds = time.perf_counter() - start
+        directory = get_profile_directory()
+        if profiler is not None:
+            profiler.dump_stats(os.path.join(directory, name))
+            samples = None
+        else:
+            with open(os.path.join(directory, name), "w") as file:
+                file.write(sampler.collapsed())
+            samples = sum(sampler.stacks.values())
+        write_profile_info(directory, name, {
+            "name": name,
+            "mode": mode,
+            "path": request.path,
+            # without profile= itself, to replay the request unprofiled
+            "args": {key: value for key, value in request.args.items() if key != "profile"},
+            "form": {key: value for key, value in request.form.items() if key != "profile"},
+            "method": request.method,
+            "status": status,
+            "seconds": round(seconds, 4),
+            "samples": samples,
+            "timestamp": time.time(),
+        })
+        prune_profiles(directory, getattr(config, "profile_max_files", DEFAULT_MAX_FILES))
+        app.logger.info(f"profiled {request.full_path} in {seconds:.3f} s: {directory}{name}")
+
+        link = f'<{request.script_root}/v2/profiles/{name}>; rel="profile"'
+
+        @after_this_request
+        def add_profile_link(response):
+            response.headers.add("Link", link)
+            return response
+
+
+def write_profile_info(directory: str, name: str, info: Dict[str, Any]) -> None:
+    with open(os.path.join(directory, f"{name}.json"), "w") as file:
+        json.dump(info, file)
+
+
+def list_profiles(directory: Optional[str] = None) -> List[Dict[str, Any]]:
+    """what was profiled, newest first"""
+    directory = directory or get_profile_directory()
+    profiles = []
+    for filename in os.listdir(directory):
+        if not filename.endswith(".json") or not NAME_PATTERN.match(filename[: -len(".json")]):
+            continue
+        try:
+            with open(os.path.join(directory, filename)) as file:
+                profiles.append(json.load(file))
+        except (FileNotFoundError, ValueError):
+            # removed or being written by another worker
+            continue
+    return sorted(profiles, key=lambda info: info.get("timestamp", 0), reverse=True)
+
+
+def prune_profiles(directory: str, max_files: int) -> None:
+    """removes the oldest profiles beyond max_files"""
+    for info in list_profiles(directory)[max_files:]:
+        for filename in [info["name"], f"{info['name']}.json"]:
+            try:
+                os.unlink(os.path.join(directory, filename))
+            except FileNotFoundError:
+                pass
+
+
+def get_profile_path(name: str) -> Optional[str]:
+    """the path of profile name, None if there is no such profile"""
+    if not NAME_PATTERN.match(name):
+        return None
+    path = os.path.join(get_profile_directory(), name)
+    return path if os.path.isfile(path) else None
@@ -1,17 +1,44 @@
 import requests
-from datetime import datetime
+from datetime import datetime, timezone
 
-import config
+from src.helpers.cache_utils import CacheType, get_cache, is_cached, set_cache
+from src.helpers.http_client import get_session
+from src.models.exceptions import UnknownValueError
 
-wiki_user_agent = (f"IariBot/0.0"
-                   f" (https://iabot-api.archive.org/services/context/iari-stage/v2/version; mojomonger@archive.org)"
-                   f" iari/0.0")
+wiki_user_agent = ("IariBot/0.0"
+                   " (https://iabot-api.archive.org/services/context/iari-stage/v2/version; mojomonger@archive.org)"
+                   " iari/0.0")
 # wiki_user_agent_2 = "TestBot/0.1 (https://example.com/; test@example.com)"
 
+wiki_api_timeout = 20  # seconds
+# titles per action=query request, the limit of the api for non bot users
+MAX_TITLES_PER_QUERY = 50
+
+# cache varieties, see cache_utils
+REVISION_INDEX_VARIETY = "INDEX"  # (domain, title) -> revisions and the as_of interval they are current in
+REVISION_VARIETY = "REVISION"  # (domain, rev_id) -> results of get_wikipedia_article
+
 def get_current_timestamp():
     now = datetime.utcnow()
     return now.strftime('%Y-%m-%dT%H:%M:%SZ')
 
+def normalize_timestamp(timestamp):
+    """
+    timestamp as ISO 8601 in UTC (2019-01-01T00:00:00Z), None if it is not a timestamp
+
+    Accepts ISO 8601 dates and times (with or without offset) and MediaWiki's 20190101000000,
+    so timestamps can be compared as strings, as the revision index does.
+    """
+    try:
+        if len(timestamp) == 14 and timestamp.isdigit():
+            timestamp = f"{timestamp[:8]}T{timestamp[8:]}"
+        moment = datetime.fromisoformat(timestamp)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc)
+    return moment.strftime('%Y-%m-%dT%H:%M:%SZ')
+
 def make_errors_array(error_name, details):
     return {
         "errors": [
@@ -37,120 +64,300 @@ def get_wikipedia_article(domain, title, timestamp):
 
     { errors: [<string>, ...] }
 
+    The revision current at timestamp is resolved with a single bounded query
+    (rvstart=timestamp, rvlimit=1) that returns ids and content together.
+    Resolved revisions are kept in a local index (see get_cached_revision),
+    so repeated historical lookups need no upstream call at all.
     """
 
-    # TODO make sure domain, title and timestamp are valid,
+    # TODO make sure domain and title are valid,
     #   returning error if not
+    as_of = normalize_timestamp(timestamp)
+    if as_of is None:
+        return make_errors_array("Invalid timestamp", f"{timestamp} is not an ISO 8601 timestamp")
+    timestamp = as_of
 
-    endpoint_url = f"https://{domain}/w/api.php"
-    continue_token = None
+    cached = get_cached_revision(domain, title, timestamp)
+    if cached:
+        return cached
 
+    results = fetch_revision_at(domain, title, timestamp)
+    if not results.get("errors"):
+        cache_revision(domain, title, timestamp, results)
+
+    return results
+
+
+def query_api(domain, params):
+    """
+    runs an action=query request, returning (data, errors)
+    """
     from src import app
 
-    # Query for revisions, then stop once the target revision is found
-    while True:
-        params = {
-            "action": "query",
-            "format": "json",
-            "prop": "revisions",
-            "titles": title,
-
-            "rvlimit": "max",
-            "rvprop": "ids|timestamp",
-            "rvdir": "older"
-        }
-        if continue_token:
-            params["rvcontinue"] = continue_token
+    endpoint_url = f"https://{domain}/w/api.php"
+    params = {
+        "action": "query",
+        "format": "json",
+        "formatversion": "2",
+        **params,
+    }
+    headers = {
+        "User-Agent": wiki_user_agent
+    }
 
-        headers = {
-            "User-Agent": wiki_user_agent
-        }
+    try:
+        response = get_session().get(
+            endpoint_url,
+            headers=headers,
+            params=params,
+            timeout=wiki_api_timeout,
+        )
+        response.raise_for_status()
+
+    except requests.RequestException as e:
+        return None, make_errors_array("Wiki requests error", f"Request failed: {e}")
+
+    try:
+        data = response.json()
+
+    except Exception as e:
+        app.logger.error(f"wikiapi::query_api: JSON parse error: {e}.")
+        return None, make_errors_array("Page parsing error", f"JSON parse error: {e}")
+
+    return data, None
+
+
+def query_revisions(domain, params):
+    """
+    runs an action=query prop=revisions request, returning (pages, errors)
+    """
+    data, errors = query_api(domain, {"prop": "revisions", **params})
+    if errors:
+        return None, errors
+    return data.get("query", {}).get("pages", []), None
+
+
+def get_revision_content(revision):
+    """content of a formatversion=2 revision, None if hidden or deleted"""
+    return revision.get("slots", {}).get("main", {}).get("content")
 
-        try:
-            # response = requests.get(
-            #     endpoint_url,
-            #     headers=headers,
-            #     params=params,
-            #     timeout=6,
-            # )
-            response = requests.get(
-                endpoint_url,
-                headers=headers,
-                params=params,
-            )
-            response.raise_for_status()
-
-        except requests.RequestException as e:
-            return make_errors_array("Wiki requests error", f"Request failed: {e}")
-
-        try:
-            data = response.json()
-
-        except Exception as e:
-            app.logger.error(f"wikiapi::get_wikipedia_article: JSON parse error for revisions: {e}.")
-            return make_errors_array("Page parsing error", f"JSON parse error for revisions: {e}")
-
-        pages = data.get("query", {}).get("pages", {})
-        # TODO error if "pages" does not exist in query
-        for page_id, page_info in pages.items():
-
-            # Abort if no page info
-            if "missing" in page_info:
-                return make_errors_array("Missing page info", f"Article did not exist at the given time")
-                # NB TODO Not sure what this means exactly...
-
-            # Check each revision to find the target one
-            revisions = page_info.get("revisions", [])
-            for rev in revisions:
-                try:
-                    rev_timestamp = rev["timestamp"]
-                    if rev_timestamp <= timestamp:
-
-                        # Fetch the content of the identified revision
-                        revision_id = rev["revid"]
-                        content_params = {
-                            "action": "query",
-                            "format": "json",
-                            "prop": "revisions",
-                            "revids": revision_id,
-                            "rvprop": "content"
-                        }
-                        content_response = requests.get(
-                            endpoint_url,
-                            params=content_params,
-                            headers=headers,
-                        )
-
-                        if content_response.status_code != 200:
-                            return make_errors_array("Page fetching error",
-                                          f"Error fetching data from revision id {revision_id} ({content_response.text})")
-
-                        # NB this should not fail, as we specifically requested JSON format
-                        content_data = content_response.json()
-
-                        # Extract content from results
-                        for page_id, page_info in content_data.get("query", {}).get("pages", {}).items():
-                            content_revisions = page_info.get("revisions", [])
-                            if content_revisions:
-                                return {
-                                    "page_id": page_id,
-                                    "rev_id": revision_id,
-                                    "rev_timestamp": rev_timestamp,
-                                    "wikitext": content_revisions[0]["*"],
-                                }
-
-                        # If no content_revisions found, error
-                        return make_errors_array("Page content error", f"No content found.")
-
-                except KeyError:  # Caused by deleted revision
-                    continue
-
-        continue_token = data.get("continue", {}).get("rvcontinue")
-        if not continue_token:
+
+def fetch_revision_at(domain, title, timestamp):
+    """
+    fetches ids and content of the latest revision of title at or before timestamp
+
+    Usually a single request. Only when that revision's content is hidden (deleted revision)
+    do we list the older revisions, once, and fetch the first one with visible content.
+    """
+    pages, errors = query_revisions(domain, {
+        "titles": title,
+        "rvlimit": "1",
+        "rvdir": "older",
+        "rvstart": timestamp,
+        "rvprop": "ids|timestamp|content",
+        "rvslots": "main",
+    })
+    if errors:
+        return errors
+
+    for page_info in pages:
+
+        # Abort if no page info
+        if "missing" in page_info:
+            return make_errors_array("Missing page info", "Article did not exist at the given time")
+            # NB TODO Not sure what this means exactly...
+
+        revisions = page_info.get("revisions", [])
+        if not revisions:
             break
 
+        rev = revisions[0]
+        wikitext = get_revision_content(rev)
+        if wikitext is None:
+            # Caused by deleted revision
+            return fetch_first_visible_revision(domain, title, timestamp, page_info["pageid"])
+
+        return make_revision_results(page_info["pageid"], rev, wikitext)
+
     # Error if no suitable revision found
-    return make_errors_array("Page content error", f"No suitable revision found")
+    return make_errors_array("Page content error", "No suitable revision found")
+
+
+def fetch_first_visible_revision(domain, title, timestamp, page_id):
+    pages, errors = query_revisions(domain, {
+        "titles": title,
+        "rvlimit": "max",
+        "rvdir": "older",
+        "rvstart": timestamp,
+        "rvprop": "ids|timestamp",
+    })
+    if errors:
+        return errors
+
+    for page_info in pages:
+        for rev in page_info.get("revisions", []):
+            if rev.get("texthidden") or "timestamp" not in rev:
+                continue
+
+            content_pages, errors = query_revisions(domain, {
+                "revids": rev["revid"],
+                "rvprop": "ids|timestamp|content",
+                "rvslots": "main",
+            })
+            if errors:
+                return errors
+            for content_page in content_pages:
+                content_revisions = content_page.get("revisions", [])
+                if content_revisions and get_revision_content(content_revisions[0]) is not None:
+                    return make_revision_results(page_id, content_revisions[0], get_revision_content(content_revisions[0]))
+
+            # If no content_revisions found, error
+            return make_errors_array("Page content error", "No content found.")
+
+    return make_errors_array("Page content error", "No suitable revision found")
+
+
+def make_revision_results(page_id, rev, wikitext):
+    return {
+        "page_id": str(page_id),
+        "rev_id": rev["revid"],
+        "rev_timestamp": rev["timestamp"],
+        "wikitext": wikitext,
+    }
+
+
+def fetch_latest_revisions(domain, titles):
+    """
+    fetches ids, timestamp and content of the latest revision of many titles at once
+
+    returns {title: results} for every title asked for, results being like those of
+    get_wikipedia_article plus the "title" the page was found under, or { errors: [] }.
+
+    Titles are grouped into titles=A|B|C queries of MAX_TITLES_PER_QUERY, so a batch
+    of pages costs one request per group instead of one per page (plus continuations
+    when the content of a group is larger than the api returns at once).
+    Normalized titles are resolved by the api and followed here. Redirects are not followed,
+    as by get_wikipedia_article: a redirect comes back with its own #REDIRECT wikitext.
+    """
+    articles = {}
+    unique_titles = list(dict.fromkeys(titles))
+    for start in range(0, len(unique_titles), MAX_TITLES_PER_QUERY):
+        group = unique_titles[start:start + MAX_TITLES_PER_QUERY]
+        articles.update(fetch_latest_revision_group(domain, group))
+
+    timestamp = get_current_timestamp()
+    for title, results in articles.items():
+        if not results.get("errors"):
+            cache_revision(domain, title, timestamp, {key: value for key, value in results.items() if key != "title"})
+    return articles
+
+
+def fetch_latest_revision_group(domain, titles):
+    """fetch_latest_revisions for at most MAX_TITLES_PER_QUERY titles"""
+    params = {
+        "prop": "revisions",
+        "titles": "|".join(titles),
+        "rvprop": "ids|timestamp|content",
+        "rvslots": "main",
+    }
+    pages = {}
+    resolved = {}
+    continuation = {}
+    while True:
+        data, errors = query_api(domain, {**params, **continuation})
+        if errors:
+            return dict.fromkeys(titles, errors)
+
+        query = data.get("query", {})
+        for entry in query.get("normalized", []):
+            resolved[entry["from"]] = entry["to"]
+        for page_info in query.get("pages", []):
+            page = pages.setdefault(page_info["title"], page_info)
+            # on continuation, pages whose content did not fit come back with their revisions
+            if page_info.get("revisions") and not page.get("revisions"):
+                page["revisions"] = page_info["revisions"]
+
+        if "continue" not in data:
+            break
+        continuation = data["continue"]
+
+    articles = {}
+    for title in titles:
+        # underscores are normalized to spaces
+        page_info = pages.get(resolved.get(title, title))
+
+        if page_info is None or "missing" in page_info or "invalid" in page_info:
+            articles[title] = make_errors_array("Missing page info", f"Article {title} does not exist")
+            continue
+        revisions = page_info.get("revisions", [])
+        wikitext = get_revision_content(revisions[0]) if revisions else None
+        if wikitext is None:
+            articles[title] = make_errors_array("Page content error", "No content found.")
+            continue
+        articles[title] = {
+            **make_revision_results(page_info["pageid"], revisions[0], wikitext),
+            "title": page_info["title"],
+        }
+    return articles
+
+
+def revision_index_key(domain, title):
+    # cache keys are upper cased before hashing, but titles are case sensitive,
+    # so we use the title in (case insensitive) hex
+    return f"{domain}/{title.encode().hex()}"
+
+
+def get_cached_revision(domain, title, timestamp):
+    """
+    returns the cached results for the revision of title current at timestamp, or None
+
+    The index of a title maps each resolved revision to the interval it is known to be current in:
+    a revision with timestamp t, resolved for as_of T, is the current revision for any as_of in [t, T].
+    Any lookup inside a known interval is answered from the index, and the revision content,
+    which never changes, from the revision cache.
+    """
+    try:
+        index = get_cache(revision_index_key(domain, title), CacheType.revisions, REVISION_INDEX_VARIETY)
+        if not index:
+            return None
+        for rev_id, interval in index.items():
+            if interval["timestamp"] <= timestamp <= interval["valid_until"]:
+                return get_cached_revision_by_id(domain, rev_id)
+    except UnknownValueError:
+        # no revisions cache directory, we just don't cache
+        pass
+    return None
+
+
+def get_cached_revision_by_id(domain, rev_id):
+    """returns the cached results of get_wikipedia_article for revision rev_id, or None"""
+    try:
+        return get_cache(f"{domain}/{rev_id}", CacheType.revisions, REVISION_VARIETY)
+    except UnknownValueError:
+        return None
+
+
+def cache_revision(domain, title, timestamp, results):
+    """adds the resolved revision to the index of title and caches its content"""
+    from src import app
+
+    try:
+        rev_id = str(results["rev_id"])
+        # a revision is not known to be current beyond now, whatever as_of was asked for
+        timestamp = min(timestamp, get_current_timestamp())
+        index = get_cache(revision_index_key(domain, title), CacheType.revisions, REVISION_INDEX_VARIETY, count=False) or {}
+        interval = index.setdefault(rev_id, {
+            "timestamp": results["rev_timestamp"],
+            "valid_until": timestamp,
+        })
+        interval["valid_until"] = max(interval["valid_until"], timestamp)
+
+        if not is_cached(f"{domain}/{rev_id}", CacheType.revisions, REVISION_VARIETY, count=False):
+            set_cache(f"{domain}/{rev_id}", CacheType.revisions, REVISION_VARIETY, results)
+        set_cache(revision_index_key(domain, title), CacheType.revisions, REVISION_INDEX_VARIETY, index)
+
+    except UnknownValueError as e:
+        app.logger.debug(f"wikiapi::cache_revision: not caching revision: {e}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,205 @@
+# single_flight.py
+"""
+Cross-process single-flight coalescing of identical computations
+
+When several gunicorn workers get the same expensive request at once
+(e.g. /v2/article for a popular revision), one of them computes the result
+and the others wait for it instead of all hitting the upstream APIs.
+
+Coordination uses an exclusive flock on a lock file per key in
+<iari_cache_dir>locks/, so no external service is needed:
+* the first caller takes the lock, computes and releases the lock
+* the other callers touch a waiting marker next to the lock file and block on the lock;
+  the leader stores its result next to the lock file only if someone is waiting,
+  so uncontended computations are never written to disk
+* once a waiter gets the lock it returns the stored result if it was produced after
+  it started waiting, else (the leader failed) it computes the result itself,
+  so failures never fan out into a stampede
+* callers that wait longer than the timeout compute without coordination
+
+Results must be json serializable (no default=str: other types raise). When the result
+is shared, the leader returns the decoded result too, so all callers of a coalesced
+computation get the same value (e.g. tuples as lists).
+
+Lock files, waiting markers and stored results that are no longer in use are
+removed every CLEANUP_INTERVAL computations (see remove_old_results).
+"""
+import fcntl
+import hashlib
+import json
+import os
+import time
+from typing import IO, Any, Callable, Optional, Tuple
+
+import config
+from src.models.cache import write_atomically
+
+LOCK_SUBFOLDER = "locks/"
+# seconds between attempts to take a held lock
+POLL_INTERVAL = 0.05
+# seconds to wait for another worker before computing anyway
+DEFAULT_TIMEOUT = 120
+# stored results are only useful to callers that were waiting at the time;
+# every CLEANUP_INTERVAL computations the ones older than the timeout are removed
+CLEANUP_INTERVAL = 100
+
+__computations = 0
+
+
+def get_lock_directory() -> str:
+    directory = f"{config.iari_cache_dir}{LOCK_SUBFOLDER}"
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def get_key_hash(key: str) -> str:
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def single_flight(key: str, compute: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+    """
+    returns compute(), coalescing concurrent calls with the same key across processes
+    """
+    from src import app
+
+    if timeout is None:
+        timeout = getattr(config, "single_flight_timeout", DEFAULT_TIMEOUT)
+
+    base_path = f"{get_lock_directory()}{get_key_hash(key)}"
+    result_path = f"{base_path}.result.json"
+    waiting_path = f"{base_path}.waiting"
+    waiting_since = time.time()
+
+    locked = open_and_lock(f"{base_path}.lock", waiting_path, timeout)
+    if locked is None:
+        app.logger.warning(f"single_flight: waited {timeout}s for {key}, computing without lock")
+        return compute()
+    lock_file, contended = locked
+    with lock_file:
+        try:
+            if contended:
+                # another worker held the lock; use its result if it produced one meanwhile
+                result = read_result(result_path, waiting_since)
+                if result is not None:
+                    app.logger.info(
+                        f"single_flight: reused result for {key} after {time.time() - waiting_since:.2f}s"
+                    )
+                    return result["value"]
+
+            value = compute()
+            if os.path.exists(waiting_path):
+                # others are waiting for this result; they get it from disk
+                encoded = json.dumps({"key": key, "value": value}, ensure_ascii=False).encode("utf-8")
+                write_atomically(result_path, encoded)
+                remove_file(waiting_path)
+                value = json.loads(encoded)["value"]
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    global __computations
+    __computations += 1
+    if __computations % CLEANUP_INTERVAL == 0:
+        remove_old_results(timeout)
+    return value
+
+
+def open_and_lock(lock_path: str, waiting_path: str, timeout: float) -> Optional[Tuple[IO, bool]]:
+    """
+    opens lock_path and takes its exclusive lock; returns the locked file and
+    whether another holder had it first, or None if it could not be taken within timeout seconds.
+    the lock file may be removed by remove_old_results() meanwhile, then the new one is locked
+    """
+    deadline = time.monotonic() + timeout
+    contended = False
+    while True:
+        lock_file = open(lock_path, "a")
+        locked = acquire_lock(lock_file, deadline, waiting_path)
+        if locked is None:
+            lock_file.close()
+            return None
+        contended = contended or locked
+        try:
+            if os.fstat(lock_file.fileno()).st_ino == os.stat(lock_path).st_ino:
+                return lock_file, contended
+        except FileNotFoundError:
+            pass
+        # locked a lock file that was removed meanwhile
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        lock_file.close()
+
+
+def acquire_lock(lock_file, deadline: float, waiting_path: str) -> Optional[bool]:
+    """
+    takes the exclusive lock on lock_file; returns whether another holder had it first,
+    or None if it could not be taken before deadline (time.monotonic()).
+    a contended caller touches waiting_path, so the holder shares its result
+    """
+    contended = False
+    while True:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return contended
+        except BlockingIOError:
+            if time.monotonic() >= deadline:
+                return None
+            if not contended:
+                with open(waiting_path, "a"):
+                    pass
+            contended = True
+            time.sleep(POLL_INTERVAL)
+
+
+def read_result(result_path: str, produced_after: float) -> Optional[Any]:
+    try:
+        if os.stat(result_path).st_mtime < produced_after:
+            return None
+        with open(result_path) as file:
+            return json.load(file)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def remove_file(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def remove_old_results(max_age: float) -> int:
+    """
+    removes the stored results and waiting markers older than max_age seconds
+    and the lock files older than that which are not held, returns how many
+    """
+    removed = 0
+    cutoff = time.time() - max_age
+    with os.scandir(get_lock_directory()) as entries:
+        for entry in entries:
+            try:
+                if entry.stat().st_mtime >= cutoff:
+                    continue
+                if entry.name.endswith(".lock"):
+                    if not remove_unheld_lock(entry.path):
+                        continue
+                elif entry.name.endswith((".result.json", ".waiting")):
+                    os.unlink(entry.path)
+                else:
+                    continue
+                removed += 1
+            except FileNotFoundError:
+                pass
+    return removed
+
+
+def remove_unheld_lock(lock_path: str) -> bool:
+    """removes lock_path unless another caller holds it, see open_and_lock"""
+    with open(lock_path, "a") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        try:
+            os.unlink(lock_path)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+    return True
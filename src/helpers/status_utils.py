@@ -1,8 +1,7 @@
 # status_utils.py
-import requests
-
 from src.constants.constants import UrlStatusMethod
 from src.helpers.cache_utils import get_cache, set_cache, is_cached, CacheType
+from src.helpers.url_status_engine import UrlStatusEngine
 
 
 class StatusUtils:
@@ -82,103 +81,58 @@ class StatusUtils:
         """
         fetch status data for specified url
         """
+        return StatusUtils.get_status_data_batch([url], status_method)[url]
 
-        results = {
-            "url": "xyz.com",
-            "status_method": status_method,
-            "status_code": 0,
-            "other_stuff": "other stuff goes here, like url parts, archive status, etc"
-        }
+    @staticmethod
+    def get_status_data_batch(urls, status_method):
+        """
+        fetch status data for many urls at once, concurrently, see UrlStatusEngine
+        returns {url: status data}
+        """
 
         try:
             # TODO: these specific implementations of status codes should eventually be in their
             #     own modules, and we can select which one to use with the Strategy pattern
             #
 
-            # LIVEWEBCHECK method
-            if status_method.upper() == UrlStatusMethod.LIVEWEBCHECK.value:
-                results = StatusUtils.check_url_with_livewebcheck_api(url)
-
-
-            # we should be able to re-use the methods in identifiers_checking/url and Wikipedia/Url to
-            # get the status info for a URL
-
-            # try:
-            #     # TEST method
-            #     if status_method.upper() == UrlStatusMethod.IABOT.value:
-            #         results = ProbeTest.probe(url=url)
-            #
-            #     # VERIFYI method
-            #     elif probe_name.upper() == ProbeMethod.VERIFYI.value:
-            #         results = ProbeVerifyi.probe(url=url)
-            #
-            #     # TRUST_PROJECT method
-            #     elif probe_name.upper() == ProbeMethod.TRUST_PROJECT.value:
-            #         results = ProbeTrustProject.probe(url=url)
-            #
+            # LIVEWEBCHECK and IABOT methods
+            if status_method.upper() in [
+                UrlStatusMethod.LIVEWEBCHECK.value,
+                UrlStatusMethod.IABOT.value,
+            ]:
+                engine_results = UrlStatusEngine.get().check_urls(
+                    urls, status_method, archive_status=False
+                )
+                results = {}
+                for url in urls:
+                    engine_result = engine_results[url]
+                    if "error" in engine_result:
+                        results[url] = {
+                            "errors": [
+                                f"Error checking status with method {status_method} "
+                                f"({engine_result['error']['message']})."
+                            ]
+                        }
+                    else:
+                        results[url] = {
+                            "status_code": engine_result["status_code"],
+                            "status_code_error_details": engine_result["status_code_error_details"],
+                        }
+                return results
 
             # status method not supported
             else:
-                results = {
+                error = {
                     "errors": [
                         f"Unknown status method: {status_method}"
                     ]
                 }
 
         except Exception as e:
-            results = {
+            error = {
                 "errors": [
                     f"Error checking status with method {status_method} ({str(e)})."
                 ]
             }
 
-        return results
-
-
-    @staticmethod
-    def check_url_with_livewebcheck_api(url: str):
-        """
-        TODO: these specific implementations of status codes should eventually be in their
-            own modules, and we can select which one to use with the Strategy pattern
-
-        This use wayback machine's Live Web Checker
-        response looks like:
-        {
-            "ctype": "text/html; charset=utf-8",
-            "location": "https://mojomonger.com/",
-            "status": 200,
-            (optional) "status_ext" : "<error reason>  if error
-            (optional) "message" : "<human readable error message>  if error
-        }
-        """
-
-        endpoint = "https://iabot-api.archive.org/livewebcheck"
-        modified_url = url.replace("&", "%26")  # TODO do appropriate encode
-        headers = {}
-        params = {
-            "impersonate": 1,
-            "skip-adblocker": 1,
-            "url": modified_url,
-        }
-
-        response = requests.get(
-            endpoint,
-            headers=headers,
-            params=params,
-        )
-
-        results = {}
-
-        # get the status code
-        if response.status_code == 200:
-            data = response.json()
-            if "status" in data:
-                results.update({
-                    "status_code", data["status"]
-                })
-            if "status_ext" in data:
-                results.update({
-                    "status_code_error_details", data["status_ext"]
-                })
-
-        return results
\ No newline at end of file
+        return {url: error for url in urls}
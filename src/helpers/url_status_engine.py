@@ -0,0 +1,384 @@
+# url_status_engine.py
+"""
+Asynchronous url status engine for the IABOT and LIVEWEBCHECK check methods
+
+Checks many urls concurrently over one pooled aiohttp session:
+* IABOT: testdeadlink, CHUNK_SIZE urls per call
+* LIVEWEBCHECK: one livewebcheck call per url
+* archive status: one IABot searchurldata call per url, in parallel with the status calls
+
+Every call passes the budgets (max concurrency and max queries per second) of
+the upstream it goes to and, for livewebcheck (which fetches the url itself),
+of the host of the checked url. Failed calls, 429 and 5xx responses are retried
+with exponential backoff.
+
+The engine runs an event loop in a background thread of each process, so the
+session and the budgets are shared by all requests a gunicorn worker handles.
+Flask views use the blocking batch API, see check_urls().
+"""
+import asyncio
+import logging
+import os
+import random
+import threading
+import urllib.parse
+from contextlib import AsyncExitStack
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+
+import config
+from src.constants.constants import UrlStatusMethod
+from src.helpers.metrics import aiohttp_trace_config
+
+logger = logging.getLogger(__name__)
+
+TESTDEADLINK_URL = "https://iabot-api.archive.org/testdeadlink.php"
+LIVEWEBCHECK_URL = "https://iabot-api.archive.org/livewebcheck"
+SEARCHURLDATA_URL = "https://iabot.wmcloud.org/api.php?wiki=enwiki"
+
+ARCHIVE_STATUS_METHOD = "iabot_searchurldata"
+
+# urls per testdeadlink call
+CHUNK_SIZE = 100
+
+# budgets per upstream, and per checked host ("host") for livewebcheck;
+# override in config.py with url_check_budgets
+DEFAULT_BUDGETS: Dict[str, Dict[str, float]] = {
+    "testdeadlink": {"concurrency": 4, "qps": 10},
+    "livewebcheck": {"concurrency": 16, "qps": 20},
+    "searchurldata": {"concurrency": 8, "qps": 20},
+    "host": {"concurrency": 2, "qps": 4},
+}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# rate limiters kept before the idle ones are dropped; there is one per checked host
+MAX_LIMITERS = 1000
+
+
+class UpstreamError(Exception):
+    """an upstream call failed after all retries"""
+
+    def __init__(self, message: str, status_code: int = 0):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class RateLimiter:
+    """at most concurrency calls at a time, started at most qps per second"""
+
+    def __init__(self, concurrency: float, qps: float):
+        self.semaphore = asyncio.Semaphore(int(concurrency))
+        self.interval = 1 / qps if qps else 0
+        self.next_start = 0.0
+        self.lock = asyncio.Lock()
+        # calls in or waiting for the limiter
+        self.users = 0
+
+    async def __aenter__(self):
+        self.users += 1
+        acquired = False
+        try:
+            await self.semaphore.acquire()
+            acquired = True
+            if self.interval:
+                async with self.lock:
+                    loop = asyncio.get_running_loop()
+                    now = loop.time()
+                    wait = self.next_start - now
+                    self.next_start = max(now, self.next_start) + self.interval
+                if wait > 0:
+                    await asyncio.sleep(wait)
+        except BaseException:
+            # cancelled (timeout)
+            if acquired:
+                self.semaphore.release()
+            self.users -= 1
+            raise
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.semaphore.release()
+        self.users -= 1
+
+    def idle(self, now: float) -> bool:
+        """whether dropping the limiter changes nothing: no calls in or waiting for it, and none to delay"""
+        return self.users == 0 and self.next_start <= now
+
+
+class UrlStatusEngine:
+    """
+    See the module docstring. Use UrlStatusEngine.get() for the engine of this process.
+    """
+
+    __instance: Optional["UrlStatusEngine"] = None
+    __instance_pid: Optional[int] = None
+    __instance_lock = threading.Lock()
+
+    def __init__(
+        self,
+        budgets: Optional[Dict[str, Dict[str, float]]] = None,
+        upstream_timeout: float = 30,
+        retries: int = 2,
+        backoff: float = 0.5,
+    ):
+        self.budgets = {**DEFAULT_BUDGETS, **(budgets or {})}
+        self.upstream_timeout = upstream_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.limiters: Dict[str, RateLimiter] = {}
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="url-status-engine", daemon=True)
+        self.thread.start()
+
+    @classmethod
+    def get(cls) -> "UrlStatusEngine":
+        """returns the engine of this process, created anew after a fork"""
+        pid = os.getpid()
+        if cls.__instance is None or cls.__instance_pid != pid:
+            with cls.__instance_lock:
+                if cls.__instance is None or cls.__instance_pid != pid:
+                    cls.__instance = UrlStatusEngine(budgets=getattr(config, "url_check_budgets", None))
+                    cls.__instance_pid = pid
+        return cls.__instance
+
+    def close(self) -> None:
+        """closes the session and stops the event loop thread"""
+
+        async def close_session():
+            if self.session is not None:
+                await self.session.close()
+
+        asyncio.run_coroutine_threadsafe(close_session(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+    def check_urls(
+        self,
+        urls: List[str],
+        method: str,
+        timeout: float = 0,
+        archive_status: bool = True,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        blocking batch API: checks urls with method (and their archive status)
+        and returns a result per url, see acheck_urls()
+        """
+        future = asyncio.run_coroutine_threadsafe(
+            self.acheck_urls(urls, method, timeout=timeout, archive_status=archive_status), self.loop
+        )
+        return future.result()
+
+    async def acheck_urls(
+        self,
+        urls: List[str],
+        method: str,
+        timeout: float = 0,
+        archive_status: bool = True,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        returns {url: result} where result is like
+        {
+            "status_code": 200,
+            "status_code_method": "IABOT",
+            "status_code_error_details": "",
+            "archive_status_method": "iabot_searchurldata",  # if archive_status
+            "archive_status": {...},  # if archive_status, None if not available
+            "error": {"message": "...", "status_code": 503},  # only if an upstream call failed
+        }
+        timeout is the per call timeout in seconds for livewebcheck (0: the engine default)
+        """
+        urls = list(dict.fromkeys(urls))
+        results = {
+            url: {"status_code": 0, "status_code_method": method, "status_code_error_details": ""}
+            for url in urls
+        }
+        jobs = [self.__check_statuses__(urls, method, timeout, results)]
+        if archive_status:
+            jobs.extend(self.__check_archive_status__(url, results[url]) for url in urls)
+        await asyncio.gather(*jobs)
+        return results
+
+    async def __check_statuses__(self, urls: List[str], method: str, timeout: float, results):
+        if method.upper() == UrlStatusMethod.IABOT.value:
+            chunks = [urls[i : i + CHUNK_SIZE] for i in range(0, len(urls), CHUNK_SIZE)]
+            await asyncio.gather(*(self.__check_with_testdeadlink__(chunk, results) for chunk in chunks))
+        elif method.upper() == UrlStatusMethod.LIVEWEBCHECK.value:
+            await asyncio.gather(*(self.__check_with_livewebcheck__(url, timeout, results[url]) for url in urls))
+        elif method.upper() == UrlStatusMethod.CORENTIN.value:
+            for url in urls:
+                results[url]["status_code_error_details"] = "CORENTIN method not implemented in IARI"
+        else:
+            logger.info(f"Unrecognized url check method: {method}")
+            for url in urls:
+                results[url]["status_code_error_details"] = f"Unrecognized url check method: {method}"
+
+    async def __check_with_testdeadlink__(self, urls: List[str], results):
+        """
+        example testdeadlink response:
+        {
+            "results": {
+                "http://www.ethnologue.com/language/rap": 200,
+                "https://orb.binghamton.edu/cgi/viewcontent.cgi?article=1041": 400,
+                "errors": {
+                    "https://orb.binghamton.edu/cgi/viewcontent.cgi?article=1041": "RESPONSE CODE: 400",
+                }
+            },
+            "servetime": 1.5802
+        }
+        """
+        testdeadlink_api_key = os.getenv("TESTDEADLINK_KEY", "")
+        if not testdeadlink_api_key:
+            logger.warning("Missing TESTDEADLINK environment variable, skipping IABot check")
+            return
+
+        # url_encode urls parameter - params cannot have any url-specific characters like "&", etc.
+        data = (
+            f"urls={urllib.parse.quote(chr(10).join(urls))}"
+            f"&authcode={testdeadlink_api_key}&returncodes=1"
+        )
+        try:
+            _, response = await self.request(
+                ["testdeadlink"],
+                "POST",
+                TESTDEADLINK_URL,
+                name="testdeadlink",
+                headers={"Content-Type": "application/x-www-form-urlencoded"},
+                data=data,
+            )
+        except UpstreamError as e:
+            for url in urls:
+                results[url]["error"] = {"message": str(e), "status_code": e.status_code}
+            return
+
+        iabot_results = (response or {}).get("results", {})
+        errors = iabot_results.get("errors", {})
+        for url in urls:
+            if url in iabot_results:
+                results[url]["status_code"] = iabot_results[url]
+            if url in errors:
+                results[url]["status_code_error_details"] = errors[url]
+
+    async def __check_with_livewebcheck__(self, url: str, timeout: float, result):
+        """
+        This uses wayback machine's Live Web Checker
+        response looks like:
+        {
+            "ctype": "text/html; charset=utf-8",
+            "location": "https://mojomonger.com/",
+            "status": 200,
+            (optional) "status_ext" : "<error reason>  if error
+            (optional) "message" : "<human readable error message>  if error
+        }
+        """
+        host = urllib.parse.urlsplit(url).netloc.lower()
+        params = {
+            "impersonate": 1,
+            "skip-adblocker": 1,
+            "url": url.replace("&", "%26"),  # TODO do appropriate encode
+        }
+        try:
+            _, data = await self.request(
+                [f"host:{host}", "livewebcheck"],
+                "GET",
+                LIVEWEBCHECK_URL,
+                name="livewebcheck",
+                params=params,
+                timeout=timeout,
+            )
+        except UpstreamError as e:
+            result["error"] = {"message": str(e), "status_code": e.status_code}
+            return
+        if data:
+            if "status" in data:
+                result["status_code"] = data["status"]
+            if "status_ext" in data:
+                result["status_code_error_details"] = data["status_ext"]
+
+    async def __check_archive_status__(self, url: str, result):
+        """archive information from IABot's searchurldata"""
+        result["archive_status_method"] = ARCHIVE_STATUS_METHOD
+        result["archive_status"] = None
+        try:
+            _, data = await self.request(
+                ["searchurldata"],
+                "POST",
+                SEARCHURLDATA_URL,
+                name="searchurldata",
+                headers={
+                    "Content-Type": "application/x-www-form-urlencoded",
+                    "User-Agent": "http://en.wikipedia.org/wiki/User:GreenC via iabget.awk",
+                },
+                data=f"&action=searchurldata&urls={urllib.parse.quote(url)}",
+            )
+        except UpstreamError as e:
+            logger.warning(f"archive status of {url} not available: {e}")
+            return
+        # TODO handle return data or errors
+        result["archive_status"] = data
+
+    def __limiter__(self, key: str) -> RateLimiter:
+        if key not in self.limiters:
+            if len(self.limiters) >= MAX_LIMITERS:
+                self.__drop_idle_limiters__()
+            budget = self.budgets.get(key.split(":")[0], self.budgets["host"])
+            self.limiters[key] = RateLimiter(budget["concurrency"], budget["qps"])
+        return self.limiters[key]
+
+    def __drop_idle_limiters__(self) -> None:
+        """drops the limiters of hosts not being checked, which would otherwise be kept for good"""
+        now = self.loop.time()
+        for key in [key for key, limiter in self.limiters.items() if limiter.idle(now)]:
+            del self.limiters[key]
+
+    async def __session__(self) -> aiohttp.ClientSession:
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=100, limit_per_host=32, ttl_dns_cache=300),
+                headers={"User-Agent": config.user_agent},
+                trace_configs=[aiohttp_trace_config()],
+            )
+        return self.session
+
+    async def request(
+        self,
+        budget_keys: List[str],
+        http_method: str,
+        url: str,
+        name: str = "",
+        timeout: float = 0,
+        **kwargs,
+    ) -> Tuple[int, Any]:
+        """
+        one upstream call within the given budgets, retried with backoff.
+        returns (status code, json data) of a 200 response, raises UpstreamError otherwise
+
+        The budgets are entered in the order of budget_keys, so give the narrowest first:
+        a call waiting for the budget of its host must not hold a slot of the upstream,
+        or the urls of one host would keep those of all others waiting.
+        """
+        name = name or url
+        session = await self.__session__()
+        client_timeout = aiohttp.ClientTimeout(total=timeout or self.upstream_timeout)
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            try:
+                async with AsyncExitStack() as stack:
+                    for key in budget_keys:
+                        await stack.enter_async_context(self.__limiter__(key))
+                    async with session.request(http_method, url, timeout=client_timeout, **kwargs) as response:
+                        if response.status == 200:
+                            return response.status, await response.json(content_type=None)
+                        error = UpstreamError(
+                            f"Non 200 status code from {name} call ({response.status})", response.status
+                        )
+                        if response.status not in RETRY_STATUSES or last_attempt:
+                            raise error
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                if last_attempt:
+                    raise UpstreamError(f"{name} call failed ({type(e).__name__})") from e
+            # jittered exponential backoff
+            await asyncio.sleep(self.backoff * 2**attempt * random.uniform(1, 1.5))
+        raise UpstreamError(f"{name} call failed")  # not reached
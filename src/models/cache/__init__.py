@@ -0,0 +1,198 @@
+"""
+Pluggable storage for cached json payloads (FileIo subclasses and cache_utils)
+
+Payloads are addressed by (namespace, key):
+* namespace is the cache subdirectory, e.g. "articlesV2" (FileIo.subfolder) or "status" (CacheType)
+* key is what used to be the file name without ".json", e.g. an iari_id or "IABOT-<hash>"
+
+The backend is selected with config.cache_backend, see config_sample.py and get_cache_backend()
+"""
+import logging
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend:
+    """
+    Contract shared by all cache backends
+
+    derived classes implement get, set, exists, delete, iter_entries and restore,
+    and those with ttl_seconds and max_bytes evict and disk_usage
+    """
+
+    name: str = ""
+
+    # writes to a namespace with a max_bytes budget between evictions, see count_writes()
+    EVICTION_INTERVAL = 1000
+
+    def __init__(self, root: str):
+        self.root = root
+        self.max_bytes: Dict[str, int] = {}
+        self.__writes: Dict[str, int] = {}
+        self.__lock = threading.Lock()
+        # the namespaces being evicted, and the last eviction thread started
+        self.__evicting: Set[str] = set()
+        self.eviction_thread: Optional[threading.Thread] = None
+
+    def namespace_path(self, namespace: str) -> str:
+        return os.path.join(self.root, namespace)
+
+    def namespace_exists(self, namespace: str) -> bool:
+        return os.path.isdir(self.namespace_path(namespace))
+
+    def namespaces(self) -> List[str]:
+        """the namespaces holding entries, e.g. ["articlesV2", "urls", "urls/archives"]"""
+        raise NotImplementedError()
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """returns the payload or None if not cached (or expired)"""
+        raise NotImplementedError()
+
+    def get_encoded(self, namespace: str, key: str) -> Optional[Tuple[bytes, Optional[str]]]:
+        """
+        returns (json, content_encoding) of the payload as stored, without parsing it,
+        or None if not cached. content_encoding is "gzip" for gzipped json, else None.
+        backends that can not do better encode the result of get()
+        """
+        from src.helpers.json_encoding import dumps
+
+        payload = self.get(namespace, key)
+        return (dumps(payload), None) if payload is not None else None
+
+    def set(self, namespace: str, key: str, payload: Any) -> None:
+        raise NotImplementedError()
+
+    def exists(self, namespace: str, key: str) -> bool:
+        raise NotImplementedError()
+
+    def delete(self, namespace: str, key: str) -> None:
+        raise NotImplementedError()
+
+    def iter_items(self, namespace: str) -> Iterator[Tuple[str, Any]]:
+        """yields (key, payload) of every entry in namespace"""
+        for key, payload, _ in self.iter_entries(namespace):
+            yield key, payload
+
+    def iter_entries(self, namespace: str) -> Iterator[Tuple[str, Any, float]]:
+        """yields (key, payload, fetched_at) of every entry in namespace"""
+        raise NotImplementedError()
+
+    def restore(self, namespace: str, key: str, payload: Any, fetched_at: float) -> None:
+        """set() keeping the original fetch time, for migrations and imports"""
+        raise NotImplementedError()
+
+    def restore_many(self, namespace: str, entries: Iterable[Tuple[str, Any, float]]) -> None:
+        """restore() of (key, payload, fetched_at) entries"""
+        for key, payload, fetched_at in entries:
+            self.restore(namespace, key, payload, fetched_at)
+
+    def evict(self, namespace: str) -> int:
+        """
+        removes the expired entries of namespace and, if it is over its max_bytes budget,
+        the oldest ones until it is under 90% of it. returns the number of removed entries
+        """
+        raise NotImplementedError()
+
+    def disk_usage(self, namespace: str) -> int:
+        """bytes taken by the entries of namespace"""
+        raise NotImplementedError()
+
+    def count_writes(self, namespace: str, count: int = 1) -> None:
+        """
+        called by set() and restore_many(): every EVICTION_INTERVAL writes to a namespace
+        with a max_bytes budget evict() runs on a background thread, at most one per namespace,
+        as it walks the namespace, which the writing request should not wait for
+        """
+        if namespace not in self.max_bytes:
+            return
+        with self.__lock:
+            before = self.__writes.get(namespace, 0)
+            self.__writes[namespace] = before + count
+            due = before // self.EVICTION_INTERVAL != (before + count) // self.EVICTION_INTERVAL
+            due = due and namespace not in self.__evicting
+            if due:
+                self.__evicting.add(namespace)
+        if due:
+            self.eviction_thread = threading.Thread(
+                target=self.__evict_in_background__, args=(namespace,), name="cache-eviction", daemon=True
+            )
+            self.eviction_thread.start()
+
+    def __evict_in_background__(self, namespace: str) -> None:
+        try:
+            self.evict(namespace)
+        except Exception:
+            logger.exception(f"eviction of cache namespace {namespace} failed")
+        finally:
+            with self.__lock:
+                self.__evicting.discard(namespace)
+
+
+def is_shard_directory(name: str) -> bool:
+    """shard directories are named by two hex digits, see ShardedCacheBackend"""
+    return len(name) == 2 and all(c in "0123456789abcdef" for c in name)
+
+
+def write_atomically(path: str, data: bytes) -> None:
+    """
+    writes data to a temporary file next to path and renames it into place,
+    so concurrent readers (other gunicorn workers) never see a partial file
+    and concurrent writers never fail on an existing file
+    """
+    directory = os.path.dirname(path)
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(file_descriptor, "wb") as file:
+            file.write(data)
+        os.replace(temporary_path, path)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.unlink(temporary_path)
+        raise
+
+
+__backends: Dict[Tuple[str, str], CacheBackend] = {}
+
+
+def get_cache_backend(root: Optional[str] = None) -> CacheBackend:
+    """
+    returns the configured backend for root (default config.iari_cache_dir)
+
+    config.cache_backend:
+    * "flat" (default): one pretty printed json file per entry, json/<namespace>/<key>.json
+    * "sharded": compressed json in hashed subdirectories, with TTLs and size based eviction
+    * "sqlite": one SQLite database (WAL) with secondary indexes, see SqliteCacheBackend.find()
+    """
+    from src.models.cache.flat_cache_backend import FlatCacheBackend
+    from src.models.cache.sharded_cache_backend import ShardedCacheBackend
+    from src.models.cache.sqlite_cache_backend import SqliteCacheBackend
+
+    root = root if root is not None else config.iari_cache_dir
+    name = getattr(config, "cache_backend", FlatCacheBackend.name)
+
+    if (name, root) not in __backends:
+        if name == FlatCacheBackend.name:
+            __backends[(name, root)] = FlatCacheBackend(root)
+        elif name == ShardedCacheBackend.name:
+            __backends[(name, root)] = ShardedCacheBackend(
+                root,
+                compression=getattr(config, "cache_compression", "gzip"),
+                ttl_seconds=getattr(config, "cache_ttl_seconds", {}),
+                max_bytes=getattr(config, "cache_max_bytes", {}),
+            )
+        elif name == SqliteCacheBackend.name:
+            __backends[(name, root)] = SqliteCacheBackend(
+                root,
+                path=getattr(config, "cache_sqlite_path", ""),
+                ttl_seconds=getattr(config, "cache_ttl_seconds", {}),
+                max_bytes=getattr(config, "cache_max_bytes", {}),
+            )
+        else:
+            raise ValueError(f"Unknown cache backend \"{name}\" in config.cache_backend")
+    return __backends[(name, root)]
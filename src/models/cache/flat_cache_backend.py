@@ -0,0 +1,76 @@
+import json
+import os
+from typing import Any, Iterator, List, Optional, Tuple
+
+from src.models.cache import CacheBackend, is_shard_directory, write_atomically
+
+
+class FlatCacheBackend(CacheBackend):
+    """
+    The original layout: one pretty printed json file per entry
+
+        <root><namespace>/<key>.json
+
+    Writes are atomic (temp file + rename); entries never expire.
+    """
+
+    name = "flat"
+
+    def path(self, namespace: str, key: str) -> str:
+        return os.path.join(self.root, namespace, f"{key}.json")
+
+    def namespaces(self) -> List[str]:
+        namespaces = []
+        for directory, subdirectories, filenames in os.walk(self.root):
+            # skip the shard directories of entries migrated to ShardedCacheBackend
+            subdirectories[:] = [d for d in subdirectories if not is_shard_directory(d)]
+            if any(filename.endswith(".json") for filename in filenames):
+                namespace = os.path.relpath(directory, self.root)
+                if namespace != ".":
+                    namespaces.append(namespace)
+        return sorted(namespaces)
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        try:
+            with open(file=self.path(namespace, key)) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+    def get_encoded(self, namespace: str, key: str) -> Optional[Tuple[bytes, Optional[str]]]:
+        try:
+            with open(file=self.path(namespace, key), mode="rb") as file:
+                return file.read(), None
+        except FileNotFoundError:
+            return None
+
+    def set(self, namespace: str, key: str, payload: Any) -> None:
+        # https://stackoverflow.com/questions/12309269/how-do-i-write-json-data-to-a-file
+        data = json.dumps(payload, ensure_ascii=False, indent=4).encode("utf-8")
+        write_atomically(self.path(namespace, key), data)
+
+    def exists(self, namespace: str, key: str) -> bool:
+        return os.path.exists(self.path(namespace, key))
+
+    def delete(self, namespace: str, key: str) -> None:
+        try:
+            os.unlink(self.path(namespace, key))
+        except FileNotFoundError:
+            pass
+
+    def iter_entries(self, namespace: str) -> Iterator[Tuple[str, Any, float]]:
+        with os.scandir(self.namespace_path(namespace)) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith(".json"):
+                    key = entry.name[: -len(".json")]
+                    try:
+                        fetched_at = entry.stat().st_mtime
+                    except FileNotFoundError:
+                        continue
+                    payload = self.get(namespace, key)
+                    if payload is not None:
+                        yield key, payload, fetched_at
+
+    def restore(self, namespace: str, key: str, payload: Any, fetched_at: float) -> None:
+        self.set(namespace, key, payload)
+        os.utime(self.path(namespace, key), (fetched_at, fetched_at))
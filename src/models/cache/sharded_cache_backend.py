@@ -0,0 +1,273 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+from src.models.cache import CacheBackend, is_shard_directory, write_atomically
+
+try:
+    import zstandard  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+# file extension of each supported compression
+EXTENSIONS = {"zstd": ".json.zst", "gzip": ".json.gz", "none": ".json"}
+
+
+class ShardedCacheBackend(CacheBackend):
+    """
+    Compact, compressed json spread over hashed subdirectories
+
+        <root><namespace>/<h[0:2]>/<h[2:4]>/<key>.json.zst|.json.gz|.json
+
+    where h is the md5 of the key. With 65536 leaf directories a million entries
+    gives ~15 files per directory instead of a million in one.
+
+    * writes go to a temporary file in the leaf directory which is then renamed into place,
+      so the gunicorn workers never see or produce partial files
+    * payloads are dumped without whitespace and compressed with zstd (if the zstandard
+      package is installed, else gzip); reads accept any of the codecs so the compression
+      can be changed without invalidating the cache
+    * ttl_seconds maps namespace -> max age; older entries are misses and get removed
+    * max_bytes maps namespace -> disk budget; every EVICTION_INTERVAL writes to a namespace
+      a background thread removes the oldest entries until it is back under 90% of the budget,
+      see CacheBackend.count_writes()
+    """
+
+    name = "sharded"
+
+    EVICTION_TARGET_RATIO = 0.9
+
+    def __init__(
+        self,
+        root: str,
+        compression: str = "gzip",
+        ttl_seconds: Optional[Dict[str, int]] = None,
+        max_bytes: Optional[Dict[str, int]] = None,
+        compression_level: int = 3,
+    ):
+        super().__init__(root)
+        if compression not in EXTENSIONS:
+            raise ValueError(f"Unsupported cache compression \"{compression}\"")
+        if compression == "zstd" and zstandard is None:
+            logger.warning("zstandard is not installed, falling back to gzip")
+            compression = "gzip"
+        self.compression = compression
+        self.compression_level = compression_level
+        self.ttl_seconds = ttl_seconds or {}
+        self.max_bytes = max_bytes or {}
+        # zstd (de)compressors are reusable but not thread safe
+        self.__local = threading.local()
+
+    @staticmethod
+    def shard(key: str) -> Tuple[str, str]:
+        digest = hashlib.md5(key.encode()).hexdigest()
+        return digest[0:2], digest[2:4]
+
+    def path(self, namespace: str, key: str, compression: Optional[str] = None) -> str:
+        first, second = self.shard(key)
+        extension = EXTENSIONS[compression or self.compression]
+        return os.path.join(
+            self.root, namespace, first, second, f"{quote(key, safe='')}{extension}"
+        )
+
+    def __candidate_paths__(self, namespace: str, key: str) -> List[str]:
+        """the configured codec first, then the others"""
+        codecs = [self.compression] + [c for c in EXTENSIONS if c != self.compression]
+        return [self.path(namespace, key, codec) for codec in codecs]
+
+    def encode(self, payload: Any) -> bytes:
+        data = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        if self.compression == "zstd":
+            if not hasattr(self.__local, "compressor"):
+                self.__local.compressor = zstandard.ZstdCompressor(level=self.compression_level)
+            compressed: bytes = self.__local.compressor.compress(data)
+            return compressed
+        if self.compression == "gzip":
+            # mtime=0 makes the output deterministic
+            return gzip.compress(data, compresslevel=self.compression_level, mtime=0)
+        return data
+
+    def decode(self, path: str, data: bytes) -> Any:
+        if path.endswith(EXTENSIONS["zstd"]):
+            if zstandard is None:
+                raise ValueError(f"{path} is zstd compressed but zstandard is not installed")
+            if not hasattr(self.__local, "decompressor"):
+                self.__local.decompressor = zstandard.ZstdDecompressor()
+            data = self.__local.decompressor.decompress(data)
+        elif path.endswith(EXTENSIONS["gzip"]):
+            data = gzip.decompress(data)
+        return json.loads(data)
+
+    def __is_expired__(self, namespace: str, mtime: float) -> bool:
+        ttl = self.ttl_seconds.get(namespace, 0)
+        return bool(ttl) and time.time() - mtime > ttl
+
+    def namespaces(self) -> List[str]:
+        namespaces = []
+        for directory, subdirectories, _ in os.walk(self.root):
+            if any(is_shard_directory(d) for d in subdirectories):
+                namespaces.append(os.path.relpath(directory, self.root))
+            subdirectories[:] = [d for d in subdirectories if not is_shard_directory(d)]
+        return sorted(namespaces)
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        for path in self.__candidate_paths__(namespace, key):
+            try:
+                with open(path, "rb") as file:
+                    if self.__is_expired__(namespace, os.fstat(file.fileno()).st_mtime):
+                        file.close()
+                        self.__unlink__(path)
+                        return None
+                    return self.decode(path, file.read())
+            except FileNotFoundError:
+                continue
+        return None
+
+    def get_encoded(self, namespace: str, key: str) -> Optional[Tuple[bytes, Optional[str]]]:
+        """gzipped entries are returned compressed, zstd ones decompressed"""
+        for path in self.__candidate_paths__(namespace, key):
+            try:
+                with open(path, "rb") as file:
+                    if self.__is_expired__(namespace, os.fstat(file.fileno()).st_mtime):
+                        file.close()
+                        self.__unlink__(path)
+                        return None
+                    data = file.read()
+            except FileNotFoundError:
+                continue
+            if path.endswith(EXTENSIONS["gzip"]):
+                return data, "gzip"
+            if path.endswith(EXTENSIONS["zstd"]):
+                if zstandard is None:
+                    raise ValueError(f"{path} is zstd compressed but zstandard is not installed")
+                if not hasattr(self.__local, "decompressor"):
+                    self.__local.decompressor = zstandard.ZstdDecompressor()
+                return self.__local.decompressor.decompress(data), None
+            return data, None
+        return None
+
+    def set(self, namespace: str, key: str, payload: Any) -> None:
+        # copies written with another codec are shadowed, as get() tries the configured one first
+        path = self.path(namespace, key)
+        data = self.encode(payload)
+        try:
+            write_atomically(path, data)
+        except FileNotFoundError:
+            # first entry in this shard
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_atomically(path, data)
+        self.count_writes(namespace)
+
+    def exists(self, namespace: str, key: str) -> bool:
+        for path in self.__candidate_paths__(namespace, key):
+            try:
+                mtime = os.stat(path).st_mtime
+            except FileNotFoundError:
+                continue
+            return not self.__is_expired__(namespace, mtime)
+        return False
+
+    def delete(self, namespace: str, key: str) -> None:
+        for path in self.__candidate_paths__(namespace, key):
+            self.__unlink__(path)
+
+    @staticmethod
+    def __unlink__(path: str) -> None:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            # another worker got there first
+            pass
+
+    def __iter_files__(self, namespace: str) -> Iterator[Tuple[str, str, os.stat_result]]:
+        """
+        yields (key, path, stat) of every entry in namespace.
+        only the two levels of shard directories are walked,
+        so nested namespaces like "urls/archives" are not part of "urls"
+        """
+        namespace_path = self.namespace_path(namespace)
+        if not os.path.isdir(namespace_path):
+            return
+        for first in sorted(os.listdir(namespace_path)):
+            first_path = os.path.join(namespace_path, first)
+            if not is_shard_directory(first) or not os.path.isdir(first_path):
+                continue
+            for second in sorted(os.listdir(first_path)):
+                second_path = os.path.join(first_path, second)
+                if not is_shard_directory(second) or not os.path.isdir(second_path):
+                    continue
+                with os.scandir(second_path) as entries:
+                    for entry in entries:
+                        if entry.name.startswith(".tmp-"):
+                            continue
+                        for extension in EXTENSIONS.values():
+                            if entry.name.endswith(extension):
+                                key = unquote(entry.name[: -len(extension)])
+                                try:
+                                    yield key, entry.path, entry.stat()
+                                except FileNotFoundError:
+                                    pass
+                                break
+
+    def iter_entries(self, namespace: str) -> Iterator[Tuple[str, Any, float]]:
+        for key, path, stat in self.__iter_files__(namespace):
+            if self.__is_expired__(namespace, stat.st_mtime):
+                continue
+            try:
+                with open(path, "rb") as file:
+                    yield key, self.decode(path, file.read()), stat.st_mtime
+            except FileNotFoundError:
+                continue
+
+    def restore(self, namespace: str, key: str, payload: Any, fetched_at: float) -> None:
+        self.set(namespace, key, payload)
+        os.utime(self.path(namespace, key), (fetched_at, fetched_at))
+
+    def disk_usage(self, namespace: str) -> int:
+        """bytes allocated on disk by the entries of namespace"""
+        return sum(self.__allocated__(stat) for _, _, stat in self.__iter_files__(namespace))
+
+    @staticmethod
+    def __allocated__(stat: os.stat_result) -> int:
+        blocks = getattr(stat, "st_blocks", None)
+        return blocks * 512 if blocks is not None else stat.st_size
+
+    def evict(self, namespace: str) -> int:
+        """
+        removes expired entries and, if namespace is over its max_bytes budget,
+        the least recently written entries until it is under 90% of it.
+        returns the number of removed entries
+        """
+        removed = 0
+        files = []
+        total = 0
+        for _, path, stat in self.__iter_files__(namespace):
+            if self.__is_expired__(namespace, stat.st_mtime):
+                self.__unlink__(path)
+                removed += 1
+                continue
+            size = self.__allocated__(stat)
+            files.append((stat.st_mtime, size, path))
+            total += size
+
+        max_bytes = self.max_bytes.get(namespace, 0)
+        if max_bytes and total > max_bytes:
+            target = max_bytes * self.EVICTION_TARGET_RATIO
+            files.sort()
+            for _, size, path in files:
+                if total <= target:
+                    break
+                self.__unlink__(path)
+                total -= size
+                removed += 1
+        if removed:
+            logger.info(f"evicted {removed} entries from cache namespace {namespace}")
+        return removed
@@ -0,0 +1,280 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, cast
+
+from src.models.cache import CacheBackend
+
+logger = logging.getLogger(__name__)
+
+# iari_id of articles: <lang>.<domain>.<page_id>.<revision>, e.g. en.wikipedia.org.12345.67890
+IARI_ID_PATTERN = re.compile(r"^(?P<iari_id>[a-z-]+\.[a-z.]+\.(?P<page_id>\d+)\.(?P<revision>\d+))$")
+# keys of url results: [<VARIETY or method>-]<url hash>, e.g. IABOT-0123456789abcdef (cache_utils)
+# or IABOT-01234567 (CheckUrlFileIoV2)
+URL_HASH_PATTERN = re.compile(r"^(?:[A-Za-z0-9_]+-)?(?P<url_hash>[0-9a-f]{8,64})$")
+# namespaces keyed by url hash
+URL_NAMESPACES = ["status", "probes", "urls", "urls/archives", "xhtmls"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    fetched_at REAL NOT NULL,
+    iari_id TEXT,
+    page_id INTEGER,
+    revision INTEGER,
+    url_hash TEXT,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_entries_iari_id ON cache_entries (iari_id) WHERE iari_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS cache_entries_page_id ON cache_entries (page_id, revision) WHERE page_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS cache_entries_revision ON cache_entries (revision) WHERE revision IS NOT NULL;
+CREATE INDEX IF NOT EXISTS cache_entries_url_hash ON cache_entries (url_hash) WHERE url_hash IS NOT NULL;
+CREATE INDEX IF NOT EXISTS cache_entries_fetched_at ON cache_entries (namespace, fetched_at);
+"""
+
+# the conditions find() can combine, by argument; nothing else goes into its query
+FIND_CONDITIONS = {
+    "namespace": "namespace = ?",
+    "iari_id": "iari_id = ?",
+    "page_id": "page_id = ?",
+    "revision": "revision = ?",
+    "url_hash": "url_hash = ?",
+    "fetched_after": "fetched_at >= ?",
+    "fetched_before": "fetched_at < ?",
+}
+
+
+class SqliteCacheBackend(CacheBackend):
+    """
+    All namespaces in one embedded SQLite database, by default <root>cache.sqlite3
+
+    * WAL journal: readers never block the writer and the other way around,
+      so the gunicorn workers can share the file; writers wait up to busy_timeout
+    * one connection per thread and process, created anew after a fork
+    * secondary indexes on iari_id, page_id, revision, url hash and fetch time,
+      derived from the key (and payload) on write, see index_columns() and find()
+    * ttl_seconds and max_bytes work like in ShardedCacheBackend, based on fetched_at:
+      expired entries are misses, and every EVICTION_INTERVAL writes to a namespace with
+      a budget evict() runs on a background thread
+    """
+
+    name = "sqlite"
+
+    def __init__(
+        self,
+        root: str,
+        path: str = "",
+        ttl_seconds: Optional[Dict[str, int]] = None,
+        max_bytes: Optional[Dict[str, int]] = None,
+        busy_timeout: float = 30,
+    ):
+        super().__init__(root)
+        self.path = path or os.path.join(root, "cache.sqlite3")
+        self.ttl_seconds = ttl_seconds or {}
+        self.max_bytes = max_bytes or {}
+        self.busy_timeout = busy_timeout
+        self.__local = threading.local()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        pid = os.getpid()
+        if getattr(self.__local, "pid", None) != pid:
+            connection = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SCHEMA)
+            self.__local.connection = connection
+            self.__local.pid = pid
+        return cast(sqlite3.Connection, self.__local.connection)
+
+    def namespace_exists(self, namespace: str) -> bool:
+        # every namespace lives in the same table
+        return True
+
+    @staticmethod
+    def index_columns(namespace: str, key: str, payload: Any) -> Dict[str, Any]:
+        """the indexed columns of an entry"""
+        columns: Dict[str, Any] = {"iari_id": None, "page_id": None, "revision": None, "url_hash": None}
+        match = IARI_ID_PATTERN.match(key)
+        if match:
+            columns["iari_id"] = match.group("iari_id")
+            columns["page_id"] = int(match.group("page_id"))
+            columns["revision"] = int(match.group("revision"))
+        match = URL_HASH_PATTERN.match(key) if namespace in URL_NAMESPACES else None
+        if match:
+            columns["url_hash"] = match.group("url_hash")
+        if isinstance(payload, dict):
+            for column in ("page_id", "revision"):
+                if columns[column] is None and isinstance(payload.get(column), int):
+                    columns[column] = payload[column]
+        return columns
+
+    def __cutoff__(self, namespace: str) -> float:
+        ttl = self.ttl_seconds.get(namespace)
+        return time.time() - ttl if ttl else 0
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        row = self.connection.execute(
+            "SELECT payload FROM cache_entries WHERE namespace = ? AND key = ? AND fetched_at >= ?",
+            (namespace, key, self.__cutoff__(namespace)),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_encoded(self, namespace: str, key: str) -> Optional[Tuple[bytes, Optional[str]]]:
+        row = self.connection.execute(
+            "SELECT payload FROM cache_entries WHERE namespace = ? AND key = ? AND fetched_at >= ?",
+            (namespace, key, self.__cutoff__(namespace)),
+        ).fetchone()
+        if not row:
+            return None
+        payload = row[0]
+        return (payload.encode("utf-8") if isinstance(payload, str) else payload), None
+
+    def set(self, namespace: str, key: str, payload: Any) -> None:
+        self.restore_many(namespace, [(key, payload, time.time())])
+
+    def restore(self, namespace: str, key: str, payload: Any, fetched_at: float) -> None:
+        self.restore_many(namespace, [(key, payload, fetched_at)])
+
+    def restore_many(self, namespace: str, entries: Iterable[Tuple[str, Any, float]]) -> None:
+        """writes (key, payload, fetched_at) entries in one transaction"""
+        rows = []
+        for key, payload, fetched_at in entries:
+            columns = self.index_columns(namespace, key, payload)
+            rows.append(
+                (
+                    namespace,
+                    key,
+                    json.dumps(payload, ensure_ascii=False, separators=(",", ":")),
+                    fetched_at,
+                    columns["iari_id"],
+                    columns["page_id"],
+                    columns["revision"],
+                    columns["url_hash"],
+                )
+            )
+        connection = self.connection
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.executemany(
+                "INSERT OR REPLACE INTO cache_entries "
+                "(namespace, key, payload, fetched_at, iari_id, page_id, revision, url_hash) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        self.count_writes(namespace, len(rows))
+
+    def exists(self, namespace: str, key: str) -> bool:
+        row = self.connection.execute(
+            "SELECT 1 FROM cache_entries WHERE namespace = ? AND key = ? AND fetched_at >= ?",
+            (namespace, key, self.__cutoff__(namespace)),
+        ).fetchone()
+        return row is not None
+
+    def delete(self, namespace: str, key: str) -> None:
+        self.connection.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key)
+        )
+
+    def iter_entries(self, namespace: str) -> Iterator[Tuple[str, Any, float]]:
+        # fetch in batches so a long export does not hold a read transaction open
+        last_key = ""
+        while True:
+            rows = self.connection.execute(
+                "SELECT key, payload, fetched_at FROM cache_entries "
+                "WHERE namespace = ? AND key > ? AND fetched_at >= ? ORDER BY key LIMIT 1000",
+                (namespace, last_key, self.__cutoff__(namespace)),
+            ).fetchall()
+            if not rows:
+                return
+            for key, payload, fetched_at in rows:
+                yield key, json.loads(payload), fetched_at
+            last_key = rows[-1][0]
+
+    def namespaces(self) -> List[str]:
+        return [
+            row[0]
+            for row in self.connection.execute("SELECT DISTINCT namespace FROM cache_entries ORDER BY namespace")
+        ]
+
+    def find(
+        self,
+        namespace: Optional[str] = None,
+        iari_id: Optional[str] = None,
+        page_id: Optional[int] = None,
+        revision: Optional[int] = None,
+        url_hash: Optional[str] = None,
+        fetched_after: Optional[float] = None,
+        fetched_before: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        returns namespace, key and fetched_at of the matching entries, newest first,
+        e.g. find("articlesV2", page_id=12345) for all cached revisions of a page
+        """
+        arguments = {
+            "namespace": namespace,
+            "iari_id": iari_id,
+            "page_id": page_id,
+            "revision": revision,
+            "url_hash": url_hash,
+            "fetched_after": fetched_after,
+            "fetched_before": fetched_before,
+        }
+        conditions = [FIND_CONDITIONS[name] for name, value in arguments.items() if value is not None]
+        parameters = [value for value in arguments.values() if value is not None]
+        query = "SELECT namespace, key, fetched_at FROM cache_entries"
+        if conditions:
+            # only constants of FIND_CONDITIONS, the values are bound
+            query += " WHERE " + " AND ".join(conditions)
+        rows = self.connection.execute(query + " ORDER BY fetched_at DESC", parameters).fetchall()
+        return [{"namespace": row[0], "key": row[1], "fetched_at": row[2]} for row in rows]
+
+    def disk_usage(self, namespace: str) -> int:
+        """bytes of payload stored for namespace"""
+        row = self.connection.execute(
+            "SELECT COALESCE(SUM(LENGTH(payload)), 0) FROM cache_entries WHERE namespace = ?",
+            (namespace,),
+        ).fetchone()
+        usage: int = row[0]
+        return usage
+
+    def evict(self, namespace: str) -> int:
+        """
+        removes expired entries and, if namespace is over its max_bytes budget,
+        the oldest entries until it is under 90% of it.
+        returns the number of removed entries
+        """
+        connection = self.connection
+        removed = 0
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            if self.ttl_seconds.get(namespace):
+                removed += connection.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND fetched_at < ?",
+                    (namespace, self.__cutoff__(namespace)),
+                ).rowcount
+            max_bytes = self.max_bytes.get(namespace)
+            if max_bytes:
+                total = self.disk_usage(namespace)
+                if total > max_bytes:
+                    target = max_bytes * 0.9
+                    keys = []
+                    for key, size in connection.execute(
+                        "SELECT key, LENGTH(payload) FROM cache_entries WHERE namespace = ? ORDER BY fetched_at",
+                        (namespace,),
+                    ):
+                        if total <= target:
+                            break
+                        keys.append((namespace, key))
+                        total -= size
+                    connection.executemany("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", keys)
+                    removed += len(keys)
+        if removed:
+            logger.info(f"evicted {removed} entries from cache namespace {namespace}")
+        return removed
@@ -1,11 +1,11 @@
-import json
 import logging
-from os.path import exists
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 import config
+from src.helpers.metrics import count_cache, span
 from src.models.api.job import Job
 from src.models.base import WariBaseModel
+from src.models.cache import get_cache_backend
 
 logger = logging.getLogger(__name__)
 
@@ -19,22 +19,31 @@ class FileIo(WariBaseModel):
     testing: bool = False
 
     @property
-    def filename(self):
+    def filename(self) -> str:
         return f"{self.wari_id}.json"
 
     @property
-    def path_filename(self) -> str:
+    def cache_root(self) -> str:
         if self.testing:
             # TODO simplify this!
             testing_dir = "/home/dpriskorn/src/python/wcdimportbot/"  # we hard code the test json directory for now
             # TODO: if testing, try to go out to repo root first
-            path_filename = f"{testing_dir}{config.iari_cache_dir}{self.subfolder}{self.filename}"
-        else:
-            path_filename = (
-                f"{config.iari_cache_dir}{self.subfolder}{self.filename}"
-            )
+            return f"{testing_dir}{config.iari_cache_dir}"
+        return config.iari_cache_dir
 
-        return path_filename
+    @property
+    def cache_namespace(self) -> str:
+        return self.subfolder.rstrip("/")
+
+    @property
+    def cache_key(self) -> str:
+        filename = self.filename
+        return filename[: -len(".json")] if filename.endswith(".json") else filename
+
+    @property
+    def path_filename(self) -> str:
+        """path of the entry in the flat cache layout (config.cache_backend = "flat")"""
+        return f"{self.cache_root}{self.subfolder}{self.filename}"
 
     def write_to_disk(
         self,
@@ -43,38 +52,41 @@ class FileIo(WariBaseModel):
         from src import app
 
         if self.data:
-            path_filename = self.path_filename
-
-            app.logger.debug(f"FileIo::write_to_disk: path_filename: {path_filename}")
-            # app.logger.debug(f"FileIo::write_to_disk: file_prefix: {self.file_prefix}")
-
-            if exists(path_filename):
-                with open(file=path_filename, mode="w") as file:
-                    app.logger.debug("overwriting existing file")
-                    # https://stackoverflow.com/questions/12309269/how-do-i-write-json-data-to-a-file
-                    json.dump(self.data, file, ensure_ascii=False, indent=4)
-            else:
-                # x = create and write
-                with open(file=path_filename, mode="x") as file:
-                    app.logger.debug("writing to new file")
-                    # https://stackoverflow.com/questions/12309269/how-do-i-write-json-data-to-a-file
-                    json.dump(self.data, file, ensure_ascii=False, indent=4)
+            app.logger.debug(
+                f"FileIo::write_to_disk: {self.cache_namespace}/{self.cache_key}"
+            )
+            # the backend writes atomically, so concurrent workers can not collide
+            with span("cache"):
+                get_cache_backend(self.cache_root).set(
+                    self.cache_namespace, self.cache_key, self.data
+                )
         else:
             app.logger.info("Skipping write because self.data is empty")
 
+    def read_encoded_from_disk(self) -> Optional[Tuple[bytes, Optional[str]]]:
+        """
+        the cached json as stored, (json, content_encoding) or None,
+        for sending a cache hit without parsing it, see src/helpers/json_encoding.py
+        """
+        with span("cache"):
+            encoded = get_cache_backend(self.cache_root).get_encoded(self.cache_namespace, self.cache_key)
+        count_cache(self.cache_namespace, hit=encoded is not None)
+        return encoded
+
     def read_from_disk(self) -> None:
         from src import app
 
-        path_filename = self.path_filename
-
-        app.logger.debug(f"FileIo::read_from_disk: path_filename: {path_filename}")
-        # app.logger.debug(f"FileIo::read_from_disk: file_prefix: {self.file_prefix}")
-
-        if exists(path_filename):
-            with open(file=path_filename) as file:
-                logger.debug("loading json into self.data")
-                self.data = json.load(file)
-                if self.data:
-                    self.data["served_from_cache"] = True
+        app.logger.debug(
+            f"FileIo::read_from_disk: {self.cache_namespace}/{self.cache_key}"
+        )
+
+        with span("cache"):
+            data = get_cache_backend(self.cache_root).get(self.cache_namespace, self.cache_key)
+        count_cache(self.cache_namespace, hit=data is not None)
+        if data is not None:
+            logger.debug("loading json into self.data")
+            self.data = data
+            if self.data:
+                self.data["served_from_cache"] = True
         else:
-            logger.debug(f"no json on disk ({path_filename})")
+            logger.debug(f"no json in cache ({self.cache_namespace}/{self.cache_key})")
@@ -105,7 +105,7 @@ class MediawikiSection(BaseModel):
                         language_code=self.language_code,
                         is_general_reference=True,
                         section=self.name,
-                        section_id=self.section_id,
+                        section_id=str(self.section_id),
                     )
                     reference.extract_and_check()
                     self.references.append(reference)
@@ -139,7 +139,7 @@ class MediawikiSection(BaseModel):
                 language_code=self.language_code,
 
                 section=self.name,
-                section_id=self.section_id,
+                section_id=str(self.section_id),
 
                 testing=self.testing,
             )
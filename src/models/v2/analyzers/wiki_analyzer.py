@@ -1,4 +1,6 @@
-from typing import Any, Dict, List, Optional
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Any, Dict, Iterator, List, Optional
 import re
 import logging
 import requests
@@ -6,11 +8,14 @@ import requests
 import mwparserfromhell
 from mwparserfromhell.wikicode import Wikicode
 
+import config
 from src.models.exceptions import MissingInformationError, WikipediaApiFetchError
 from src.models.v2.analyzers import IariAnalyzer
 
 from iarilib.parse_utils import extract_cite_refs
 
+from src.helpers.metrics import span
+from src.helpers.fieldsets import Fieldset, get_sub_fieldset, prune_fields, wants_any, wants_field
 from src.helpers.refs_extractor.wikiapi import get_current_timestamp, get_wikipedia_article
 from src.helpers.refs_extractor.article import extract_urls_from_text
     # extract_references_from_page as extract_references_from_page_old, \
@@ -33,13 +38,20 @@ class WikiAnalyzerV2(IariAnalyzer):
     """
 
     @staticmethod
-    def get_page_data(page_spec) -> Dict[str, Any]:
+    def get_page_data(
+        page_spec, article: Optional[Dict[str, Any]] = None, fieldset: Fieldset = None
+    ) -> Dict[str, Any]:
         """
         NB: Does not do any exception handling
+
+        article: the already fetched revision of the page (see wikiapi.fetch_latest_revisions),
+        fetched here if None
+        fieldset: the fields the patron asked for (see src/helpers/fieldsets.py),
+        the work for the others is skipped and they are left empty
         """
 
         # seed return data with page specs
-        results = {
+        results: Dict[str, Any] = {
             "media_type": "wiki_article"
         }
         results.update(page_spec)  # append page_spec fields to return_data
@@ -48,13 +60,18 @@ class WikiAnalyzerV2(IariAnalyzer):
         ref_data = extract_references_from_page(page_spec["page_title"],
                                                 page_spec["domain"],
                                                 page_spec["as_of"],
-                                                page_spec["hydrate"]
+                                                page_spec["hydrate"],
+                                                article=article,
+                                                claims=wants_any(fieldset, "references.claim", "references.claim_array"),
                                                 )
 
         # cite_refs uses local iarilib's extract_cite_refs
-        cite_refs = extract_citerefs_from_page(page_spec["page_title"],
-                                               page_spec["domain"],
-                                               page_spec["as_of"])
+        # it needs the html of the page, a second fetch
+        cite_refs: List[Dict[str, Any]] = []
+        if wants_any(fieldset, "cite_refs", "cite_refs_count"):
+            cite_refs = extract_citerefs_from_page(page_spec["page_title"],
+                                                   page_spec["domain"],
+                                                   page_spec["as_of"])
 
 
 
@@ -81,11 +98,66 @@ class WikiAnalyzerV2(IariAnalyzer):
 
         return results
 
+    @staticmethod
+    def iter_page_data(
+        page_spec, article: Optional[Dict[str, Any]] = None, fieldset: Fieldset = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        the data of get_page_data as records for format=ndjson:
+        a header, a record per reference and per cite_ref, and a footer with the counts and urls.
+        with a fieldset, references and cite_refs are only yielded (and pruned) if asked for
+        """
+        records = iter_references_from_page(page_spec["page_title"],
+                                            page_spec["domain"],
+                                            page_spec["as_of"],
+                                            page_spec["hydrate"],
+                                            article=article,
+                                            claims=wants_any(fieldset, "references.claim", "references.claim_array"),
+                                            )
+        page = next(records)
+
+        yield {
+            "record": "header",
+            "media_type": "wiki_article",
+            **page_spec,
+            "page_id": str(page["page_id"]),
+            "revision_id": str(page["revision_id"]),
+            "section_names": page["section_names"],
+        }
 
-def extract_references_from_page(title, domain="en.wikipedia.org", as_of=None, hydrate=False):
+        found_urls = set()
+        reference_count = 0
+        for ref in records:
+            found_urls.update(ref["urls"])
+            reference_count += 1
+            if wants_field(fieldset, "references"):
+                yield {"record": "reference", **prune_fields(ref, get_sub_fieldset(fieldset, "references"))}
+
+        cite_refs_count = 0
+        if wants_any(fieldset, "cite_refs", "cite_refs_count"):
+            for cite_ref in extract_citerefs_from_page(page_spec["page_title"],
+                                                       page_spec["domain"],
+                                                       page_spec["as_of"]):
+                cite_refs_count += 1
+                if wants_field(fieldset, "cite_refs"):
+                    yield {"record": "cite_ref", **prune_fields(cite_ref, get_sub_fieldset(fieldset, "cite_refs"))}
+
+        yield {
+            "record": "footer",
+            "reference_count": reference_count,
+            "url_count": len(found_urls),
+            "urls": list(found_urls),
+            "cite_refs_count": cite_refs_count,
+        }
+
+
+def extract_references_from_page(title, domain="en.wikipedia.org", as_of=None, hydrate=False, article=None, claims=True):
     """
     raises Exception if errors anywhere along the way
 
+    article, if given, holds the already fetched results of get_wikipedia_article
+    claims: whether to find the claim of each reference (get_claim)
+
     returns a dict describing page and references
     {
         "page_id": page_id,
@@ -114,12 +186,36 @@ def extract_references_from_page(title, domain="en.wikipedia.org", as_of=None, h
 
     """
 
-    if as_of is None:
-        as_of = get_current_timestamp()
-    title = title.replace(" ", "_")
+    records = iter_references_from_page(title, domain, as_of, hydrate, article=article, claims=claims)
+    page = next(records)
+    refs = list(records)
+
+    found_urls = set()
+    for ref in refs:
+        found_urls.update(ref["urls"])
+
+    return {
+        **page,
+        "urls": list(found_urls),
+        "references": refs
+    }
+
+
+def iter_references_from_page(title, domain="en.wikipedia.org", as_of=None, hydrate=False, article=None, claims=True):
+    """
+    like extract_references_from_page, but yields the page information first:
+    {
+        "page_id": page_id,
+        "revision_id": revision_id,
+        "revision_timestamp": revision_timestamp,
+        "section_names": [...],
+    }
+    and then the references one by one, as each section is processed,
+    so the references of a page need not all be held at once (see format=ndjson)
+    """
 
     # fetch article data, which returns a dict containing article fetch results, or { errors: [] }
-    results = get_wikipedia_article(domain, title, as_of)
+    results = article if article is not None else fetch_page_article(title, domain, as_of)
 
     if results.get("errors", []):
         raise WikipediaApiFetchError(results.get("errors", [{}])[0].get("details", "Unknown Wikipedia API error"))
@@ -128,11 +224,18 @@ def extract_references_from_page(title, domain="en.wikipedia.org", as_of=None, h
         raise WikipediaApiFetchError("wikitext not found in wikiapi results")
 
     # extract Wikicode objects "sections" from the wikitext
-    sections = mw_extract_sections(results["wikitext"])
+    with span("parse"):
+        sections = mw_extract_sections(results["wikitext"])
     # TODO make sections a collection of Section objects that are passed the mwPFH section object,
     #   these Section objects should have active methods as well, like extract_refs, et al.
 
-    refs = []
+    yield {
+        "page_id": results.get("page_id", ""),
+        "revision_id": results.get("rev_id", ""),
+        "revision_timestamp": results.get("rev_timestamp", ""),
+        "section_names": [get_section_title(section) for section in sections],
+    }
+
     """
     references look like:
     {
@@ -144,20 +247,23 @@ def extract_references_from_page(title, domain="en.wikipedia.org", as_of=None, h
     """
 
     for section in sections:
-        section_refs = get_refs_from_section(section, hydrate=hydrate)
-        # TODO replace with "section.get_refs" when section becomes an object with a "get_refs" method
-        refs.extend(section_refs)
+        with span("refs"):
+            section_refs = get_refs_from_section(section, hydrate=hydrate, claims=claims)
+            # TODO replace with "section.get_refs" when section becomes an object with a "get_refs" method
+            post_process_refs(section_refs)
+        yield from section_refs
 
-    [found_urls] = post_process_refs(refs)
 
-    return {
-        "page_id": results.get("page_id", ""),
-        "revision_id": results.get("rev_id", ""),
-        "revision_timestamp": results.get("rev_timestamp", ""),
-        "section_names": [get_section_title(section) for section in sections],
-        "urls": list(found_urls),
-        "references": refs
-    }
+def fetch_page_article(title, domain="en.wikipedia.org", as_of=None):
+    """
+    the results of get_wikipedia_article for the revision of title current at as_of (now if None),
+    to resolve the revision before analyzing it (see the article parameter of iter_references_from_page)
+    """
+    if as_of is None:
+        as_of = get_current_timestamp()
+    title = title.replace(" ", "_")
+    with span("fetch"):
+        return get_wikipedia_article(domain, title, as_of)
 
 
 def mw_extract_sections(wikitext):
@@ -187,25 +293,28 @@ def get_section_title(section):
         return "Section is empty or malformed."
 
 
-def get_refs_from_section(section: Wikicode, hydrate=False) -> List[object]:
+def get_refs_from_section(section: Wikicode, hydrate=False, claims=True) -> List[Dict[str, Any]]:
     """
     generic.py::__extract_templates_and_parameters__ - gets templates
+
+    claims: whether to find the claim of each ref, else "claim" is left empty
     """
     from src import app
 
     nodes = list(section.nodes)
     refs = []
+    ref_numbers = []  # the node of each ref, for its claim
     section_name = get_section_title(section)
 
     # Iterate through all the nodes, special casing on "ref" nodes and "sfn" nodes
 
     for i, node in enumerate(nodes):
 
-        if isinstance(node, mwparserfromhell.nodes.tag.Tag) and node.tag == "ref":
+        if is_ref_tag(node):
 
             wt = str(node)
 
-            my_ref = {}
+            my_ref: Dict[str, Any] = {}
 
             if hydrate is True:  # only add if hydrate is True
                 my_ref["hydrate"] = True
@@ -225,13 +334,13 @@ def get_refs_from_section(section: Wikicode, hydrate=False) -> List[object]:
             for url in extract_urls_from_text(wt):
                 my_ref["urls"].append(url)
 
-            [claim_text, claim_array] = get_claim(i, nodes)
-
-            my_ref["claim"] = claim_text
+            # filled in below, with the claims of the other refs of the section
+            my_ref["claim"] = ""
             if hydrate:  # only add if hydrate is True
-                my_ref["claim_array"] = claim_array
+                my_ref["claim_array"] = []
 
             refs.append(my_ref)
+            ref_numbers.append(i)
 
         # check for sfn template
         if isinstance(node, mwparserfromhell.nodes.template.Template) and node.name.strip().lower() == "sfn":
@@ -245,6 +354,15 @@ def get_refs_from_section(section: Wikicode, hydrate=False) -> List[object]:
                 references can have a cite_location array, describing where in the article it is referenced
             """
 
+    if claims and refs:
+        # the sentence boundaries of the section are found once for all its refs
+        claim_index = ClaimIndex(nodes, ref_numbers)
+        for my_ref, node_number in zip(refs, ref_numbers):
+            [claim_text, claim_array] = get_claim(node_number, nodes, claim_index)
+            my_ref["claim"] = claim_text
+            if hydrate:
+                my_ref["claim_array"] = claim_array
+
     return refs
 
 
@@ -288,7 +406,7 @@ def get_templates_from_ref(ref):
     return templates
 
 
-def get_claim(node_number, nodes):
+def get_claim(node_number, nodes, index: Optional["ClaimIndex"] = None):
     """
     Returns [claim_text, claim_array], where claim_array is for debugging
 
@@ -305,7 +423,8 @@ def get_claim(node_number, nodes):
     In the first half of the 20th century, steam reportedly came out of the
      Rano Kau crater wall. This was photographed by the island's manager, Mr. Edmunds.
     (Mr. stops it!)
-    (If terminating period's preceding text is one of accepted abbreviations, continue on)
+    (If terminating period's preceding text is one of accepted abbreviations, continue on:
+    see claim_abbreviations in config.py)
 
 
     If you want to handle tags more robustly (e.g., extract attributes or process nested contents),
@@ -315,72 +434,137 @@ def get_claim(node_number, nodes):
     node.attributes: Returns the tag's attributes as a dictionary-like object.
     str(node): Returns the entire tag as a string, including its opening and closing tags.
 
+    index: the ClaimIndex of nodes, to share between the refs of a section
     """
 
-    # Piece together the claim text referring to the citation at node_number.
-    # The citation can be all the previous nodes before the last full stop.
-
-    claim_array = []
-    claim_text = ""
-    terminal_found = False  # condition to stop back-looking for claim
-    offset = 0
-    max_back_nodes = 12
-
-    while (offset < max_back_nodes) and not terminal_found:
-        offset += 1
-
-        n_index = node_number - offset
-
-        # stop if at beginning of node list
-        if n_index < 0:
-            break
+    if index is None:
+        index = ClaimIndex(nodes, [node_number])
+    return index.get_claim(node_number)
 
-        node = nodes[n_index]
-        node_text = ""
 
-        if isinstance(node, mwparserfromhell.nodes.text.Text):
-            node_text = str(node.value)
+class ClaimIndex:
+    """
+    the text of the nodes of a section and its sentence boundaries, computed once
+    for the claims of all the refs of the section
+
+    The claim text referring to the citation at node_number can be all the previous
+    nodes (at most MAX_BACK_NODES) back to the last one holding an end of sentence:
+    a period followed by whitespace, or whitespace up to a newline at its start.
+    Of that text the claim is the last sentence, after the last period followed by whitespace.
+
+    Rather than stringifying and searching the nodes before every ref (again and again
+    for runs of refs), each node is stringified and searched at most once, the texts are
+    concatenated once and the ends of sentences in the text are kept in a sorted list,
+    so a claim is a binary search and a slice. Only the nodes the claims of node_numbers
+    (by default the <ref> tags) reach are stringified, the text of the others is left empty.
+    """
 
-        elif isinstance(node, mwparserfromhell.nodes.tag.Tag):
-            node_text = str(node.contents)
-            # node_text = str(node)
-            # NB  the node may contain other nodes that need to be processed
+    MAX_BACK_NODES = 12
+    # in the text of a single node, ends the search back for the claim
+    END_OF_SENTENCE_PATTERN = re.compile(r"^\s*\n|\.\s")
+    NEWLINE_START_PATTERN = re.compile(r"^\s*\n")
+    # the claim is the text after the last one
+    SENTENCE_SEPARATOR_PATTERN = re.compile(r"\.\s+")
+    WORD_BEFORE_PATTERN = re.compile(r"\w+$")
+
+    def __init__(self, nodes, node_numbers: Optional[List[int]] = None, abbreviations: Optional[List[str]] = None):
+        if node_numbers is None:
+            node_numbers = [number for number, node in enumerate(nodes) if is_ref_tag(node)]
+        if abbreviations is None:
+            abbreviations = getattr(config, "claim_abbreviations", [])
+        self.nodes = nodes
+        self.abbreviations = set(abbreviations)
+        self.longest_abbreviation = max((len(abbreviation) for abbreviation in self.abbreviations), default=0)
+
+        # the first node of the claim of each of node_numbers, searching back
+        # up to the nearest node holding an end of sentence
+        self.first_nodes: Dict[int, int] = {}
+        self.node_texts: List[str] = [""] * len(nodes)
+        ends_sentence: List[Optional[bool]] = [None] * len(nodes)
+        for node_number in node_numbers:
+            first = node_number
+            while first > max(node_number - self.MAX_BACK_NODES, 0):
+                first -= 1
+                if ends_sentence[first] is None:
+                    self.node_texts[first] = get_node_text(nodes[first])
+                    ends_sentence[first] = self.__ends_sentence__(self.node_texts[first])
+                if ends_sentence[first]:
+                    break
+            self.first_nodes[node_number] = first
+
+        # self.offsets[n] is where the text of node n starts in self.text
+        self.offsets = list(accumulate(map(len, self.node_texts), initial=0))
+        self.text = "".join(self.node_texts)
+
+        # the periods ending a sentence in self.text, and where the next sentence starts
+        self.sentence_ends: List[int] = []
+        self.sentence_starts: List[int] = []
+        for match in self.__sentence_separators__(self.text):
+            self.sentence_ends.append(match.start())
+            self.sentence_starts.append(match.end())
+
+    def __sentence_separators__(self, text: str) -> Iterator[re.Match]:
+        """the matches of SENTENCE_SEPARATOR_PATTERN, except after an abbreviation (e.g. "Mr.")"""
+        for match in self.SENTENCE_SEPARATOR_PATTERN.finditer(text):
+            if self.abbreviations:
+                # one character more than the longest abbreviation, so a longer word never matches
+                before = text[max(match.start() - self.longest_abbreviation - 1, 0):match.start()]
+                word = self.WORD_BEFORE_PATTERN.search(before)
+                if word and word.group() in self.abbreviations:
+                    continue
+            yield match
+
+    def __ends_sentence__(self, node_text: str) -> bool:
+        if not self.abbreviations:
+            return self.END_OF_SENTENCE_PATTERN.search(node_text) is not None
+        return (
+            self.NEWLINE_START_PATTERN.search(node_text) is not None
+            or next(self.__sentence_separators__(node_text), None) is not None
+        )
 
-        elif isinstance(node, mwparserfromhell.nodes.wikilink.Wikilink):
-            node_text = str(node.title) if not node.text else str(node.text)
+    def get_claim(self, node_number: int):
+        """[claim_text, claim_array] of the ref at node_number, see get_claim"""
+        if node_number not in self.first_nodes:
+            return ClaimIndex(self.nodes, [node_number], list(self.abbreviations)).get_claim(node_number)
+        first = self.first_nodes[node_number]
 
-        elif isinstance(node, mwparserfromhell.nodes.html_entity.HTMLEntity):
-            node_text = str(node)
+        # claim_array is for debugging, the nodes in the order they were searched
+        claim_array = [
+            f"[{type(self.nodes[number])}] {self.node_texts[number]}" for number in range(node_number - 1, first - 1, -1)
+        ]
 
-        else:
-            node_text = str(node.value) if hasattr(node, 'value') else ""
+        # use the LAST sentence of the text of these nodes;
+        # a period ends a sentence of it only if it is followed by whitespace inside it
+        start, end = self.offsets[first], self.offsets[node_number]
+        separator = bisect_right(self.sentence_ends, end - 2) - 1
+        if separator >= 0 and self.sentence_ends[separator] >= start:
+            start = min(self.sentence_starts[separator], end)
 
+        return [self.text[start:end], claim_array]
 
 
-        """
-        terminate if period followed by whitespace is found in display_val snippet.
-        end_of_sentence_pattern regex: r"\.\s|\.$"
-            - Matches a period followed by whitespace OR
-            - a period at the end of the string
+def is_ref_tag(node) -> bool:
+    return isinstance(node, mwparserfromhell.nodes.tag.Tag) and node.tag == "ref"
 
-        # end_of_sentence_pattern = r"\.\s"
-        """
-        end_of_sentence_pattern = r"^\s*\n|\.\s"
-        terminal_found = re.search(end_of_sentence_pattern, node_text)
 
-        # claim_array is for debugging
-        claim_array.append(f"[{type(nodes[n_index])}] {node_text}")
+def get_node_text(node) -> str:
+    """the text of node as part of a claim"""
+    if isinstance(node, mwparserfromhell.nodes.text.Text):
+        return str(node.value)
 
-        # append current node_text to the beginning of claim_text,
-        # because we are searching backwards from the <ref> node
-        claim_text = node_text + claim_text
+    elif isinstance(node, mwparserfromhell.nodes.tag.Tag):
+        return str(node.contents)
+        # return str(node)
+        # NB  the node may contain other nodes that need to be processed
 
+    elif isinstance(node, mwparserfromhell.nodes.wikilink.Wikilink):
+        return str(node.title) if not node.text else str(node.text)
 
-    # Use LAST sentence of claim text
-    claim_sentences = re.split(r'\.\s+', claim_text)
-    claim_text = claim_sentences[-1] if claim_sentences else claim_text
+    elif isinstance(node, mwparserfromhell.nodes.html_entity.HTMLEntity):
+        return str(node)
 
-    return [claim_text, claim_array]
+    else:
+        return str(node.value) if hasattr(node, 'value') else ""
 
 
 def post_process_refs(refs):
@@ -414,8 +598,10 @@ def post_process_refs(refs):
 
 
 def extract_citerefs_from_page(title, domain="en.wikipedia.org", as_of=None):
-    html_source = fetch_page_html(title, domain, as_of)
-    return extract_cite_refs(html_source)
+    with span("fetch", "html"):
+        html_source = fetch_page_html(title, domain, as_of)
+    with span("html"):
+        return extract_cite_refs(html_source)
 
 
 def fetch_page_html(title, domain="en.wikipedia.org", as_of=None):
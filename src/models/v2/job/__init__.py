@@ -1,5 +1,7 @@
 from pydantic import BaseModel
 
+from src.helpers.fieldsets import Fieldset, parse_fields
+
 '''
 This ensures each and every job (i.e. each endpoint) can handle a "refresh" and a "testing" url parameter
 '''
@@ -7,3 +9,21 @@ class JobV2(BaseModel):
     refresh: bool = False
     testing: bool = False
     hydrate: bool = False
+    format: str = "json"
+
+    @property
+    def streaming(self) -> bool:
+        """the response is streamed as ndjson, see src/helpers/ndjson.py"""
+        return self.format == "ndjson"
+
+    @property
+    def compact(self) -> bool:
+        """the reference lists of the response are sent in the compact format, see src/helpers/compact.py"""
+        return self.format == "compact"
+
+    field_names: str = ""  # the fields= parameter, for the endpoints that support it
+
+    @property
+    def fieldset(self) -> Fieldset:
+        """the fields the patron asked for, None for all, see src/helpers/fieldsets.py"""
+        return parse_fields(self.field_names)
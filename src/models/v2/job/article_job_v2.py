@@ -1,9 +1,7 @@
 import re
 from urllib.parse import quote, unquote
 
-import requests
-
-import config
+from src.helpers.http_client import get_session
 from src.models.exceptions import MissingInformationError, WikipediaApiFetchError
 from src.models.v2.job import JobV2
 from src.models.wikimedia.enums import WikimediaDomain
@@ -24,6 +22,7 @@ class ArticleJobV2(JobV2):
 
     sections: str = ""
     revision: int = 0  # this is named just as in the MediaWiki API
+    since_revision: int = 0  # see src/helpers/delta.py
     dehydrate: bool = True
 
     @property
@@ -62,8 +61,7 @@ class ArticleJobV2(JobV2):
                 f"https://{self.lang}.{self.domain.value}/"
                 f"w/rest.php/v1/page/{self.quoted_title}"
             )
-            headers = {"User-Agent": config.user_agent}
-            response = requests.get(wiki_fetch_url, headers=headers)
+            response = get_session().get(wiki_fetch_url, timeout=20)
             # console.print(response.json())
             if response.status_code == 200:
                 data = response.json()
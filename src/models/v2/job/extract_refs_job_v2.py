@@ -1,15 +1,17 @@
 from src import MissingInformationError
 from src.models.v2.job import JobV2
 
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel
 
 class ExtractRefsJobV2(JobV2):
     """job that supports ExtractRefsV2 endpoint"""
 
     page_title: str = ""
+    pages: List[str] = []  # batch of page titles, analyzed in parallel
     domain: str = "en.wikipedia.org"
     as_of: Optional[str] = None
+    since_revision: int = 0  # see src/helpers/delta.py
     wikitext: str = ""
 
     wiki_id: str = ""
@@ -21,13 +23,13 @@ class ExtractRefsJobV2(JobV2):
         """
         parameter checking here...
 
-        must have at least "page_title" or "wikitext" defined
+        must have at least "page_title", "pages" or "wikitext" defined
         """
 
         if not self.wikitext:
-            if not self.page_title:
+            if not self.page_title and not self.pages:
                 raise MissingInformationError(
-                    f"page_title or wikitext must be specified"
+                    f"page_title, pages or wikitext must be specified"
                 )
 
 
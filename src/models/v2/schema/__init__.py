@@ -1,4 +1,4 @@
-from marshmallow import Schema, fields
+from marshmallow import Schema, fields, validate
 
 
 class BaseSchemaV2(Schema):
@@ -8,6 +8,9 @@ class BaseSchemaV2(Schema):
     refresh:    re-fetch the data and re-fill the cached value, except of new fetch is error
     testing:    change behavior based on testing (* may not need this *)
     tag:        a pass thru value that helps with identifying object being queried
+    format:     "json" (default), "ndjson" to stream the result one record per line
+                (see src/helpers/ndjson.py) or "compact" to send the strings of reference
+                lists once (see src/helpers/compact.py), for the endpoints that support it
     """
 
     refresh = fields.Bool(required=False)
@@ -16,6 +19,7 @@ class BaseSchemaV2(Schema):
     hydrate = fields.Bool(required=False)
     uselocal = fields.Bool(required=False)
     tag = fields.Str(required=False)
+    format = fields.Str(required=False, validate=validate.OneOf(["json", "ndjson", "compact"]))
 
     # def __init__(self, *args, request_method=None, **kwargs):
     #     # Extract or initialize context dict
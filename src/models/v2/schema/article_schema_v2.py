@@ -16,6 +16,10 @@ class ArticleSchemaV2(BaseSchemaV2):
     reference_types = fields.Str(required=False)
     url_details = fields.Bool(required=False)
     url_method = fields.Str(required=False)
+    # comma separated fields to return, e.g. "urls,references.template_names", see src/helpers/fieldsets.py
+    field_names = fields.Str(data_key="fields", required=False)
+    # the revision whose analysis the patron holds, only the differences are returned, see src/helpers/delta.py
+    since_revision = fields.Int(required=False)
 
     # noinspection PyUnusedLocal
     @post_load
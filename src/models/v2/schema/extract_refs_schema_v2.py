@@ -9,10 +9,14 @@ class ExtractRefsSchemaV2(BaseSchemaV2):
     #   - default parameters are defined in BaseSchemaV2
 
     page_title = fields.Str(load_default="", required=False)
-    # pages = fields.List(fields.String(), required=False)  # either pages, page_title or wikitext must be defined
+    pages = fields.List(fields.String(), required=False)  # either pages, page_title or wikitext must be defined
     domain = fields.Str(load_default="en.wikipedia.org", required=False)
     as_of = fields.Str(required=False, allow_none=True, load_default=None)
     wikitext = fields.Str(load_default="", required=False)  # if wikitext orovided then process directly without any fetching
+    # comma separated fields to return, e.g. "urls,references.template_names", see src/helpers/fieldsets.py
+    field_names = fields.Str(data_key="fields", required=False)
+    # the revision whose analysis the patron holds, only the differences are returned, see src/helpers/delta.py
+    since_revision = fields.Int(required=False)
 
     @pre_load
     # NB: pre_load is a marshmallow directive;
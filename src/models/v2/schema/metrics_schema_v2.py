@@ -0,0 +1,10 @@
+from marshmallow import fields, validate
+
+from src.models.v2.schema import BaseSchemaV2
+
+
+class MetricsSchemaV2(BaseSchemaV2):
+    """This validates the patron input in the get request"""
+
+    # "prometheus" for the Prometheus text exposition format
+    format = fields.Str(required=False, validate=validate.OneOf(["json", "prometheus"]))
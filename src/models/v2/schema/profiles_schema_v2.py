@@ -0,0 +1,7 @@
+from src.models.v2.schema import BaseSchemaV2
+
+
+class ProfilesSchemaV2(BaseSchemaV2):
+    """This validates the patron input in the get request"""
+
+    # no request args for the profiles, the admin token is sent as a header
@@ -0,0 +1,233 @@
+import logging
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import requests
+from dateutil.parser import isoparse
+from pydantic import BaseModel
+
+from src.helpers.http_client import get_session
+from src.models.exceptions import MissingInformationError, WikipediaApiFetchError
+from src.models.v2.job.article_job_v2 import ArticleJobV2
+
+logger = logging.getLogger(__name__)
+
+
+class ArticleFetchResultV2(BaseModel):
+    """What the upstream calls for one article returned"""
+
+    found_in_wikipedia: bool = True
+    page_id: int = 0
+    revision_id: int = 0
+    revision_isodate: Optional[datetime] = None
+    revision_timestamp: int = 0
+    wikitext: Optional[str] = None
+
+    html_markup: Optional[str] = None
+
+    ores_quality_prediction: str = ""
+    ores_details: Dict[str, Any] = {}
+
+    # non fatal upstream errors, e.g. ORES timing out
+    errors: List[Dict[str, Any]] = []
+    # seconds spent in each upstream call
+    timings: Dict[str, float] = {}
+
+
+class ArticleFetcherV2(BaseModel):
+    """
+    Fetches the wikitext, Parsoid html and ORES score of an article concurrently
+    over the shared pooled http client.
+
+    Once the revision id is known the three calls do not depend on each other:
+    * revision known: wikitext, html and ORES all run at the same time
+    * latest revision: wikitext (which gives us the revision id) and html run at the same time,
+      ORES starts as soon as the wikitext call has returned
+
+    so wall clock time is that of the slowest chain of calls, not the sum of all of them.
+    Wikitext and html errors are raised like before; ORES errors are logged and
+    recorded in result.errors.
+    """
+
+    job: ArticleJobV2
+
+    # per-call timeouts in seconds
+    wikitext_timeout: float = 20
+    html_timeout: float = 30
+    ores_timeout: float = 10
+
+    class Config:  # dead: disable
+        arbitrary_types_allowed = True  # dead: disable
+
+    @property
+    def base_url(self) -> str:
+        return f"https://{self.job.lang}.{self.job.domain.value}/w/rest.php/v1"
+
+    def fetch(
+        self,
+        fetch_wikitext: bool = True,
+        fetch_html: bool = True,
+        fetch_ores: bool = True,
+    ) -> ArticleFetchResultV2:
+        """
+        runs the requested calls concurrently and returns the combined result
+        """
+        if not self.job.title:
+            raise MissingInformationError("self.job.title was empty string")
+
+        result = ArticleFetchResultV2(revision_id=self.job.revision, page_id=self.job.page_id)
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            wikitext_future: Optional[Future] = None
+            html_future: Optional[Future] = None
+            ores_future: Optional[Future] = None
+
+            if fetch_wikitext:
+                if self.job.revision:
+                    wikitext_future = executor.submit(self.__timed__, result, "wikitext", self.__fetch_revision__)
+                else:
+                    wikitext_future = executor.submit(self.__timed__, result, "wikitext", self.__fetch_latest__)
+            if fetch_html:
+                html_future = executor.submit(self.__timed__, result, "html", self.__fetch_html__)
+            if fetch_ores and self.job.revision:
+                ores_future = executor.submit(self.__timed__, result, "ores", self.__fetch_ores__, self.job.revision)
+
+            if wikitext_future:
+                self.__apply_wikitext__(result, wikitext_future.result())
+                # for the latest revision ORES had to wait for the revision id
+                if fetch_ores and not ores_future and result.revision_id:
+                    ores_future = executor.submit(self.__timed__, result, "ores", self.__fetch_ores__, result.revision_id)
+
+            if html_future:
+                result.html_markup = html_future.result()
+
+            if ores_future:
+                self.__apply_ores__(result, ores_future)
+
+        return result
+
+    @staticmethod
+    def __timed__(result: ArticleFetchResultV2, name: str, function, *args):
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            result.timings[name] = round(time.perf_counter() - start, 4)
+
+    @staticmethod
+    def __apply_wikitext__(result: ArticleFetchResultV2, data: Optional[Dict[str, Any]]):
+        if data is None:
+            result.found_in_wikipedia = False
+            return
+        result.revision_id = data["revision_id"]
+        result.page_id = data["page_id"]
+        result.revision_isodate = isoparse(data["timestamp"])
+        result.revision_timestamp = round(result.revision_isodate.timestamp())
+        result.wikitext = data["source"]
+
+    def __apply_ores__(self, result: ArticleFetchResultV2, ores_future: Future):
+        from src import app
+
+        try:
+            score = ores_future.result()
+        except (requests.RequestException, KeyError, ValueError) as e:
+            app.logger.error(f"ArticleFetcherV2: ORES request failed: {e}")
+            result.errors.append({"type": "ores", "error": type(e).__name__, "details": str(e)})
+            return
+        if score:
+            result.ores_quality_prediction = score["prediction"]
+            result.ores_details = score
+
+    def __fetch_latest__(self) -> Optional[Dict[str, Any]]:
+        """
+        wikitext and ids of the latest revision, None if the page was not found
+
+        This is needed to support e.g. https://en.wikipedia.org/wiki/Musk%C3%B6_naval_base or
+        https://en.wikipedia.org/wiki/GNU/Linux_naming_controversy
+        """
+        from src import app
+
+        url = f"{self.base_url}/page/{self.job.quoted_title}"
+        response = get_session().get(url, timeout=self.wikitext_timeout)
+        if response.status_code == 200:
+            data = response.json()
+            return {
+                "revision_id": int(data["latest"]["id"]),
+                "page_id": int(data["id"]),
+                "timestamp": data["latest"]["timestamp"],
+                "source": data["source"],
+            }
+        elif response.status_code == 404:
+            app.logger.error(f"Could not fetch page data because of 404. See {url}")
+            return None
+        else:
+            raise WikipediaApiFetchError(
+                f"Could not fetch page data. Got {response.status_code} from {url}"
+            )
+
+    def __fetch_revision__(self) -> Optional[Dict[str, Any]]:
+        """wikitext and ids of self.job.revision, None if the revision was not found"""
+        from src import app
+
+        url = f"{self.base_url}/revision/{self.job.revision}"
+        response = get_session().get(url, timeout=self.wikitext_timeout)
+        if response.status_code == 200:
+            app.logger.debug("returned article data with prop: ids|timestamp|content")
+            data = response.json()
+            return {
+                "revision_id": self.job.revision,
+                "page_id": int(data["page"]["id"]),
+                "timestamp": data["timestamp"],
+                "source": data["source"],
+            }
+        elif response.status_code == 404:
+            app.logger.error(f"Could not fetch revision data because of 404. See {url}")
+            return None
+        else:
+            raise WikipediaApiFetchError(
+                f"Could not fetch page data. Got {response.status_code} from {url}"
+            )
+
+    def __fetch_html__(self) -> Optional[str]:
+        """
+        Parsoid html of the page, None if not found
+
+        example request url for html source:
+        https://en.wikipedia.org/w/rest.php/v1/page/Earth/with_html
+        """
+        from src import app
+
+        url = f"{self.base_url}/page/{self.job.quoted_title}/with_html"
+        response = get_session().get(url, timeout=self.html_timeout)
+        if response.status_code == 200:
+            html: str = response.json()["html"]
+            return html
+        elif response.status_code == 404:
+            app.logger.error(f"Could not fetch page html because of 404. See {url}")
+            return None
+        else:
+            raise WikipediaApiFetchError(
+                f"Could not fetch page html. Got {response.status_code} from {url}"
+            )
+
+    def __fetch_ores__(self, revision_id: int) -> Optional[Dict[str, Any]]:
+        """
+        articlequality score of the revision via ORES API:
+          https://ores.wikimedia.org/v3/scores/enwiki/234234320/articlequality
+        We only support Wikipedia for now
+        """
+        from src import app
+
+        wiki_project = f"{self.job.lang}wiki"
+        response = get_session().get(
+            f"https://ores.wikimedia.org/v3/scores/{wiki_project}/{revision_id}/articlequality",
+            timeout=self.ores_timeout,
+        )
+        if response.status_code == 200:
+            data = response.json()
+            score: Dict[str, Any] = data[wiki_project]["scores"][str(revision_id)]["articlequality"]["score"]
+            return score
+        app.logger.debug(f"ORES error: {response.status_code}")
+        return None
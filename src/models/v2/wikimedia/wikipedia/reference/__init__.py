@@ -1,6 +1,7 @@
 import hashlib
 import logging
 import re
+from collections import OrderedDict
 from typing import Any, Dict, List, Optional, Union
 
 from bs4 import BeautifulSoup, Comment
@@ -10,6 +11,9 @@ from mwparserfromhell.wikicode import Wikicode  # type: ignore
 from config import regex_url_link_extraction
 from src.models.base.job import JobBaseModel
 from src.models.exceptions import MissingInformationError
+from src.models.v2.wikimedia.wikipedia.reference.extraction_memo_v2 import (
+    get_reference_memo,
+)
 from src.models.v2.wikimedia.wikipedia.reference.template import WikipediaTemplateV2
 from src.models.v2.wikimedia.wikipedia.url_v2 import WikipediaUrlV2
 from src.models.wikimedia.wikipedia.reference.enums import (
@@ -68,10 +72,11 @@ class WikipediaReferenceV2(JobBaseModel):
 
     @property
     def get_name(self) -> str:
-        if not self.soup:
-            raise MissingInformationError()
+        # references loaded from the extraction memo are not parsed until needed;
+        # they can be shared (AnalysisCacheV2), so the parse is not kept on them
+        soup = self.soup or BeautifulSoup(str(self.wikicode), "lxml")
         # Find the <ref> tag
-        ref_tag = self.soup.find("ref")
+        ref_tag = soup.find("ref")
         if ref_tag:
             # Extract the value of the 'name' attribute
             name = str(ref_tag.get("name"))  # type: ignore # see https://github.com/python/typeshed/issues/8356
@@ -189,9 +194,7 @@ class WikipediaReferenceV2(JobBaseModel):
         self.bare_urls = []
         urls = []
         for url in self.__find_bare_urls_outside_templates__():
-            url_object = WikipediaUrlV2(url=url)
-            url_object.extract()
-            urls.append(url_object)
+            urls.append(WikipediaUrlV2.from_url(url))
         self.bare_urls = urls
 
     # Disabled because it does not work. See todo
@@ -211,16 +214,12 @@ class WikipediaReferenceV2(JobBaseModel):
             for url in self.wikicode.ifilter_external_links():
                 # url: ExternalLink
                 # we throw away the title here
-                url = WikipediaUrlV2(url=str(url.url))
-                url.extract()
-                urls.add(url)
+                urls.add(WikipediaUrlV2.from_url(str(url.url)))
         else:
             for url in self.wikicode.contents.ifilter_external_links():
                 # url: ExternalLink
                 # we throw away the title here
-                url = WikipediaUrlV2(url=str(url.url))
-                url.extract()
-                urls.add(url)
+                urls.add(WikipediaUrlV2.from_url(str(url.url)))
         self.wikicoded_links = list(urls)
 
     def __extract_reference_urls__(self) -> None:
@@ -346,19 +345,8 @@ class WikipediaReferenceV2(JobBaseModel):
             self.is_named_reused_reference = True
         else:
             logger.debug(f"Extracting templates from: {self.wikicode}")
-            if isinstance(self.wikicode, Tag):
-                # contents is needed here to get a Wikicode object
-                raw_templates = self.wikicode.contents.ifilter_templates(
-                    matches=lambda x: not x.name.lstrip().startswith("#"),
-                    recursive=True,
-                )
-            else:
-                raw_templates = self.wikicode.ifilter_templates(
-                    matches=lambda x: not x.name.lstrip().startswith("#"),
-                    recursive=True,
-                )
             count = 0
-            for raw_template in raw_templates:
+            for raw_template in self.__filter_raw_templates__():
                 count += 1
                 self.templates.append(
                     WikipediaTemplateV2(
@@ -368,6 +356,19 @@ class WikipediaReferenceV2(JobBaseModel):
             if count == 0:
                 logger.debug("Found no templates")
 
+    def __filter_raw_templates__(self):
+        if isinstance(self.wikicode, Tag):
+            # contents is needed here to get a Wikicode object
+            return self.wikicode.contents.ifilter_templates(
+                matches=lambda x: not x.name.lstrip().startswith("#"),
+                recursive=True,
+            )
+        else:
+            return self.wikicode.ifilter_templates(
+                matches=lambda x: not x.name.lstrip().startswith("#"),
+                recursive=True,
+            )
+
     def __extract_and_clean_template_parameters__(self) -> None:
         """We extract all templates"""
         from src import app
@@ -380,16 +381,80 @@ class WikipediaReferenceV2(JobBaseModel):
             ]
 
     def extract_and_check(self) -> None:
-        """Helper method"""
+        """Helper method
+
+        Identical references are extracted once, see extraction_memo_v2"""
         from src import app
 
         app.logger.debug("==> extract_and_check")
+        memo = get_reference_memo()
+        key = ""
+        if memo is not None:
+            key = memo.key(self.wikicode_as_string, self.language_code, self.is_general_reference)
+            payload = memo.get(key)
+            if payload is not None and self.__load_extraction_payload__(payload):
+                self.__generate_reference_id__()
+                return
+
         self.__parse_xhtml__()
         self.__extract_xhtml_comments__()
         self.__extract_templates_and_parameters__()
         self.__extract_reference_urls__()
         self.__extract_unique_first_level_domains__()
         self.__generate_reference_id__()
+        if memo is not None and key:
+            memo.set(key, self.__get_extraction_payload__())
+
+    def __get_extraction_payload__(self) -> Dict[str, Any]:
+        """What extract_and_check() found, as json"""
+
+        def urls(urls_: Optional[List[WikipediaUrlV2]]) -> Optional[List[Dict[str, Any]]]:
+            if urls_ is None:
+                return None
+            return [url.get_dict for url in urls_]
+
+        return {
+            "is_named_reused_reference": self.is_named_reused_reference,
+            "templates": [
+                {"parameters": list(template.parameters.items()), "isbn": template.isbn}
+                for template in self.templates or []
+            ],
+            "template_urls": urls(self.template_urls),
+            "bare_urls": urls(self.bare_urls),
+            "wikicoded_links": urls(self.wikicoded_links),
+            "reference_urls": urls(self.reference_urls),
+            "unique_first_level_domains": self.unique_first_level_domains,
+        }
+
+    def __load_extraction_payload__(self, payload: Dict[str, Any]) -> bool:
+        """Sets what extract_and_check() would find from a payload of an identical reference.
+        Returns False if the payload does not fit this reference"""
+
+        def urls(dicts: Optional[List[Dict[str, Any]]]) -> Optional[List[WikipediaUrlV2]]:
+            if dicts is None:
+                return None
+            return [WikipediaUrlV2(**url) for url in dicts]
+
+        raw_templates = [] if payload["is_named_reused_reference"] else list(self.__filter_raw_templates__())
+        if len(raw_templates) != len(payload["templates"]):
+            return False
+        self.is_named_reused_reference = payload["is_named_reused_reference"]
+        self.templates = [
+            WikipediaTemplateV2(
+                raw_template=raw_template,
+                parameters=OrderedDict(template["parameters"]),
+                isbn=template["isbn"],
+                extraction_done=True,
+            )
+            for raw_template, template in zip(raw_templates, payload["templates"])
+        ]
+        self.extraction_done = True
+        self.template_urls = urls(payload["template_urls"])
+        self.bare_urls = urls(payload["bare_urls"])
+        self.wikicoded_links = urls(payload["wikicoded_links"])
+        self.reference_urls = urls(payload["reference_urls"])
+        self.unique_first_level_domains = payload["unique_first_level_domains"]
+        return True
 
     def __generate_reference_id__(self) -> None:
         """This generates an 8-char long id based on the md5 hash of
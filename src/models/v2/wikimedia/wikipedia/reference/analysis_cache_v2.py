@@ -0,0 +1,100 @@
+"""
+In-process cache of section analyses, used for incremental re-analysis of articles
+
+Most edits touch one level 2 section, so when a new revision of an article is
+analyzed the references of its unchanged sections can be taken from the analysis
+of an earlier revision instead of being extracted again.
+
+* sections are keyed by the md5 hash of their wikitext (including the heading),
+  so an unchanged section maps to the same references whatever the revision
+* in a changed section, references are looked up by their reference_id
+  (the md5 based id of their wikitext) and reused if the wikitext is identical
+
+Both maps are bounded LRUs. The cached WikipediaReferenceV2 objects are shared
+between analyses and must not be modified after extraction.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+
+import config
+
+DEFAULT_MAX_SECTIONS = 2000
+DEFAULT_MAX_REFERENCES = 50000
+
+
+class AnalysisCacheV2:
+    """see the module docstring"""
+
+    def __init__(
+        self,
+        max_sections: int = DEFAULT_MAX_SECTIONS,
+        max_references: int = DEFAULT_MAX_REFERENCES,
+    ):
+        self.max_sections = max_sections
+        self.max_references = max_references
+        self.sections: "OrderedDict[str, List[Any]]" = OrderedDict()
+        self.references: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def section_key(wikitext: str, language_code: str = "", testing: bool = False) -> str:
+        return hashlib.md5(f"{language_code}|{testing}|{wikitext}".encode()).hexdigest()
+
+    def get_section(self, key: str) -> Optional[List[Any]]:
+        """the references of an earlier analysis of the section, or None"""
+        with self.lock:
+            references = self.sections.get(key)
+            if references is not None:
+                self.sections.move_to_end(key)
+            return references
+
+    def set_section(self, key: str, references: List[Any]) -> None:
+        with self.lock:
+            self.sections[key] = list(references)
+            self.sections.move_to_end(key)
+            while len(self.sections) > self.max_sections:
+                self.sections.popitem(last=False)
+
+    @staticmethod
+    def reference_key(reference_id: str, section: str, is_general_reference: bool, language_code: str) -> Tuple:
+        return reference_id, section, is_general_reference, language_code
+
+    def get_reference(self, key: Tuple, wikitext: str) -> Optional[Any]:
+        """an earlier extracted reference with this key and exactly this wikitext, or None"""
+        with self.lock:
+            reference = self.references.get(key)
+            if reference is None or reference.wikicode_as_string != wikitext:
+                return None
+            self.references.move_to_end(key)
+            return reference
+
+    def set_reference(self, key: Tuple, reference: Any) -> None:
+        with self.lock:
+            self.references[key] = reference
+            self.references.move_to_end(key)
+            while len(self.references) > self.max_references:
+                self.references.popitem(last=False)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.sections.clear()
+            self.references.clear()
+
+
+__analysis_cache: Optional[AnalysisCacheV2] = None
+__analysis_cache_lock = threading.Lock()
+
+
+def get_analysis_cache() -> AnalysisCacheV2:
+    """the analysis cache of this process, sized from config.py"""
+    global __analysis_cache
+    if __analysis_cache is None:
+        with __analysis_cache_lock:
+            if __analysis_cache is None:
+                __analysis_cache = AnalysisCacheV2(
+                    max_sections=getattr(config, "analysis_cache_max_sections", DEFAULT_MAX_SECTIONS),
+                    max_references=getattr(config, "analysis_cache_max_references", DEFAULT_MAX_REFERENCES),
+                )
+    return __analysis_cache
@@ -0,0 +1,114 @@
+"""
+Content-addressed memoization of reference extraction
+
+The same citation (e.g. a {{cite web}} of a popular source) appears in many
+articles, and every occurrence used to go through the full extraction: a
+BeautifulSoup parse, template parameter cleaning and url parsing with fld lookups.
+
+WikipediaReferenceV2.extract_and_check() stores what it extracted (templates,
+urls, first level domains) as a json payload keyed by the md5 hash of the
+reference wikitext, and loads it from there for identical references:
+* in a bounded in-process LRU (reference_memo_size in config.py, 0 disables)
+* optionally in the cache backend, shared by all workers
+  (reference_memo_persistent in config.py, needs the <iari_cache_dir>reference_extractions/ directory)
+
+Payloads are copied into new objects on every hit, so references never share state.
+"""
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = "reference_extractions"
+# bump when the extraction or the payload changes, to ignore older payloads
+VERSION = 1
+DEFAULT_SIZE = 100000
+
+
+class ReferenceExtractionMemoV2:
+    """see the module docstring"""
+
+    def __init__(self, size: int = DEFAULT_SIZE, persistent: bool = False, backend: Optional[Any] = None):
+        self.size = size
+        self.persistent = persistent
+        self.backend = backend
+        self.payloads: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(wikitext: str, language_code: str, is_general_reference: bool) -> str:
+        return hashlib.md5(
+            f"{VERSION}|{language_code}|{is_general_reference}|{wikitext}".encode()
+        ).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            payload = self.payloads.get(key)
+            if payload is not None:
+                self.payloads.move_to_end(key)
+                self.hits += 1
+                return payload
+        if self.persistent:
+            stored: Optional[Dict[str, Any]] = self.__get_backend__().get(NAMESPACE, key)
+            if stored is not None:
+                self.__remember__(key, stored)
+                with self.lock:
+                    self.hits += 1
+                return stored
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, payload: Dict[str, Any]) -> None:
+        self.__remember__(key, payload)
+        if self.persistent:
+            try:
+                self.__get_backend__().set(NAMESPACE, key, payload)
+            except OSError as e:
+                logger.warning(f"could not store reference extraction {key}: {e}")
+
+    def __remember__(self, key: str, payload: Dict[str, Any]) -> None:
+        with self.lock:
+            self.payloads[key] = payload
+            self.payloads.move_to_end(key)
+            while len(self.payloads) > self.size:
+                self.payloads.popitem(last=False)
+
+    def __get_backend__(self):
+        if self.backend is None:
+            from src.models.cache import get_cache_backend
+
+            self.backend = get_cache_backend()
+        return self.backend
+
+    def clear(self) -> None:
+        with self.lock:
+            self.payloads.clear()
+            self.hits = self.misses = 0
+
+
+__reference_memo: Optional[ReferenceExtractionMemoV2] = None
+__reference_memo_lock = threading.Lock()
+
+
+def get_reference_memo() -> Optional[ReferenceExtractionMemoV2]:
+    """the memo of this process, sized from config.py, or None if disabled"""
+    global __reference_memo
+    size = getattr(config, "reference_memo_size", DEFAULT_SIZE)
+    if not size:
+        return None
+    if __reference_memo is None:
+        with __reference_memo_lock:
+            if __reference_memo is None:
+                __reference_memo = ReferenceExtractionMemoV2(
+                    size=size,
+                    persistent=getattr(config, "reference_memo_persistent", False),
+                )
+    return __reference_memo
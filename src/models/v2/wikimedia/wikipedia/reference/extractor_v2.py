@@ -3,14 +3,16 @@ from copy import deepcopy
 from typing import Dict, List, Optional
 
 import mwparserfromhell  # type: ignore
-from bs4 import BeautifulSoup
 from mwparserfromhell.wikicode import Wikicode  # type: ignore
-from iarilib.parse_utils import extract_cite_refs
+from iarilib.html_document import WikiHtmlDocument
 
 from src.models.base import WariBaseModel  # TODO change to IariBaseModel
 from src.models.exceptions import MissingInformationError
 from src.models.v2.job.article_job_v2 import ArticleJobV2
 from src.models.v2.wikimedia.wikipedia.reference import WikipediaReferenceV2
+from src.models.v2.wikimedia.wikipedia.reference.analysis_cache_v2 import (
+    get_analysis_cache,
+)
 from src.models.v2.wikimedia.wikipedia.section_v2 import WikipediaSectionV2
 from src.models.v2.wikimedia.wikipedia.url_v2 import WikipediaUrlV2
 
@@ -25,6 +27,11 @@ class WikipediaReferenceExtractorV2(WariBaseModel):
     * first we get the wikicode
     * we parse it with mwparser from hell
     * we extract the references -> WikipediaReference
+
+    With incremental=True, sections whose wikitext was analyzed before
+    (e.g. in an earlier revision of the article) reuse the references from that
+    analysis, and changed sections reuse the references they still contain,
+    see analysis_cache_v2. The result is the same as that of a full extraction.
     """
 
     language_code: str = ""
@@ -35,6 +42,7 @@ class WikipediaReferenceExtractorV2(WariBaseModel):
     wikitext: str
     wikicode: Wikicode = None  # wiki object tree parsed from wikitext
     html_source: Optional[str] = ""  # used to extract citeref reference data
+    html_document: Optional[WikiHtmlDocument] = None  # html_source, if already parsed by the caller
 
     references: Optional[List[WikipediaReferenceV2]] = None
     # cite_page_refs: Optional[List] = []
@@ -43,6 +51,8 @@ class WikipediaReferenceExtractorV2(WariBaseModel):
     # wikibase: Wikibase # ??? What is this? TODO
 
     testing: bool = False
+    incremental: bool = False
+    reused_sections: int = 0  # number of sections taken from the analysis cache
 
     class Config:  # dead: disable
         arbitrary_types_allowed = True  # dead: disable
@@ -214,6 +224,7 @@ class WikipediaReferenceExtractorV2(WariBaseModel):
         from src import app
 
         self.sections = []
+        self.reused_sections = 0
         app.logger.debug("__extract_sections__: running")
         if not self.wikicode:
             self.__parse_wikitext__()
@@ -228,28 +239,41 @@ class WikipediaReferenceExtractorV2(WariBaseModel):
             app.logger.debug("No level 2 sections detected, creating root section")
             # console.print(self.wikicode)
             # exit()
-            mw_section = WikipediaSectionV2(
-                # We add the whole article to the root section
-                wikicode=self.wikicode,
-                testing=self.testing,
-                language_code=self.language_code,
-                job=self.job,
-            )
-            mw_section.extract()
-            self.sections.append(mw_section)
+            # We add the whole article to the root section
+            self.sections.append(self.__extract_section__(wikicode=self.wikicode))
 
         else:
             self.__extract_root_section__()
             for section in sections:
-                mw_section = WikipediaSectionV2(
-                    wikicode=section,
-                    testing=self.testing,
-                    language_code=self.language_code,
-                    job=self.job,
-                )
-                mw_section.extract()
-                self.sections.append(mw_section)
+                self.sections.append(self.__extract_section__(wikicode=section))
         app.logger.debug(f"Number of sections found: {len(self.sections)}")
+        if self.incremental:
+            app.logger.info(f"Reused {self.reused_sections} of {len(self.sections)} sections")
+
+    def __extract_section__(self, wikicode: Optional[Wikicode] = None, wikitext: str = "") -> WikipediaSectionV2:
+        mw_section = WikipediaSectionV2(
+            wikicode=wikicode,
+            wikitext=wikitext,
+            testing=self.testing,
+            language_code=self.language_code,
+            job=self.job,
+        )
+        if not self.incremental:
+            mw_section.extract()
+            return mw_section
+
+        analysis_cache = get_analysis_cache()
+        mw_section.__populate_wikitext__()
+        key = analysis_cache.section_key(mw_section.wikitext, self.language_code, self.testing)
+        references = analysis_cache.get_section(key)
+        if references is not None:
+            mw_section.references = list(references)
+            self.reused_sections += 1
+        else:
+            mw_section.analysis_cache = analysis_cache
+            mw_section.extract()
+            analysis_cache.set_section(key, mw_section.references)
+        return mw_section
 
     def __parse_wikitext__(self):
         from src import app
@@ -269,8 +293,11 @@ class WikipediaReferenceExtractorV2(WariBaseModel):
         # def is_citeref_link(css_class):
         #     return css_class is None  # and len(css_class) == 6
 
-        if self.html_source:
-            self.cite_page_refs = extract_cite_refs(self.html_source)
+        if self.html_source and not self.html_document:
+            self.html_document = WikiHtmlDocument(self.html_source)
+
+        if self.html_document:
+            self.cite_page_refs = self.html_document.cite_refs()
 
     @property
     def reference_ids(self) -> List[str]:
@@ -306,14 +333,7 @@ class WikipediaReferenceExtractorV2(WariBaseModel):
             )
             # console.print(root_section_wikitext)
             # exit()
-            mw_section = WikipediaSectionV2(
-                wikitext=root_section_wikitext,
-                testing=self.testing,
-                language_code=self.language_code,
-                job=self.job,
-            )
-            mw_section.extract()
-            self.sections.append(mw_section)
+            self.sections.append(self.__extract_section__(wikitext=root_section_wikitext))
         else:
             logger.debug(
                 "Special case, wikitext started with a "
@@ -1,16 +1,45 @@
 import logging
 import re
 from collections import OrderedDict
+from functools import cached_property, lru_cache
 from typing import Any, Dict, List
 
 from mwparserfromhell.nodes import Template  # type: ignore
-from pydantic import BaseModel, validate_arguments
+from pydantic import BaseModel
 
 from src.models.exceptions import MissingInformationError
 from src.models.v2.wikimedia.wikipedia.url_v2 import WikipediaUrlV2
 
 logger = logging.getLogger(__name__)
 
+# template parameters holding urls, after __fix_key_names_in_template_parameters__
+URL_PARAMETERS = ["url", "archive_url", "conference_url", "transcript_url", "chapter_url"]
+
+# matches the text on both sides of a comment, see __remove_comments__
+COMMENT_REGEX = re.compile(r"(.*)<!--.*-->(.*)|(.*)")
+
+PARAMETER_ALIASES = {
+    "accessdate": "access_date",
+    "archiveurl": "archive_url",
+    "archivedate": "archive_date",
+    "ISBN": "isbn",
+    "authorlink1": "author_link1",
+    "authorlink2": "author_link2",
+    "authorlink3": "author_link3",
+    "authorlink4": "author_link4",
+    "authorlink5": "author_link5",
+    "authorurl": "author_link",
+}
+
+
+@lru_cache(maxsize=4096)
+def normalize_parameter_name(name: str) -> str:
+    """The parameter name after __fix_class_key__, __fix_aliases__ and __fix_dash__"""
+    if name == "class":
+        name = "news_class"
+    name = PARAMETER_ALIASES.get(name, name)
+    return name.replace("-", "_")
+
 
 class WikipediaTemplateV2(BaseModel):
 
@@ -48,48 +77,18 @@ class WikipediaTemplateV2(BaseModel):
             if "isbn" in self.parameters:
                 self.isbn = str(self.parameters["isbn"])
 
-    @property
+    @cached_property
     def urls(self) -> List[WikipediaUrlV2]:
-        """This returns a list"""
+        """This returns a list, computed once per extraction (do not modify it)"""
         # if not self.extracted:
         #     raise MissingInformationError("this template has not been extracted")
         urls = set()
-
-        if "url" in self.parameters:
-            url = self.parameters["url"]
-            if url:
-                logger.debug(f"url: {url}")
-                url = WikipediaUrlV2(url=url)
-                url.extract()
-                urls.add(url)
-
-        if "archive_url" in self.parameters:
-            url = self.parameters["archive_url"]
-            if url:
-                url = WikipediaUrlV2(url=url)
-                url.extract()
-                urls.add(url)
-
-        if "conference_url" in self.parameters:
-            url = self.parameters["conference_url"]
-            if url:
-                url = WikipediaUrlV2(url=url)
-                url.extract()
-                urls.add(url)
-
-        if "transcript_url" in self.parameters:
-            url = self.parameters["transcript_url"]
-            if url:
-                url = WikipediaUrlV2(url=url)
-                url.extract()
-                urls.add(url)
-
-        if "chapter_url" in self.parameters:
-            url = self.parameters["chapter_url"]
-            if url:
-                url = WikipediaUrlV2(url=url)
-                url.extract()
-                urls.add(url)
+        for parameter in URL_PARAMETERS:
+            if parameter in self.parameters:
+                url = self.parameters[parameter]
+                if url:
+                    logger.debug(f"{parameter}: {url}")
+                    urls.add(WikipediaUrlV2.from_url(url))
         return list(urls)
 
     @property
@@ -108,11 +107,13 @@ class WikipediaTemplateV2(BaseModel):
     def __remove_comments__(text: str):
         """Remove html comments <!-- -->
         Copyright pywikibot authors"""
+        if "<!--" not in text:
+            # what the regex below gives for text without comments: the lines joined
+            return text.replace("\n", "").strip()
         # This regex tries to match text on both sides of
         # the comment and join them or in the case no comment is found
         # just return the whole thing.
-        regex = re.compile(r"(.*)<!--.*-->(.*)|(.*)")
-        matches = re.findall(pattern=regex, string=text)
+        matches = COMMENT_REGEX.findall(text)
         if matches:
             # print(match.groups())
             string = ""
@@ -166,7 +167,8 @@ class WikipediaTemplateV2(BaseModel):
         """
         from src import app
 
-        if not self.raw_template:
+        # "is None" because the truth value of a node renders it to a string
+        if self.raw_template is None:
             raise MissingInformationError("self.raw_template was empty")
 
         # This has been deprecated by Dennis
@@ -177,16 +179,13 @@ class WikipediaTemplateV2(BaseModel):
         #     text = removeDisabledParts(text)
 
         # Dennis removed the loop here during OOP-ification
-        app.logger.debug(f"Working on templates: {self.raw_template}")
+        app.logger.debug("Working on templates: %s", self.raw_template)
         for parameter in self.raw_template.params:
             value = str(parameter.value)  # mwpfh needs upcast to str
             if strip:
                 key = parameter.name.strip()
-                value = (
-                    parameter.value.strip()
-                    if self.__explicit__(parameter)
-                    else str(parameter.value)
-                )
+                if self.__explicit__(parameter):
+                    value = value.strip()
             else:
                 key = str(parameter.name)
             # Remove comments added by Dennis
@@ -204,6 +203,8 @@ class WikipediaTemplateV2(BaseModel):
         self.__add_template_name_to_parameters__()
         self.__rename_one_to_first_parameter__()
         self.__extract_isbn__()
+        # the urls depend on the parameters
+        self.__dict__.pop("urls", None)
         self.extraction_done = True
         # self.__extract_first_level_domains_from_urls__()
 
@@ -229,18 +230,7 @@ class WikipediaTemplateV2(BaseModel):
 
     def __fix_aliases__(self):
         """Replace alias keys"""
-        replacements = {
-            "accessdate": "access_date",
-            "archiveurl": "archive_url",
-            "archivedate": "archive_date",
-            "ISBN": "isbn",
-            "authorlink1": "author_link1",
-            "authorlink2": "author_link2",
-            "authorlink3": "author_link3",
-            "authorlink4": "author_link4",
-            "authorlink5": "author_link5",
-            "authorurl": "author_link",
-        }
+        replacements = PARAMETER_ALIASES
         myDict = OrderedDict()
         for key in self.parameters:
             replacement_made = False
@@ -264,12 +254,22 @@ class WikipediaTemplateV2(BaseModel):
                 myDict[key] = self.parameters[key]
         self.parameters = myDict
 
-    @validate_arguments
     def __fix_key_names_in_template_parameters__(self):
-        """This avoids parse errors"""
-        self.__fix_class_key__()
-        self.__fix_aliases__()
-        self.__fix_dash__()
+        """This avoids parse errors
+
+        Renames the keys in one pass with normalize_parameter_name. If two keys end up
+        with the same name, the renames are done step by step as before, because
+        then the value that is kept depends on the order of the steps"""
+        parameters: OrderedDict = OrderedDict()
+        for key, value in self.parameters.items():
+            name = normalize_parameter_name(key)
+            if name in parameters:
+                self.__fix_class_key__()
+                self.__fix_aliases__()
+                self.__fix_dash__()
+                return
+            parameters[name] = value
+        self.parameters = parameters
 
     def __rename_one_to_first_parameter__(self):
         if "1" in self.parameters:
@@ -1,8 +1,10 @@
+import hashlib
 import logging
 import re
-from typing import List, Optional
+from typing import Any, List, Optional, Union
 
 import mwparserfromhell  # type: ignore
+from mwparserfromhell.nodes import Tag  # type: ignore
 from mwparserfromhell.wikicode import Wikicode  # type: ignore
 from pydantic import BaseModel
 
@@ -22,6 +24,8 @@ class WikipediaSectionV2(BaseModel):
     wikitext: str = ""
     references: List[WikipediaReferenceV2] = []
     job: ArticleJobV2
+    # AnalysisCacheV2 to reuse earlier extracted references from, see extractor_v2
+    analysis_cache: Optional[Any] = None
 
     class Config:  # dead: disable
         arbitrary_types_allowed = True  # dead: disable
@@ -95,15 +99,9 @@ class WikipediaSectionV2(BaseModel):
                 logger.debug("Appending line with star to references")
                 # We don't know what the line contains besides a start
                 # but we assume it is a reference
-                reference = WikipediaReferenceV2(
-                    wikicode=parsed_line,
-                    testing=self.testing,
-                    language_code=self.language_code,
-                    is_general_reference=True,
-                    section=self.name,
+                self.references.append(
+                    self.__extract_reference__(wikicode=parsed_line, is_general_reference=True)
                 )
-                reference.extract_and_check()
-                self.references.append(reference)
 
     def __extract_all_footnote_references__(self):
         """This extracts all <ref>...</ref> from self.wikicode"""
@@ -130,16 +128,34 @@ class WikipediaSectionV2(BaseModel):
             app.logger.debug(f"extracting ref# {base_ref_counter}")
             # app.logger.debug(f"### ### ###")
 
-            reference = WikipediaReferenceV2(
-                wikicode=ref,
-                # wikibase=self.wikibase,
-                testing=self.testing,
-                language_code=self.language_code,
-                section=self.name,
+            self.references.append(self.__extract_reference__(wikicode=ref))
+
+    def __extract_reference__(
+        self, wikicode: Union[Tag, Wikicode], is_general_reference: bool = False
+    ) -> WikipediaReferenceV2:
+        """Extracts a reference, or reuses the one extracted earlier from the same wikitext"""
+        key = wikitext = None
+        if self.analysis_cache is not None:
+            wikitext = str(wikicode)
+            reference_id = hashlib.md5(wikitext.encode()).hexdigest()[:8]
+            key = self.analysis_cache.reference_key(
+                reference_id, self.name, is_general_reference, self.language_code
             )
-
-            reference.extract_and_check()
-            self.references.append(reference)
+            cached: Optional[WikipediaReferenceV2] = self.analysis_cache.get_reference(key, wikitext)
+            if cached is not None:
+                return cached
+
+        reference = WikipediaReferenceV2(
+            wikicode=wikicode,
+            testing=self.testing,
+            language_code=self.language_code,
+            is_general_reference=is_general_reference,
+            section=self.name,
+        )
+        reference.extract_and_check()
+        if key and self.analysis_cache is not None:
+            self.analysis_cache.set_reference(key, reference)
+        return reference
 
     def extract(self):
         if not self.wikicode and not self.wikitext:
@@ -1,19 +1,41 @@
 import logging
 import re
+from functools import lru_cache
 from ipaddress import ip_address
-from typing import Any, Dict, Optional
-from urllib.parse import urlparse
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse, urlsplit
 
 import validators  # type: ignore
 from pydantic import BaseModel
 from tld import get_fld
 from tld.exceptions import TldBadUrl, TldDomainNotFound
 
+import config
 from src.models.wikimedia.wikipedia.enums import MalformedUrlError
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=getattr(config, "fld_cache_size", 100000))
+def resolve_first_level_domain(netloc: str) -> Tuple[str, bool]:
+    """
+    (first level domain, whether it is an ip address) of urls with this netloc,
+    ("", False) if there is none.
+    The public suffix lookup only depends on the host, so the results are memoized per netloc
+    """
+    try:
+        # get_fld raises rather than returning None (fail_silently is off)
+        return get_fld(f"//{netloc}") or "", False
+    except (TldBadUrl, TldDomainNotFound):
+        try:
+            ip = ip_address(netloc)
+            logger.debug(f"found IP: {ip}")
+            return str(ip), True
+        except ValueError:
+            # Not a valid IPv4 or IPv6 address.
+            return "", False
+
+
 class WikipediaUrlV2(BaseModel):
     """models a Wikipedia URL
 
@@ -47,6 +69,13 @@ class WikipediaUrlV2(BaseModel):
             url.update({"malformed_url_details": self.malformed_url_details.value})
         return url
 
+    @classmethod
+    def from_url(cls, url: str) -> "WikipediaUrlV2":
+        """An extracted url"""
+        url_object = cls(url=str(url))
+        url_object.extract()
+        return url_object
+
     def __hash__(self):
         return hash(self.url)
 
@@ -68,21 +97,17 @@ class WikipediaUrlV2(BaseModel):
         from src import app
 
         app.logger.debug("==> __extract_first_level_domain__")
-        try:
-            self.__get_fld__()
-        except (TldBadUrl, TldDomainNotFound):
-            try:
-                ip = ip_address(self.netloc)
-                logger.debug(f"found IP: {ip}")
-                self.first_level_domain = str(ip)
-                self.fld_is_ip = True
-            except ValueError:
-                # Not a valid IPv4 or IPv6 address.
-                message = f"Could not extract fld from {self.url}"
-                logger.warning(message)
-                # self.__log_to_file__(
-                #     message=str(message), file_name="url_exceptions.log"
-                # )
+        netloc = urlsplit(self.archived_url or self.url).netloc
+        first_level_domain, fld_is_ip = resolve_first_level_domain(netloc)
+        if first_level_domain:
+            self.first_level_domain = first_level_domain
+            self.fld_is_ip = fld_is_ip
+        else:
+            message = f"Could not extract fld from {self.url}"
+            logger.warning(message)
+            # self.__log_to_file__(
+            #     message=str(message), file_name="url_exceptions.log"
+            # )
 
     def __check_scheme__(self):
         """Check for one of 4 know schemes that Wikipedia accepts"""
@@ -146,17 +171,6 @@ class WikipediaUrlV2(BaseModel):
             #     message=str(message), file_name="url_exceptions.log"
             # )
 
-    def __get_fld__(self):
-        # logger.debug("==> __get_fld__")
-        if self.archived_url:
-            # logger.debug(f"Trying to get FLD from {self.archived_url}")
-            fld = get_fld(self.archived_url)
-        else:
-            # logger.debug(f"Trying to get FLD from {self.url}")
-            fld = get_fld(self.url)
-        # logger.debug(f"Found FLD: {fld}")
-        self.first_level_domain = fld
-
     def extract(self):
         from src import app
 
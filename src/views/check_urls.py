@@ -1,4 +1,3 @@
-import asyncio
 import logging
 
 # import hashlib
@@ -9,21 +8,27 @@ import os
 from datetime import datetime
 from typing import Any, Dict, Optional
 
-import aiohttp
-import requests
 from flask_restful import Resource, abort  # type: ignore
 from marshmallow import Schema
 
+from src.constants.constants import UrlStatusMethod
+from src.helpers.cache_utils import CacheType, get_cache, set_cache
+from src.helpers.url_status_engine import UrlStatusEngine
 from src.models.api.job.check_urls_job import UrlsJob
 from src.models.api.schema.check_urls_schema import UrlsSchema
 
 # from src.models.exceptions import MissingInformationError
+from src.models.exceptions import UnknownValueError
 # from src.models.file_io.url_file_io import UrlFileIo
 # from src.models.identifiers_checking.url import Url
 from src.views.statistics.write_view import StatisticsWriteView
 
 logger = logging.getLogger(__name__)
 
+# cache variety of the per-url results of /check-urls, { "status_code": ..., "error": ..., "error_details": ... };
+# not UrlStatusMethod.IABOT.value, which StatusUtils.get_status_results keys its own results by
+CHECK_URLS_CACHE_VARIETY = "CHECK_URLS_IABOT"
+
 
 class CheckUrls(StatisticsWriteView):
     """
@@ -105,27 +110,33 @@ class CheckUrls(StatisticsWriteView):
         fetches status codes of urls in self.url_dict
         Currently uses testdeadlink API of IABot
 
+        urls with a status in the cache (CacheType.status) are served from there
+        unless refresh is set; the others are checked concurrently by UrlStatusEngine
+        and their results are cached, but for those with an error, which may be transient
+        (the cache of the flat backend does not expire)
+
         returns { "error": <error text here>} if error:
         - TESTDEADLINK_KEY is missing  # TODO NB: this should raise an error and cause a fatal return
         """
         from src import app
 
-        # process urls_list into skipped, cached, and search categories
+        # process urls_list into cached and search categories
         url_result_dict = {}
         search_urls = []
 
-        for url in self.urls_list:  # basically, the "sorting hat" for urls
-
-            # Check cache of url ::
-            # ### TODO skipping for now...must implement for real!
-            # self.__read_from_cache__()
-            #         if self.io.data:
-            #             - add url to "cached_urls" list (useless?)
-            #             - url_results_dict[url] = <cached data>
+        for url in dict.fromkeys(self.urls_list):  # basically, the "sorting hat" for urls
+            cached = None if self.job.refresh else self.__get_cached_status__(url)
+            if cached is not None:
+                url_result_dict[url] = cached
+            else:
+                search_urls.append(url)
 
-            search_urls.append(url)
+        app.logger.debug(
+            f"CheckUrls::__check_urls__: {len(url_result_dict)} cached, {len(search_urls)} to check"
+        )
+        if not search_urls:
+            return {"results": url_result_dict}
 
-        # urls_response = self.__check_urls_with_iabot_async__(search_urls)
         urls_response = self.__check_urls_with_iabot__(search_urls)
         # urls_response assumed to be:
         # {
@@ -133,32 +144,64 @@ class CheckUrls(StatisticsWriteView):
         #   "errors"? : [ list of errors ]
         # }
 
-        if "errors" in urls_response:
+        iabot_results = urls_response.get("results", {})
+        if "errors" in urls_response and not iabot_results and not url_result_dict:
             return {"errors": urls_response["errors"]}
 
-        if "results" in urls_response:
-            # process iabot_response: move url status codes from results into url_result_dict
-            for key, value in urls_response["results"].items():
-                # save status of url in result_dict
-                if key != "errors":
-                    url_result_dict[key] = {
-                        "status_code": value,
-                    }
-
-            # add any error info to urls in url_result_dict
-            if "errors" in urls_response["results"]:
-                for url_key, value in urls_response["results"]["errors"].items():
-                    # add error details to url entry
-                    if url_key not in url_result_dict:
-                        url_result_dict[url_key] = {}  # TODO: better syntax here?
-                    url_result_dict[url_key]["error"] = True
-                    url_result_dict[url_key]["error_details"] = value
+        new_result_dict = {}
+        # process iabot_response: move url status codes from results into new_result_dict
+        for key, value in iabot_results.items():
+            # save status of url in result_dict
+            if key != "errors":
+                new_result_dict[key] = {
+                    "status_code": value,
+                }
+
+        # add any error info to urls in new_result_dict
+        if "errors" in iabot_results:
+            for url_key, value in iabot_results["errors"].items():
+                # add error details to url entry
+                if url_key not in new_result_dict:
+                    new_result_dict[url_key] = {}  # TODO: better syntax here?
+                new_result_dict[url_key]["error"] = True
+                new_result_dict[url_key]["error_details"] = value
+
+        for url, result in new_result_dict.items():
+            if "error" not in result:
+                self.__set_cached_status__(url, result)
+        url_result_dict.update(new_result_dict)
+
+        # and return dict, with status codes and errors, keyed by urls
+        results = {"results": url_result_dict}
+        if "errors" in urls_response:
+            # some chunks failed, their urls are missing from results
+            results["errors"] = urls_response["errors"]
+        return results
 
-            # and return dict, with status codes and errors, keyed by urls
-            return {"results": url_result_dict}
+    def __get_cached_status__(self, url) -> Optional[Dict[str, Any]]:
+        try:
+            cached: Optional[Dict[str, Any]] = get_cache(url, CacheType.status, CHECK_URLS_CACHE_VARIETY)
+            return cached
+        except UnknownValueError as e:
+            logger.warning(f"CheckUrls: not using status cache: {e}")
+            return None
+
+    def __set_cached_status__(self, url, result: Dict[str, Any]):
+        # We skip writes during testing
+        if self.job is None or self.job.testing:
+            return
+        try:
+            set_cache(url, CacheType.status, CHECK_URLS_CACHE_VARIETY, result)
+        except UnknownValueError as e:
+            logger.warning(f"CheckUrls: not caching status: {e}")
 
     def __check_urls_with_iabot__(self, search_urls):
         """
+        checks search_urls with the testdeadlink API of IABot (see UrlStatusEngine)
+        and returns the results like those of a single testdeadlink call:
+        { "results": { <url>: <status code>, ..., "errors": { <url>: <error>, ... } } }
+        plus "errors": [ ... ] if any chunk failed
+
         Example iabot response:
         {
             "results": {
@@ -182,7 +225,6 @@ class CheckUrls(StatisticsWriteView):
         }
         """
 
-        # TODO TODO chunk urls into 100 unit chinks, and process each chink till done.
         # error if no authcode available
         testdeadlink_api_key = self.__get_testdeadlink_api_key__()
         if not testdeadlink_api_key:
@@ -194,97 +236,34 @@ class CheckUrls(StatisticsWriteView):
                 "errors": [{"message": "Missing TESTDEADLINK_KEY environment variable"}]
             }
 
-        # url_encode urls parameter - params cannot have any url-specific characters like "&", etc.
-        import urllib.parse
-
-        search_urls_param = urllib.parse.quote("\n".join(search_urls))
-
-        # make the iabot call and respond accordingly
-        headers = {
-            "Content-Type": "application/x-www-form-urlencoded",
-        }
-        # TODO there should really be a "timeout" parameter sent to iabot/testdeadlink, but currently not supported
-        data = f"urls={search_urls_param}&authcode={testdeadlink_api_key}&returncodes=1"
-
-        response = requests.post(
-            "https://iabot-api.archive.org/testdeadlink.php",
-            headers=headers,
-            data=data,
+        # chunking, concurrency limits and retries are handled by the engine
+        engine_results = UrlStatusEngine.get().check_urls(
+            search_urls, UrlStatusMethod.IABOT.value, archive_status=False
         )
 
-        # process the results
-        if response.status_code == 200:
-            data = response.json()
-            if "results" in data:
-                # array of results
-                return {"results": data["results"]}
-            else:
-                # TODO: raise an error here - should have results section
-                return {"results": {}}
-
-        else:
-            logger.error(f"iabot error response: {response}")
-            return {
-                "errors": [
-                    {
-                        "status_code": response.status_code,
-                        "message": f"Non 200 status code from testdeadlink call ({response.status_code})",
-                        # "details": response,
+        merged = {"results": {"errors": {}}}
+        errors = {}
+        for url, result in engine_results.items():
+            if "error" in result:
+                # the testdeadlink call for the chunk of this url failed
+                message = result["error"]["message"]
+                if message not in errors:
+                    errors[message] = {
+                        "status_code": result["error"]["status_code"],
+                        "message": message,
+                        "urls": [],
                     }
-                ]
-            }
-
-    # Function to check the status of a single URL asynchronously
-    async def __check_url_status__(self, url, session):
-        try:
-            async with session.get(url) as response:
-                # ### return f"{url} - Status Code: {response.status}"
-                return {url: {"status_code": response.status}}
-        except aiohttp.ClientError as e:
-            # ### return f"{url} - Error: {str(e)}"
-            return {url: {"status_code": 0, "error": True, "error_details": str(e)}}
-
-    # Function to check the status of multiple URLs asynchronously
-    async def __check_multiple_urls__(self, urls):
-        async with aiohttp.ClientSession() as session:
-            tasks = [self.__check_url_status__(url, session) for url in urls]
-            return await asyncio.gather(*tasks)
-
-    # Create an event loop and call the function to check multiple URLs asynchronously
-    def __check_urls_with_iabot_async__(self, urls):
-
-        testdeadlink_api_key = self.__get_testdeadlink_api_key__()
-        if not testdeadlink_api_key:
-            # ### raise MissingInformationError("missing TESTDEADLINK_KEY")
-            logger.warning(
-                "Missing TESTDEADLINK environment variable, skipping IABot check"
-            )
-            return {
-                "errors": [{"message": "Missing TESTDEADLINK_KEY environment variable"}]
-            }
-
-        # ??    loop = asyncio.get_event_loop()
-        # ??    loop.run_until_complete(main()), or,
-        # loop.run_until_complete(__check_urls_with_iabot_async__()) or
-        # loop.run_until_complete( self.__check_multiple_urls__(urls) )
-
-        url_statuses = self.__check_multiple_urls__(urls)
-        # statuses are a mini dict: { <url>
-        # Print the status of each URL
-        print("RETURN STATUSES FROM __check_urls_with_iabot_async__")
-        for status in url_statuses:
-            print(status)
-
-        # place the info of each url in urls_duct
-        urls_dict = {}
-        for status in url_statuses:
-            urls_dict.update(status)  # status is a tiny dict: { <url> : { ... } }
-
-        return urls_dict
-
-    # if __name__ == "__main__":
-    #     loop = asyncio.get_event_loop()
-    #     loop.run_until_complete(main())
+                errors[message]["urls"].append(url)
+                continue
+            merged["results"][url] = result["status_code"]
+            if result["status_code_error_details"]:
+                merged["results"]["errors"][url] = result["status_code_error_details"]
+
+        if not merged["results"]["errors"]:
+            del merged["results"]["errors"]
+        if errors:
+            merged["errors"] = list(errors.values())
+        return merged
 
     def __get_testdeadlink_api_key__(self):
         return os.getenv("TESTDEADLINK_KEY") if os.getenv("TESTDEADLINK_KEY") else ""
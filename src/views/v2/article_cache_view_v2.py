@@ -4,6 +4,7 @@ from datetime import datetime
 from typing import Any, Optional, Tuple
 import traceback
 
+from src.helpers.etags import make_etag, not_modified, with_etag
 from src.models.exceptions import MissingInformationError, WikipediaApiFetchError
 
 from src.models.v2.file_io.article_cache_file_io_v2 import ArticleCacheFileIoV2
@@ -39,6 +40,12 @@ class ArticleCacheV2(StatisticsViewV2):
 
         self.__setup_io__()  # defined right above!
 
+        # cached analyses never change, a patron holding this one gets a 304 without reading it
+        etag = make_etag(self.job.iari_id)
+        response = not_modified(etag)
+        if response:
+            return response
+
         self.__read_from_cache__()  # inherited from StatisticsWriteView; fills io.data if successful
 
         # if self.io.data and not self.job.refresh:
@@ -47,7 +54,7 @@ class ArticleCacheV2(StatisticsViewV2):
             app.logger.info(
                 f"Returning cached articleV2 json data, date: {self.time_of_analysis}"
             )
-            return self.io.data, 200
+            return with_etag((self.io.data, 200), etag)
 
         # else no cache, so return"no cached data" error
 
@@ -1,9 +1,19 @@
 # from flask_restful import Resource, abort  # type: ignore
 # from marshmallow import Schema
+import json
 from datetime import datetime
-from typing import Any, Optional, Tuple
+from typing import Any, Dict, Iterator, Optional, Tuple
 import traceback
 
+from flask import Response
+
+from src.helpers.compact import compact
+from src.helpers.delta import make_delta
+from src.helpers.etags import make_etag, not_modified, with_etag
+from src.helpers.fieldsets import prune_fields
+from src.helpers.json_encoding import encoded_response
+from src.helpers.ndjson import ndjson_response
+from src.helpers.single_flight import single_flight
 from src.models.exceptions import MissingInformationError, WikipediaApiFetchError
 from src.models.v2.file_io.article_file_io_v2 import ArticleFileIoV2
 from src.models.v2.job.article_job_v2 import ArticleJobV2
@@ -15,6 +25,10 @@ from src.views.v2.statistics import StatisticsViewV2
 from src.helpers.get_version import get_poetry_version
 
 
+# returned whatever fields were asked for
+ENVELOPE_FIELDS = ["iari_version", "iari_id", "served_from_cache"]
+
+
 class ArticleV2(StatisticsViewV2):
     """
     returns data associated with article specified by the schema
@@ -24,6 +38,7 @@ class ArticleV2(StatisticsViewV2):
     job: ArticleJobV2  # overrides StatisticsViewV2's job property
 
     page_analyzer: Optional[WikipediaAnalyzerV2] = None
+    etag: Optional[str] = None
 
     def __setup_io__(self):
         """
@@ -38,8 +53,22 @@ class ArticleV2(StatisticsViewV2):
 
         self.__setup_io__()
 
+        # the analysis of a revision never changes, a patron holding it gets a 304
+        self.etag = self.__etag__()
         if not self.job.refresh:
-            self.__read_from_cache__()  # inherited from StatisticsWriteView; fills io.data if successful
+            response = not_modified(self.etag)
+            if response:
+                app.logger.info(f"ArticleV2: not modified, etag {self.etag}")
+                return response
+
+            if self.job.fieldset is None and self.job.format == "json" and not self.job.since_revision:
+                # a hit is sent as stored, without parsing and serializing it again
+                encoded = self.io.read_encoded_from_disk()
+                if encoded:
+                    app.logger.info("Returning cached articleV2 json as stored")
+                    return encoded_response(*encoded)
+            else:
+                self.__read_from_cache__()  # inherited from StatisticsWriteView; fills io.data if successful
 
         # if self.io.data and not self.job.refresh:
         if self.io.data:
@@ -51,7 +80,13 @@ class ArticleV2(StatisticsViewV2):
 
         # no cached data, either cause it doesnt exist or force refresh = true
         app.logger.info("generating articleV2 data (force refresh or no cache)")
-        return self.__analyze_and_write_and_return__()
+        # concurrent requests for the same revision (in any worker) wait for one analysis
+        key = f"articleV2:{self.job.iari_id}"
+        if self.job.fieldset is not None:
+            # partial results are only shared with requests for the same fields
+            key += f":{json.dumps(self.job.fieldset, sort_keys=True)}"
+        data, status = single_flight(key, self.__analyze_and_write_and_return__)
+        return data, status
 
     def get(self):
         """
@@ -73,7 +108,20 @@ class ArticleV2(StatisticsViewV2):
                 and self.job.title
                 and self.job.domain == WikimediaDomain.wikipedia
             ) or self.job.url:
-                return self.__return_article_data__()
+                result = self.__return_article_data__()
+                if isinstance(result, Response):
+                    # a cache hit sent as stored, or a 304
+                    return with_etag(result, self.etag)
+                data, status = result
+                if status == 200 and self.job.fieldset is not None:
+                    data = prune_fields(data, {**self.job.fieldset, **{field: {} for field in ENVELOPE_FIELDS}})
+                if self.job.streaming and status == 200:
+                    return with_etag(ndjson_response(self.__iter_records__(data)), self.etag)
+                if self.job.since_revision and status == 200:
+                    data = self.__delta__(data)
+                if self.job.compact and status == 200:
+                    data = compact(data)
+                return with_etag((data, status), self.etag)
 
             else:
                 return self.__return_article_error__()
@@ -84,6 +132,42 @@ class ArticleV2(StatisticsViewV2):
             traceback.print_exc()
             return {"error": f"General Error: {str(e)}"}, 500
 
+    def __delta__(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        data with its references replaced by their differences with the cached
+        analysis of job.since_revision, data as it is if that is not cached
+        """
+        from src import app
+
+        base_io = ArticleFileIoV2(job=self.job.model_copy(update={"revision": self.job.since_revision}))
+        base_io.read_from_disk()
+        if not base_io.data:
+            app.logger.info(f"ArticleV2: revision {self.job.since_revision} not cached, returning the full analysis")
+            return data
+        return make_delta(prune_fields(base_io.data, self.job.fieldset), data, self.job.since_revision)
+
+    def __etag__(self) -> Optional[str]:
+        """the etag of the response, None if the page or revision could not be resolved"""
+        self.job.get_mediawiki_ids()
+        if not self.job.page_id or not self.job.revision:
+            return None
+        return make_etag(
+            self.job.iari_id,
+            fields=self.job.fieldset,
+            format=self.job.format,
+            since_revision=self.job.since_revision or None,
+        )
+
+    @staticmethod
+    def __iter_records__(data: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        the records of the format=ndjson response:
+        the article data without the references, then one record per reference
+        """
+        yield {"record": "header", **{key: value for key, value in data.items() if key != "references"}}
+        for reference in data.get("references") or []:
+            yield {"record": "reference", **reference}
+
     def __return_article_error__(self):
         from src import app
 
@@ -154,6 +238,10 @@ class ArticleV2(StatisticsViewV2):
         if self.job.testing:
             return
 
+        # a sparse fieldset was analyzed only partially, the cache holds complete articles
+        if self.job.fieldset is not None:
+            return
+
         self.__write_article_to_disk__()
         # NB _not_ writing references to disk now...
         # self.__write_references_to_disk__()
@@ -161,7 +249,8 @@ class ArticleV2(StatisticsViewV2):
     def __write_article_to_disk__(self):
         article_io = ArticleFileIoV2(
             job=self.job,
-            data=self.io.data,
+            # stored as a hit returns it, so hits can be sent as stored
+            data={**self.io.data, "served_from_cache": True},
             wari_id=self.job.iari_id,  # defined in ArticleJobV2
         )
         article_io.write_to_disk()
@@ -9,6 +9,7 @@ from typing import Any, Dict, Optional
 from flask_restful import Resource, abort  # type: ignore
 from marshmallow import Schema
 
+from src.helpers.metrics import span
 from src.models.exceptions import MissingInformationError
 # from src.models.file_io.url_file_io import UrlFileIo
 from src.models.v2.file_io.check_url_file_io_v2 import CheckUrlFileIoV2
@@ -102,7 +103,8 @@ class CheckUrlV2(StatisticsViewV2):
         app.logger.info(f"CheckUrlV2::__return_fresh_data__: url is {url_string}")
         url = Url(url=url_string, timeout=self.job.timeout)
 
-        url.check(self.job.method)
+        with span("check", self.job.method):
+            url.check(self.job.method)
 
         data = url.get_dict
 
@@ -1,4 +1,5 @@
-from typing import Any, Optional, Tuple, List, Dict
+from typing import Any, Iterator, Optional, Tuple, List, Dict
+import json
 import traceback
 import time
 from flask import jsonify
@@ -12,10 +13,18 @@ from src.models.v2.job.extract_refs_job_v2 import ExtractRefsJobV2
 
 from src.views.v2.statistics import StatisticsViewV2
 
-from src.models.v2.analyzers.wiki_analyzer import WikiAnalyzerV2
+from src.models.v2.analyzers.wiki_analyzer import WikiAnalyzerV2, fetch_page_article
 
 from src.helpers.get_version import get_poetry_version
+from src.helpers.compact import compact
+from src.helpers.delta import make_delta
+from src.helpers.etags import make_etag, not_modified, with_etag
 from src.helpers.iari_utils import iari_errors
+from src.helpers.fieldsets import Fieldset, prune_fields, wants_field
+from src.helpers.ndjson import ndjson_response
+from src.helpers.page_pool import iter_batch
+from src.helpers.refs_extractor.wikiapi import fetch_latest_revisions, get_cached_revision_by_id
+from src.helpers.single_flight import single_flight
 
 
 class ExtractRefsV2(StatisticsViewV2):
@@ -62,8 +71,24 @@ class ExtractRefsV2(StatisticsViewV2):
             # validate and setup params
             self.__validate_and_get_job__(method)  # inherited from StatisticsViewV2
 
+            if self.job.pages:
+                if self.job.streaming:
+                    return ndjson_response(self.__iter_records__(start_time))
+                # batch mode, the pages are analyzed in parallel in the page pool
+                return self.__process_pages__(start_time), 200
+
+            # the revision is resolved first: its analysis never changes, a patron holding it gets a 304
+            article = fetch_page_article(self.job.page_title, self.job.domain, self.job.as_of)
+            etag = self.__etag__(article)
+            response = not_modified(etag)
+            if response:
+                return response
+
+            if self.job.streaming:
+                return with_etag(ndjson_response(self.__iter_records__(start_time, article)), etag)
+
             # get page_data, either from cache or newly calculated
-            page_data = self.__get_page_data__()
+            page_data = self.__get_page_data__(article)
                 # TODO get cached data here if possible
                 # TODO somehow access self.page_errors here
                 #   self.page_errors should collect errors encountered while processing the page,
@@ -84,31 +109,16 @@ class ExtractRefsV2(StatisticsViewV2):
             }
 
             # pick and choose which fields from page_data we want to pass on to response
-            self.page_data.update(
-                {
-                    "media_type": page_data["media_type"],
-                    "page_title": page_data["page_title"],
-                    "domain": page_data["domain"],
-                    "as_of": page_data["as_of"],
-                    "page_id": page_data["page_id"],
-                    "revision_id": page_data["revision_id"],
-
-                    # here is all the specific statistical data fetched from article...
-
-                    "section_names": page_data["section_names"],
-
-                    "url_count": page_data["url_count"],
-                    "urls": page_data["urls"],
+            self.page_data.update(prune_fields(select_page_fields(page_data), self.job.fieldset))
 
-                    "reference_count": page_data["reference_count"],
-                    "references": page_data["references"],
+            if self.job.since_revision:
+                self.page_data = self.__delta__(self.page_data, article)
 
-                    "cite_refs_count": page_data["cite_refs_count"],
-                    "cite_refs": page_data["cite_refs"],
-            })
+            if self.job.compact:
+                self.page_data = compact(self.page_data)
 
             # return results
-            return self.page_data, 200
+            return with_etag((self.page_data, 200), etag)
 
 
         except MissingInformationError as e:
@@ -127,8 +137,115 @@ class ExtractRefsV2(StatisticsViewV2):
             return iari_errors(e), 500
 
 
-    def __get_page_data__(self):
+    def __process_pages__(self, start_time: float) -> Dict[str, Any]:
+        """
+        returns the data of each of self.job.pages, in input order.
+        a page that fails gets {"page_title": ..., "errors": [...]} instead
+        """
+        pages = list(self.__iter_pages__())
+
+        execution_time = time.time() - start_time
+        return {
+            "iari_version": get_poetry_version("pyproject.toml"),
+            "iari_command": "extract_refs",
+            "execution_time": f"{execution_time:.4f} seconds",
+            "hydrate": self.job.hydrate,
+            "pages": pages,
+        }
+
+    def __iter_pages__(self) -> Iterator[Dict[str, Any]]:
+        """the data of each of self.job.pages, in input order, as soon as it is done"""
+        page_specs = [
+            {
+                "page_title": page_title,
+                "domain": self.job.domain,
+                "as_of": self.job.as_of,
+                "hydrate": self.job.hydrate,
+            }
+            for page_title in self.job.pages
+        ]
+        articles = {}
+        if not self.job.as_of:
+            # the wikitext of all pages in a few multi title queries instead of one call per page
+            articles = fetch_latest_revisions(self.job.domain, self.job.pages)
+        results = iter_batch(
+            get_page_data,
+            [(page_spec, articles.get(page_spec["page_title"]), self.job.fieldset) for page_spec in page_specs],
+        )
+        for page_spec, (page_data, error) in zip(page_specs, results):
+            if error:
+                yield {"page_title": page_spec["page_title"], "errors": [error]}
+            else:
+                page = prune_fields(select_page_fields(page_data), self.job.fieldset)
+                # each page has its own string table
+                yield compact(page) if self.job.compact else page
+
+    def __etag__(self, article: Optional[Dict[str, Any]]) -> Optional[str]:
+        """the etag of the analysis of the resolved revision article, None if it could not be resolved"""
+        if not article or article.get("errors") or "rev_id" not in article:
+            return None
+        iari_id = f"{self.job.domain}.{article['page_id']}.{article['rev_id']}"
+        return make_etag(
+            iari_id,
+            command="extract_refs",
+            hydrate=self.job.hydrate,
+            fields=self.job.fieldset,
+            format=self.job.format,
+            since_revision=self.job.since_revision or None,
+        )
+
+    def __delta__(self, data: Dict[str, Any], article: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        data with its references replaced by their differences with those of job.since_revision,
+        data as it is if the wikitext of that revision is not cached.
+        the references of the base revision are extracted again from its cached wikitext,
+        extract_refs does not cache analyses; cite_refs, which need its html, are sent in full
+        """
+        from src import app
+
+        if not wants_field(self.job.fieldset, "references"):
+            return data
+        base_article = get_cached_revision_by_id(self.job.domain, self.job.since_revision)
+        if not base_article or str(base_article.get("page_id")) != str(article["page_id"]):
+            app.logger.info(f"ExtractRefsV2: revision {self.job.since_revision} not cached, returning the full analysis")
+            return data
+        fieldset = {"references": (self.job.fieldset or {}).get("references", {})}
+        base = WikiAnalyzerV2.get_page_data(self.__page_spec__(), base_article, fieldset)
+        return make_delta(prune_fields({"references": base["references"]}, fieldset), data, self.job.since_revision)
+
+    def __iter_records__(self, start_time: float, article: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        the response for format=ndjson: a header, then a record per reference (or per page
+        with pages=) as extraction proceeds, then a footer with the execution time
+
+        article: the already resolved revision of the page (see fetch_page_article)
         """
+        header = {
+            "record": "header",
+            "iari_version": get_poetry_version("pyproject.toml"),
+            "iari_command": "extract_refs",
+            "hydrate": self.job.hydrate,
+        }
+        if self.job.pages:
+            yield header
+            for page in self.__iter_pages__():
+                yield {"record": "page", **page}
+            footer = {"record": "footer", "page_count": len(self.job.pages)}
+        else:
+            records = WikiAnalyzerV2.iter_page_data(self.__page_spec__(), article, fieldset=self.job.fieldset)
+            yield {**header, **next(records)}
+            for record in records:
+                if record["record"] == "footer":
+                    footer = record
+                else:
+                    yield record
+
+        yield {**footer, "execution_time": f"{time.time() - start_time:.4f} seconds"}
+
+    def __get_page_data__(self, article: Optional[Dict[str, Any]] = None):
+        """
+        article: the already resolved revision of the page (see fetch_page_article)
+
         returns the page data or
         errors structure:
         {
@@ -147,7 +264,10 @@ class ExtractRefsV2(StatisticsViewV2):
                 - parse from self.job specs
         """
 
-        page_spec = {
+        return get_page_data(self.__page_spec__(), article, fieldset=self.job.fieldset)
+
+    def __page_spec__(self) -> Dict[str, Any]:
+        return {
             "page_title": self.job.page_title,
             "domain": self.job.domain,
             "as_of": self.job.as_of,
@@ -157,15 +277,63 @@ class ExtractRefsV2(StatisticsViewV2):
             #   - maybe served from cache? what does cache mean now that we have databases?
         }
 
-        self.analyzer = WikiAnalyzerV2()
-        # For now, assume page_spec refers to a wiki page.
-        # TODO In the future, determine which analyzer to use based on media type.
-        #   - or, have a generic analyzer that delegates a specific analyzer based on page_spec
-        # NB: each analyzer should implement a "base analyzer" interface that should include:
-        #  get_page_data(page_spec)
-        #   - page_spec should also be a formal object class, with default required fields.
-        #   - page_spec should be a property of the analyzer class object instance
-        #   - This will allow analyzers to be polymorphic, wherein they could process amy type of page/media
 
-        return self.analyzer.get_page_data(page_spec)
+def get_page_data(
+    page_spec: Dict[str, Any], article: Optional[Dict[str, Any]] = None, fieldset: Fieldset = None
+) -> Dict[str, Any]:
+    """
+    analyzes the page of page_spec.
+    module level, so it can run in the page pool
 
+    article: the already fetched latest revision of the page, see wikiapi.fetch_latest_revisions
+    fieldset: the fields asked for, the work behind the others is skipped, see src/helpers/fieldsets.py
+    """
+    analyzer = WikiAnalyzerV2()
+    # For now, assume page_spec refers to a wiki page.
+    # TODO In the future, determine which analyzer to use based on media type.
+    #   - or, have a generic analyzer that delegates a specific analyzer based on page_spec
+    # NB: each analyzer should implement a "base analyzer" interface that should include:
+    #  get_page_data(page_spec)
+    #   - page_spec should also be a formal object class, with default required fields.
+    #   - page_spec should be a property of the analyzer class object instance
+    #   - This will allow analyzers to be polymorphic, wherein they could process amy type of page/media
+
+    # concurrent requests for the same revision (in any worker) wait for one analysis,
+    # the time asked for only stands in for it when the revision is not resolved yet
+    revision = page_spec["as_of"]
+    if article and not article.get("errors") and "rev_id" in article:
+        revision = f"rev{article['rev_id']}"
+    key = f"extract_refs:{page_spec['domain']}:{page_spec['page_title']}:{revision}:{page_spec['hydrate']}"
+    if fieldset is not None:
+        # partial results are only shared with requests for the same fields
+        key += f":{json.dumps(fieldset, sort_keys=True)}"
+    page_data: Dict[str, Any] = single_flight(
+        key,
+        lambda: analyzer.get_page_data(page_spec, article, fieldset),
+    )
+    return page_data
+
+
+def select_page_fields(page_data: Dict[str, Any]) -> Dict[str, Any]:
+    """the fields of the analyzer page data that extract_refs returns"""
+    return {
+        "media_type": page_data["media_type"],
+        "page_title": page_data["page_title"],
+        "domain": page_data["domain"],
+        "as_of": page_data["as_of"],
+        "page_id": page_data["page_id"],
+        "revision_id": page_data["revision_id"],
+
+        # here is all the specific statistical data fetched from article...
+
+        "section_names": page_data["section_names"],
+
+        "url_count": page_data["url_count"],
+        "urls": page_data["urls"],
+
+        "reference_count": page_data["reference_count"],
+        "references": page_data["references"],
+
+        "cite_refs_count": page_data["cite_refs_count"],
+        "cite_refs": page_data["cite_refs"],
+    }
@@ -1,7 +1,7 @@
 # from flask_restful import Resource, abort  # type: ignore
 # from marshmallow import Schema
 from datetime import datetime
-from typing import Any, Optional, Tuple, List, Dict
+from typing import Any, Iterator, Optional, Tuple, List, Dict
 import traceback
 
 from dateutil.parser import isoparse
@@ -9,6 +9,9 @@ from dateutil.parser import isoparse
 import config
 import requests
 
+from src.helpers.ndjson import ndjson_response
+from src.helpers.page_pool import iter_batch
+from src.helpers.refs_extractor.wikiapi import fetch_latest_revisions
 from src.models.exceptions import MissingInformationError, WikipediaApiFetchError
 from src.models.v2.job.article_job_v2 import ArticleJobV2
 
@@ -70,13 +73,12 @@ class FetchRefsV2(StatisticsViewV2):
         try:
             self.__validate_and_get_job__(method)  # inherited from StatisticsViewV2
 
-            self.pages = []
+            if self.job.streaming:
+                # a header, then one line per page as soon as it is done, see src/helpers/ndjson.py
+                return ndjson_response(self.__iter_records__())
 
             # process pages, get refs, sets self.pages data
-            for page in self.job.pages:
-                page_results = self.__get_page_data__(page)
-                # append page ref data to pages result
-                self.pages.append(page_results)
+            self.pages = list(self.__iter_pages__())
 
             # and return results
             return {"pages": self.pages}
@@ -90,56 +92,95 @@ class FetchRefsV2(StatisticsViewV2):
             traceback.print_exc()
             return {"error": f"General Error: {str(e)}"}, 500
 
+    def __iter_records__(self) -> Iterator[Dict[str, Any]]:
+        """the records of the format=ndjson response"""
+        yield {"record": "header", "which_wiki": self.job.which_wiki, "page_count": len(self.job.pages)}
+        for page in self.__iter_pages__():
+            yield {"record": "page", **page}
+
+    def __iter_pages__(self) -> Iterator[Dict[str, Any]]:
+        """the data of each of self.job.pages, in input order, as soon as it is done"""
+        if len(self.job.pages) <= 1:
+            for page in self.job.pages:
+                yield self.__get_page_data__(page)
+            return
+
+        # several pages are parsed in parallel, see page_pool
+        # the wikitext of all pages in a few multi title queries instead of one call per page
+        articles = fetch_latest_revisions("en.wikipedia.org", self.job.pages)
+        results = iter_batch(
+            get_page_data, [(page, self.job.which_wiki, articles.get(page)) for page in self.job.pages]
+        )
+        for page_title, (page_data, error) in zip(self.job.pages, results):
+            if error:
+                page_data = {
+                    "page_title": page_title,
+                    "which_wiki": self.job.which_wiki,
+                    "error": f"General error: {error['details']}",
+                }
+            yield page_data
+
     def __get_page_data__(self, page_title):
         """
         Assume page is a fully resolved url, such as: https://en.wikipedia.org/wiki/Easter_Island
         """
+        return get_page_data(page_title, self.job.which_wiki)
 
-        try:
-            # process page
 
-            url_template = "https://{lang}.{wiki_domain}/wiki/{page_title}"  # TODO make this a global
-            page_url = url_template.format(page_title=page_title, lang="en", wiki_domain="wikipedia.org")
+def get_page_data(page_title: str, which_wiki: str, article: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    returns the refs of a page, or an error.
+    module level, so it can run in the page pool
+
+    article: the already fetched latest revision of the page, see wikiapi.fetch_latest_revisions
+    """
 
-            article_job = ArticleJobV2(url=page_url)
-            article_job.__extract_url__()
+    try:
+        # process page
 
-            # get article object corresponding to page
-            # page = WikiArticleV2(job=article_job)
+        url_template = "https://{lang}.{wiki_domain}/wiki/{page_title}"  # TODO make this a global
+        page_url = url_template.format(page_title=page_title, lang="en", wiki_domain="wikipedia.org")
 
-            page = WikipediaArticleV2(job=article_job)
-            page.fetch_and_parse()
+        article_job = ArticleJobV2(url=page_url)
+        article_job.__extract_url__()
 
-            # loop thru references
-            page_refs = []
-            if page.extractor:
-                for ref in page.extractor.references:
-                    page_refs.append({
-                        "name": ref.get_name,
-                        "wikitext": ref.wikicode_as_string
-                    })
+        # get article object corresponding to page
+        # page = WikiArticleV2(job=article_job)
 
-        except WikipediaApiFetchError as e:
-            return {
-                "page_title": page_title,
-                "which_wiki": self.job.which_wiki,
-                "error": f"Page data error: {str(e)}"
-            }
+        page = WikipediaArticleV2(job=article_job)
+        if article:
+            if article.get("errors"):
+                raise WikipediaApiFetchError(article["errors"][0]["details"])
+            page.use_revision(article)
+        page.fetch_and_parse()
 
-        except Exception as e:
-            traceback.print_exc()
-            return {
-                "page_title": page_title,
-                "which_wiki": self.job.which_wiki,
-                "error": f"General error: {str(e)}"
-            }
+        # loop thru references
+        page_refs = []
+        if page.extractor and page.extractor.references:
+            for ref in page.extractor.references:
+                page_refs.append({
+                    "name": ref.get_name,
+                    "wikitext": ref.wikicode_as_string
+                })
 
+    except WikipediaApiFetchError as e:
         return {
             "page_title": page_title,
-            "which_wiki": self.job.which_wiki,
-
-            "refs": page_refs,
+            "which_wiki": which_wiki,
+            "error": f"Page data error: {str(e)}"
         }
 
+    except Exception as e:
+        traceback.print_exc()
+        return {
+            "page_title": page_title,
+            "which_wiki": which_wiki,
+            "error": f"General error: {str(e)}"
+        }
 
+    return {
+        "page_title": page_title,
+        "which_wiki": which_wiki,
 
+        "refs": page_refs,
+    }
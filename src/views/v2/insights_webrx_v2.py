@@ -7,6 +7,7 @@ from bs4 import BeautifulSoup, NavigableString
 from flask import request
 
 from src.helpers.get_version import get_poetry_version
+from src.helpers.metrics import span
 
 from src.models.exceptions import MissingInformationError, WikipediaApiFetchError
 from src.constants.constants import RequestMethods
@@ -92,11 +93,13 @@ class InsightsWebRxV2(StatisticsViewV2):
         grabs appropriate data regarding media updates
         """
 
-        soup = self.__get_stats_soup__()
+        with span("fetch"):
+            soup = self.__get_stats_soup__()
 
-        table_names = self.__get_table_names__(soup)
-        table_list = self.__get_all_tables__(soup, table_names)
-        table_totals = self.__get_table_totals__(table_list)
+        with span("insights"):
+            table_names = self.__get_table_names__(soup)
+            table_list = self.__get_all_tables__(soup, table_names)
+            table_totals = self.__get_table_totals__(table_list)
 
         return {
             "webrx" : {
@@ -0,0 +1,32 @@
+from flask import Response
+from marshmallow import Schema
+
+from src.helpers.metrics import collect_metrics, prometheus_text
+from src.models.v2.schema.metrics_schema_v2 import MetricsSchemaV2
+from src.views.v2.statistics import StatisticsViewV2
+
+
+class MetricsV2(StatisticsViewV2):
+    """
+    returns the metrics of all IARI processes (see src/helpers/metrics.py):
+    latency histograms per stage, upstream and endpoint, cache hits and misses
+    per cache namespace and the requests in flight
+    """
+
+    schema: Schema = MetricsSchemaV2()
+
+    def get(self):
+        """
+        main entrypoint for flask
+        must return a tuple (Any,response_code)
+        """
+        from src import app
+
+        app.logger.debug("MetricsV2::get: running")
+
+        self.__validate_and_get_job__()
+
+        metrics = collect_metrics()
+        if (self.job or {}).get("format") == "prometheus":
+            return Response(prometheus_text(metrics), mimetype="text/plain; version=0.0.4")
+        return metrics, 200
@@ -12,6 +12,7 @@ from marshmallow import Schema
 from src.models.exceptions import MissingInformationError, UnknownValueError
 
 from src.helpers.get_version import get_poetry_version, get_version_stamp
+from src.helpers.metrics import span
 from src.helpers.probe_utils import ProbeUtils
 
 from src.views.v2.statistics import StatisticsViewV2
@@ -82,7 +83,8 @@ class ProbeV2(StatisticsViewV2):
         if self.job.tag:
             results.update({"tag": self.job.tag})
 
-        probe_results = ProbeUtils.get_probe_results(self.url_link, self.probe_list, self.refresh)
+        with span("probe"):
+            probe_results = ProbeUtils.get_probe_results(self.url_link, self.probe_list, self.refresh)
         execution_time = time.time() - start_time  # elapsed = now - then
 
         results.update({
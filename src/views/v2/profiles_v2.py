@@ -0,0 +1,55 @@
+from flask import send_file
+from flask_restful import abort  # type: ignore
+from marshmallow import Schema
+
+from src.helpers.profiling import check_admin, get_profile_path, list_profiles
+from src.models.v2.schema.profiles_schema_v2 import ProfilesSchemaV2
+from src.views.v2.statistics import StatisticsViewV2
+
+
+class ProfilesV2(StatisticsViewV2):
+    """
+    lists the stored request profiles (see src/helpers/profiling.py), newest first,
+    for admins only
+    """
+
+    schema: Schema = ProfilesSchemaV2()
+
+    def get(self):
+        """
+        main entrypoint for flask
+        must return a tuple (Any,response_code)
+        """
+        from src import app
+
+        app.logger.debug("ProfilesV2::get: running")
+
+        check_admin()
+        self.__validate_and_get_job__()
+
+        return {"profiles": list_profiles()}, 200
+
+
+class ProfileV2(StatisticsViewV2):
+    """
+    returns one stored request profile: the collapsed stacks of profile=1 as text,
+    the cProfile stats of profile=cprofile as a file, for admins only
+    """
+
+    schema: Schema = ProfilesSchemaV2()
+
+    def get(self, name: str):
+        from src import app
+
+        app.logger.debug(f"ProfileV2::get: {name}")
+
+        check_admin()
+        self.__validate_and_get_job__()
+
+        path = get_profile_path(name)
+        if path is None:
+            abort(404, error=f"no profile {name}")
+        elif name.endswith(".collapsed"):
+            return send_file(path, mimetype="text/plain")
+        else:
+            return send_file(path, mimetype="application/octet-stream", as_attachment=True, download_name=name)
@@ -6,6 +6,7 @@ from flask_restful import Resource, abort  # type: ignore
 from marshmallow import Schema
 
 from src.helpers.console import console
+from src.helpers.profiling import check_admin, get_profile_mode, profile_request
 
 from src.models.api.job import Job
 from src.models.exceptions import MissingInformationError
@@ -32,6 +33,20 @@ class StatisticsViewV2(Resource):
     request_args: Any = {}
     time_of_analysis: Optional[datetime] = None
 
+    def dispatch_request(self, *args, **kwargs):
+        """
+        runs the request under a profiler when an admin asks for it, see src/helpers/profiling.py;
+        profile= can be a query or (POST) form parameter, like the parameters of the job
+        """
+        if "profile" not in request.values:
+            return super().dispatch_request(*args, **kwargs)
+
+        mode = get_profile_mode(request.values["profile"])
+        if mode is None:
+            return super().dispatch_request(*args, **kwargs)
+        check_admin()
+        return profile_request(lambda: super(StatisticsViewV2, self).dispatch_request(*args, **kwargs), mode)
+
     def __setup_io__(self):
         # Derived child class must implement __setup_io__ from this base parent class
         raise NotImplementedError()  # must be defined in parent class
@@ -52,6 +67,10 @@ class StatisticsViewV2(Resource):
 
         # get request args via GET or POST
         self.request_args = request.args if (request.method == "GET") else request.form
+        if "profile" in self.request_args:
+            # handled by dispatch_request, not a parameter of the job
+            self.request_args = self.request_args.copy()
+            self.request_args.pop("profile")
 
         from src import app
         app.logger.debug(f"==> StatisticsViewV2::__validate_and_get_job__: request.method = {request.method}; request_args: {self.request_args}")
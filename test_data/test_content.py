@@ -527,3 +527,18 @@ sncaso_tail_excerpt = """==External links==
 [[Category:French companies established in 1936]]
 [[Category:1957 disestablishments in France]]
 [[Category:Sud-Ouest aircraft| ]] """
+
+# Parsoid html (as returned by /w/rest.php/v1/page/{title}/with_html), trimmed to
+# the body with a few footnotes, a Bibliography and a Further reading section
+easter_island_parsoid_html_excerpt = """<!DOCTYPE html>
+<html prefix="dc: http://purl.org/dc/terms/ mw: http://mediawiki.org/rdf/" about="https://en.wikipedia.org/wiki/Special:Redirect/revision/1185000000"><head prefix="mwr: https://en.wikipedia.org/wiki/Special:Redirect/"><meta charset="utf-8"/><title>Easter Island</title></head><body class="mw-content-ltr sitedir-ltr ltr mw-body-content parsoid-body mediawiki mw-parser-output" lang="en" dir="ltr">
+<section data-mw-section-id="0" id="mwAQ"><p id="mwAg"><b id="mwAw">Easter Island</b> is a Chilean island in the southeastern Pacific Ocean.<sup about="#mwt3" class="mw-ref reference" id="cite_ref-INE_1-0" rel="dc:references" typeof="mw:Extension/ref" data-mw='{"name":"ref","attrs":{"name":"INE"}}'><a href="./Easter_Island#cite_note-INE-1" id="mwBA"><span class="mw-reflink-text" id="mwBQ"><span class="cite-bracket">[</span>1<span class="cite-bracket">]</span></span></a></sup> The island is most famous for its nearly 1,000 monumental statues, called <i>moai</i>.<sup about="#mwt5" class="mw-ref reference" id="cite_ref-2" rel="dc:references" typeof="mw:Extension/ref" data-mw='{"name":"ref","attrs":{}}'><a href="./Easter_Island#cite_note-2" id="mwBg"><span class="mw-reflink-text" id="mwBw"><span class="cite-bracket">[</span>2<span class="cite-bracket">]</span></span></a></sup> Mr. Edmunds photographed the crater wall.<sup about="#mwt7" class="mw-ref reference" id="cite_ref-3" rel="dc:references" typeof="mw:Extension/ref" data-mw='{"name":"ref","attrs":{}}'><a href="./Easter_Island#cite_note-3" id="mwCA"><span class="mw-reflink-text" id="mwCQ"><span class="cite-bracket">[</span>3<span class="cite-bracket">]</span></span></a></sup> The census was repeated in 2017.<sup about="#mwt9" class="mw-ref reference" id="cite_ref-INE_1-1" rel="dc:references" typeof="mw:Extension/ref" data-mw='{"name":"ref","attrs":{"name":"INE"}}'><a href="./Easter_Island#cite_note-INE-1" id="mwCg"><span class="mw-reflink-text" id="mwCw"><span class="cite-bracket">[</span>1<span class="cite-bracket">]</span></span></a></sup></p></section>
+<section data-mw-section-id="1" id="mwDA"><h2 id="History">History</h2><p id="mwDQ">The first settlers arrived from Polynesia.</p><section data-mw-section-id="2" id="mwDg"><h3 id="Settlement">Settlement</h3><p id="mwDw">Text of the subsection.</p></section></section>
+<section data-mw-section-id="3" id="mwEA"><h2 id="References">References</h2>
+<div class="mw-references-wrap mw-references-columns" typeof="mw:Extension/references" about="#mwt11" data-mw='{"name":"references","attrs":{}}' id="mwEQ"><ol class="mw-references references" id="mwEg"><li about="#cite_note-INE-1" id="cite_note-INE-1"><span class="mw-cite-backlink" id="mwEw"><a href="./Easter_Island#cite_ref-INE_1-0" rel="mw:referencedBy" id="mwFA"><span class="mw-linkback-text" id="mwFQ">1 </span></a><a href="./Easter_Island#cite_ref-INE_1-1" rel="mw:referencedBy" id="mwFg"><span class="mw-linkback-text" id="mwFw">2 </span></a></span> <span id="mw-reference-text-cite_note-INE-1" class="mw-reference-text reference-text"><link rel="mw-deduplicated-inline-style" href="mw-data:TemplateStyles:r1215172403" about="#mwt4" typeof="mw:Extension/templatestyles mw:Transclusion" data-mw='{"parts":[{"template":{"target":{"wt":"cite web","href":"./Template:Cite_web"},"params":{"url":{"wt":"http://www.ine.cl/canales/chile_estadistico/censos_poblacion_vivienda/censo_pobl_vivi.php"},"title":{"wt":"Censo de Población y Vivienda 2002"},"work":{"wt":"National Statistics Institute"},"access-date":{"wt":"1 May 2010"}},"i":0}}]}' id="mwGA"/><cite id="CITEREFNational_Statistics_Institute" class="citation web cs1" about="#mwt4"><a rel="mw:ExtLink nofollow" href="http://www.ine.cl/canales/chile_estadistico/censos_poblacion_vivienda/censo_pobl_vivi.php" class="external text" id="mwGQ">"Censo de Población y Vivienda 2002"</a>. <i><a rel="mw:WikiLink" href="./National_Statistics_Institute_(Chile)" title="National Statistics Institute (Chile)" id="mwGg">National Statistics Institute</a></i>. Retrieved <span class="nowrap">1 May</span> 2010.</cite><span title="ctx_ver=Z39.88-2004&amp;rft_val_fmt=info%3Aofi%2Ffmt%3Akev%3Amtx%3Ajournal&amp;rft.genre=unknown&amp;rft.jtitle=National+Statistics+Institute&amp;rft.atitle=Censo+de+Poblaci%C3%B3n+y+Vivienda+2002&amp;rft_id=http%3A%2F%2Fwww.ine.cl%2Fcanales%2Fchile_estadistico%2Fcensos_poblacion_vivienda%2Fcenso_pobl_vivi.php&amp;rfr_id=info%3Asid%2Fen.wikipedia.org%3AEaster+Island" class="Z3988" about="#mwt4" id="mwGw"></span></span></li><li about="#cite_note-2" id="cite_note-2"><span class="mw-cite-backlink" id="mwHA"><a href="./Easter_Island#cite_ref-2" rel="mw:referencedBy" id="mwHQ"><span class="mw-linkback-text" id="mwHg">↑ </span></a></span> <span id="mw-reference-text-cite_note-2" class="mw-reference-text reference-text"><link rel="mw-deduplicated-inline-style" href="mw-data:TemplateStyles:r1215172403" about="#mwt6" typeof="mw:Extension/templatestyles mw:Transclusion" data-mw='{"parts":[{"template":{"target":{"wt":"Cite book ","href":"./Template:Cite_book"},"params":{"last":{"wt":"Fischer"},"first":{"wt":"Steven Roger"},"title":{"wt":"Island at the End of the World"},"publisher":{"wt":"Reaktion Books"},"year":{"wt":"2005"},"isbn":{"wt":"978-1-86189-245-4"}},"i":0}}]}' id="mwHw"/><cite id="CITEREFFischer2005" class="citation book cs1" about="#mwt6">Fischer, Steven Roger (2005). <i>Island at the End of the World</i>. Reaktion Books. <a rel="mw:WikiLink" href="./ISBN_(identifier)" title="ISBN (identifier)" class="mw-redirect" id="mwIA">ISBN</a> <a rel="mw:WikiLink" href="./Special:BookSources/978-1-86189-245-4" title="Special:BookSources/978-1-86189-245-4" id="mwIQ"><bdi>978-1-86189-245-4</bdi></a>.</cite><span title="ctx_ver=Z39.88-2004&amp;rft_val_fmt=info%3Aofi%2Ffmt%3Akev%3Amtx%3Abook&amp;rft.genre=book&amp;rft.btitle=Island+at+the+End+of+the+World&amp;rft.pub=Reaktion+Books&amp;rft.date=2005&amp;rft.isbn=978-1-86189-245-4&amp;rft.aulast=Fischer&amp;rft.aufirst=Steven+Roger&amp;rfr_id=info%3Asid%2Fen.wikipedia.org%3AEaster+Island" class="Z3988" about="#mwt6" id="mwIg"></span></span></li><li about="#cite_note-3" id="cite_note-3"><span class="mw-cite-backlink" id="mwIw"><a href="./Easter_Island#cite_ref-3" rel="mw:referencedBy" id="mwJA"><span class="mw-linkback-text" id="mwJQ">↑ </span></a></span> <span id="mw-reference-text-cite_note-3" class="mw-reference-text reference-text">Photograph by the manager of the island, see <a rel="mw:ExtLink nofollow" href="https://www.example.org/rano-kau" class="external text" id="mwJg">Rano Kau crater wall</a>.</span></li></ol></div></section>
+<section data-mw-section-id="4" id="mwJw"><h2 id="Bibliography">Bibliography</h2>
+<ul id="mwKA"><li id="mwKQ"><link rel="mw-deduplicated-inline-style" href="mw-data:TemplateStyles:r1215172403" about="#mwt12" typeof="mw:Extension/templatestyles mw:Transclusion" data-mw='{"parts":[{"template":{"target":{"wt":"cite book","href":"./Template:Cite_book"},"params":{"last":{"wt":"Heyerdahl"},"first":{"wt":"Thor"},"title":{"wt":"Aku-Aku"},"url":{"wt":"https://archive.org/details/akuaku00heye"},"year":{"wt":"1958"}},"i":0}}]}' id="mwKg"/><cite id="CITEREFHeyerdahl1958" class="citation book cs1" about="#mwt12">Heyerdahl, Thor (1958). <a rel="mw:ExtLink nofollow" href="https://archive.org/details/akuaku00heye" class="external text" id="mwKw"><i>Aku-Aku</i></a>.</cite><span title="ctx_ver=Z39.88-2004&amp;rft.btitle=Aku-Aku" class="Z3988" about="#mwt12" id="mwLA"></span></li><li id="mwLQ">Métraux, Alfred (1940). <i>Ethnology of Easter Island</i>. Bishop Museum.</li></ul></section>
+<section data-mw-section-id="5" id="mwLg"><h2 id="Further_reading">Further reading</h2>
+<ul id="mwLw"><li id="mwMA"><link rel="mw-deduplicated-inline-style" href="mw-data:TemplateStyles:r1215172403" about="#mwt13" typeof="mw:Extension/templatestyles mw:Transclusion" data-mw='{"parts":[{"template":{"target":{"wt":"cite journal","href":"./Template:Cite_journal"},"params":{"last":{"wt":"Hunt"},"title":{"wt":"Rethinking the Fall of Easter Island"},"journal":{"wt":"American Scientist"},"url":{"wt":"http://www.americanscientist.org/issues/feature/2006/5/rethinking-the-fall-of-easter-island"}},"i":0}}]}' id="mwMQ"/><cite id="CITEREFHunt2006" class="citation journal cs1" about="#mwt13">Hunt, Terry L. (2006). <a rel="mw:ExtLink nofollow" href="http://www.americanscientist.org/issues/feature/2006/5/rethinking-the-fall-of-easter-island" class="external text" id="mwMg">"Rethinking the Fall of Easter Island"</a>. <i>American Scientist</i>.</cite></li></ul></section>
+<section data-mw-section-id="6" id="mwMw"><h2 id="External_links">External links</h2><ul id="mwNA"><li id="mwNQ"><a rel="mw:ExtLink nofollow" href="http://www.example.com/rapanui" class="external text" id="mwNg">Rapa Nui</a></li></ul></section>
+</body></html>"""
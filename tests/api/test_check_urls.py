@@ -0,0 +1,122 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+from urllib.parse import parse_qs
+
+from flask import Flask
+from flask_restful import Api  # type: ignore
+
+import config
+from src.constants.constants import UrlStatusMethod
+from src.helpers.cache_utils import CacheType, get_cache, set_cache
+from src.helpers.url_status_engine import UpstreamError, UrlStatusEngine
+from src.views.check_urls import CHECK_URLS_CACHE_VARIETY, CheckUrls
+
+
+class StubTestDeadLink(UrlStatusEngine):
+    """answers testdeadlink posts with 200 for every url, except those containing "dead" (404)"""
+
+    def __init__(self, fail_urls_containing=""):
+        super().__init__(backoff=0)
+        self.posted_chunks = []
+        self.fail_urls_containing = fail_urls_containing
+
+    async def request(self, budget_keys, http_method, url, name="", timeout=0, **kwargs):
+        assert budget_keys == ["testdeadlink"]
+        urls = parse_qs(kwargs["data"])["urls"][0].split("\n")
+        self.posted_chunks.append(urls)
+        if self.fail_urls_containing and any(self.fail_urls_containing in u for u in urls):
+            raise UpstreamError("Non 200 status code from testdeadlink call (503)", 503)
+        results = {u: 404 if "dead" in u else 200 for u in urls}
+        results["errors"] = {u: "RESPONSE CODE: 404" for u in urls if "dead" in u}
+        return 200, {"results": results, "servetime": 0.1}
+
+
+class TestCheckUrls(TestCase):
+    def setUp(self):
+        app = Flask(__name__)
+        api = Api(app)
+
+        api.add_resource(CheckUrls, "/check-urls")
+        app.testing = True
+        self.test_client = app.test_client()
+
+        self.directory = tempfile.TemporaryDirectory()
+        os.makedirs(f"{self.directory.name}/status")
+        self.patches = [
+            patch.object(config, "iari_cache_dir", self.directory.name + "/"),
+            patch.dict(os.environ, {"TESTDEADLINK_KEY": "key"}),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.directory.cleanup()
+
+    def get(self, urls, engine, extra=""):
+        self.addCleanup(engine.close)
+        query = "&".join(f"url={u}" for u in urls)
+        with patch.object(UrlStatusEngine, "get", return_value=engine):
+            response = self.test_client.get(f"/check-urls?{query}{extra}")
+        return response.status_code, json.loads(response.data)
+
+    def test_chunks_and_merges(self):
+        urls = [f"https://example.com/{n}" for n in range(249)] + ["https://example.com/dead"]
+        engine = StubTestDeadLink()
+        status_code, data = self.get(urls, engine)
+        assert status_code == 200
+        assert sorted(len(chunk) for chunk in engine.posted_chunks) == [50, 100, 100]
+        assert data["num_urls"] == 250
+        assert data["urls"]["https://example.com/0"] == {"status_code": 200}
+        assert data["urls"]["https://example.com/dead"] == {
+            "status_code": 404,
+            "error": True,
+            "error_details": "RESPONSE CODE: 404",
+        }
+        assert "errors" not in data
+
+    def test_serves_known_urls_from_cache(self):
+        urls = [f"https://example.com/{n}" for n in range(10)]
+        self.get(urls, StubTestDeadLink())
+
+        engine = StubTestDeadLink()
+        status_code, data = self.get(urls + ["https://example.com/new"], engine)
+        assert engine.posted_chunks == [["https://example.com/new"]]
+        assert data["urls"]["https://example.com/3"] == {"status_code": 200}
+
+        engine = StubTestDeadLink()
+        self.get(urls, engine, extra="&refresh=true")
+        assert len(engine.posted_chunks) == 1
+
+    def test_does_not_cache_errors(self):
+        urls = ["https://example.com/1", "https://example.com/dead"]
+        self.get(urls, StubTestDeadLink())
+        assert get_cache("https://example.com/dead", CacheType.status, CHECK_URLS_CACHE_VARIETY) is None
+
+        # the error may have been transient, the url is checked again
+        engine = StubTestDeadLink()
+        status_code, data = self.get(urls, engine)
+        assert engine.posted_chunks == [["https://example.com/dead"]]
+        assert data["urls"]["https://example.com/dead"]["error"] is True
+
+    def test_keeps_clear_of_status_utils_cache(self):
+        # StatusUtils.get_status_results caches its results of another shape under IABOT
+        set_cache("https://example.com/1", CacheType.status, UrlStatusMethod.IABOT.value, {"status_code": 301, "iabot": {}})
+        engine = StubTestDeadLink()
+        status_code, data = self.get(["https://example.com/1", "https://example.com/2"], engine)
+        assert engine.posted_chunks == [["https://example.com/1", "https://example.com/2"]]
+        assert data["urls"]["https://example.com/1"] == {"status_code": 200}
+        assert get_cache("https://example.com/2", CacheType.status, UrlStatusMethod.IABOT.value) is None
+
+    def test_failed_chunk_keeps_other_results(self):
+        urls = [f"https://example.com/{n}" for n in range(100)] + ["https://example.com/broken"]
+        status_code, data = self.get(urls, StubTestDeadLink(fail_urls_containing="broken"))
+        assert status_code == 200
+        assert data["urls"]["https://example.com/0"] == {"status_code": 200}
+        assert data["urls"]["https://example.com/broken"] == {}
+        assert data["errors"][0]["status_code"] == 503
+        assert data["errors"][0]["urls"] == ["https://example.com/broken"]
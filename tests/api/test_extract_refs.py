@@ -0,0 +1,169 @@
+import json
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from flask import Flask
+from flask_restful import Api  # type: ignore
+
+import config
+from src.helpers.compact import expand
+from src.views.v2.extract_refs_v2 import ExtractRefsV2, get_page_data
+from src.views.v2.fetchrefs_v2 import FetchRefsV2
+
+WIKITEXT = """Lead text.<ref name="a">{{cite web |url=https://example.com/a |title=A}}</ref>
+
+== History ==
+The island was settled early.<ref>{{cite book |title=B |url=https://example.com/b}}</ref>
+It was annexed later.<ref>[https://example.com/c C]</ref>
+"""
+
+ARTICLE = {
+    "page_id": "9",
+    "rev_id": 20,
+    "rev_timestamp": "2020-06-01T00:00:00Z",
+    "wikitext": WIKITEXT,
+}
+
+
+def read_ndjson(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+class TestExtractRefsNdjson(TestCase):
+    def setUp(self):
+        app = Flask(__name__)
+        api = Api(app)
+        api.add_resource(ExtractRefsV2, "/extract_refs")
+        api.add_resource(FetchRefsV2, "/fetchrefs")
+        self.client = app.test_client()
+
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        for p in [
+            patch.object(config, "iari_cache_dir", cache_dir.name + "/"),
+            patch("src.models.v2.analyzers.wiki_analyzer.get_wikipedia_article", return_value=ARTICLE),
+            patch("src.models.v2.analyzers.wiki_analyzer.fetch_page_html", return_value=""),
+        ]:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_records_match_json(self):
+        data = self.client.get("/extract_refs?page_title=Easter_Island").get_json()
+        response = self.client.get("/extract_refs?page_title=Easter_Island&format=ndjson")
+        assert response.status_code == 200
+        assert response.mimetype == "application/x-ndjson"
+        records = read_ndjson(response)
+
+        header, footer = records[0], records[-1]
+        assert header["record"] == "header"
+        assert footer["record"] == "footer"
+        for key in ["page_title", "page_id", "revision_id", "section_names", "hydrate"]:
+            assert header[key] == data[key], key
+        for key in ["reference_count", "url_count", "cite_refs_count"]:
+            assert footer[key] == data[key], key
+        assert sorted(footer["urls"]) == sorted(data["urls"])
+
+        references = [record for record in records if record["record"] == "reference"]
+        assert [{k: v for k, v in r.items() if k != "record"} for r in references] == data["references"]
+        assert data["reference_count"] == 3
+
+    def test_errors_before_header(self):
+        with patch(
+            "src.models.v2.analyzers.wiki_analyzer.get_wikipedia_article",
+            return_value={"errors": [{"error": "Missing page info", "details": "Article does not exist"}]},
+        ):
+            response = self.client.get("/extract_refs?page_title=Nope&format=ndjson")
+        assert response.status_code == 500
+        assert response.get_json()["errors"][0]["error"] == "WikipediaApiFetchError"
+
+    def test_unknown_format(self):
+        response = self.client.get("/extract_refs?page_title=Easter_Island&format=xml")
+        assert response.status_code == 500
+
+    def test_sparse_fieldset(self):
+        with patch("src.models.v2.analyzers.wiki_analyzer.fetch_page_html") as fetch_page_html, patch(
+            "src.models.v2.analyzers.wiki_analyzer.get_claim"
+        ) as get_claim:
+            data = self.client.get("/extract_refs?page_title=Easter_Island&fields=urls,references.template_names").get_json()
+        # the html for cite_refs is never fetched and no claims are looked for
+        fetch_page_html.assert_not_called()
+        get_claim.assert_not_called()
+        assert sorted(data["urls"]) == ["https://example.com/a", "https://example.com/b", "https://example.com/c"]
+        assert data["references"] == [
+            {"template_names": ["cite web"]},
+            {"template_names": ["cite book"]},
+            {"template_names": []},
+        ]
+        for field in ["cite_refs", "cite_refs_count", "section_names", "reference_count"]:
+            assert field not in data
+        assert data["iari_command"] == "extract_refs"
+
+    def test_conditional_get(self):
+        response = self.client.get("/extract_refs?page_title=Easter_Island")
+        etag = response.headers["ETag"]
+        assert "en.wikipedia.org.9.20" in etag
+
+        with patch("src.models.v2.analyzers.wiki_analyzer.mw_extract_sections") as mw_extract_sections:
+            not_modified = self.client.get("/extract_refs?page_title=Easter_Island", headers={"If-None-Match": etag})
+        # the revision is resolved, nothing is analyzed
+        mw_extract_sections.assert_not_called()
+        assert not_modified.status_code == 304
+        assert not_modified.headers["ETag"] == etag
+        assert not_modified.get_data() == b""
+
+        # another representation, or another revision, has another etag
+        for url in ["/extract_refs?page_title=Easter_Island&fields=urls", "/extract_refs?page_title=Easter_Island&format=ndjson"]:
+            assert self.client.get(url, headers={"If-None-Match": etag}).status_code == 200
+        with patch("src.models.v2.analyzers.wiki_analyzer.get_wikipedia_article", return_value={**ARTICLE, "rev_id": 21}):
+            response = self.client.get("/extract_refs?page_title=Easter_Island", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.get_json()["revision_id"] == "21"
+
+    def test_single_flight_key_is_the_revision(self):
+        page_spec = {"page_title": "Easter_Island", "domain": "en.wikipedia.org", "as_of": None, "hydrate": False}
+        with patch("src.views.v2.extract_refs_v2.single_flight") as single_flight:
+            get_page_data(page_spec, ARTICLE)
+            get_page_data(page_spec, {**ARTICLE, "rev_id": 21})
+            get_page_data(page_spec)
+        keys = [call.args[0] for call in single_flight.call_args_list]
+        # a request that resolved a newer revision does not wait for the analysis of the older one
+        assert keys[0] == "extract_refs:en.wikipedia.org:Easter_Island:rev20:False"
+        assert keys[1] == "extract_refs:en.wikipedia.org:Easter_Island:rev21:False"
+        assert keys[2] == "extract_refs:en.wikipedia.org:Easter_Island:None:False"
+
+    def test_compact(self):
+        data = self.client.get("/extract_refs?page_title=Easter_Island").get_json()
+        compacted = self.client.get("/extract_refs?page_title=Easter_Island&format=compact").get_json()
+        assert "compact" in compacted
+        for fields in [data, compacted]:
+            del fields["execution_time"]
+        assert expand(compacted) == data
+
+    def test_since_revision(self):
+        base_article = {**ARTICLE, "rev_id": 19, "wikitext": WIKITEXT.replace("It was annexed later.<ref>[https://example.com/c C]</ref>", "")}
+        data = self.client.get("/extract_refs?page_title=Easter_Island").get_json()
+        with patch("src.views.v2.extract_refs_v2.get_cached_revision_by_id", return_value=base_article) as get_cached:
+            delta = self.client.get("/extract_refs?page_title=Easter_Island&since_revision=19").get_json()
+        get_cached.assert_called_once_with("en.wikipedia.org", 19)
+        assert delta["reference_count"] == 3
+        assert "references" not in delta
+        assert delta["delta"]["references"]["from_base"] == [0, 1, None]
+        assert delta["delta"]["references"]["added"] == [data["references"][2]]
+
+        # the base is not cached
+        with patch("src.views.v2.extract_refs_v2.get_cached_revision_by_id", return_value=None):
+            full = self.client.get("/extract_refs?page_title=Easter_Island&since_revision=19").get_json()
+        assert full["references"] == data["references"]
+        assert "delta" not in full
+
+    def test_fetchrefs_records(self):
+        with patch("src.views.v2.fetchrefs_v2.get_page_data", side_effect=lambda page, which_wiki: {
+            "page_title": page, "which_wiki": which_wiki, "refs": []
+        }):
+            # the records are produced as the response is read
+            records = read_ndjson(self.client.get("/fetchrefs?pages=Easter_Island&format=ndjson"))
+        assert records == [
+            {"record": "header", "which_wiki": "enwiki", "page_count": 1},
+            {"record": "page", "page_title": "Easter_Island", "which_wiki": "enwiki", "refs": []},
+        ]
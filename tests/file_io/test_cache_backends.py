@@ -0,0 +1,187 @@
+import gzip
+import json
+import os
+import tempfile
+import time
+from io import StringIO
+from unittest import TestCase
+from unittest.mock import patch
+
+import config
+from migrate_cache import export, import_, migrate
+from src.helpers import cache_utils
+from src.helpers.cache_utils import CacheType
+from src.models.cache import get_cache_backend
+from src.models.cache.flat_cache_backend import FlatCacheBackend
+from src.models.cache.sharded_cache_backend import ShardedCacheBackend, zstandard
+from src.models.cache.sqlite_cache_backend import SqliteCacheBackend
+
+
+class TestCacheBackends(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name + "/"
+        os.makedirs(self.root + "status")
+        os.makedirs(self.root + "urls/archives")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_flat_round_trip(self):
+        backend = FlatCacheBackend(self.root)
+        backend.set("status", "IABOT-abc", {"status_code": 200})
+        assert os.path.exists(f"{self.root}status/IABOT-abc.json")
+        assert backend.get("status", "IABOT-abc") == {"status_code": 200}
+        assert backend.get("status", "IABOT-missing") is None
+        backend.delete("status", "IABOT-abc")
+        assert backend.exists("status", "IABOT-abc") is False
+
+    def test_sharded_round_trip(self):
+        compressions = ["gzip", "none"] + (["zstd"] if zstandard else [])
+        for compression in compressions:
+            backend = ShardedCacheBackend(self.root, compression=compression)
+            payload = {"url": "https://example.com/ä", "status_code": 404}
+            backend.set("status", f"IABOT-{compression}", payload)
+            path = backend.path("status", f"IABOT-{compression}")
+            assert path.startswith(f"{self.root}status/")
+            assert len(os.path.relpath(path, self.root).split(os.sep)) == 4
+            assert backend.get("status", f"IABOT-{compression}") == payload
+            assert backend.exists("status", f"IABOT-{compression}") is True
+        # no temporary files are left behind
+        for directory, _, filenames in os.walk(self.root):
+            assert not [f for f in filenames if f.startswith(".tmp-")]
+
+    def test_get_encoded(self):
+        payload = {"title": "Påskön", "served_from_cache": True, "references": [{"id": 1}]}
+        backends = [
+            FlatCacheBackend(self.root),
+            ShardedCacheBackend(self.root, compression="none"),
+            SqliteCacheBackend(self.root),
+        ] + ([ShardedCacheBackend(self.root, compression="zstd")] if zstandard else [])
+        for backend in backends:
+            backend.set("status", "key", payload)
+            body, content_encoding = backend.get_encoded("status", "key")
+            assert content_encoding is None
+            assert json.loads(body) == payload, backend.name
+            assert backend.get_encoded("status", "missing") is None
+
+        gzip_backend = ShardedCacheBackend(self.root, compression="gzip")
+        gzip_backend.set("status", "gzipped", payload)
+        body, content_encoding = gzip_backend.get_encoded("status", "gzipped")
+        assert content_encoding == "gzip"
+        assert json.loads(gzip.decompress(body)) == payload
+
+    def test_sharded_reads_other_compression(self):
+        ShardedCacheBackend(self.root, compression="gzip").set("status", "key", [1, 2])
+        assert ShardedCacheBackend(self.root, compression="none").get("status", "key") == [1, 2]
+
+    def test_sharded_ttl(self):
+        backend = ShardedCacheBackend(self.root, ttl_seconds={"status": 60})
+        backend.set("status", "old", {"a": 1})
+        backend.set("status", "new", {"a": 2})
+        expired = time.time() - 120
+        os.utime(backend.path("status", "old"), (expired, expired))
+        assert backend.exists("status", "old") is False
+        assert backend.get("status", "old") is None
+        assert not os.path.exists(backend.path("status", "old"))
+        assert backend.get("status", "new") == {"a": 2}
+
+    def test_sharded_eviction(self):
+        backend = ShardedCacheBackend(self.root, compression="none", max_bytes={"status": 1})
+        for number in range(5):
+            backend.set("status", f"key{number}", {"number": number})
+            mtime = time.time() - 100 + number
+            os.utime(backend.path("status", f"key{number}"), (mtime, mtime))
+        backend.max_bytes = {"status": backend.disk_usage("status") - 1}
+        assert backend.evict("status") == 1
+        assert backend.get("status", "key0") is None
+        assert backend.get("status", "key4") == {"number": 4}
+
+    def test_sharded_eviction_in_background(self):
+        backend = ShardedCacheBackend(self.root, compression="none", max_bytes={"status": 1})
+        backend.EVICTION_INTERVAL = 3
+        for number in range(3):
+            backend.set("status", f"key{number}", {"number": number})
+        backend.eviction_thread.join()
+        assert list(backend.iter_items("status")) == []
+    def test_sharded_iteration_skips_nested_namespaces(self):
+        backend = ShardedCacheBackend(self.root)
+        backend.set("urls", "a", 1)
+        backend.set("urls/archives", "b", 2)
+        assert dict(backend.iter_items("urls")) == {"a": 1}
+        assert dict(backend.iter_items("urls/archives")) == {"b": 2}
+
+    def test_migrate(self):
+        flat = FlatCacheBackend(self.root)
+        flat.set("status", "IABOT-1", {"status_code": 200})
+        flat.set("urls/archives", "abc", {"archived": True})
+        os.makedirs(self.root + "articlesV2")
+        flat.set("articlesV2", "en.1.2", {"served_from_cache": False, "references": [{"served_from_cache": False}]})
+        sharded = ShardedCacheBackend(self.root)
+        migrate(flat, sharded, [], delete_source=True)
+        # gzipped hits are sent as stored, so legacy articles are flagged on the way
+        assert sharded.get("articlesV2", "en.1.2") == {"served_from_cache": True, "references": [{"served_from_cache": False}]}
+        assert sharded.namespaces() == ["articlesV2", "status", "urls/archives"]
+        assert sharded.get("status", "IABOT-1") == {"status_code": 200}
+        assert sharded.get("urls/archives", "abc") == {"archived": True}
+        assert flat.exists("status", "IABOT-1") is False
+
+    def test_cache_utils_uses_configured_backend(self):
+        with patch.object(config, "iari_cache_dir", self.root), patch.object(
+            config, "cache_backend", "sharded", create=True
+        ):
+            cache_utils.set_cache("https://example.com", CacheType.status, "iabot", {"a": 1})
+            assert cache_utils.is_cached("https://example.com", CacheType.status, "iabot")
+            assert cache_utils.get_cache("https://example.com", CacheType.status, "iabot") == {"a": 1}
+            assert isinstance(get_cache_backend(), ShardedCacheBackend)
+
+    def test_sqlite_round_trip(self):
+        backend = SqliteCacheBackend(self.root, ttl_seconds={"status": 60})
+        backend.set("articlesV2", "en.wikipedia.org.123.456", {"title": "Easter Island"})
+        backend.set("articlesV2", "en.wikipedia.org.123.789", {"title": "Easter Island"})
+        backend.set("status", "IABOT-0123456789abcdef", {"status_code": 200})
+        backend.restore("status", "IABOT-aaaaaaaaaaaaaaaa", {"status_code": 404}, time.time() - 120)
+        assert os.path.exists(f"{self.root}cache.sqlite3")
+        assert backend.get("articlesV2", "en.wikipedia.org.123.456") == {"title": "Easter Island"}
+        assert backend.get("articlesV2", "missing") is None
+        # expired
+        assert backend.exists("status", "IABOT-aaaaaaaaaaaaaaaa") is False
+        assert backend.evict("status") == 1
+        backend.delete("articlesV2", "en.wikipedia.org.123.789")
+        assert backend.exists("articlesV2", "en.wikipedia.org.123.789") is False
+
+    def test_sqlite_find(self):
+        backend = SqliteCacheBackend(self.root)
+        backend.set("articlesV2", "en.wikipedia.org.123.456", {})
+        backend.set("articlesV2", "en.wikipedia.org.123.789", {})
+        backend.set("articlesV2", "sv.wikipedia.org.5.6", {})
+        backend.set("status", "IABOT-0123456789abcdef", {})
+        assert {e["key"] for e in backend.find("articlesV2", page_id=123)} == {
+            "en.wikipedia.org.123.456",
+            "en.wikipedia.org.123.789",
+        }
+        assert [e["key"] for e in backend.find(revision=6)] == ["sv.wikipedia.org.5.6"]
+        assert [e["key"] for e in backend.find(iari_id="en.wikipedia.org.123.456")] == ["en.wikipedia.org.123.456"]
+        assert [e["namespace"] for e in backend.find(url_hash="0123456789abcdef")] == ["status"]
+        assert len(backend.find(fetched_after=time.time() - 60)) == 4
+        assert backend.find(fetched_before=time.time() - 60) == []
+
+    def test_sqlite_evicts_on_write(self):
+        backend = SqliteCacheBackend(self.root, max_bytes={"status": 1})
+        backend.EVICTION_INTERVAL = 3
+        backend.restore_many("status", [(f"key{number}", {"number": number}, time.time()) for number in range(2)])
+        assert backend.eviction_thread is None
+        backend.set("status", "key2", {"number": 2})
+        backend.eviction_thread.join()
+        assert backend.disk_usage("status") == 0
+
+    def test_sqlite_export_import(self):
+        flat = FlatCacheBackend(self.root)
+        flat.set("status", "IABOT-1", {"status_code": 200})
+        flat.set("urls/archives", "abc", {"archived": True})
+        output = StringIO()
+        assert export(flat, [], output) == 2
+        backend = SqliteCacheBackend(self.root)
+        assert import_(backend, StringIO(output.getvalue())) == 2
+        assert backend.namespaces() == ["status", "urls/archives"]
+        assert backend.get("urls/archives", "abc") == {"archived": True}
@@ -0,0 +1,51 @@
+from unittest import TestCase
+
+import mwparserfromhell
+
+from src.models.v2.analyzers.wiki_analyzer import ClaimIndex, get_claim, get_refs_from_section, is_ref_tag
+
+WIKITEXT = (
+    "In the first half of the 20th century, steam reportedly came out of the\n"
+    " [[Rano Kau]] crater wall. This was photographed by the island's manager, Mr. Edmunds."
+    "<ref>Routledge</ref><ref name=\"b\">Heyerdahl</ref>\n"
+    "The crater is filled with a lake<ref>{{cite web |url=https://example.org |title=Lake}}</ref>"
+)
+
+
+class TestClaimIndex(TestCase):
+    def setUp(self):
+        self.nodes = mwparserfromhell.parse(WIKITEXT).nodes
+        self.ref_numbers = [number for number, node in enumerate(self.nodes) if is_ref_tag(node)]
+
+    def claims(self, **kwargs):
+        index = ClaimIndex(self.nodes, self.ref_numbers, **kwargs)
+        return [index.get_claim(number)[0] for number in self.ref_numbers]
+
+    def test_claims(self):
+        # as claims have always been found: a ref before the ref is part of its claim
+        self.assertEqual(self.claims(abbreviations=[]), ["Edmunds.", "Edmunds.Routledge", "\nThe crater is filled with a lake"])
+
+    def test_abbreviations(self):
+        self.assertEqual(
+            self.claims(abbreviations=["Mr", "Dr"])[:2],
+            ["This was photographed by the island's manager, Mr. Edmunds.", "This was photographed by the island's manager, Mr. Edmunds.Routledge"],
+        )
+
+    def test_same_claims_without_index(self):
+        index = ClaimIndex(self.nodes, self.ref_numbers, abbreviations=[])
+        for number in range(len(self.nodes)):
+            self.assertEqual(get_claim(number, self.nodes, index), ClaimIndex(self.nodes, [number], abbreviations=[]).get_claim(number))
+
+    def test_claim_array(self):
+        claim, claim_array = ClaimIndex(self.nodes, abbreviations=[]).get_claim(self.ref_numbers[1])
+        self.assertEqual(claim, "Edmunds.Routledge")
+        # the nodes searched back, up to the one ending a sentence
+        self.assertEqual(len(claim_array), 2)
+        self.assertTrue(claim_array[0].endswith("] Routledge"))
+        self.assertTrue(claim_array[1].endswith("]  crater wall. This was photographed by the island's manager, Mr. Edmunds."))
+
+    def test_refs_from_section(self):
+        refs = get_refs_from_section(mwparserfromhell.parse(WIKITEXT), hydrate=True)
+        self.assertEqual(refs[2]["claim"], "\nThe crater is filled with a lake")
+        self.assertEqual(list(refs[0])[-2:], ["claim", "claim_array"])
+        self.assertEqual([ref["claim"] for ref in get_refs_from_section(mwparserfromhell.parse(WIKITEXT), claims=False)], ["", "", ""])
@@ -0,0 +1,78 @@
+import json
+from unittest import TestCase
+
+from src.helpers.compact import compact, expand
+
+REFERENCES = [
+    {
+        "wikitext": "<ref>{{cite web |url=https://example.com/a |title=A}}</ref>",
+        "name": "a",
+        "urls": ["https://example.com/a"],
+        "section": "History",
+        "templates": [{"name": "cite web", "parameters": {"url": "https://example.com/a", "title": "A"}}],
+        "template_names": ["cite web"],
+        "hydrate": True,
+    },
+    {
+        "wikitext": "<ref>{{cite web |url=https://example.com/b}}{{dead link}}</ref>",
+        "name": None,
+        "urls": ["https://example.com/b"],
+        "section": "History",
+        "templates": [
+            {"name": "cite web", "parameters": {"url": "https://example.com/b"}},
+            {"name": "dead link", "parameters": {}},
+        ],
+        "template_names": ["cite web", "dead link"],
+        "ref_info": {"cite_class": ["citation"]},
+    },
+    {
+        "wikitext": "<ref>[https://example.com/a A]</ref>",
+        "name": None,
+        "urls": ["https://example.com/a"],
+        "section": "Sources",
+        "templates": [{"name": "cite web"}],
+        "template_names": [],
+        "ref_info": None,
+    },
+]
+
+
+class TestCompact(TestCase):
+    def round_trip(self, data):
+        encoded = json.loads(json.dumps(compact(data)))
+        assert expand(encoded) == data
+        return encoded
+
+    def test_round_trip(self):
+        data = {
+            "page_title": "Easter_Island",
+            "reference_count": 3,
+            "urls": ["https://example.com/a", "https://example.com/b"],
+            "section_names": ["History", "Sources"],
+            "references": REFERENCES,
+            "url_dict": {"https://example.com/a": {"count": 2, "refs": [1, 3]}, "https://example.com/b": {"count": 1, "refs": [2]}},
+        }
+        encoded = self.round_trip(data)
+        table = encoded["compact"]
+        assert table["fields"] == {"urls": "S", "section_names": "S", "references": "r", "url_dict": "k"}
+        # each string once
+        assert len(table["strings"]) == len(set(table["strings"]))
+        assert table["strings"].count("https://example.com/a") == 1
+        columns = encoded["references"]["columns"]
+        assert columns["section"][0] == "s"
+        assert columns["urls"][0] == "S"
+        assert columns["templates"][0] == "t"
+        assert columns["ref_info"][0] == "v"
+        assert encoded["references"]["absent"] == {"hydrate": [1, 2], "ref_info": [0]}
+        assert encoded["page_title"] == "Easter_Island"
+
+    def test_unsupported_shapes_are_kept(self):
+        data = {"urls": ["https://example.com/a", 1], "references": [{"templates": [{"name": "x", "other": 1}]}, 2]}
+        encoded = self.round_trip(data)
+        assert encoded["urls"] == data["urls"]
+        assert encoded["references"] == data["references"]
+        assert encoded["compact"]["fields"] == {}
+
+    def test_empty(self):
+        self.round_trip({"urls": [], "references": [], "url_dict": {}})
+        self.round_trip({})
@@ -0,0 +1,51 @@
+import json
+from unittest import TestCase
+
+from src.helpers.delta import apply_delta, make_delta
+
+A = {"wikitext": "<ref>A</ref>", "urls": [], "section": "History", "claim": "One."}
+B = {"wikitext": "<ref>B</ref>", "urls": ["https://example.com/b"], "section": "History", "claim": "Two."}
+C = {"wikitext": "<ref>C</ref>", "urls": [], "section": "Sources", "claim": ""}
+NAMED = {"wikitext": '<ref name="n" />', "urls": [], "section": "History", "claim": "Again."}
+
+
+class TestDelta(TestCase):
+    def round_trip(self, base, current):
+        delta = json.loads(json.dumps(make_delta(base, current, 1)))
+        assert apply_delta(base, delta) == current
+        return delta
+
+    def test_delta(self):
+        base = {"reference_count": 3, "references": [A, B, C], "urls": ["https://example.com/b"]}
+        moved_b = {**B, "section": "Sources", "claim": "Two, moved."}
+        d = {"wikitext": "<ref>D</ref>", "urls": [], "section": "History", "claim": "Four."}
+        current = {"reference_count": 3, "references": [d, A, moved_b], "urls": ["https://example.com/b"]}
+        delta = self.round_trip(base, current)
+        assert "references" not in delta
+        assert delta["reference_count"] == 3
+        references = delta["delta"]["references"]
+        assert delta["delta"]["since_revision"] == 1
+        assert references["from_base"] == [None, 0, 1]
+        assert references["added"] == [d]
+        assert references["removed"] == [2]
+        assert references["changed"] == [{"index": 2, "set": {"section": "Sources", "claim": "Two, moved."}, "unset": []}]
+
+    def test_unchanged(self):
+        base = {"references": [A, NAMED, B, NAMED]}
+        delta = self.round_trip(base, {"references": [A, NAMED, B, NAMED]})
+        assert delta["delta"]["references"] == {"from_base": [0, 1, 2, 3], "added": [], "removed": [], "changed": []}
+
+    def test_repeated_references(self):
+        # the same named ref used more often, and a field dropped
+        base = {"references": [NAMED, {**A, "hydrate": True}]}
+        delta = self.round_trip(base, {"references": [NAMED, NAMED, A]})
+        assert delta["delta"]["references"]["from_base"] == [0, None, 1]
+        assert delta["delta"]["references"]["changed"] == [{"index": 2, "set": {}, "unset": ["hydrate"]}]
+
+    def test_without_base_references(self):
+        current = {"references": [A], "cite_refs": [{"id": "cite_note-1"}]}
+        delta = self.round_trip({"cite_refs": []}, current)
+        assert delta["references"] == [A]
+        assert delta["delta"]["cite_refs"]["added"] == [{"id": "cite_note-1"}]
+        # a full response as it is
+        assert apply_delta({}, current) == current
@@ -0,0 +1,77 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from flask import Flask, Response
+from flask_restful import Api  # type: ignore
+
+import config
+from src.helpers.etags import make_etag, not_modified, with_etag
+from src.views.v2.article_cache_view_v2 import ArticleCacheV2
+
+IARI_ID = "en.wikipedia.org.9.20"
+
+
+class TestEtags(TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+
+    def test_make_etag(self):
+        etag = make_etag(IARI_ID)
+        assert etag.endswith(f"-{IARI_ID}")
+        assert make_etag(IARI_ID, fields=None) == etag
+        assert make_etag(IARI_ID, format="json") != etag
+        assert make_etag(IARI_ID, format="json") == make_etag(IARI_ID, format="json")
+        assert make_etag(IARI_ID, format="json") != make_etag(IARI_ID, format="ndjson")
+        assert make_etag(IARI_ID, fields={"urls": {}}) != make_etag(IARI_ID, fields={"references": {}})
+
+    def test_not_modified(self):
+        etag = make_etag(IARI_ID)
+        with self.app.test_request_context():
+            assert not_modified(etag) is None
+        with self.app.test_request_context(headers={"If-None-Match": f'"other", "{etag}"'}):
+            response = not_modified(etag)
+            assert not_modified(None) is None
+        assert response.status_code == 304
+        assert response.headers["ETag"] == f'"{etag}"'
+        # the etag of a response sent gzipped as stored
+        with self.app.test_request_context(headers={"If-None-Match": f'"{etag}-gzip"'}):
+            assert not_modified(etag).status_code == 304
+
+    def test_with_etag(self):
+        assert with_etag(({"a": 1}, 200), "tag") == ({"a": 1}, 200, {"ETag": '"tag"'})
+        assert with_etag(({"a": 1}, 404), "tag") == ({"a": 1}, 404)
+        assert with_etag(({"a": 1}, 200), None) == ({"a": 1}, 200)
+        gzipped = with_etag(Response(b"", headers={"Content-Encoding": "gzip"}), "tag")
+        assert gzipped.headers["ETag"] == '"tag-gzip"'
+
+
+class TestArticleCacheEtag(TestCase):
+    def setUp(self):
+        app = Flask(__name__)
+        api = Api(app)
+        api.add_resource(ArticleCacheV2, "/article_cache")
+        self.client = app.test_client()
+
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        os.makedirs(os.path.join(cache_dir.name, "articles"))
+        with open(os.path.join(cache_dir.name, "articles", f"{IARI_ID}.json"), "w") as file:
+            json.dump({"iari_id": IARI_ID, "references": []}, file)
+        p = patch.object(config, "iari_cache_dir", cache_dir.name + "/")
+        p.start()
+        self.addCleanup(p.stop)
+
+    def test_conditional_get(self):
+        response = self.client.get(f"/article_cache?iari_id={IARI_ID}")
+        assert response.status_code == 200
+        etag = response.headers["ETag"]
+        assert response.get_json()["iari_id"] == IARI_ID
+
+        with patch("src.models.file_io.FileIo.read_from_disk") as read_from_disk:
+            response = self.client.get(f"/article_cache?iari_id={IARI_ID}", headers={"If-None-Match": etag})
+        # answered before the cache file is read
+        read_from_disk.assert_not_called()
+        assert response.status_code == 304
@@ -0,0 +1,37 @@
+from unittest import TestCase
+
+from src.helpers.fieldsets import parse_fields, prune_fields, wants_any, wants_field
+
+
+class TestFieldsets(TestCase):
+    def test_parse_fields(self):
+        assert parse_fields("") is None
+        assert parse_fields(None) is None
+        assert parse_fields("urls, references.template_names,references.claim") == {
+            "urls": {},
+            "references": {"template_names": {}, "claim": {}},
+        }
+
+    def test_wants_field(self):
+        fieldset = parse_fields("urls,references.template_names,cite_refs")
+        assert wants_field(fieldset, "urls")
+        assert wants_field(fieldset, "references")
+        assert wants_field(fieldset, "references.template_names")
+        assert not wants_field(fieldset, "references.claim")
+        assert wants_field(fieldset, "cite_refs.cite_html")
+        assert not wants_field(fieldset, "section_names")
+        assert wants_field(None, "references.claim")
+        assert wants_any(fieldset, "section_names", "urls")
+        assert not wants_any(fieldset, "section_names", "ores_score")
+
+    def test_prune_fields(self):
+        data = {
+            "urls": ["a"],
+            "url_count": 1,
+            "references": [{"claim": "x", "template_names": ["cite web"]}, {"claim": "y", "template_names": []}],
+        }
+        assert prune_fields(data, parse_fields("urls,references.template_names")) == {
+            "urls": ["a"],
+            "references": [{"template_names": ["cite web"]}, {"template_names": []}],
+        }
+        assert prune_fields(data, None) == data
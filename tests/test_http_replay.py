@@ -0,0 +1,131 @@
+import asyncio
+import json
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import TestCase
+from unittest.mock import patch
+
+import aiohttp
+import requests
+
+import config
+from src.helpers.http_replay import (
+    REPLAY,
+    FixtureNotFound,
+    HttpReplay,
+    install_http_replay,
+    request_key,
+    uninstall_http_replay,
+)
+
+
+class UpstreamHandler(BaseHTTPRequestHandler):
+    calls = 0
+
+    def do_GET(self):
+        UpstreamHandler.calls += 1
+        body = json.dumps({"path": self.path}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+async def aiohttp_get(url: str):
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url) as response:
+            return response.status, await response.json(content_type=None)
+
+
+class TestHttpReplay(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), UpstreamHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        UpstreamHandler.calls = 0
+
+    def tearDown(self):
+        uninstall_http_replay()
+        self.server.shutdown()
+        self.server.server_close()
+        self.directory.cleanup()
+
+    @staticmethod
+    def settings(**settings):
+        return patch.multiple(config, create=True, **settings)
+
+    def record(self, *paths):
+        install_http_replay("record", self.directory.name)
+        for path in paths:
+            requests.get(self.base_url + path)
+
+    def test_request_key(self):
+        self.assertEqual(
+            request_key("get", "HTTPS://En.Wikipedia.org/w/api.php?b=2&a=1"),
+            request_key("GET", "https://en.wikipedia.org/w/api.php?a=1&b=2"),
+        )
+        self.assertNotEqual(
+            request_key("GET", "https://en.wikipedia.org/w/api.php?a=1"),
+            request_key("POST", "https://en.wikipedia.org/w/api.php?a=1"),
+        )
+        self.assertEqual(
+            request_key("GET", "https://en.wikipedia.org/w/api.php?a=1&rvstart=2024", ignored_params=["rvstart"]),
+            request_key("GET", "https://en.wikipedia.org/w/api.php?a=1&rvstart=2025", ignored_params=["rvstart"]),
+        )
+
+    def test_record_then_replay(self):
+        self.record("/page?title=Earth")
+        self.assertEqual(UpstreamHandler.calls, 1)
+
+        replay = install_http_replay(REPLAY, self.directory.name)
+        response = requests.get(self.base_url + "/page?title=Earth")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"path": "/page?title=Earth"})
+        self.assertEqual(response.headers["Content-Type"], "application/json")
+        self.assertEqual(UpstreamHandler.calls, 1)
+        self.assertEqual(replay.counts["replayed"], 1)
+
+        with self.assertRaises(FixtureNotFound):
+            requests.get(self.base_url + "/page?title=Mars")
+        self.assertEqual(replay.counts["missing"], 1)
+
+    def test_replay_with_aiohttp(self):
+        install_http_replay("record", self.directory.name)
+        recorded = asyncio.run(aiohttp_get(self.base_url + "/status"))
+
+        install_http_replay(REPLAY, self.directory.name)
+        self.assertEqual(asyncio.run(aiohttp_get(self.base_url + "/status")), recorded)
+        self.assertEqual(UpstreamHandler.calls, 1)
+        with self.assertRaises(aiohttp.ClientConnectionError):
+            asyncio.run(aiohttp_get(self.base_url + "/other"))
+
+    def test_ignored_params_match_loosely(self):
+        with self.settings(http_replay_ignored_params=["rvstart"]):
+            self.record("/api?titles=Earth&rvstart=2024-01-01T00:00:00Z")
+            install_http_replay(REPLAY, self.directory.name)
+            response = requests.get(self.base_url + "/api?titles=Earth&rvstart=2025-06-01T00:00:00Z")
+        self.assertEqual(response.json(), {"path": "/api?titles=Earth&rvstart=2024-01-01T00:00:00Z"})
+
+    def test_injected_errors_and_latency(self):
+        self.record("/page")
+        replay = HttpReplay(REPLAY, self.directory.name, errors={"default": {"rate": 1.0, "status": 503}})
+        fixture, _ = replay.lookup("GET", self.base_url + "/page", b"")
+        self.assertEqual(replay.injected_error(self.base_url + "/page"), 503)
+        self.assertEqual(replay.counts["injected_errors"], 1)
+
+        replay = HttpReplay(REPLAY, self.directory.name, latency={"127.0.0.1": 0.25, "default": 0.0})
+        self.assertEqual(replay.delay(self.base_url + "/page", fixture), 0.25)
+        self.assertEqual(replay.delay("https://ores.wikimedia.org/", fixture), 0.0)
+        replay = HttpReplay(REPLAY, self.directory.name, latency="recorded")
+        self.assertEqual(replay.delay(self.base_url + "/page", fixture), fixture["elapsed"])
+
+        with self.settings(http_replay_errors={"default": {"rate": 1.0, "status": 0}}):
+            install_http_replay(REPLAY, self.directory.name)
+            with self.assertRaises(requests.ConnectionError):
+                requests.get(self.base_url + "/page")
@@ -0,0 +1,48 @@
+import datetime
+import gzip
+import json
+from unittest import TestCase
+
+from flask import Flask
+
+from src.helpers.json_encoding import SERVED_FROM_CACHE_HEADER, dumps, encoded_response
+
+
+class TestJsonEncoding(TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+
+    def test_dumps(self):
+        payload = {"title": "Påskön", "count": 3, "ratio": 0.5, "none": None, "list": [True, {"a": "b"}]}
+        assert json.loads(dumps(payload)) == payload
+        assert json.loads(dumps(payload, indent=True)) == payload
+        # like json with default=str
+        assert json.loads(dumps({1: datetime.date(2024, 1, 2)})) == {"1": "2024-01-02"}
+        # beyond 64 bits
+        assert json.loads(dumps({"big": 2**70})) == {"big": 2**70}
+
+    def test_gzipped_hit(self):
+        body = gzip.compress(b'{"served_from_cache":true,"a":1}')
+        with self.app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+            response = encoded_response(body, "gzip")
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.headers[SERVED_FROM_CACHE_HEADER] == "true"
+        assert response.get_data() == body
+
+        with self.app.test_request_context():
+            response = encoded_response(body, "gzip")
+        assert "Content-Encoding" not in response.headers
+        assert response.get_json() == {"served_from_cache": True, "a": 1}
+
+    def test_legacy_hit_is_flagged(self):
+        body = json.dumps({"served_from_cache": False, "references": [{"served_from_cache": False}]}, indent=4)
+        with self.app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+            plain = encoded_response(body.encode())
+            gzipped = encoded_response(gzip.compress(body.encode()), "gzip")
+        # a gzipped hit is sent as stored, migrate_cache.py flags the legacy entries it compresses
+        assert gzipped.headers["Content-Encoding"] == "gzip"
+        with self.app.test_request_context():
+            decompressed = encoded_response(gzip.compress(body.encode()), "gzip")
+        for response in [plain, decompressed]:
+            assert "Content-Encoding" not in response.headers
+            assert response.get_json() == {"served_from_cache": True, "references": [{"served_from_cache": False}]}
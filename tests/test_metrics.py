@@ -0,0 +1,111 @@
+import json
+import os
+import socket
+import tempfile
+from unittest import TestCase
+
+from src import app
+from src.helpers.metrics import (
+    ARCHIVE,
+    Metrics,
+    collect_metrics,
+    empty_metrics,
+    merge_metrics,
+    prometheus_text,
+    server_timing,
+    span,
+    upstream_label,
+)
+
+
+class TestMetrics(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_process(self, pid: int, **observations) -> Metrics:
+        """writes the metrics file of process pid, as that process would"""
+        metrics = Metrics(self.directory.name)
+        for label, seconds in observations.items():
+            metrics.observe("stages", label, seconds)
+        metrics.count_cache("probes", hit=True)
+        metrics.add_in_flight("/v2/article", 1)
+        metrics.flush()
+        os.rename(metrics.path, os.path.join(self.directory.name, f"{socket.gethostname()}-{pid}.json"))
+        return metrics
+
+    def test_server_timing(self):
+        self.assertEqual(
+            server_timing({("fetch", None): 0.4123, ("upstream", "en.wikipedia.org"): 0.4}, total=0.5),
+            'fetch;dur=412.3, upstream;dur=400.0;desc="en.wikipedia.org", total;dur=500.0',
+        )
+
+    def test_upstream_label(self):
+        self.assertEqual(upstream_label("https://de.wikipedia.org/w/api.php?action=query"), "de.wikipedia.org")
+        self.assertEqual(upstream_label("https://iabot.wmcloud.org/api.php?wiki=enwiki"), "iabot.wmcloud.org")
+        # the urls patrons have fetched share one label
+        self.assertEqual(upstream_label("https://www.example.com/paper.pdf"), "other")
+        self.assertEqual(upstream_label("https://evil.wikipedia.org.example.com/"), "other")
+        self.assertEqual(upstream_label("not a url"), "other")
+
+    def test_server_timing_header(self):
+        with app.test_request_context("/v2/version"):
+            with span("parse"):
+                pass
+            with span("parse"):
+                pass
+            from flask import g
+            self.assertEqual(list(g.server_timing), [("parse", None)])
+
+        response = app.test_client().get("/v2/version")
+        self.assertEqual(response.status_code, 200)
+        entries = [entry.split(";")[0] for entry in response.headers["Server-Timing"].split(", ")]
+        self.assertIn("encode", entries)
+        self.assertEqual(entries[-1], "total")
+
+    def test_merge_metrics(self):
+        first = Metrics(self.directory.name)
+        first.observe("stages", "parse", 0.003)
+        first.count_cache("status", hit=False)
+        second = Metrics(self.directory.name)
+        second.observe("stages", "parse", 2.0)
+        second.count_cache("status", hit=True)
+        second.add_in_flight("/v2/article", 2)
+
+        total = merge_metrics(merge_metrics(empty_metrics(), first.data), second.data, in_flight=False)
+        self.assertEqual(total["stages"]["parse"]["count"], 2)
+        self.assertAlmostEqual(total["stages"]["parse"]["sum"], 2.003)
+        self.assertEqual(total["stages"]["parse"]["buckets"][0], 1)
+        self.assertEqual(sum(total["stages"]["parse"]["buckets"]), 2)
+        self.assertEqual(total["cache"]["status"], {"hits": 1, "misses": 1})
+        self.assertEqual(total["in_flight"], {})
+
+    def test_collect_archives_exited_processes(self):
+        # pids this large are not in use
+        self.write_process(2 ** 22 + 1, parse=0.1)
+        self.write_process(os.getppid(), parse=0.2, refs=0.3)
+
+        metrics = collect_metrics(self.directory.name)
+        self.assertEqual(metrics["processes"], 1)
+        self.assertEqual(metrics["stages"]["parse"]["count"], 2)
+        self.assertEqual(metrics["cache"]["probes"], {"hits": 2, "misses": 0})
+        # the requests in flight of an exited process are dropped
+        self.assertEqual(metrics["in_flight"], {"/v2/article": 1})
+        self.assertTrue(os.path.exists(os.path.join(self.directory.name, ARCHIVE)))
+        self.assertFalse(os.path.exists(os.path.join(self.directory.name, f"{socket.gethostname()}-{2 ** 22 + 1}.json")))
+
+        # archived counts are not counted twice
+        self.assertEqual(collect_metrics(self.directory.name)["stages"]["parse"]["count"], 2)
+        with open(os.path.join(self.directory.name, ARCHIVE)) as file:
+            self.assertEqual(json.load(file)["stages"]["parse"]["count"], 1)
+
+    def test_prometheus_text(self):
+        self.write_process(os.getppid(), parse=0.02)
+        text = prometheus_text(collect_metrics(self.directory.name))
+        self.assertIn('iari_stage_seconds_bucket{stage="parse",le="0.025"} 1', text)
+        self.assertIn('iari_stage_seconds_count{stage="parse"} 1', text)
+        self.assertIn('iari_cache_lookups_total{namespace="probes",result="hit"} 1', text)
+        self.assertIn('iari_requests_in_flight{endpoint="/v2/article"} 1', text)
+        self.assertIn("iari_processes 1", text)
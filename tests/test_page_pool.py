@@ -0,0 +1,75 @@
+import threading
+import time
+from unittest import TestCase
+from unittest.mock import patch
+
+import config
+from src.helpers import page_pool
+from src.helpers.page_pool import run_batch
+
+
+def sleep_and_return(value, seconds):
+    time.sleep(seconds)
+    if value == "fail":
+        raise ValueError("page failed")
+    return value
+
+
+class TestPagePool(TestCase):
+    def setUp(self):
+        patcher = patch.multiple(config, page_pool_size=4, page_pool_start_method="fork", create=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(page_pool.shutdown_pool)
+        page_pool.shutdown_pool()
+
+    def test_results_are_in_input_order(self):
+        arguments = [(number, (4 - number) * 0.05) for number in range(5)]
+        assert run_batch(sleep_and_return, arguments) == [(number, None) for number in range(5)]
+
+    def test_errors_are_returned_per_page(self):
+        results = run_batch(sleep_and_return, [("a", 0), ("fail", 0), ("b", 0)])
+        assert results[0] == ("a", None)
+        assert results[1] == (None, {"error": "ValueError", "details": "page failed"})
+        assert results[2] == ("b", None)
+
+    def test_pages_run_in_parallel(self):
+        run_batch(sleep_and_return, [(0, 0)])  # start the processes
+        start = time.monotonic()
+        results = run_batch(sleep_and_return, [(number, 0.5) for number in range(8)])
+        assert time.monotonic() - start < 2
+        assert [error for _, error in results] == [None] * 8
+
+    def test_time_budget(self):
+        results = run_batch(sleep_and_return, [("fast", 0), ("slow", 3)], time_budget=1)
+        assert results[0] == ("fast", None)
+        assert results[1][1]["error"] == "TimeoutError"
+
+    def test_over_budget_pages_are_stopped(self):
+        pool = page_pool.get_pool()
+        pool.submit(sleep_and_return, 0, 0).result()
+        processes = list(pool._processes.values())
+        results = run_batch(sleep_and_return, [("slow", 30)], time_budget=0.5)
+        assert results[0][1]["error"] == "TimeoutError"
+        assert page_pool.get_pool() is not pool
+        for process in processes:
+            process.join(5)
+            assert not process.is_alive()
+        assert run_batch(sleep_and_return, [("next", 0)]) == [("next", None)]
+
+    def test_concurrent_batch_keeps_its_pages(self):
+        run_batch(sleep_and_return, [(0, 0)])  # start the processes
+        over_budget = []
+        thread = threading.Thread(
+            target=lambda: over_budget.extend(run_batch(sleep_and_return, [("slow", 3)], time_budget=0.5))
+        )
+        thread.start()
+        time.sleep(0.1)
+        # more pages than free processes, some are still queued when the other batch recycles the pool
+        results = run_batch(sleep_and_return, [(number, 0.4) for number in range(8)], time_budget=20)
+        thread.join()
+        assert over_budget[0][1]["error"] == "TimeoutError"
+        assert results == [(number, None) for number in range(8)]
+
+    def test_empty_batch(self):
+        assert run_batch(sleep_and_return, []) == []
@@ -0,0 +1,105 @@
+import tempfile
+import threading
+import time
+from unittest import TestCase
+from unittest.mock import patch
+
+import config
+from src import app
+from src.helpers.profiling import ADMIN_TOKEN_HEADER, StackSampler, is_admin, list_profiles, prune_profiles
+
+
+def busy_wait(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class TestProfiling(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.settings = patch.multiple(
+            config, create=True, iari_cache_dir=self.directory.name + "/", admin_token="secret", profile_interval=0.001
+        )
+        self.settings.start()
+        self.client = app.test_client()
+
+    def tearDown(self):
+        self.settings.stop()
+        self.directory.cleanup()
+
+    def get(self, path: str, token: str = "secret"):
+        return self.client.get(path, headers={ADMIN_TOKEN_HEADER: token} if token else {})
+
+    def test_is_admin(self):
+        self.assertTrue(is_admin("secret"))
+        self.assertFalse(is_admin("guess"))
+        self.assertFalse(is_admin(None))
+        with patch.object(config, "admin_token", ""):
+            self.assertFalse(is_admin(""))
+
+    def test_stack_sampler(self):
+        with StackSampler(threading.get_ident(), interval=0.001) as sampler:
+            busy_wait(0.05)
+        self.assertGreater(sum(sampler.stacks.values()), 0)
+        self.assertIn("busy_wait_(tests/test_profiling.py:", sampler.collapsed())
+        stack, count = sampler.collapsed().splitlines()[0].rsplit(" ", 1)
+        self.assertTrue(count.isdigit())
+
+    def test_profile_needs_admin_token(self):
+        self.assertEqual(self.get("/v2/version?profile=1", token="").status_code, 403)
+        self.assertEqual(self.get("/v2/version?profile=1", token="guess").status_code, 403)
+        self.assertEqual(self.get("/v2/profiles", token="").status_code, 403)
+        self.assertEqual(self.get("/v2/version?profile=sometimes").status_code, 400)
+        # profile=0 is no profiling, for anyone
+        response = self.get("/v2/version?profile=0", token="")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Link", response.headers)
+        self.assertEqual(list_profiles(), [])
+
+    def test_profile_request(self):
+        response = self.get("/v2/version?profile=1")
+        self.assertEqual(response.status_code, 200)
+        link = response.headers["Link"]
+        self.assertTrue(link.startswith("</v2/profiles/") and link.endswith('>; rel="profile"'))
+        path = link[1: link.index(">")]
+
+        profiles = self.get("/v2/profiles").get_json()["profiles"]
+        self.assertEqual(len(profiles), 1)
+        self.assertEqual(profiles[0]["path"], "/v2/version")
+        self.assertEqual(profiles[0]["mode"], "sample")
+        self.assertEqual(profiles[0]["status"], "ok")
+        self.assertEqual(path, f"/v2/profiles/{profiles[0]['name']}")
+
+        response = self.get(path)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith("text/plain"))
+        self.assertEqual(self.get(path, token="").status_code, 403)
+        self.assertEqual(self.get("/v2/profiles/config.py").status_code, 404)
+
+    def test_profile_form_parameter(self):
+        # profile= of a POST form, which is stripped from the parameters of the job
+        form = {"old_ref": "<ref>a</ref>", "new_ref": "<ref>b</ref>", "source": "text<ref>a</ref>", "profile": "1"}
+        self.assertEqual(self.client.post("/v2/editref", data=form).status_code, 403)
+        response = self.client.post("/v2/editref", data=form, headers={ADMIN_TOKEN_HEADER: "secret"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("text<ref>b</ref>", response.get_data(as_text=True))
+        profiles = list_profiles()
+        self.assertEqual(len(profiles), 1)
+        self.assertEqual(profiles[0]["method"], "POST")
+        self.assertNotIn("profile", profiles[0]["form"])
+
+    def test_cprofile(self):
+        response = self.get("/v2/version?profile=cprofile")
+        self.assertEqual(response.status_code, 200)
+        path = response.headers["Link"][1: response.headers["Link"].index(">")]
+        self.assertTrue(path.endswith(".prof"))
+        self.assertEqual(self.get(path).status_code, 200)
+
+    def test_prune_profiles(self):
+        for _ in range(3):
+            self.get("/v2/version?profile=1")
+        profiles = list_profiles()
+        self.assertEqual(len(profiles), 3)
+        prune_profiles(self.directory.name + "/profiles/", 2)
+        self.assertEqual([profile["name"] for profile in list_profiles()], [profile["name"] for profile in profiles[:2]])
@@ -0,0 +1,98 @@
+import multiprocessing
+import os
+import tempfile
+import time
+from unittest import TestCase
+from unittest.mock import patch
+
+import config
+from src.helpers import single_flight as single_flight_module
+from src.helpers.single_flight import single_flight
+
+
+def slow_computation(counter_path: str):
+    with open(counter_path, "a") as file:
+        file.write("x")
+    time.sleep(0.5)
+    return {"computed_by": os.getpid()}
+
+
+def coalesced_worker(cache_dir: str, counter_path: str, queue):
+    with patch.object(config, "iari_cache_dir", cache_dir):
+        queue.put(single_flight("articleV2:en.wikipedia.org.1.2", lambda: slow_computation(counter_path)))
+
+
+class TestSingleFlight(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_dir = self.directory.name + "/"
+        self.counter_path = f"{self.cache_dir}counter"
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_concurrent_processes_compute_once(self):
+        queue = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=coalesced_worker, args=(self.cache_dir, self.counter_path, queue))
+            for _ in range(4)
+        ]
+        for process in processes:
+            process.start()
+        results = [queue.get(timeout=30) for _ in processes]
+        for process in processes:
+            process.join()
+        with open(self.counter_path) as file:
+            assert file.read() == "x"
+        assert len({result["computed_by"] for result in results}) == 1
+
+    def test_sequential_calls_compute_again(self):
+        with patch.object(config, "iari_cache_dir", self.cache_dir):
+            assert single_flight("key", lambda: 1) == 1
+            assert single_flight("key", lambda: 2) == 2
+
+    def test_failure_is_not_shared(self):
+        with patch.object(config, "iari_cache_dir", self.cache_dir):
+            with self.assertRaises(ValueError):
+                single_flight("key", self.__fail__)
+            assert single_flight("key", lambda: "recovered") == "recovered"
+
+    def test_uncontended_result_is_not_written(self):
+        with patch.object(config, "iari_cache_dir", self.cache_dir):
+            assert single_flight("key", lambda: (1, 2)) == (1, 2)
+            names = os.listdir(single_flight_module.get_lock_directory())
+        assert not [name for name in names if name.endswith(".result.json")]
+
+    def test_waiting_result_is_shared_decoded(self):
+        with patch.object(config, "iari_cache_dir", self.cache_dir):
+            base_path = single_flight_module.get_lock_directory() + single_flight_module.get_key_hash("key")
+            # a caller waiting for the result
+            open(f"{base_path}.waiting", "a").close()
+            assert single_flight("key", lambda: (1, 2)) == [1, 2]
+            assert os.path.exists(f"{base_path}.result.json")
+            assert not os.path.exists(f"{base_path}.waiting")
+
+            open(f"{base_path}.waiting", "a").close()
+            with self.assertRaises(TypeError):
+                single_flight("key", lambda: {"when": object()})
+
+    def test_remove_old_results(self):
+        with patch.object(config, "iari_cache_dir", self.cache_dir):
+            directory = single_flight_module.get_lock_directory()
+            single_flight("key", lambda: 1)
+            assert single_flight_module.remove_old_results(max_age=3600) == 0
+            # the lock file of "key"
+            assert single_flight_module.remove_old_results(max_age=-1) == 1
+            assert os.listdir(directory) == []
+
+            lock_path = f"{directory}{single_flight_module.get_key_hash('held')}.lock"
+            held = single_flight_module.open_and_lock(lock_path, lock_path + ".waiting", timeout=1)
+            assert held is not None
+            assert single_flight_module.remove_old_results(max_age=-1) == 0
+            assert os.path.exists(lock_path)
+            held[0].close()
+            assert single_flight_module.remove_old_results(max_age=-1) == 1
+
+    @staticmethod
+    def __fail__():
+        raise ValueError("upstream error")
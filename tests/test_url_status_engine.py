@@ -0,0 +1,138 @@
+import asyncio
+import threading
+from unittest import TestCase
+from unittest.mock import patch
+
+from aiohttp import web
+
+from src.helpers import url_status_engine
+from src.helpers.url_status_engine import UrlStatusEngine
+
+
+class StubUpstream:
+    """local livewebcheck and searchurldata stand-ins that record the calls they get"""
+
+    def __init__(self, fail_first=0, delay=0.0):
+        self.fail_first = fail_first
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.port = asyncio.run_coroutine_threadsafe(self.start(), self.loop).result()
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/livewebcheck", self.livewebcheck)
+        app.router.add_post("/searchurldata", self.searchurldata)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        return self.runner.addresses[0][1]
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+    async def livewebcheck(self, request):
+        url = request.query["url"]
+        self.calls.append(("livewebcheck", url))
+        if len(self.calls) <= self.fail_first:
+            return web.Response(status=503)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        if "dead" in url:
+            return web.json_response({"status": 404, "status_ext": "RESPONSE CODE: 404"})
+        return web.json_response({"status": 200})
+
+    async def searchurldata(self, request):
+        self.calls.append(("searchurldata", (await request.post())["urls"]))
+        return web.json_response({"result": "success"})
+
+
+class TestUrlStatusEngine(TestCase):
+    def engine(self, upstream, **kwargs):
+        base = f"http://127.0.0.1:{upstream.port}"
+        patches = [
+            patch.object(url_status_engine, "LIVEWEBCHECK_URL", f"{base}/livewebcheck"),
+            patch.object(url_status_engine, "SEARCHURLDATA_URL", f"{base}/searchurldata"),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        engine = UrlStatusEngine(backoff=0, **kwargs)
+        self.addCleanup(engine.close)
+        self.addCleanup(upstream.stop)
+        return engine
+
+    def test_livewebcheck_with_archive_status(self):
+        upstream = StubUpstream()
+        urls = ["https://example.com/a", "https://example.org/dead", "https://example.com/a"]
+        results = self.engine(upstream).check_urls(urls, "LIVEWEBCHECK")
+        assert list(results) == ["https://example.com/a", "https://example.org/dead"]
+        assert results["https://example.com/a"]["status_code"] == 200
+        assert results["https://example.org/dead"]["status_code"] == 404
+        assert results["https://example.org/dead"]["status_code_error_details"] == "RESPONSE CODE: 404"
+        assert results["https://example.com/a"]["archive_status"] == {"result": "success"}
+        assert sorted(call[0] for call in upstream.calls) == ["livewebcheck"] * 2 + ["searchurldata"] * 2
+
+    def test_retries_5xx(self):
+        upstream = StubUpstream(fail_first=1)
+        results = self.engine(upstream).check_urls(["https://example.com/"], "LIVEWEBCHECK", archive_status=False)
+        assert results["https://example.com/"]["status_code"] == 200
+        assert "error" not in results["https://example.com/"]
+        assert len(upstream.calls) == 2
+
+    def test_gives_up_after_retries(self):
+        upstream = StubUpstream(fail_first=10)
+        results = self.engine(upstream, retries=1).check_urls(
+            ["https://example.com/"], "LIVEWEBCHECK", archive_status=False
+        )
+        assert results["https://example.com/"]["error"]["status_code"] == 503
+        assert len(upstream.calls) == 2
+
+    def test_per_host_budget(self):
+        upstream = StubUpstream(delay=0.05)
+        engine = self.engine(upstream, budgets={"host": {"concurrency": 1, "qps": 0}})
+        urls = [f"https://example.com/{n}" for n in range(6)]
+        results = engine.check_urls(urls, "LIVEWEBCHECK", archive_status=False)
+        assert all(result["status_code"] == 200 for result in results.values())
+        assert upstream.max_in_flight == 1
+
+        upstream.max_in_flight = 0
+        engine.check_urls([f"https://host{n}.example.com/" for n in range(6)], "LIVEWEBCHECK", archive_status=False)
+        assert upstream.max_in_flight > 1
+
+    def test_busy_host_does_not_hold_upstream_budget(self):
+        upstream = StubUpstream(delay=0.1)
+        engine = self.engine(upstream, budgets={
+            "host": {"concurrency": 1, "qps": 0}, "livewebcheck": {"concurrency": 2, "qps": 0}
+        })
+        urls = [f"https://example.com/{n}" for n in range(4)] + ["https://example.org/"]
+        engine.check_urls(urls, "LIVEWEBCHECK", archive_status=False)
+        # the other host is checked alongside the first url, not after all of example.com
+        assert upstream.calls.index(("livewebcheck", "https://example.org/")) < 4
+
+    def test_drops_idle_limiters(self):
+        upstream = StubUpstream()
+        # without qps limits, which keep a limiter until its next start
+        engine = self.engine(upstream, budgets={
+            "host": {"concurrency": 1, "qps": 0}, "livewebcheck": {"concurrency": 1, "qps": 0}
+        })
+        with patch.object(url_status_engine, "MAX_LIMITERS", 3):
+            for n in range(5):
+                engine.check_urls([f"https://host{n}.example.com/"], "LIVEWEBCHECK", archive_status=False)
+        assert len(engine.limiters) <= 3
+        assert all(limiter.users == 0 for limiter in engine.limiters.values())
+
+    def test_unknown_method(self):
+        upstream = StubUpstream()
+        results = self.engine(upstream).check_urls(["https://example.com/"], "FOO", archive_status=False)
+        assert results["https://example.com/"]["status_code_error_details"] == "Unrecognized url check method: FOO"
+        assert upstream.calls == []
@@ -0,0 +1,90 @@
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+import mwparserfromhell  # type: ignore
+
+from src.models.cache.flat_cache_backend import FlatCacheBackend
+from src.models.v2.wikimedia.wikipedia import reference as reference_module
+from src.models.v2.wikimedia.wikipedia.reference import WikipediaReferenceV2
+from src.models.v2.wikimedia.wikipedia.reference.extraction_memo_v2 import (
+    NAMESPACE,
+    ReferenceExtractionMemoV2,
+)
+
+FOOTNOTES = [
+    "<ref>{{cite web |url=https://www.example.com/a |archive-url=https://web.archive.org/web/2020/"
+    "https://www.example.com/a |title=A |ISBN=978-0-19-852663-6}}</ref>",
+    '<ref name="INE"/>',
+    "<ref>See [https://news.example.org/b B] and {{cite book |title=C |1=first}}</ref>",
+    "<ref>{{#tag:ref|nested}} plain text</ref>",
+]
+GENERAL = "* {{cite journal |doi=10.1000/182 |url=ftp://example.net/c}} https://bare.example.com/d"
+
+
+def extract(wikitext, memo, is_general_reference=False):
+    wikicode = mwparserfromhell.parse(wikitext)
+    if not is_general_reference:
+        wikicode = wikicode.filter_tags(matches=lambda tag: tag.tag.lower() == "ref")[0]
+    reference = WikipediaReferenceV2(
+        wikicode=wikicode, section="root", is_general_reference=is_general_reference
+    )
+    with patch.object(reference_module, "get_reference_memo", return_value=memo):
+        reference.extract_and_check()
+    return reference
+
+
+def summary(reference):
+    return (
+        reference.reference_id,
+        reference.is_named_reused_reference,
+        reference.get_template_dicts,
+        reference.template_names,
+        sorted(url.get_dict["url"] for url in reference.reference_urls or []),
+        [url.get_dict for url in reference.template_urls or []],
+        sorted(reference.unique_first_level_domains or []),
+        reference.get_name,
+    )
+
+
+class TestReferenceExtractionMemo(TestCase):
+    def test_hits_match_full_extraction(self):
+        memo = ReferenceExtractionMemoV2()
+        for wikitext, is_general_reference in [(f, False) for f in FOOTNOTES] + [(GENERAL, True)]:
+            expected = summary(extract(wikitext, None, is_general_reference))
+            assert summary(extract(wikitext, memo, is_general_reference)) == expected
+            assert summary(extract(wikitext, memo, is_general_reference)) == expected
+        assert memo.misses == len(FOOTNOTES) + 1
+        assert memo.hits == len(FOOTNOTES) + 1
+
+    def test_hits_do_not_share_objects(self):
+        memo = ReferenceExtractionMemoV2()
+        first = extract(FOOTNOTES[0], memo)
+        second = extract(FOOTNOTES[0], memo)
+        assert second.templates[0] is not first.templates[0]
+        second.templates[0].parameters["title"] = "changed"
+        assert extract(FOOTNOTES[0], memo).templates[0].parameters["title"] == "A"
+
+    def test_name_of_hit_leaves_it_unparsed(self):
+        memo = ReferenceExtractionMemoV2()
+        extract(FOOTNOTES[1], memo)
+        hit = extract(FOOTNOTES[1], memo)
+        assert hit.get_name == "INE"
+        assert hit.soup is None
+
+    def test_lru_is_bounded(self):
+        memo = ReferenceExtractionMemoV2(size=2)
+        for wikitext in FOOTNOTES:
+            extract(wikitext, memo)
+        assert len(memo.payloads) == 2
+
+    def test_persistent(self):
+        with tempfile.TemporaryDirectory() as directory:
+            os.makedirs(f"{directory}/{NAMESPACE}")
+            backend = FlatCacheBackend(directory + "/")
+            extract(FOOTNOTES[0], ReferenceExtractionMemoV2(persistent=True, backend=backend))
+            # e.g. another worker
+            memo = ReferenceExtractionMemoV2(persistent=True, backend=backend)
+            assert summary(extract(FOOTNOTES[0], memo)) == summary(extract(FOOTNOTES[0], None))
+            assert memo.hits == 1
@@ -0,0 +1,82 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from src.models.v2.job.article_job_v2 import ArticleJobV2
+from src.models.v2.wikimedia.wikipedia.reference import extractor_v2
+from src.models.v2.wikimedia.wikipedia.reference.analysis_cache_v2 import (
+    AnalysisCacheV2,
+)
+from src.models.v2.wikimedia.wikipedia.reference.extractor_v2 import (
+    WikipediaReferenceExtractorV2,
+)
+from test_data.test_content import (  # type: ignore
+    easter_island_head_excerpt,
+    electrical_breakdown_full_article,
+)
+
+
+def summary(extractor):
+    return [
+        (
+            reference.section,
+            reference.reference_id,
+            reference.is_general_reference,
+            reference.wikicode_as_string,
+            reference.template_names,
+            reference.raw_urls,
+            reference.unique_first_level_domains,
+        )
+        for reference in extractor.references
+    ]
+
+
+class TestIncrementalExtraction(TestCase):
+    def setUp(self):
+        self.job = ArticleJobV2(url="https://en.wikipedia.org/wiki/Electrical_breakdown")
+        self.job.__extract_url__()
+        self.cache = AnalysisCacheV2()
+        patcher = patch.object(extractor_v2, "get_analysis_cache", return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def extract(self, wikitext, incremental):
+        extractor = WikipediaReferenceExtractorV2(wikitext=wikitext, job=self.job, incremental=incremental)
+        extractor.extract_all_references()
+        return extractor
+
+    def test_revisions_match_full_extraction(self):
+        article = electrical_breakdown_full_article
+        revisions = [
+            article,
+            # an edit in one section
+            article.replace("==See also==", "==See also==\n* [[Dielectric strength]]"),
+            # a new reference in the root section
+            article.replace(
+                "\n==", "<ref>{{cite web |url=https://example.com/new |title=New}}</ref>\n==", 1
+            ),
+            # a removed section
+            article.split("==See also==")[0],
+            easter_island_head_excerpt,
+        ]
+        for revision in revisions:
+            assert summary(self.extract(revision, incremental=True)) == summary(
+                self.extract(revision, incremental=False)
+            )
+
+    def test_unchanged_sections_are_reused(self):
+        article = electrical_breakdown_full_article
+        first = self.extract(article, incremental=True)
+        assert first.reused_sections == 0
+
+        edited = article.replace("==See also==", "==See also==\n* [[Dielectric strength]]")
+        second = self.extract(edited, incremental=True)
+        assert second.reused_sections == len(second.sections) - 1
+        assert summary(second) == summary(self.extract(edited, incremental=False))
+
+    def test_references_in_changed_section_are_reused(self):
+        wikitext = "Intro<ref>{{cite web |url=https://example.com/a}}</ref>\n==History==\n"
+        first = self.extract(wikitext, incremental=True)
+        edited = wikitext.replace("Intro", "Introduction")
+        second = self.extract(edited, incremental=True)
+        assert second.reused_sections == 1
+        assert second.references[0] is first.references[0]
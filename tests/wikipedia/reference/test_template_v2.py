@@ -0,0 +1,69 @@
+import re
+from unittest import TestCase
+
+import mwparserfromhell  # type: ignore
+
+from src.models.v2.wikimedia.wikipedia.reference.template import WikipediaTemplateV2
+from test_data.test_content import (  # type: ignore
+    easter_island_head_excerpt,
+    easter_island_tail_excerpt,
+    electrical_breakdown_full_article,
+    old_norse_sources,
+    test_full_article,
+)
+
+
+def remove_comments_with_regex(text: str) -> str:
+    """__remove_comments__ before the fast path"""
+    string = ""
+    for match in re.findall(r"(.*)<!--.*-->(.*)|(.*)", text):
+        for part in match:
+            string += str(part)
+    return string.strip()
+
+
+def step_by_step_parameters(raw_template) -> dict:
+    """the parameters as extract_and_prepare_parameter_and_flds gave them with one pass per fix"""
+    template = WikipediaTemplateV2(raw_template=raw_template)
+    template.__extract_and_clean_template_parameters__()
+    template.__fix_class_key__()
+    template.__fix_aliases__()
+    template.__fix_dash__()
+    template.__add_template_name_to_parameters__()
+    template.__rename_one_to_first_parameter__()
+    return template.parameters
+
+
+class TestWikipediaTemplateV2(TestCase):
+    def test_parameters_match_step_by_step_fixes(self):
+        wikitext = "\n".join(
+            [
+                easter_island_head_excerpt,
+                easter_island_tail_excerpt,
+                electrical_breakdown_full_article,
+                old_norse_sources,
+                test_full_article,
+                # colliding keys
+                "{{cite web |accessdate=1 |access-date=2 |access_date=3 |class=a |news_class=b}}",
+                "{{cite news |archiveurl=x <!-- old --> |ISBN=978 |author-link1=y |1=first}}",
+            ]
+        )
+        raw_templates = mwparserfromhell.parse(wikitext).filter_templates(recursive=True)
+        assert len(raw_templates) > 100
+        for raw_template in raw_templates:
+            template = WikipediaTemplateV2(raw_template=raw_template)
+            template.extract_and_prepare_parameter_and_flds()
+            expected = step_by_step_parameters(raw_template)
+            assert list(template.parameters.items()) == list(expected.items()), str(raw_template)
+
+    def test_remove_comments(self):
+        for text in [
+            "",
+            "  plain  ",
+            "two\nlines \n",
+            "test<!--test-->",
+            "a <!-- b --> c <!-- d --> e",
+            "line<!--\nmultiline\n-->after",
+            "<!-- unclosed",
+        ]:
+            assert WikipediaTemplateV2.__remove_comments__(text) == remove_comments_with_regex(text), text
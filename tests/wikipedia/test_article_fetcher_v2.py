@@ -0,0 +1,109 @@
+import time
+from unittest import TestCase
+from unittest.mock import patch
+
+import requests
+
+from src.models.v2.job.article_job_v2 import ArticleJobV2
+from src.models.v2.wikimedia.wikipedia.article_fetcher_v2 import ArticleFetcherV2
+
+DELAY = 0.2
+
+
+class StubResponse:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self.data = data
+
+    def json(self):
+        return self.data
+
+
+class StubSession:
+    """answers the MediaWiki REST and ORES calls after DELAY seconds"""
+
+    def __init__(self, ores_error=None):
+        self.ores_error = ores_error
+        self.urls = []
+
+    def get(self, url, **kwargs):
+        self.urls.append(url)
+        time.sleep(DELAY)
+        if "ores.wikimedia.org" in url:
+            if self.ores_error:
+                raise self.ores_error
+            return StubResponse(
+                200,
+                {"enwiki": {"scores": {"1185000000": {"articlequality": {"score": {"prediction": "GA"}}}}}},
+            )
+        if url.endswith("/with_html"):
+            return StubResponse(200, {"html": "<html></html>"})
+        if "/revision/" in url:
+            return StubResponse(
+                200,
+                {"page": {"id": 9}, "timestamp": "2023-11-01T00:00:00Z", "source": "old wikitext"},
+            )
+        if "Missing" in url:
+            return StubResponse(404)
+        return StubResponse(
+            200,
+            {
+                "id": 9,
+                "latest": {"id": 1185000000, "timestamp": "2023-11-18T00:00:00Z"},
+                "source": "wikitext",
+            },
+        )
+
+
+class TestArticleFetcherV2(TestCase):
+    def fetch(self, session, **job):
+        with patch(
+            "src.models.v2.wikimedia.wikipedia.article_fetcher_v2.get_session",
+            return_value=session,
+        ):
+            return ArticleFetcherV2(job=ArticleJobV2(title="Easter Island", **job)).fetch()
+
+    def test_fetch_specific_revision_concurrently(self):
+        session = StubSession()
+        start = time.perf_counter()
+        result = self.fetch(session, revision=1185000000)
+        elapsed = time.perf_counter() - start
+        assert len(session.urls) == 3
+        # three calls of DELAY seconds, all at the same time
+        assert elapsed < 2 * DELAY
+        assert result.wikitext == "old wikitext"
+        assert result.page_id == 9
+        assert result.revision_id == 1185000000
+        assert result.html_markup == "<html></html>"
+        assert result.ores_quality_prediction == "GA"
+        assert set(result.timings) == {"wikitext", "html", "ores"}
+
+    def test_fetch_latest_revision(self):
+        session = StubSession()
+        start = time.perf_counter()
+        result = self.fetch(session)
+        elapsed = time.perf_counter() - start
+        # html runs alongside wikitext, ORES after it
+        assert elapsed < 3 * DELAY
+        assert result.revision_id == 1185000000
+        assert result.revision_timestamp == 1700265600
+        assert result.wikitext == "wikitext"
+        assert result.ores_details == {"prediction": "GA"}
+
+    def test_ores_error_is_not_fatal(self):
+        result = self.fetch(StubSession(ores_error=requests.Timeout("slow")))
+        assert result.wikitext == "wikitext"
+        assert result.ores_details == {}
+        assert result.errors[0]["type"] == "ores"
+        assert result.errors[0]["error"] == "Timeout"
+
+    def test_not_found(self):
+        session = StubSession()
+        with patch(
+            "src.models.v2.wikimedia.wikipedia.article_fetcher_v2.get_session",
+            return_value=session,
+        ):
+            result = ArticleFetcherV2(job=ArticleJobV2(title="Missing")).fetch()
+        assert result.found_in_wikipedia is False
+        assert result.wikitext is None
+        assert not any("ores" in url for url in session.urls)
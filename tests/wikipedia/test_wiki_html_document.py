@@ -0,0 +1,96 @@
+import json
+from unittest import TestCase
+
+from iarilib.html_document import WikiHtmlDocument
+from iarilib.parse_utils import extract_cite_refs
+from test_data.test_content import easter_island_parsoid_html_excerpt  # type: ignore
+
+# the output of the html parsing before WikiHtmlDocument (WikipediaArticleV2 and
+# iarilib.parse_utils.extract_cite_refs) for the excerpt
+EXPECTED_REFERENCES = "test_data/easter_island_parsoid_references.json"
+
+
+class TestWikiHtmlDocument(TestCase):
+    document = WikiHtmlDocument(easter_island_parsoid_html_excerpt)
+
+    def test_same_output_as_before(self):
+        with open(EXPECTED_REFERENCES) as file:
+            expected = json.load(file)
+        # as json, like the responses
+        assert json.loads(json.dumps(self.document.footnote_references())) == expected["footnote_references"]
+        assert json.loads(json.dumps(self.document.section_references(ref_counter=3))) == expected["section_references"]
+        assert json.loads(json.dumps(self.document.cite_refs())) == expected["cite_refs"]
+        assert json.loads(json.dumps(extract_cite_refs(easter_island_parsoid_html_excerpt))) == expected["cite_refs"]
+
+    def test_walk(self):
+        assert self.document.references_wrapper is not None
+        assert [section_id for _, section_id in self.document.reference_sections] == [
+            "Bibliography",
+            "Further_reading",
+        ]
+
+    def test_empty_html(self):
+        document = WikiHtmlDocument("")
+        assert document.footnote_references() == []
+        assert document.section_references() == []
+        assert document.cite_refs() == []
+
+    def test_footnote_references(self):
+        refs = self.document.footnote_references()
+        assert [ref["ref_id"] for ref in refs] == [1, 2, 3]
+        first = refs[0]
+        assert first["wiki_ref_id"] == "cite_note-INE-1"
+        assert first["ref_info"]["ref_name"] == "INE"
+        assert first["ref_info"]["cite_id"] == "CITEREFNational_Statistics_Institute"
+        assert first["template_names"] == ["cite web"]
+        assert first["template_urls"] == [
+            "http://www.ine.cl/canales/chile_estadistico/censos_poblacion_vivienda/censo_pobl_vivi.php"
+        ]
+        assert first["urls"] == first["template_urls"]
+        assert len(first["cite_ref_links"]) == 2
+        assert first["span_templates"][0][0] == "ctx_ver=Z39.88-2004"
+        assert first["cite_html"].startswith("<cite")
+        assert first["span_html"] is None
+        # the second template name is stripped
+        assert refs[1]["template_names"] == ["Cite book"]
+        # no <cite>, so the reference text span is returned instead
+        assert refs[2]["cite_html"] is None
+        assert refs[2]["span_html"].startswith('<span class="mw-reference-text')
+
+    def test_section_references(self):
+        refs = self.document.section_references(ref_counter=3)
+        assert [ref["ref_id"] for ref in refs] == [4, 5, 6]
+        assert [ref["source_section"] for ref in refs] == [
+            "Bibliography",
+            "Bibliography",
+            "Further_reading",
+        ]
+        assert refs[0]["urls"] == ["https://archive.org/details/akuaku00heye"]
+        assert refs[1]["templates"] == []
+        assert refs[1]["cite_html"] == ""
+
+    def test_cite_refs(self):
+        cite_refs = self.document.cite_refs()
+        assert [ref["id"] for ref in cite_refs] == [
+            "cite_note-INE-1",
+            "cite_note-2",
+            "cite_note-3",
+        ]
+        assert cite_refs[0]["page_refs"][1] == {
+            "href": "./Easter_Island#cite_ref-INE_1-1",
+            "id": "mwFg",
+        }
+        assert '"cite web"' in cite_refs[0]["raw_data"]
+        assert cite_refs[2]["urls"] == []
+        assert cite_refs[2]["span_html"]
+
+    def test_without_markup(self):
+        document = WikiHtmlDocument(easter_island_parsoid_html_excerpt, markup=False)
+        refs = document.footnote_references() + document.section_references()
+        assert all(not ref["cite_html"] and ref.get("span_html") is None for ref in refs)
+        # everything else is the same
+        markup_fields = {"cite_html", "span_html"}
+        full_refs = self.document.footnote_references() + self.document.section_references()
+        assert [{k: v for k, v in ref.items() if k not in markup_fields} for ref in refs] == [
+            {k: v for k, v in ref.items() if k not in markup_fields} for ref in full_refs
+        ]
@@ -0,0 +1,267 @@
+import os
+import tempfile
+from typing import Any, Dict, List
+from unittest import TestCase
+from unittest.mock import patch
+
+import config
+from src.helpers.refs_extractor.wikiapi import (
+    MAX_TITLES_PER_QUERY,
+    fetch_latest_revisions,
+    get_wikipedia_article,
+)
+
+# history of the stub page, newest first
+HISTORY = [
+    {"revid": 40, "timestamp": "2020-06-01T00:00:00Z", "content": "fourth"},
+    {"revid": 30, "timestamp": "2010-06-01T00:00:00Z", "content": None},  # deleted revision
+    {"revid": 20, "timestamp": "2005-06-01T00:00:00Z", "content": "second"},
+    {"revid": 10, "timestamp": "2002-06-01T00:00:00Z", "content": "first"},
+]
+
+
+class StubResponse:
+    def __init__(self, data):
+        self.status_code = 200
+        self.data = data
+
+    def json(self):
+        return self.data
+
+    def raise_for_status(self):
+        pass
+
+
+class StubMediaWikiApi:
+    """answers action=query&prop=revisions&formatversion=2 like api.php would"""
+
+    def __init__(self):
+        self.requests: List[Dict[str, Any]] = []
+        self.history = list(HISTORY)
+
+    @staticmethod
+    def revision(rev, rvprop):
+        result = {"revid": rev["revid"], "parentid": 0}
+        if "timestamp" in rvprop:
+            result["timestamp"] = rev["timestamp"]
+        if "content" in rvprop:
+            if rev["content"] is None:
+                result["slots"] = {"main": {"texthidden": True}}
+            else:
+                result["slots"] = {"main": {"contentmodel": "wikitext", "content": rev["content"]}}
+        elif rev["content"] is None:
+            result["texthidden"] = True
+        return result
+
+    def get(self, url, params=None, **kwargs):
+        self.requests.append(params)
+        assert url == "https://en.wikipedia.org/w/api.php"
+        assert params["formatversion"] == "2"
+        if "revids" in params:
+            revisions = [rev for rev in self.history if rev["revid"] == params["revids"]]
+        else:
+            if params["titles"] != "Easter_Island":
+                return StubResponse({"query": {"pages": [{"title": params["titles"], "missing": True}]}})
+            revisions = [rev for rev in self.history if rev["timestamp"] <= params["rvstart"]]
+            if params["rvlimit"] != "max":
+                revisions = revisions[: int(params["rvlimit"])]
+        page = {"pageid": 9, "title": "Easter Island"}
+        if revisions:
+            page["revisions"] = [self.revision(rev, params["rvprop"]) for rev in revisions]
+        return StubResponse({"query": {"pages": [page]}})
+
+
+class TestWikiApi(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        os.mkdir(os.path.join(self.cache_dir.name, "revisions"))
+        self.api = StubMediaWikiApi()
+        self.patches = [
+            patch.object(config, "iari_cache_dir", self.cache_dir.name + "/"),
+            patch("src.helpers.refs_extractor.wikiapi.get_session", return_value=self.api),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.cache_dir.cleanup()
+
+    def test_single_request(self):
+        results = get_wikipedia_article("en.wikipedia.org", "Easter_Island", "2008-01-01T00:00:00Z")
+        assert results == {
+            "page_id": "9",
+            "rev_id": 20,
+            "rev_timestamp": "2005-06-01T00:00:00Z",
+            "wikitext": "second",
+        }
+        assert len(self.api.requests) == 1
+        assert self.api.requests[0]["rvstart"] == "2008-01-01T00:00:00Z"
+        assert self.api.requests[0]["rvlimit"] == "1"
+
+    def test_repeat_lookup_uses_index(self):
+        get_wikipedia_article("en.wikipedia.org", "Easter_Island", "2008-01-01T00:00:00Z")
+        # inside [2005-06-01, 2008-01-01], where revision 20 is known to be current
+        results = get_wikipedia_article("en.wikipedia.org", "Easter_Island", "2006-01-01T00:00:00Z")
+        assert results["rev_id"] == 20
+        assert results["wikitext"] == "second"
+        assert len(self.api.requests) == 1
+        # outside the known interval we have to ask again
+        results = get_wikipedia_article("en.wikipedia.org", "Easter_Island", "2009-01-01T00:00:00Z")
+        assert results["rev_id"] == 20
+        assert len(self.api.requests) == 2
+        get_wikipedia_article("en.wikipedia.org", "Easter_Island", "2008-06-01T00:00:00Z")
+        assert len(self.api.requests) == 2
+
+    def test_future_as_of(self):
+        with patch("src.helpers.refs_extractor.wikiapi.get_current_timestamp", return_value="2021-01-01T00:00:00Z"):
+            results = get_wikipedia_article("en.wikipedia.org", "Easter_Island", "2099-01-01T00:00:00Z")
+        assert results["rev_id"] == 40
+        # revision 40 is only known to be current up to when it was fetched, not up to 2099
+        self.api.history.insert(0, {"revid": 50, "timestamp": "2022-06-01T00:00:00Z", "content": "fifth"})
+        results = get_wikipedia_article("en.wikipedia.org", "Easter_Island", "2023-01-01T00:00:00Z")
+        assert results["rev_id"] == 50
+        assert len(self.api.requests) == 2
+        results = get_wikipedia_article("en.wikipedia.org", "Easter_Island", "2020-12-01T00:00:00Z")
+        assert results["rev_id"] == 40
+        assert len(self.api.requests) == 2
+
+    def test_non_iso_as_of(self):
+        results = get_wikipedia_article("en.wikipedia.org", "Easter_Island", "20080101000000")
+        assert results["rev_id"] == 20
+        assert self.api.requests[0]["rvstart"] == "2008-01-01T00:00:00Z"
+        # the index holds ISO timestamps, whatever format they were asked in
+        results = get_wikipedia_article("en.wikipedia.org", "Easter_Island", "2006-01-01")
+        assert results["rev_id"] == 20
+        results = get_wikipedia_article("en.wikipedia.org", "Easter_Island", "20090101000000")
+        assert results["rev_id"] == 20
+        assert len(self.api.requests) == 2
+        results = get_wikipedia_article("en.wikipedia.org", "Easter_Island", "January 2008")
+        assert results["errors"][0]["error"] == "Invalid timestamp"
+        assert len(self.api.requests) == 2
+
+    def test_index_is_case_sensitive(self):
+        get_wikipedia_article("en.wikipedia.org", "Easter_Island", "2008-01-01T00:00:00Z")
+        results = get_wikipedia_article("en.wikipedia.org", "EASTER_ISLAND", "2008-01-01T00:00:00Z")
+        assert "errors" in results
+
+    def test_deleted_revision_is_skipped(self):
+        results = get_wikipedia_article("en.wikipedia.org", "Easter_Island", "2015-01-01T00:00:00Z")
+        assert results["rev_id"] == 20
+        assert results["wikitext"] == "second"
+        # the revision at rvstart, the list of older revisions, and the content of revision 20
+        assert len(self.api.requests) == 3
+
+    def test_before_first_revision(self):
+        results = get_wikipedia_article("en.wikipedia.org", "Easter_Island", "2001-01-01T00:00:00Z")
+        assert results["errors"][0]["details"] == "No suitable revision found"
+
+    def test_missing_page(self):
+        results = get_wikipedia_article("en.wikipedia.org", "No_such_page", "2008-01-01T00:00:00Z")
+        assert results["errors"][0]["error"] == "Missing page info"
+
+    def test_without_cache_directory(self):
+        with patch.object(config, "iari_cache_dir", self.cache_dir.name + "/nonexistent/"):
+            get_wikipedia_article("en.wikipedia.org", "Easter_Island", "2008-01-01T00:00:00Z")
+            get_wikipedia_article("en.wikipedia.org", "Easter_Island", "2008-01-01T00:00:00Z")
+        assert len(self.api.requests) == 2
+
+
+class StubMultiTitleApi:
+    """
+    answers action=query&prop=revisions&titles=A|B|C (with redirects=1 if asked) like api.php would,
+    returning the content of at most two pages per response
+    """
+
+    PAGES_PER_RESPONSE = 2
+
+    def __init__(self, count: int):
+        self.requests: List[Dict[str, Any]] = []
+        self.pages = {
+            f"Page {number}": {"pageid": number + 1, "revid": 100 + number, "content": f"text {number}"}
+            for number in range(count)
+        }
+        self.pages["Old page"] = {"pageid": 1000, "revid": 1000, "content": "#REDIRECT [[Page 0]]"}
+        self.redirects = {"Old page": "Page 0"}
+
+    def get(self, url, params=None, **kwargs):
+        self.requests.append(params)
+        titles = params["titles"].split("|")
+        assert len(titles) <= MAX_TITLES_PER_QUERY
+        query = {"normalized": [], "redirects": [], "pages": []}
+        for title in titles:
+            normalized = title.replace("_", " ")
+            if normalized != title:
+                query["normalized"].append({"from": title, "to": normalized})
+            if params.get("redirects") and normalized in self.redirects:
+                query["redirects"].append({"from": normalized, "to": self.redirects[normalized]})
+                normalized = self.redirects[normalized]
+            if normalized not in self.pages:
+                query["pages"].append({"title": normalized, "missing": True})
+                continue
+            page = self.pages[normalized]
+            query["pages"].append({"pageid": page["pageid"], "title": normalized})
+
+        offset = int(params.get("rvcontinue", 0))
+        with_content = [page for page in query["pages"] if "missing" not in page]
+        for page in with_content[offset:offset + self.PAGES_PER_RESPONSE]:
+            stub_page = self.pages[page["title"]]
+            page["revisions"] = [{
+                "revid": stub_page["revid"],
+                "timestamp": "2020-06-01T00:00:00Z",
+                "slots": {"main": {"content": stub_page["content"]}},
+            }]
+        data = {"query": query}
+        if offset + self.PAGES_PER_RESPONSE < len(with_content):
+            data["continue"] = {"rvcontinue": str(offset + self.PAGES_PER_RESPONSE), "continue": "||"}
+        return StubResponse(data)
+
+
+class TestFetchLatestRevisions(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        os.mkdir(os.path.join(self.cache_dir.name, "revisions"))
+        self.api = StubMultiTitleApi(count=120)
+        for p in [
+            patch.object(config, "iari_cache_dir", self.cache_dir.name + "/"),
+            patch("src.helpers.refs_extractor.wikiapi.get_session", return_value=self.api),
+        ]:
+            p.start()
+            self.addCleanup(p.stop)
+        self.addCleanup(self.cache_dir.cleanup)
+
+    def test_titles_are_grouped(self):
+        self.api.PAGES_PER_RESPONSE = MAX_TITLES_PER_QUERY
+        titles = [f"Page_{number}" for number in range(120)]
+        articles = fetch_latest_revisions("en.wikipedia.org", titles)
+        assert len(self.api.requests) == 3
+        assert list(articles) == titles
+        assert articles["Page_7"] == {
+            "page_id": "8",
+            "rev_id": 107,
+            "rev_timestamp": "2020-06-01T00:00:00Z",
+            "wikitext": "text 7",
+            "title": "Page 7",
+        }
+
+    def test_continuation(self):
+        articles = fetch_latest_revisions("en.wikipedia.org", [f"Page {number}" for number in range(5)])
+        # 5 pages with content, 2 per response
+        assert len(self.api.requests) == 3
+        assert [article["wikitext"] for article in articles.values()] == [f"text {number}" for number in range(5)]
+
+    def test_redirects_and_missing_pages(self):
+        articles = fetch_latest_revisions("en.wikipedia.org", ["Old_page", "No such page", "Page 1"])
+        # redirects are not followed, as for a single page
+        assert articles["Old_page"]["title"] == "Old page"
+        assert articles["Old_page"]["wikitext"] == "#REDIRECT [[Page 0]]"
+        assert articles["No such page"]["errors"][0]["error"] == "Missing page info"
+        assert articles["Page 1"]["wikitext"] == "text 1"
+        assert len(self.api.requests) == 1
+
+    def test_fetched_revisions_are_cached(self):
+        fetch_latest_revisions("en.wikipedia.org", ["Page_3"])
+        results = get_wikipedia_article("en.wikipedia.org", "Page_3", "2020-07-01T00:00:00Z")
+        assert results["wikitext"] == "text 3"
+        assert len(self.api.requests) == 1
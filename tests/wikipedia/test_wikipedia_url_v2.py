@@ -0,0 +1,61 @@
+from unittest import TestCase
+
+import mwparserfromhell  # type: ignore
+from tld import get_fld
+from tld.exceptions import TldBadUrl, TldDomainNotFound
+
+from src.models.v2.wikimedia.wikipedia.reference.template import WikipediaTemplateV2
+from src.models.v2.wikimedia.wikipedia.url_v2 import (
+    WikipediaUrlV2,
+    resolve_first_level_domain,
+)
+
+URLS = [
+    "https://en.wikipedia.org/wiki/Test",
+    "https://books.google.com/books?id=Sj9jDwAAQBAJ&printsec=frontcover",
+    "https://web.archive.org/web/20141031094104/http://collections.rmg.co.uk/collections/objects/13275.html",
+    "https://web.archive.org/web/20220000000000*/https://www.regeringen.se/rattsliga-dokument/sou-20167?test=2",
+    "http://127.0.0.1/test",
+    "http://[::1]:8080/test",
+    "http://user@WWW.Example.CO.UK:8080/path",
+    "www.example.com/no-scheme",
+    "gopher://example.invalid/",
+    "mailto:someone@example.com",
+]
+
+
+class TestWikipediaUrlV2(TestCase):
+    def test_first_level_domains_match_tld(self):
+        for url in URLS:
+            url_object = WikipediaUrlV2.from_url(url)
+            try:
+                expected = get_fld(url_object.archived_url or url)
+            except (TldBadUrl, TldDomainNotFound):
+                expected = url_object.first_level_domain if url_object.fld_is_ip else ""
+            assert url_object.first_level_domain == expected, url
+
+    def test_first_level_domains(self):
+        assert resolve_first_level_domain("www.example.co.uk:8080") == ("example.co.uk", False)
+        assert resolve_first_level_domain("127.0.0.1") == ("127.0.0.1", True)
+        assert resolve_first_level_domain("") == ("", False)
+        assert WikipediaUrlV2.from_url(URLS[2]).first_level_domain == "rmg.co.uk"
+
+    def test_first_level_domains_are_memoized(self):
+        resolve_first_level_domain.cache_clear()
+        for number in range(10):
+            WikipediaUrlV2.from_url(f"https://www.example.org/{number}")
+        info = resolve_first_level_domain.cache_info()
+        assert (info.misses, info.hits) == (1, 9)
+
+    def test_template_urls_are_computed_once(self):
+        raw_template = mwparserfromhell.parse(
+            "{{cite web |url=https://example.com/a |archiveurl=https://web.archive.org/web/2020/https://example.com/a}}"
+        ).filter_templates()[0]
+        template = WikipediaTemplateV2(raw_template=raw_template)
+        template.extract_and_prepare_parameter_and_flds()
+        first = template.urls
+        assert sorted(url.url for url in first) == [
+            "https://example.com/a",
+            "https://web.archive.org/web/2020/https://example.com/a",
+        ]
+        assert template.urls is first
@@ -0,0 +1,84 @@
+// Title: Decoder of the IARI compact wire format
+// Note: expands a format=compact response of /v2/extract_refs or /v2/article
+//   into the data the plain json response holds, see src/helpers/compact.py
+// Usage:
+//   fetch(iari_url + "v2/article?url=...&format=compact")
+//       .then(response => response.json())
+//       .then(data => expand_compact(data))
+
+function expand_compact(data) {
+    let table = data.compact
+    let strings = table.strings
+    let names = table.templates.names
+    let parameters = table.templates.parameters
+
+    function string(index) {
+        return index === null ? null : strings[index]
+    }
+
+    function template(index) {
+        let expanded = {}
+        if (names[index] !== null) {
+            expanded.name = strings[names[index]]
+        }
+        if (parameters[index] !== null) {
+            let flat = parameters[index]
+            expanded.parameters = {}
+            for (let i = 0; i < flat.length; i += 2) {
+                expanded.parameters[strings[flat[i]]] = strings[flat[i + 1]]
+            }
+        }
+        return expanded
+    }
+
+    function records(encoded) {
+        let expanded = []
+        for (let row = 0; row < encoded.count; row++) {
+            expanded.push({})
+        }
+        let absent = encoded.absent || {}
+        for (let [key, [column_type, values]] of Object.entries(encoded.columns)) {
+            let skipped = new Set(absent[key] || [])
+            values.forEach((value, row) => {
+                if (skipped.has(row)) {
+                    return
+                }
+                if (column_type === "s") {
+                    value = string(value)
+                } else if (column_type === "S") {
+                    value = value === null ? null : value.map(item => strings[item])
+                } else if (column_type === "t") {
+                    value = value === null ? null : value.map(template)
+                }
+                expanded[row][key] = value
+            })
+        }
+        return expanded
+    }
+
+    let result = {}
+    for (let [key, value] of Object.entries(data)) {
+        if (key !== "compact") {
+            result[key] = value
+        }
+    }
+    for (let [name, field_type] of Object.entries(table.fields)) {
+        let value = data[name]
+        if (field_type === "S") {
+            result[name] = value.map(item => strings[item])
+        } else if (field_type === "r") {
+            result[name] = records(value)
+        } else if (field_type === "k") {
+            let rows = records(value.rows)
+            result[name] = {}
+            value.keys.forEach((key, i) => {
+                result[name][strings[key]] = rows[i]
+            })
+        }
+    }
+    return result
+}
+
+if (typeof module !== "undefined") {
+    module.exports = { expand_compact }
+}